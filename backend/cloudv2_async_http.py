@@ -0,0 +1,451 @@
+import asyncio
+import io
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from backend.cloudv2_config import SERVER_MODE_ASYNCIO
+
+_HEADER_END = b"\r\n\r\n"
+_MAX_HEADER_BYTES = 64 * 1024
+_NO_BODY_STATUS = (204, 304)
+# Bytes entregues ao transporte entre esperas pelo dreno do socket.
+_DRAIN_CHUNK_BYTES = 64 * 1024
+
+
+def _simple_response(status_code, reason):
+    body = f'{{"error":"{reason}"}}'.encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status_code} {reason}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _inspect_request_head(head):
+    # (metodo, caminho, content_length, erro) a partir do bloco de cabecalhos;
+    # o parse completo continua no BaseHTTPRequestHandler.
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3:
+        return None, None, 0, (400, "Bad Request")
+    method, target, _version = parts
+    content_length = 0
+    for line in lines[1:]:
+        name, _sep, value = line.partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            try:
+                content_length = int(value.strip())
+            except ValueError:
+                return method, target, 0, (400, "Bad Request")
+            if content_length < 0:
+                return method, target, 0, (400, "Bad Request")
+        elif name == "transfer-encoding":
+            # Corpo chunked nao e usado pelo dashboard (_read_json_body le
+            # Content-Length).
+            return method, target, 0, (501, "Not Implemented")
+    return method, target.split("?", 1)[0], content_length, None
+
+
+class _ResponseOutput:
+    # Saida do handler (thread do executor) para o transporte do asyncio. Os
+    # bytes seguem em ordem pelo call_soon_threadsafe; o cabecalho da resposta
+    # e guardado para decidir se a conexao pode ser reaproveitada.
+    #
+    # Backpressure: a cada _DRAIN_CHUNK_BYTES o thread do handler espera o
+    # writer.drain() no loop. Cliente parado (SSE sem leitura) nao faz o
+    # buffer do transporte crescer: apos write_timeout_sec o handler recebe
+    # BrokenPipeError e a conexao e encerrada.
+    def __init__(self, loop, writer, write_timeout_sec=15.0, on_stall=None):
+        self._loop = loop
+        self._writer = writer
+        self._write_timeout_sec = write_timeout_sec
+        self._on_stall = on_stall
+        self._head = bytearray()
+        self._head_done = False
+        self._undrained = 0
+        self.bytes_written = 0
+
+    def sendall(self, data):
+        if self._writer.is_closing():
+            raise BrokenPipeError("conexao encerrada pelo cliente")
+        data = bytes(data)
+        if not data:
+            return
+        if not self._head_done:
+            self._head.extend(data)
+            end = self._head.find(_HEADER_END)
+            if end >= 0:
+                del self._head[end:]
+                self._head_done = True
+        self.bytes_written += len(data)
+        try:
+            self._loop.call_soon_threadsafe(self._write, data)
+        except RuntimeError:
+            # Loop encerrado (shutdown) com o handler ainda escrevendo.
+            raise BrokenPipeError("servidor encerrado") from None
+        self._undrained += len(data)
+        if self._undrained >= _DRAIN_CHUNK_BYTES:
+            self._undrained = 0
+            self._wait_drain()
+
+    def _write(self, data):
+        if not self._writer.is_closing():
+            self._writer.write(data)
+
+    def _wait_drain(self):
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._writer.drain(), self._loop)
+        except RuntimeError:
+            raise BrokenPipeError("servidor encerrado") from None
+        try:
+            future.result(self._write_timeout_sec)
+        except FutureTimeoutError:
+            future.cancel()
+            if self._on_stall is not None:
+                self._on_stall()
+            self._loop.call_soon_threadsafe(self._writer.close)
+            raise BrokenPipeError("cliente nao esta lendo a resposta") from None
+        except (ConnectionError, asyncio.CancelledError):
+            raise BrokenPipeError("conexao encerrada pelo cliente") from None
+
+    def is_delimited(self, method):
+        # Resposta com fim conhecido (Content-Length ou sem corpo): a conexao
+        # pode receber a proxima requisicao. Stream (SSE) termina fechando.
+        if not self._head_done:
+            return False
+        lines = self._head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(None, 2)
+        try:
+            status_code = int(parts[1])
+        except (IndexError, ValueError):
+            return False
+        if status_code < 200 or status_code in _NO_BODY_STATUS or method == "HEAD":
+            return True
+        return any(line.lower().startswith("content-length:") for line in lines[1:])
+
+
+class _RequestConnection:
+    # "Socket" entregue ao BaseHTTPRequestHandler: le a requisicao ja recebida
+    # pelo loop e escreve pelo _ResponseOutput (wbufsize=0 usa sendall).
+    def __init__(self, raw_request, output):
+        self._raw_request = raw_request
+        self._output = output
+
+    def makefile(self, mode, bufsize=-1):
+        if "r" in mode:
+            return io.BytesIO(self._raw_request)
+        raise io.UnsupportedOperation("escrita usa sendall")
+
+    def sendall(self, data):
+        self._output.sendall(data)
+
+    def settimeout(self, value):
+        return None
+
+    def setsockopt(self, *args):
+        return None
+
+
+def _keep_alive_handler_class(handler_class):
+    class KeepAliveHandler(handler_class):
+        protocol_version = "HTTP/1.1"
+
+        def handle(self):
+            # Uma requisicao por instancia: close_connection fica com a decisao
+            # do handler (Connection: close, HTTP/1.0, stream) e nao com o EOF
+            # do buffer.
+            self.close_connection = True
+            self.handle_one_request()
+
+        def end_headers(self):
+            # Em HTTP/1.1 o cliente so sabe que a conexao vai fechar pelo cabecalho.
+            if self.close_connection:
+                self.send_header("Connection", "close")
+            super().end_headers()
+
+    KeepAliveHandler.__name__ = handler_class.__name__
+    KeepAliveHandler.__qualname__ = handler_class.__qualname__
+    return KeepAliveHandler
+
+
+class AsyncDashboardServer:
+    # Front end HTTP/1.1 com keep-alive sobre asyncio. Um loop em um thread
+    # aceita as conexoes e le cada requisicao (com timeout); o DashboardHandler
+    # existente (do_GET/do_POST/...) roda em um ThreadPoolExecutor de tamanho
+    # fixo, entao chamadas bloqueantes ao store e ao SQLite nao travam o loop
+    # e o numero de threads nao cresce com as conexoes. Caminhos de conexao
+    # longa (SSE) ganham thread propria para nao ocupar o executor; o limite
+    # deles fica no proprio stream.
+    #
+    # Mesma interface usada do ThreadingHTTPServer: server_address,
+    # server_name/server_port (handler), shutdown() e server_close().
+    def __init__(
+        self,
+        server_address,
+        handler_class,
+        max_workers=16,
+        max_connections=512,
+        request_timeout_sec=15.0,
+        keepalive_timeout_sec=15.0,
+        max_body_bytes=1048576,
+        long_request_paths=(),
+        log=None,
+    ):
+        self.handler_class = _keep_alive_handler_class(handler_class)
+        self.max_workers = max(1, int(max_workers))
+        self.max_connections = max(1, int(max_connections))
+        self.request_timeout_sec = max(0.1, float(request_timeout_sec))
+        self.keepalive_timeout_sec = max(0.1, float(keepalive_timeout_sec))
+        self.max_body_bytes = max(0, int(max_body_bytes))
+        self.long_request_paths = frozenset(long_request_paths or ())
+        self.log = log or logging.getLogger("cloudv2.http")
+        self.state_stream = None
+        self.auth_service = None
+        self.server_address = (str(server_address[0]), int(server_address[1]))
+        self.server_name = socket.getfqdn(self.server_address[0])
+        self.server_port = self.server_address[1]
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cloudv2-http")
+        self._loop = None
+        self._thread = None
+        self._stop_event = None
+        self._writers = set()
+        self._tasks = set()
+        # Contadores atualizados pelo loop e pelos threads dos handlers.
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "connections_total": 0,
+            "requests": 0,
+            "keepalive_reuses": 0,
+            "rejected_connections": 0,
+            "timeouts": 0,
+            "stalled_writes": 0,
+            "errors": 0,
+        }
+
+    def _count(self, name):
+        with self._metrics_lock:
+            self._metrics[name] += 1
+
+    def start(self):
+        if self._thread is not None:
+            return
+        started = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                loop.run_until_complete(self._serve(started))
+            except Exception as exc:
+                failure.append(exc)
+            finally:
+                started.set()
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="cloudv2-http-loop", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+            raise failure[0]
+
+    async def _serve(self, started):
+        self._stop_event = asyncio.Event()
+        server = await asyncio.start_server(
+            self._handle_connection,
+            self.server_address[0],
+            self.server_address[1],
+            limit=_MAX_HEADER_BYTES,
+            reuse_address=True,
+            backlog=min(self.max_connections, 1024),
+        )
+        sockname = server.sockets[0].getsockname()
+        self.server_address = (sockname[0], sockname[1])
+        self.server_port = sockname[1]
+        started.set()
+        try:
+            await self._stop_event.wait()
+        finally:
+            server.close()
+            for writer in list(self._writers):
+                writer.close()
+            # Conexoes terminam a requisicao em andamento; o que sobrar apos
+            # o prazo e cancelado no encerramento do loop.
+            if self._tasks:
+                await asyncio.wait(list(self._tasks), timeout=2.0)
+
+    def shutdown(self):
+        loop = self._loop
+        thread = self._thread
+        if loop is None or thread is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._stop_event.set)
+        except RuntimeError:
+            pass
+        thread.join(timeout=5.0)
+        self._thread = None
+
+    def server_close(self):
+        # Encerra o stream antes: libera as conexoes SSE presas em wait_events.
+        if self.state_stream is not None:
+            self.state_stream.stop()
+        self.shutdown()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Grava os last_seen_at ainda em buffer.
+        if self.auth_service is not None:
+            self.auth_service.close()
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["mode"] = SERVER_MODE_ASYNCIO
+        metrics["connections"] = len(self._writers)
+        metrics["max_connections"] = self.max_connections
+        metrics["workers"] = self.max_workers
+        return metrics
+
+    async def _handle_connection(self, reader, writer):
+        self._count("connections_total")
+        if len(self._writers) >= self.max_connections:
+            self._count("rejected_connections")
+            writer.write(_simple_response(503, "Service Unavailable"))
+            await self._close_writer(writer)
+            return
+
+        self._writers.add(writer)
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        peer = writer.get_extra_info("peername") or ("", 0)
+        served = 0
+        try:
+            while True:
+                # Primeira requisicao: prazo de leitura; nas seguintes o mesmo
+                # relogio cobre a espera ociosa do keep-alive.
+                timeout = self.request_timeout_sec if not served else self.keepalive_timeout_sec
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(_HEADER_END), timeout)
+                except asyncio.TimeoutError:
+                    self._count("timeouts")
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(_simple_response(431, "Request Header Fields Too Large"))
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                method, path, content_length, error = _inspect_request_head(head)
+                if error is None and content_length > self.max_body_bytes:
+                    error = (413, "Content Too Large")
+                if error is not None:
+                    writer.write(_simple_response(*error))
+                    break
+                body = b""
+                if content_length:
+                    try:
+                        body = await asyncio.wait_for(reader.readexactly(content_length), self.request_timeout_sec)
+                    except asyncio.TimeoutError:
+                        self._count("timeouts")
+                        break
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+
+                if served:
+                    self._count("keepalive_reuses")
+                served += 1
+                self._count("requests")
+                output = _ResponseOutput(
+                    asyncio.get_running_loop(),
+                    writer,
+                    write_timeout_sec=self.request_timeout_sec,
+                    on_stall=lambda: self._count("stalled_writes"),
+                )
+                if path in self.long_request_paths:
+                    keep_alive = await self._run_in_thread(self._serve_request, head + body, output, peer, method)
+                else:
+                    keep_alive = await asyncio.get_running_loop().run_in_executor(
+                        self._executor,
+                        self._serve_request,
+                        head + body,
+                        output,
+                        peer,
+                        method,
+                    )
+                try:
+                    await asyncio.wait_for(writer.drain(), self.request_timeout_sec)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                if not keep_alive or writer.is_closing():
+                    break
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            self._count("errors")
+            self.log.warning("Falha na conexao HTTP de %s: %s", peer[0] if peer else "-", exc)
+        finally:
+            self._writers.discard(writer)
+            self._tasks.discard(task)
+            writer.close()
+
+    def _serve_request(self, raw_request, output, peer, method):
+        try:
+            handler = self.handler_class(_RequestConnection(raw_request, output), peer, self)
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+        except Exception as exc:
+            self._count("errors")
+            self.log.warning("Falha ao atender requisicao HTTP: %s", exc)
+            if not output.bytes_written:
+                try:
+                    output.sendall(_simple_response(500, "Internal Server Error"))
+                except OSError:
+                    pass
+            return False
+        return not handler.close_connection and output.is_delimited(method)
+
+    def _run_in_thread(self, func, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(result, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def target():
+            result, error = None, None
+            try:
+                result = func(*args)
+            except Exception as exc:
+                error = exc
+            try:
+                loop.call_soon_threadsafe(resolve, result, error)
+            except RuntimeError:
+                pass
+
+        threading.Thread(target=target, name="cloudv2-http-stream", daemon=True).start()
+        return future
+
+    async def _close_writer(self, writer):
+        try:
+            writer.close()
+            await asyncio.wait_for(writer.wait_closed(), 1.0)
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            pass
@@ -12,6 +12,7 @@ import sqlite3
 import threading
 import time
 import uuid
+from contextlib import contextmanager
 from email.message import EmailMessage
 from urllib.parse import quote
 
@@ -29,6 +30,10 @@ def _env_int(name, default, minimum=1):
 
 SESSION_COOKIE_NAME = str(os.environ.get("AUTH_SESSION_COOKIE_NAME", "cloudv2_session")).strip() or "cloudv2_session"
 SESSION_TTL_SEC = _env_int("AUTH_SESSION_TTL_SEC", 12 * 3600, minimum=300)
+SESSION_CACHE_TTL_SEC = _env_int("AUTH_SESSION_CACHE_TTL_SEC", 30, minimum=0)
+SESSION_CACHE_MAX_ENTRIES = _env_int("AUTH_SESSION_CACHE_MAX_ENTRIES", 4096, minimum=1)
+LAST_SEEN_FLUSH_SEC = _env_int("AUTH_LAST_SEEN_FLUSH_SEC", 60, minimum=0)
+DB_POOL_SIZE = _env_int("AUTH_DB_POOL_SIZE", 4, minimum=1)
 VERIFY_TOKEN_TTL_SEC = _env_int("AUTH_VERIFY_TOKEN_TTL_SEC", 24 * 3600, minimum=300)
 RESET_TOKEN_TTL_SEC = _env_int("AUTH_RESET_TOKEN_TTL_SEC", 3600, minimum=300)
 PASSWORD_MIN_LENGTH = _env_int("AUTH_PASSWORD_MIN_LENGTH", 8, minimum=8)
@@ -265,14 +270,160 @@ class AuthService:
         self.db_path = str(db_path or "").strip()
         self.logger = logger
         self.email_service = email_service or AuthEmailService(logger=logger)
-
-    def _connect(self):
+        self._pool_lock = threading.Lock()
+        self._idle_connections = []
+        self._closed = False
+        # Sessoes resolvidas por hash do token, validas por SESSION_CACHE_TTL_SEC.
+        # Logout, reset de senha, verificacao e exclusao de conta invalidam na
+        # hora; alteracoes feitas por outro processo valem apos o TTL.
+        self._session_cache_lock = threading.Lock()
+        self._session_cache = {}
+        self._session_cache_epoch = 0
+        self._session_cache_hits = 0
+        self._session_cache_misses = 0
+        # last_seen_at por sessao, gravado em lote a cada LAST_SEEN_FLUSH_SEC.
+        self._pending_last_seen = {}
+        self._last_seen_flushed_at = _now_ts()
+        self._last_seen_flushes = 0
+
+    def _open_connection(self):
         conn = sqlite3.connect(self.db_path, timeout=3.0, check_same_thread=False)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON")
         conn.execute("PRAGMA busy_timeout = 3000")
         return conn
 
+    @contextmanager
+    def _connect(self):
+        # Conexao reaproveitada do pool ocioso (ate DB_POOL_SIZE). O bloco faz
+        # commit no fim ou rollback em erro, como o "with conn" do sqlite3;
+        # conexao que terminou em erro e descartada.
+        conn = None
+        with self._pool_lock:
+            if self._idle_connections:
+                conn = self._idle_connections.pop()
+        if conn is None:
+            conn = self._open_connection()
+        reusable = False
+        try:
+            with conn:
+                yield conn
+            reusable = True
+        finally:
+            with self._pool_lock:
+                if reusable and not self._closed and len(self._idle_connections) < DB_POOL_SIZE:
+                    self._idle_connections.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        self.flush_session_touches()
+        with self._pool_lock:
+            self._closed = True
+            idle = self._idle_connections
+            self._idle_connections = []
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _get_cached_session(self, session_hash, now_ts):
+        if SESSION_CACHE_TTL_SEC <= 0:
+            return None
+        with self._session_cache_lock:
+            entry = self._session_cache.get(session_hash)
+            if entry is None:
+                self._session_cache_misses += 1
+                return None
+            cached_at, context = entry
+            expires_at = float(context.get("session_expires_at") or 0.0)
+            if now_ts - cached_at >= SESSION_CACHE_TTL_SEC or now_ts < cached_at or expires_at <= now_ts:
+                del self._session_cache[session_hash]
+                self._session_cache_misses += 1
+                return None
+            self._session_cache_hits += 1
+            return context
+
+    def _store_cached_session(self, session_hash, context, now_ts, epoch):
+        if SESSION_CACHE_TTL_SEC <= 0:
+            return
+        with self._session_cache_lock:
+            # Invalidacao durante a consulta: o resultado pode estar velho.
+            if epoch != self._session_cache_epoch:
+                return
+            self._session_cache[session_hash] = (now_ts, context)
+            if len(self._session_cache) > SESSION_CACHE_MAX_ENTRIES:
+                oldest = min(self._session_cache, key=lambda item: self._session_cache[item][0])
+                del self._session_cache[oldest]
+
+    def _invalidate_sessions(self, session_hash=None, user_id=None):
+        # Sem argumentos limpa tudo.
+        with self._session_cache_lock:
+            self._session_cache_epoch += 1
+            if session_hash is not None:
+                self._session_cache.pop(session_hash, None)
+            elif user_id is not None:
+                user_id = str(user_id)
+                for key in [key for key, entry in self._session_cache.items() if entry[1]["session_user_id"] == user_id]:
+                    del self._session_cache[key]
+            else:
+                self._session_cache.clear()
+
+    def _touch_session(self, session_id, now_ts):
+        with self._session_cache_lock:
+            self._pending_last_seen[session_id] = now_ts
+            due = LAST_SEEN_FLUSH_SEC <= 0 or now_ts - self._last_seen_flushed_at >= LAST_SEEN_FLUSH_SEC
+        if due:
+            self.flush_session_touches(now_ts)
+
+    def flush_session_touches(self, now_ts=None):
+        with self._session_cache_lock:
+            pending = self._pending_last_seen
+            self._pending_last_seen = {}
+            self._last_seen_flushed_at = float(now_ts if now_ts is not None else _now_ts())
+        if not pending:
+            return 0
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    """
+                    UPDATE user_sessions
+                    SET last_seen_at = ?
+                    WHERE id = ?
+                    """,
+                    [(seen_ts, session_id) for session_id, seen_ts in pending.items()],
+                )
+        except sqlite3.Error as exc:
+            # Banco ocupado: devolve para a proxima rodada sem perder toques novos.
+            with self._session_cache_lock:
+                for session_id, seen_ts in pending.items():
+                    if self._pending_last_seen.get(session_id, 0.0) < seen_ts:
+                        self._pending_last_seen[session_id] = seen_ts
+            if self.logger is not None:
+                self.logger.warning("Falha ao gravar last_seen_at de %d sessoes: %s", len(pending), exc)
+            return 0
+        with self._session_cache_lock:
+            self._last_seen_flushes += 1
+        return len(pending)
+
+    def get_metrics(self):
+        with self._session_cache_lock:
+            requests = self._session_cache_hits + self._session_cache_misses
+            metrics = {
+                "session_cache_entries": len(self._session_cache),
+                "session_cache_hits": self._session_cache_hits,
+                "session_cache_misses": self._session_cache_misses,
+                "session_cache_hit_ratio": round(self._session_cache_hits / requests, 4) if requests else None,
+                "session_cache_ttl_sec": SESSION_CACHE_TTL_SEC,
+                "pending_last_seen": len(self._pending_last_seen),
+                "last_seen_flushes": self._last_seen_flushes,
+            }
+        with self._pool_lock:
+            metrics["idle_connections"] = len(self._idle_connections)
+        return metrics
+
     def _normalize_email(self, email):
         return str(email or "").strip().lower()
 
@@ -617,6 +768,7 @@ class AuthService:
                     """,
                     (now_ts, user_id),
                 )
+        self._invalidate_sessions(user_id=user_id)
 
         if self.logger is not None:
             self.logger.info("Conta admin fixa garantida para %s", mask_email(admin_email))
@@ -845,51 +997,51 @@ class AuthService:
         now_ts = _now_ts()
         session_hash = self._hash_secret(token, "session")
 
-        with self._connect() as conn:
-            row = conn.execute(
-                """
-                SELECT
-                    sessions.id AS session_id,
-                    sessions.user_id AS session_user_id,
-                    sessions.expires_at AS session_expires_at,
-                    users.*
-                FROM user_sessions AS sessions
-                JOIN users
-                    ON users.id = sessions.user_id
-                WHERE sessions.session_hash = ?
-                    AND sessions.revoked_at IS NULL
-                    AND sessions.expires_at > ?
-                    AND users.deleted_at IS NULL
-                    AND users.status = 'active'
-                LIMIT 1
-                """,
-                (session_hash, now_ts),
-            ).fetchone()
+        context = self._get_cached_session(session_hash, now_ts)
+        if context is None:
+            with self._session_cache_lock:
+                epoch = self._session_cache_epoch
+            with self._connect() as conn:
+                row = conn.execute(
+                    """
+                    SELECT
+                        sessions.id AS session_id,
+                        sessions.user_id AS session_user_id,
+                        sessions.expires_at AS session_expires_at,
+                        users.*
+                    FROM user_sessions AS sessions
+                    JOIN users
+                        ON users.id = sessions.user_id
+                    WHERE sessions.session_hash = ?
+                        AND sessions.revoked_at IS NULL
+                        AND sessions.expires_at > ?
+                        AND users.deleted_at IS NULL
+                        AND users.status = 'active'
+                    LIMIT 1
+                    """,
+                    (session_hash, now_ts),
+                ).fetchone()
 
             if row is None:
                 return None
 
-            if touch:
-                with conn:
-                    conn.execute(
-                        """
-                        UPDATE user_sessions
-                        SET last_seen_at = ?
-                        WHERE id = ?
-                        """,
-                        (now_ts, str(row["session_id"])),
-                    )
+            user = self._public_user_from_row(row)
+            if user is None:
+                return None
 
-        user = self._public_user_from_row(row)
-        if user is None:
-            return None
+            context = {
+                "session_id": str(row["session_id"]),
+                "session_user_id": str(row["session_user_id"]),
+                "session_expires_at": row["session_expires_at"],
+                "user": user,
+            }
+            self._store_cached_session(session_hash, context, now_ts, epoch)
 
-        return {
-            "session_id": str(row["session_id"]),
-            "session_user_id": str(row["session_user_id"]),
-            "session_expires_at": row["session_expires_at"],
-            "user": user,
-        }
+        if touch:
+            self._touch_session(context["session_id"], now_ts)
+
+        # Copia: quem chama pode alterar o dict sem mexer no cache.
+        return {**context, "user": dict(context["user"])}
 
     def logout_session(self, raw_session_token):
         token = str(raw_session_token or "").strip()
@@ -907,6 +1059,7 @@ class AuthService:
                     """,
                     (now_ts, session_hash),
                 )
+        self._invalidate_sessions(session_hash=session_hash)
 
     def verify_email_token(self, raw_token):
         token = str(raw_token or "").strip()
@@ -976,6 +1129,7 @@ class AuthService:
                     """,
                     (now_ts, now_ts, str(row["token_user_id"])),
                 )
+        self._invalidate_sessions(user_id=str(row["token_user_id"]))
 
         return {"ok": True, "code": "verified", "message": "E-mail verificado com sucesso."}
 
@@ -1133,6 +1287,7 @@ class AuthService:
                     """,
                     (now_ts, user_id),
                 )
+        self._invalidate_sessions(user_id=user_id)
 
         return {"ok": True, "code": "password_reset", "message": "Senha redefinida com sucesso."}
 
@@ -1511,5 +1666,6 @@ class AuthService:
                     """,
                     (now_ts, normalized_user_id),
                 )
+        self._invalidate_sessions(user_id=normalized_user_id)
 
         return True
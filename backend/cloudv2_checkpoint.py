@@ -0,0 +1,253 @@
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from backend.cloudv2_event_ring import string_code_map, string_table
+
+# Checkpoint binario do estado em memoria (substitui o runtime_store.json).
+#
+# Arquivo = cabecalho (magic + versao) seguido de quadros
+#   <tipo:u8><tamanho:u32><crc32:u32><dados>
+# Uma gravacao completa reescreve o arquivo (tmp + os.replace); as seguintes
+# so acrescentam quadros dos pivos que mudaram. Na leitura os quadros sao
+# aplicados em ordem (o ultimo de cada pivo vale) e um quadro truncado ou
+# com CRC invalido encerra a leitura: perde-se so o ultimo acrescimo.
+CHECKPOINT_MAGIC = b"CV2CKPT"
+CHECKPOINT_VERSION = 1
+
+FRAME_META = 1  # JSON com o estado global (run, probe_settings, pendencias)
+FRAME_STRINGS = 2  # strings novas da tabela de codigos dos aneis
+FRAME_PIVOT = 3  # estado de um pivo: JSON + colunas dos aneis
+FRAME_DROP = 4  # pivo removido desde a gravacao anterior
+
+_HEADER = struct.Struct("<7sB")
+_FRAME = struct.Struct("<BII")
+_LENGTH = struct.Struct("<I")
+_JSON_SEPARATORS = (",", ":")
+_RING_FIELDS = ("timeline", "ping_rssi_points")
+
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=_JSON_SEPARATORS).encode("utf-8")
+
+
+def _frame(kind, payload):
+    return _FRAME.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def encode_pivot_frame(pivot):
+    # Chamado com o lock do pivo: copia estado e colunas para bytes, o resto
+    # (montar o arquivo, gravar) roda fora do lock.
+    state = {}
+    rings = {}
+    sections = []
+    for name, value in pivot.items():
+        if name in _RING_FIELDS:
+            meta, ring_sections = value.export_columns()
+            rings[name] = meta
+            sections.extend(ring_sections)
+        elif hasattr(value, "to_dict"):
+            state[name] = value.to_dict()
+        else:
+            state[name] = value
+    header = _encode_json({"pivot_id": pivot.pivot_id, "state": state, "rings": rings})
+    return _frame(FRAME_PIVOT, b"".join([_LENGTH.pack(len(header)), header, *sections]))
+
+
+class RingColumns:
+    # Colunas de um anel lidas do checkpoint, aplicadas no anel do pivo
+    # restaurado (capacidade e formatadores vem do store).
+    __slots__ = ("meta", "sections", "swap", "code_map")
+
+    def __init__(self, meta, sections, swap, code_map):
+        self.meta = meta
+        self.sections = sections
+        self.swap = swap
+        self.code_map = code_map
+
+    def load_into(self, ring):
+        ring.load_columns(self.meta, self.sections, swap=self.swap, code_map=self.code_map)
+        return ring
+
+
+def _decode_pivot_frame(payload, swap, code_map):
+    header_size = _LENGTH.unpack_from(payload, 0)[0]
+    offset = _LENGTH.size + header_size
+    header = json.loads(bytes(payload[_LENGTH.size : offset]).decode("utf-8"))
+    raw_pivot = header.get("state")
+    if not isinstance(raw_pivot, dict):
+        raise ValueError("quadro de pivo sem estado")
+    for name, meta in (header.get("rings") or {}).items():
+        sections = {}
+        for section_name, _typecode, _itemsize, size in meta["sections"]:
+            sections[section_name] = payload[offset : offset + size]
+            offset += size
+        raw_pivot[name] = RingColumns(meta, sections, swap, code_map)
+    if offset != len(payload):
+        raise ValueError("quadro de pivo com tamanho inconsistente")
+    return str(header.get("pivot_id") or ""), raw_pivot
+
+
+def read_checkpoint(path):
+    # Devolve (payload, info): payload no formato do runtime_store.json (com
+    # RingColumns no lugar das listas dos aneis) ou None se nao ha arquivo.
+    if not os.path.exists(path):
+        return None, {"frames": 0, "truncated": False}
+    with open(path, "rb") as file:
+        data = file.read()
+    view = memoryview(data)
+    if len(data) < _HEADER.size:
+        raise ValueError("checkpoint sem cabecalho")
+    magic, version = _HEADER.unpack_from(data, 0)
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError("checkpoint com assinatura invalida")
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f"versao de checkpoint nao suportada: {version}")
+
+    meta = None
+    strings = []
+    code_map = None
+    swap = False
+    pivots = {}
+    frames = 0
+    truncated = False
+    offset = _HEADER.size
+    while offset < len(data):
+        if offset + _FRAME.size > len(data):
+            truncated = True
+            break
+        kind, size, crc = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        end = start + size
+        if end > len(data) or zlib.crc32(view[start:end]) != crc:
+            truncated = True
+            break
+        payload = view[start:end]
+        offset = end
+        frames += 1
+        if kind == FRAME_META:
+            meta = json.loads(bytes(payload).decode("utf-8"))
+            swap = meta.get("byteorder", sys.byteorder) != sys.byteorder
+        elif kind == FRAME_STRINGS:
+            strings.extend(json.loads(bytes(payload).decode("utf-8")))
+            code_map = string_code_map(strings)
+        elif kind == FRAME_PIVOT:
+            try:
+                pivot_id, raw_pivot = _decode_pivot_frame(payload, swap, code_map)
+            except struct.error as exc:
+                raise ValueError(f"quadro de pivo invalido: {exc}") from exc
+            if pivot_id:
+                pivots[pivot_id] = raw_pivot
+        elif kind == FRAME_DROP:
+            pivots.pop(bytes(payload).decode("utf-8"), None)
+
+    if meta is None:
+        raise ValueError("checkpoint sem quadro de estado global")
+    payload = dict(meta)
+    payload["pivots"] = pivots
+    return payload, {"frames": frames, "truncated": truncated}
+
+
+class CheckpointWriter:
+    # Sabe o que ja esta no arquivo (versao gravada de cada pivo, strings
+    # gravadas) para acrescentar so a diferenca. Depois de max_appends
+    # acrescimos, ou de qualquer falha, a proxima gravacao e completa.
+    def __init__(self, path, max_appends=60):
+        self.path = path
+        self.max_appends = max(0, int(max_appends))
+        self._lock = threading.Lock()
+        self._written = {}
+        self._strings_written = 0
+        self._appends = 0
+        self._needs_full = True
+        self._metrics = {
+            "full_writes": 0,
+            "append_writes": 0,
+            "last_full": None,
+            "last_pivots_written": 0,
+            "last_bytes": 0,
+            "last_write_ms": None,
+            "file_bytes": 0,
+            "errors": 0,
+        }
+
+    def wants_full(self):
+        with self._lock:
+            return self._needs_full or self._appends >= self.max_appends
+
+    def is_current(self, pivot_id, token):
+        with self._lock:
+            written = self._written.get(pivot_id)
+        return written is not None and written[0] is token[0] and written[1] == token[1]
+
+    def force_full(self):
+        with self._lock:
+            self._needs_full = True
+
+    def write(self, meta, pivot_frames, pivot_ids, full):
+        # pivot_frames: {pivot_id: (token, quadro)} capturados sob lock;
+        # pivot_ids: pivos vivos na captura (os demais gravados viram DROP).
+        started = time.perf_counter()
+        with self._lock:
+            meta = dict(meta)
+            meta["byteorder"] = sys.byteorder
+            strings_start = 0 if full else self._strings_written
+            strings = string_table(strings_start)
+            chunks = [_frame(FRAME_META, _encode_json(meta))]
+            if strings:
+                chunks.append(_frame(FRAME_STRINGS, _encode_json(strings)))
+            chunks.extend(frame for _token, frame in pivot_frames.values())
+            if not full:
+                for pivot_id in self._written:
+                    if pivot_id not in pivot_ids:
+                        chunks.append(_frame(FRAME_DROP, pivot_id.encode("utf-8")))
+            body = b"".join(chunks)
+            try:
+                if full:
+                    temp = f"{self.path}.tmp"
+                    with open(temp, "wb") as file:
+                        file.write(_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION))
+                        file.write(body)
+                    os.replace(temp, self.path)
+                else:
+                    with open(self.path, "ab") as file:
+                        file.write(body)
+            except OSError:
+                self._needs_full = True
+                self._metrics["errors"] += 1
+                raise
+
+            if full:
+                self._written = {}
+                self._appends = 0
+                self._needs_full = False
+            else:
+                self._appends += 1
+                for pivot_id in [pivot_id for pivot_id in self._written if pivot_id not in pivot_ids]:
+                    del self._written[pivot_id]
+            for pivot_id, (token, _frame_bytes) in pivot_frames.items():
+                self._written[pivot_id] = token
+            self._strings_written = strings_start + len(strings)
+
+            metrics = self._metrics
+            metrics["full_writes" if full else "append_writes"] += 1
+            metrics["last_full"] = bool(full)
+            metrics["last_pivots_written"] = len(pivot_frames)
+            metrics["last_bytes"] = len(body)
+            metrics["last_write_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+            try:
+                metrics["file_bytes"] = os.path.getsize(self.path)
+            except OSError:
+                pass
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["max_appends"] = self.max_appends
+            metrics["appends_since_full"] = self._appends
+            metrics["pivots_tracked"] = len(self._written)
+        return metrics
@@ -1,6 +1,7 @@
 ﻿import json
 import os
 
+from backend.cloudv2_ingest import normalize_ingest_policy
 from backend.cloudv2_paths import resolve_data_dir
 
 
@@ -17,6 +18,9 @@ FIXED_MONITOR_TOPICS = [
 
 PROBE_RESPONSE_TOPICS = ["cloudv2-network", "cloudv2-info"]
 
+SERVER_MODE_ASYNCIO = "asyncio"
+SERVER_MODE_THREADING = "threading"
+
 DEFAULT_CONFIG = {
     "broker": "a19mijesri84u2-ats.iot.us-east-1.amazonaws.com",
     "port": 8883,
@@ -35,8 +39,28 @@ DEFAULT_CONFIG = {
     "dashboard_enabled": True,
     "dashboard_port": 8008,
     "dashboard_refresh_sec": 5,
+    "dashboard_files_enabled": True,
+    "dashboard_server_mode": "asyncio",
+    "dashboard_http_workers": 16,
+    "dashboard_http_max_connections": 512,
+    "dashboard_http_request_timeout_sec": 15.0,
+    "dashboard_http_keepalive_sec": 15.0,
     "api_state_cache_ttl_sec": 2.0,
     "api_quality_cache_ttl_sec": 2.0,
+    "api_response_gzip": True,
+    "api_response_gzip_min_bytes": 1024,
+    "api_response_brotli": True,
+    "api_stream_enabled": True,
+    "api_stream_interval_sec": 1.0,
+    "api_stream_max_clients": 32,
+    "snapshot_persist_interval_sec": 15.0,
+    "status_refresh_interval_sec": 30.0,
+    "summary_cache_bucket_sec": 1.0,
+    "ingest_queue_enabled": True,
+    "ingest_queue_max_size": 10000,
+    "ingest_queue_workers": 1,
+    "ingest_queue_policy": "block",
+    "ingest_queue_block_timeout_sec": 2.0,
     "enable_background_worker": True,
     "require_apply_to_start": True,
     "continuous_monitoring_mode": True,
@@ -59,6 +83,19 @@ DEFAULT_CONFIG = {
     "max_events_per_pivot_list": 5000,
     "probe_settings": {},
     "sqlite_db_path": os.path.join(resolve_data_dir(), "telemetry.sqlite3"),
+    "sqlite_write_behind_ms": 250,
+    "sqlite_write_behind_max_rows": 500,
+    "sqlite_read_pool_size": 4,
+    "runtime_store_format": "binary",
+    "runtime_checkpoint_max_appends": 60,
+    "retention_enabled": True,
+    "retention_interval_sec": 3600,
+    "retention_chunk_rows": 500,
+    "retention_events_days": 30,
+    "retention_points_days": 30,
+    "retention_raw_payload_days": 7,
+    "retention_rollups_hourly_days": 0,
+    "retention_rollups_daily_days": 0,
 }
 
 
@@ -127,6 +164,20 @@ def _normalize_schedule_mode(value):
     return "random"
 
 
+def normalize_server_mode(value):
+    text = str(value or "").strip().lower()
+    if text in ("threading", "thread", "threads", "legacy"):
+        return SERVER_MODE_THREADING
+    return SERVER_MODE_ASYNCIO
+
+
+def _normalize_runtime_store_format(value):
+    text = str(value or "").strip().lower()
+    if text in ("json", "legacy"):
+        return "json"
+    return "binary"
+
+
 def _read_config_file(path):
     if not os.path.exists(path):
         return {}
@@ -205,8 +256,28 @@ def _apply_env_overrides(config):
         "DASHBOARD_ENABLED": "dashboard_enabled",
         "DASHBOARD_PORT": "dashboard_port",
         "DASHBOARD_REFRESH_SEC": "dashboard_refresh_sec",
+        "DASHBOARD_FILES_ENABLED": "dashboard_files_enabled",
+        "DASHBOARD_SERVER_MODE": "dashboard_server_mode",
+        "DASHBOARD_HTTP_WORKERS": "dashboard_http_workers",
+        "DASHBOARD_HTTP_MAX_CONNECTIONS": "dashboard_http_max_connections",
+        "DASHBOARD_HTTP_REQUEST_TIMEOUT_SEC": "dashboard_http_request_timeout_sec",
+        "DASHBOARD_HTTP_KEEPALIVE_SEC": "dashboard_http_keepalive_sec",
         "API_STATE_CACHE_TTL_SEC": "api_state_cache_ttl_sec",
         "API_QUALITY_CACHE_TTL_SEC": "api_quality_cache_ttl_sec",
+        "API_RESPONSE_GZIP": "api_response_gzip",
+        "API_RESPONSE_GZIP_MIN_BYTES": "api_response_gzip_min_bytes",
+        "API_RESPONSE_BROTLI": "api_response_brotli",
+        "API_STREAM_ENABLED": "api_stream_enabled",
+        "API_STREAM_INTERVAL_SEC": "api_stream_interval_sec",
+        "API_STREAM_MAX_CLIENTS": "api_stream_max_clients",
+        "SNAPSHOT_PERSIST_INTERVAL_SEC": "snapshot_persist_interval_sec",
+        "STATUS_REFRESH_INTERVAL_SEC": "status_refresh_interval_sec",
+        "SUMMARY_CACHE_BUCKET_SEC": "summary_cache_bucket_sec",
+        "INGEST_QUEUE_ENABLED": "ingest_queue_enabled",
+        "INGEST_QUEUE_MAX_SIZE": "ingest_queue_max_size",
+        "INGEST_QUEUE_WORKERS": "ingest_queue_workers",
+        "INGEST_QUEUE_POLICY": "ingest_queue_policy",
+        "INGEST_QUEUE_BLOCK_TIMEOUT_SEC": "ingest_queue_block_timeout_sec",
         "ENABLE_BACKGROUND_WORKER": "enable_background_worker",
         "REQUIRE_APPLY_TO_START": "require_apply_to_start",
         "CONTINUOUS_MONITORING_MODE": "continuous_monitoring_mode",
@@ -228,6 +299,19 @@ def _apply_env_overrides(config):
         "MAX_EVENTS_PER_PIVOT_PANEL": "max_events_per_pivot_panel",
         "MAX_EVENTS_PER_PIVOT_LIST": "max_events_per_pivot_list",
         "SQLITE_DB_PATH": "sqlite_db_path",
+        "SQLITE_WRITE_BEHIND_MS": "sqlite_write_behind_ms",
+        "SQLITE_WRITE_BEHIND_MAX_ROWS": "sqlite_write_behind_max_rows",
+        "SQLITE_READ_POOL_SIZE": "sqlite_read_pool_size",
+        "RUNTIME_STORE_FORMAT": "runtime_store_format",
+        "RUNTIME_CHECKPOINT_MAX_APPENDS": "runtime_checkpoint_max_appends",
+        "RETENTION_ENABLED": "retention_enabled",
+        "RETENTION_INTERVAL_SEC": "retention_interval_sec",
+        "RETENTION_CHUNK_ROWS": "retention_chunk_rows",
+        "RETENTION_EVENTS_DAYS": "retention_events_days",
+        "RETENTION_POINTS_DAYS": "retention_points_days",
+        "RETENTION_RAW_PAYLOAD_DAYS": "retention_raw_payload_days",
+        "RETENTION_ROLLUPS_HOURLY_DAYS": "retention_rollups_hourly_days",
+        "RETENTION_ROLLUPS_DAILY_DAYS": "retention_rollups_daily_days",
     }
     for env_name, config_key in overrides.items():
         env_value = os.environ.get(env_name)
@@ -305,6 +389,41 @@ def normalize_config(raw_config):
         base.get("dashboard_enabled"),
         DEFAULT_CONFIG["dashboard_enabled"],
     )
+    base["dashboard_files_enabled"] = _to_bool(
+        base.get("dashboard_files_enabled"),
+        DEFAULT_CONFIG["dashboard_files_enabled"],
+    )
+    base["dashboard_server_mode"] = normalize_server_mode(
+        base.get("dashboard_server_mode", DEFAULT_CONFIG["dashboard_server_mode"])
+    )
+    base["dashboard_http_workers"] = _to_int(
+        base.get("dashboard_http_workers"),
+        DEFAULT_CONFIG["dashboard_http_workers"],
+        minimum=1,
+    )
+    if base["dashboard_http_workers"] > 256:
+        base["dashboard_http_workers"] = 256
+    base["dashboard_http_max_connections"] = _to_int(
+        base.get("dashboard_http_max_connections"),
+        DEFAULT_CONFIG["dashboard_http_max_connections"],
+        minimum=1,
+    )
+    if base["dashboard_http_max_connections"] > 10000:
+        base["dashboard_http_max_connections"] = 10000
+    base["dashboard_http_request_timeout_sec"] = _to_float(
+        base.get("dashboard_http_request_timeout_sec"),
+        DEFAULT_CONFIG["dashboard_http_request_timeout_sec"],
+        minimum=1.0,
+    )
+    if base["dashboard_http_request_timeout_sec"] > 300.0:
+        base["dashboard_http_request_timeout_sec"] = 300.0
+    base["dashboard_http_keepalive_sec"] = _to_float(
+        base.get("dashboard_http_keepalive_sec"),
+        DEFAULT_CONFIG["dashboard_http_keepalive_sec"],
+        minimum=1.0,
+    )
+    if base["dashboard_http_keepalive_sec"] > 600.0:
+        base["dashboard_http_keepalive_sec"] = 600.0
     base["dashboard_port"] = _to_int(
         base.get("dashboard_port"),
         DEFAULT_CONFIG["dashboard_port"],
@@ -329,6 +448,86 @@ def normalize_config(raw_config):
     )
     if base["api_quality_cache_ttl_sec"] > 5.0:
         base["api_quality_cache_ttl_sec"] = 5.0
+    base["api_response_gzip"] = _to_bool(
+        base.get("api_response_gzip"),
+        DEFAULT_CONFIG["api_response_gzip"],
+    )
+    base["api_response_gzip_min_bytes"] = _to_int(
+        base.get("api_response_gzip_min_bytes"),
+        DEFAULT_CONFIG["api_response_gzip_min_bytes"],
+        minimum=0,
+    )
+    if base["api_response_gzip_min_bytes"] > 1048576:
+        base["api_response_gzip_min_bytes"] = 1048576
+    base["api_response_brotli"] = _to_bool(
+        base.get("api_response_brotli"),
+        DEFAULT_CONFIG["api_response_brotli"],
+    )
+    base["api_stream_enabled"] = _to_bool(
+        base.get("api_stream_enabled"),
+        DEFAULT_CONFIG["api_stream_enabled"],
+    )
+    base["api_stream_interval_sec"] = _to_float(
+        base.get("api_stream_interval_sec"),
+        DEFAULT_CONFIG["api_stream_interval_sec"],
+        minimum=0.2,
+    )
+    if base["api_stream_interval_sec"] > 30.0:
+        base["api_stream_interval_sec"] = 30.0
+    base["api_stream_max_clients"] = _to_int(
+        base.get("api_stream_max_clients"),
+        DEFAULT_CONFIG["api_stream_max_clients"],
+        minimum=1,
+    )
+    if base["api_stream_max_clients"] > 1000:
+        base["api_stream_max_clients"] = 1000
+    base["snapshot_persist_interval_sec"] = _to_float(
+        base.get("snapshot_persist_interval_sec"),
+        DEFAULT_CONFIG["snapshot_persist_interval_sec"],
+        minimum=0.0,
+    )
+    if base["snapshot_persist_interval_sec"] > 300.0:
+        base["snapshot_persist_interval_sec"] = 300.0
+    base["status_refresh_interval_sec"] = _to_float(
+        base.get("status_refresh_interval_sec"),
+        DEFAULT_CONFIG["status_refresh_interval_sec"],
+        minimum=0.0,
+    )
+    if base["status_refresh_interval_sec"] > 3600.0:
+        base["status_refresh_interval_sec"] = 3600.0
+    base["summary_cache_bucket_sec"] = _to_float(
+        base.get("summary_cache_bucket_sec"),
+        DEFAULT_CONFIG["summary_cache_bucket_sec"],
+        minimum=0.0,
+    )
+    if base["summary_cache_bucket_sec"] > 60.0:
+        base["summary_cache_bucket_sec"] = 60.0
+    base["ingest_queue_enabled"] = _to_bool(
+        base.get("ingest_queue_enabled"),
+        DEFAULT_CONFIG["ingest_queue_enabled"],
+    )
+    base["ingest_queue_max_size"] = _to_int(
+        base.get("ingest_queue_max_size"),
+        DEFAULT_CONFIG["ingest_queue_max_size"],
+        minimum=100,
+    )
+    base["ingest_queue_workers"] = _to_int(
+        base.get("ingest_queue_workers"),
+        DEFAULT_CONFIG["ingest_queue_workers"],
+        minimum=1,
+    )
+    if base["ingest_queue_workers"] > 8:
+        base["ingest_queue_workers"] = 8
+    base["ingest_queue_policy"] = normalize_ingest_policy(
+        base.get("ingest_queue_policy", DEFAULT_CONFIG["ingest_queue_policy"])
+    )
+    base["ingest_queue_block_timeout_sec"] = _to_float(
+        base.get("ingest_queue_block_timeout_sec"),
+        DEFAULT_CONFIG["ingest_queue_block_timeout_sec"],
+        minimum=0.0,
+    )
+    if base["ingest_queue_block_timeout_sec"] > 30.0:
+        base["ingest_queue_block_timeout_sec"] = 30.0
     base["enable_background_worker"] = _to_bool(
         base.get("enable_background_worker"),
         DEFAULT_CONFIG["enable_background_worker"],
@@ -440,6 +639,60 @@ def normalize_config(raw_config):
         str(base.get("sqlite_db_path", DEFAULT_CONFIG["sqlite_db_path"])).strip()
         or DEFAULT_CONFIG["sqlite_db_path"]
     )
+    base["sqlite_write_behind_ms"] = _to_int(
+        base.get("sqlite_write_behind_ms"),
+        DEFAULT_CONFIG["sqlite_write_behind_ms"],
+        minimum=0,
+    )
+    if base["sqlite_write_behind_ms"] > 5000:
+        base["sqlite_write_behind_ms"] = 5000
+    base["sqlite_write_behind_max_rows"] = _to_int(
+        base.get("sqlite_write_behind_max_rows"),
+        DEFAULT_CONFIG["sqlite_write_behind_max_rows"],
+        minimum=1,
+    )
+    base["sqlite_read_pool_size"] = _to_int(
+        base.get("sqlite_read_pool_size"),
+        DEFAULT_CONFIG["sqlite_read_pool_size"],
+        minimum=0,
+    )
+    if base["sqlite_read_pool_size"] > 16:
+        base["sqlite_read_pool_size"] = 16
+    base["runtime_store_format"] = _normalize_runtime_store_format(
+        base.get("runtime_store_format", DEFAULT_CONFIG["runtime_store_format"])
+    )
+    base["runtime_checkpoint_max_appends"] = _to_int(
+        base.get("runtime_checkpoint_max_appends"),
+        DEFAULT_CONFIG["runtime_checkpoint_max_appends"],
+        minimum=0,
+    )
+    if base["runtime_checkpoint_max_appends"] > 1000:
+        base["runtime_checkpoint_max_appends"] = 1000
+    base["retention_enabled"] = _to_bool(
+        base.get("retention_enabled"),
+        DEFAULT_CONFIG["retention_enabled"],
+    )
+    base["retention_interval_sec"] = _to_int(
+        base.get("retention_interval_sec"),
+        DEFAULT_CONFIG["retention_interval_sec"],
+        minimum=60,
+    )
+    base["retention_chunk_rows"] = _to_int(
+        base.get("retention_chunk_rows"),
+        DEFAULT_CONFIG["retention_chunk_rows"],
+        minimum=1,
+    )
+    if base["retention_chunk_rows"] > 10000:
+        base["retention_chunk_rows"] = 10000
+    # 0 desativa a politica (mantem para sempre).
+    for key in (
+        "retention_events_days",
+        "retention_points_days",
+        "retention_raw_payload_days",
+        "retention_rollups_hourly_days",
+        "retention_rollups_daily_days",
+    ):
+        base[key] = _to_float(base.get(key), DEFAULT_CONFIG[key], minimum=0.0)
 
     base["filter_names"] = _normalize_string_list(base.get("filter_names"))
     base["cmd_topics"] = _normalize_string_list(base.get("cmd_topics"))
@@ -0,0 +1,274 @@
+from bisect import bisect_left, bisect_right, insort
+
+from backend.cloudv2_event_ring import EventRing
+
+
+def _event_ts(event):
+    if not isinstance(event, dict):
+        return None
+    try:
+        return float(event.get("ts"))
+    except (TypeError, ValueError):
+        return None
+
+
+class OnlineIntervalTracker:
+    # Acompanha a timeline de um pivo sem refiltrar a lista a cada refresh.
+    # Guarda os timestamps unicos das mensagens de conectividade e, para o
+    # limiar de queda atual, a uniao de [ts, ts + limiar] em intervalos
+    # ordenados com soma prefixada: o tempo online numa janela sai por bisect.
+    # Mensagens em ordem estendem o ultimo intervalo; limiar novo ou mensagem
+    # fora de ordem reconstroem os intervalos uma vez.
+    def __init__(self, topics):
+        self.topics = frozenset(topics)
+        self._timeline = None
+        self._seen = 0
+        self._ring_epoch = None
+        self._ring_start = 0
+        self._times = []
+        self._topic_times = {topic: [] for topic in self.topics}
+        self._min_event_ts = None
+        self._threshold = None
+        self._valid = False
+        self._head = 0
+        self._starts = []
+        self._ends = []
+        self._prefix = [0.0]
+        self.rebuild_count = 0
+
+    def bind(self, timeline):
+        if isinstance(timeline, EventRing):
+            self._timeline = None
+            self._sync_ring(timeline)
+            return
+        self._timeline = timeline
+        self._seen = 0
+        self._times = []
+        self._topic_times = {topic: [] for topic in self.topics}
+        self._min_event_ts = None
+        self._valid = False
+        self.sync(timeline)
+
+    def _cut_front(self, first_ts, min_event_ts):
+        self._min_event_ts = min_event_ts
+        if first_ts is None:
+            self._times = []
+            self._topic_times = {topic: [] for topic in self.topics}
+            self._valid = False
+            return
+        for topic_times in self._topic_times.values():
+            topic_cut = bisect_left(topic_times, first_ts)
+            if topic_cut:
+                del topic_times[:topic_cut]
+        cut = bisect_left(self._times, first_ts)
+        if cut:
+            del self._times[:cut]
+            self._trim_intervals()
+
+    def rebind(self, timeline):
+        # A timeline foi podada (retencao ou limite de eventos): os itens que
+        # sobraram sao o sufixo da lista anterior, entao basta cortar pela
+        # frente em vez de reconstruir.
+        if isinstance(timeline, EventRing):
+            self.sync(timeline)
+            return
+        first_ts = None
+        min_event_ts = None
+        for event in timeline:
+            ts = _event_ts(event)
+            if ts is None:
+                continue
+            if first_ts is None:
+                first_ts = ts
+            if ts > 0 and (min_event_ts is None or ts < min_event_ts):
+                min_event_ts = ts
+        self._timeline = timeline
+        self._seen = len(timeline)
+        self._cut_front(first_ts, min_event_ts)
+
+    def sync(self, timeline):
+        if isinstance(timeline, EventRing):
+            self._sync_ring(timeline)
+            return
+        if timeline is not self._timeline or len(timeline) < self._seen:
+            self.bind(timeline)
+            return
+        for index in range(self._seen, len(timeline)):
+            event = timeline[index]
+            ts = _event_ts(event)
+            if ts is None:
+                continue
+            self._add_event(ts, str(event.get("topic") or ""))
+        self._seen = len(timeline)
+
+    def _sync_ring(self, ring):
+        # Timeline em colunas: le so ts/topico pelo seq absoluto, sem montar
+        # os eventos. Se a cabeca andou (limite de eventos, poda), corta pela
+        # frente como o rebind; conteudo reescrito (epoch novo) reconstroi.
+        if ring is not self._timeline or ring.epoch != self._ring_epoch:
+            self._timeline = ring
+            self._ring_epoch = ring.epoch
+            self._ring_start = ring.start_seq
+            self._seen = ring.start_seq
+            self._times = []
+            self._topic_times = {topic: [] for topic in self.topics}
+            self._min_event_ts = None
+            self._valid = False
+        for seq in range(max(self._seen, ring.start_seq), ring.end_seq):
+            ts = ring.ts_at_seq(seq)
+            if ts is not None:
+                self._add_event(ts, ring.topic_at_seq(seq))
+        self._seen = ring.end_seq
+        if ring.start_seq != self._ring_start:
+            self._ring_start = ring.start_seq
+            self._cut_front(ring.first_ts(), ring.min_ts())
+
+    def _add_event(self, ts, topic):
+        if ts > 0 and (self._min_event_ts is None or ts < self._min_event_ts):
+            self._min_event_ts = ts
+        if topic in self.topics:
+            topic_times = self._topic_times[topic]
+            if topic_times and ts < topic_times[-1]:
+                insort(topic_times, ts)
+            else:
+                topic_times.append(ts)
+            self._add_time(ts)
+
+    def _add_time(self, ts):
+        times = self._times
+        if times and ts <= times[-1]:
+            position = bisect_left(times, ts)
+            if position < len(times) and times[position] == ts:
+                return
+            insort(times, ts)
+            self._valid = False
+            return
+        times.append(ts)
+        if not self._valid:
+            return
+        end_ts = ts + self._threshold
+        if self._head < len(self._ends) and ts <= self._ends[-1]:
+            if end_ts > self._ends[-1]:
+                self._prefix[-1] += end_ts - self._ends[-1]
+                self._ends[-1] = end_ts
+            return
+        self._starts.append(ts)
+        self._ends.append(end_ts)
+        self._prefix.append(self._prefix[-1] + self._threshold)
+
+    def _trim_intervals(self):
+        if not self._valid:
+            return
+        if not self._times:
+            self._valid = False
+            return
+        first_ts = self._times[0]
+        index = bisect_right(self._starts, first_ts, self._head) - 1
+        if index < self._head:
+            self._valid = False
+            return
+        # Encolhe o intervalo que passa a comecar em first_ts ajustando a soma
+        # antes dele; as diferencas usadas nas consultas continuam corretas.
+        self._prefix[index] += first_ts - self._starts[index]
+        self._starts[index] = first_ts
+        self._head = index
+        if self._head > 64 and self._head * 2 > len(self._starts):
+            del self._starts[: self._head]
+            del self._ends[: self._head]
+            del self._prefix[: self._head]
+            self._head = 0
+
+    def _ensure_intervals(self, threshold_sec):
+        if self._valid and self._threshold == threshold_sec:
+            return
+        self.rebuild_count += 1
+        starts = []
+        ends = []
+        prefix = [0.0]
+        for ts in self._times:
+            end_ts = ts + threshold_sec
+            if starts and ts <= ends[-1]:
+                if end_ts > ends[-1]:
+                    prefix[-1] += end_ts - ends[-1]
+                    ends[-1] = end_ts
+                continue
+            starts.append(ts)
+            ends.append(end_ts)
+            prefix.append(prefix[-1] + threshold_sec)
+        self._starts = starts
+        self._ends = ends
+        self._prefix = prefix
+        self._head = 0
+        self._threshold = threshold_sec
+        self._valid = True
+
+    def min_event_ts(self):
+        return self._min_event_ts
+
+    def has_topic_between(self, topic, start_ts, end_ts):
+        topic_times = self._topic_times.get(topic) or []
+        position = bisect_left(topic_times, start_ts)
+        return position < len(topic_times) and topic_times[position] <= end_ts
+
+    def connected_seconds(self, start_ts, end_ts, threshold_sec):
+        if end_ts <= start_ts:
+            return 0.0
+        self._ensure_intervals(threshold_sec)
+        first = bisect_right(self._ends, start_ts, self._head)
+        last = bisect_left(self._starts, end_ts, self._head) - 1
+        if last < first:
+            return 0.0
+        total = self._prefix[last + 1] - self._prefix[first]
+        if self._starts[first] < start_ts:
+            total -= start_ts - self._starts[first]
+        if self._ends[last] > end_ts:
+            total -= self._ends[last] - end_ts
+        return max(0.0, total)
+
+    def online_intervals(self, start_ts, end_ts, threshold_sec):
+        self._ensure_intervals(threshold_sec)
+        first = bisect_right(self._ends, start_ts, self._head)
+        intervals = []
+        for index in range(first, len(self._starts)):
+            interval_start = max(start_ts, self._starts[index])
+            if interval_start >= end_ts:
+                break
+            interval_end = min(end_ts, self._ends[index])
+            if interval_end > interval_start:
+                intervals.append((interval_start, interval_end))
+        return intervals
+
+
+def scan_online_intervals(timeline, topics, start_ts, end_ts, threshold_sec):
+    # Varredura completa da timeline (algoritmo original); referencia para o
+    # OnlineIntervalTracker nos testes.
+    message_ts = set()
+    for event in timeline or []:
+        ts = _event_ts(event)
+        if ts is None or str(event.get("topic") or "") not in topics:
+            continue
+        if ts < start_ts - threshold_sec or ts > end_ts:
+            continue
+        message_ts.add(ts)
+
+    intervals = []
+    current_start = None
+    current_end = None
+    for ts in sorted(message_ts):
+        interval_start = max(start_ts, ts)
+        interval_end = min(end_ts, ts + threshold_sec)
+        if interval_end <= interval_start:
+            continue
+        if current_start is None:
+            current_start = interval_start
+            current_end = interval_end
+            continue
+        if interval_start <= current_end:
+            current_end = max(current_end, interval_end)
+            continue
+        intervals.append((current_start, current_end))
+        current_start = interval_start
+        current_end = interval_end
+    if current_start is not None:
+        intervals.append((current_start, current_end))
+    return intervals
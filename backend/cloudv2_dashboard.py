@@ -17,7 +17,17 @@ from backend.cloudv2_auth import (
     AuthService,
     InMemoryRateLimiter,
 )
+from backend.cloudv2_async_http import AsyncDashboardServer
+from backend.cloudv2_config import SERVER_MODE_THREADING, normalize_server_mode
 from backend.cloudv2_paths import DATA_SUBDIR, DEFAULT_WEB_DIR, LEGACY_WEB_DIRS, resolve_data_dir, resolve_web_dir
+from backend.cloudv2_response_cache import (
+    StaticFileCache,
+    brotli_available,
+    compress_bytes,
+    etag_matches,
+    negotiate_encoding,
+)
+from backend.cloudv2_state_stream import StateChangeStream
 
 
 DASHBOARD_DIR = resolve_web_dir()
@@ -183,10 +193,13 @@ def write_text_atomic(path, content):
     os.replace(temp, path)
 
 
-def write_json_atomic(path, data):
+def write_json_atomic(path, data, compact=False):
     temp = f"{path}.tmp"
     with open(temp, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=2, ensure_ascii=False)
+        if compact:
+            json.dump(data, file, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, file, indent=2, ensure_ascii=False)
     os.replace(temp, path)
 
 
@@ -235,7 +248,7 @@ def generate_dashboard_assets(refresh_sec):
     )
 
 
-def _build_handler(telemetry_store, reload_token_getter=None):
+def _build_handler(telemetry_store, reload_token_getter=None, state_stream=None):
     auth_service = AuthService(db_path=telemetry_store.persistence.db_path, logger=logging.getLogger("cloudv2.auth"))
     auth_seed_result = auth_service.ensure_fixed_admin_account()
     if not auth_seed_result.get("ok"):
@@ -245,6 +258,15 @@ def _build_handler(telemetry_store, reload_token_getter=None):
         )
     rate_limiter = InMemoryRateLimiter()
     auth_blocked = object()
+    # Compressao negociada pelo Accept-Encoding: br (se o modulo brotli estiver
+    # instalado) ou gzip, so para corpos a partir de api_response_gzip_min_bytes.
+    compression_min_bytes = telemetry_store.api_response_gzip_min_bytes if telemetry_store.api_response_gzip else None
+    dynamic_encodings = ("br", "gzip") if telemetry_store.api_response_brotli and brotli_available() else ("gzip",)
+    static_cache = StaticFileCache(
+        gzip_enabled=telemetry_store.api_response_gzip,
+        gzip_min_bytes=telemetry_store.api_response_gzip_min_bytes,
+        brotli_enabled=telemetry_store.api_response_brotli,
+    )
 
     page_aliases = {
         "/": "index.html",
@@ -312,6 +334,12 @@ def _build_handler(telemetry_store, reload_token_getter=None):
 
         def _write_json(self, status_code, payload, extra_headers=None, cookies=None):
             body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            compressible = compression_min_bytes is not None and len(body) >= compression_min_bytes
+            encoding = None
+            if compressible:
+                encoding = negotiate_encoding(self.headers.get("Accept-Encoding"), dynamic_encodings)
+                if encoding:
+                    body = compress_bytes(body, encoding)
             self.send_response(status_code)
             self._write_cors_headers()
             self.send_header("Content-Type", "application/json; charset=utf-8")
@@ -322,10 +350,80 @@ def _build_handler(telemetry_store, reload_token_getter=None):
             if cookies:
                 for cookie_value in cookies:
                     self.send_header("Set-Cookie", str(cookie_value))
+            if compressible:
+                self.send_header("Vary", "Accept-Encoding")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
             self.send_header("Content-Length", str(len(body)))
             self.end_headers()
             self.wfile.write(body)
 
+        def _write_encoded_json(self, status_code, response):
+            # Resposta pre-codificada do cache: escreve os bytes prontos, em
+            # br/gzip quando o cliente aceita e a resposta tem versao comprimida.
+            # A ETag vem da geracao dos dados; If-None-Match igual responde 304.
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"), response.encodings())
+            body = response.encoded_body(encoding)
+            not_modified = etag_matches(self.headers.get("If-None-Match"), response.etag)
+            self.send_response(304 if not_modified else status_code)
+            self._write_cors_headers()
+            if response.etag:
+                self.send_header("ETag", response.representation_etag(encoding=encoding))
+                self.send_header("Access-Control-Expose-Headers", "ETag")
+                self.send_header("Cache-Control", "no-cache")
+            else:
+                self.send_header("Cache-Control", "no-store")
+            if response.encodings():
+                self.send_header("Vary", "Accept-Encoding")
+            if not_modified:
+                telemetry_store.note_api_not_modified()
+                self.end_headers()
+                return
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_event_stream(self, query):
+            # Conexao SSE longa: deltas pre-codificados do StateChangeStream
+            # e comentario de keepalive quando nada muda.
+            if state_stream is None:
+                self._write_json(404, {"error": "stream desativado"})
+                return
+            if not state_stream.open_client():
+                self._write_json(503, {"error": "limite de conexoes do stream atingido"})
+                return
+            try:
+                last_event_id = self.headers.get("Last-Event-ID") or (query.get("last_event_id") or [None])[0]
+                after_generation, reset_event = state_stream.resume_point(last_event_id)
+                self.send_response(200)
+                self._write_cors_headers()
+                self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("X-Accel-Buffering", "no")
+                self.end_headers()
+                self.wfile.write(b"retry: 3000\n\n")
+                if reset_event is not None:
+                    self.wfile.write(reset_event)
+                self.wfile.flush()
+                while True:
+                    events = state_stream.wait_events(after_generation)
+                    if events is None:
+                        break
+                    if not events:
+                        self.wfile.write(b": keepalive\n\n")
+                    for generation, event in events:
+                        self.wfile.write(event)
+                        after_generation = generation
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                pass
+            finally:
+                state_stream.close_client()
+                self.close_connection = True
+
         def _write_text(self, status_code, content_type, body_text):
             body = str(body_text or "").encode("utf-8")
             self.send_response(status_code)
@@ -347,48 +445,64 @@ def _build_handler(telemetry_store, reload_token_getter=None):
             self.send_header("Content-Length", "0")
             self.end_headers()
 
-        def _write_html_file(self, filename):
-            path = os.path.join(DASHBOARD_DIR, str(filename or "").strip())
-            if not os.path.isfile(path):
-                self._write_text(404, "text/plain", "arquivo nao encontrado")
+        def _write_static_file(self, path, content_type, cache_control, head_only=False):
+            # Bytes (e versoes br/gzip) vem do cache de estaticos, validado
+            # pelo mtime do arquivo; If-None-Match com a ETag atual responde 304.
+            response = static_cache.get(path, content_type)
+            if response is None:
+                if head_only:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    self._write_text(404, "text/plain", "arquivo nao encontrado")
                 return
-            with open(path, "rb") as file:
-                body = file.read()
-
-            content_type, _ = mimetypes.guess_type(path)
-            if not content_type:
-                content_type = "text/html"
-            if content_type.startswith("text/"):
-                content_type = f"{content_type}; charset=utf-8"
-
-            self.send_response(200)
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"), response.encodings())
+            not_modified = etag_matches(self.headers.get("If-None-Match"), response.etag)
+            self.send_response(304 if not_modified else 200)
             self._write_cors_headers()
+            self.send_header("ETag", response.representation_etag(encoding=encoding))
+            self.send_header("Cache-Control", cache_control)
+            if response.encodings():
+                self.send_header("Vary", "Accept-Encoding")
+            if not_modified:
+                self.end_headers()
+                return
+            body = response.encoded_body(encoding)
             self.send_header("Content-Type", content_type)
-            self.send_header("Cache-Control", "no-store")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
             self.send_header("Content-Length", str(len(body)))
             self.end_headers()
-            self.wfile.write(body)
+            if not head_only:
+                self.wfile.write(body)
 
-        def _write_html_headers(self, filename):
+        def _write_html_file(self, filename, head_only=False):
             path = os.path.join(DASHBOARD_DIR, str(filename or "").strip())
-            if not os.path.isfile(path):
-                self.send_response(404)
-                self.send_header("Content-Length", "0")
-                self.end_headers()
-                return
-
             content_type, _ = mimetypes.guess_type(path)
             if not content_type:
                 content_type = "text/html"
             if content_type.startswith("text/"):
                 content_type = f"{content_type}; charset=utf-8"
+            self._write_static_file(path, content_type, "no-store", head_only=head_only)
 
-            self.send_response(200)
-            self._write_cors_headers()
-            self.send_header("Content-Type", content_type)
-            self.send_header("Cache-Control", "no-store")
-            self.send_header("Content-Length", str(int(os.path.getsize(path))))
-            self.end_headers()
+        def _write_html_headers(self, filename):
+            self._write_html_file(filename, head_only=True)
+
+        def _write_dashboard_asset(self, head_only=False):
+            # Arquivos de DASHBOARD_DIR (js, css, data/*.json) saem do cache de
+            # estaticos; diretorios seguem no SimpleHTTPRequestHandler.
+            path = self.translate_path(self.path)
+            if not os.path.isfile(path):
+                if head_only:
+                    super().do_HEAD()
+                else:
+                    super().do_GET()
+                return
+            content_type = self.guess_type(path)
+            if content_type.startswith("text/"):
+                content_type = f"{content_type}; charset=utf-8"
+            self._write_static_file(path, content_type, "no-cache", head_only=head_only)
 
         def _read_json_body(self):
             content_length = int(self.headers.get("Content-Length", "0"))
@@ -877,7 +991,7 @@ def _build_handler(telemetry_store, reload_token_getter=None):
                     self._write_html_headers(alias_file)
                     return
 
-            super().do_HEAD()
+            self._write_dashboard_asset(head_only=True)
 
         def do_GET(self):
             parsed = urlparse(self.path)
@@ -914,26 +1028,36 @@ def _build_handler(telemetry_store, reload_token_getter=None):
                 run_id = (query.get("run_id") or [None])[0]
                 if isinstance(run_id, str):
                     run_id = run_id.strip() or None
-                payload = telemetry_store.get_state_snapshot(run_id=run_id)
-                selected_run_id = None
-                if isinstance(payload, dict):
-                    selected_run_id = str(payload.get("run_id") or "").strip() or run_id
-                filter_options = telemetry_store.get_cloud2_filter_options(run_id=selected_run_id)
-                if isinstance(payload, dict):
-                    payload["cloud2_filter_options"] = {
-                        "run_id": str(filter_options.get("run_id") or "").strip() or None,
-                        "technologies": list(filter_options.get("technologies") or []),
-                        "firmwares": list(filter_options.get("firmwares") or []),
-                    }
-                self._write_json(200, payload)
+                since_raw = (query.get("since") or [None])[0]
+                try:
+                    since = int(since_raw) if since_raw not in (None, "") else None
+                except (TypeError, ValueError):
+                    self._write_json(400, {"error": "since invalido"})
+                    return
+                self._write_encoded_json(200, telemetry_store.get_state_response(run_id=run_id, since=since))
+                return
+
+            if path == "/api/stream":
+                self._write_event_stream(query)
+                return
+
+            if path == "/api/metrics":
+                metrics = telemetry_store.get_runtime_metrics()
+                if state_stream is not None:
+                    metrics["stream"] = state_stream.get_metrics()
+                server_metrics = getattr(self.server, "get_metrics", None)
+                if callable(server_metrics):
+                    metrics["http"] = server_metrics()
+                metrics["static_files"] = static_cache.get_metrics()
+                metrics["auth"] = auth_service.get_metrics()
+                self._write_json(200, metrics)
                 return
 
             if path == "/api/quality-lite":
                 run_id = (query.get("run_id") or [None])[0]
                 if isinstance(run_id, str):
                     run_id = run_id.strip() or None
-                payload = telemetry_store.get_quality_cards_snapshot(run_id=run_id)
-                self._write_json(200, payload)
+                self._write_encoded_json(200, telemetry_store.get_quality_cards_response(run_id=run_id))
                 return
 
             if path == "/api/monitoring/runs":
@@ -975,6 +1099,36 @@ def _build_handler(telemetry_store, reload_token_getter=None):
                 )
                 return
 
+            if path.startswith("/api/pivot/") and path.endswith("/rollups"):
+                pivot_id = unquote(path[len("/api/pivot/") : -len("/rollups")]).strip("/").strip()
+                if not pivot_id:
+                    self._write_json(400, {"error": "pivot_id invalido"})
+                    return
+                session_id = (query.get("session_id") or [None])[0]
+                if isinstance(session_id, str):
+                    session_id = session_id.strip() or None
+                granularity = (query.get("granularity") or ["hourly"])[0]
+                range_values = {}
+                for key in ("start_ts", "end_ts"):
+                    raw_value = (query.get(key) or [None])[0]
+                    try:
+                        range_values[key] = float(raw_value) if raw_value not in (None, "") else None
+                    except (TypeError, ValueError):
+                        self._write_json(400, {"error": f"{key} invalido"})
+                        return
+                payload = telemetry_store.get_connectivity_rollups(
+                    pivot_id,
+                    session_id=session_id,
+                    granularity=granularity,
+                    start_ts=range_values["start_ts"],
+                    end_ts=range_values["end_ts"],
+                )
+                if payload is None:
+                    self._write_json(404, {"error": "pivot nao encontrado"})
+                    return
+                self._write_json(200, payload)
+                return
+
             if path.startswith("/api/pivot/") and path.endswith("/panel"):
                 pivot_id = unquote(path[len("/api/pivot/") : -len("/panel")]).strip("/").strip()
                 if not pivot_id:
@@ -986,11 +1140,11 @@ def _build_handler(telemetry_store, reload_token_getter=None):
                 run_id = (query.get("run_id") or [None])[0]
                 if isinstance(run_id, str):
                     run_id = run_id.strip() or None
-                payload = telemetry_store.get_complete_panel(pivot_id, session_id=session_id, run_id=run_id)
-                if payload is None:
+                response = telemetry_store.get_panel_response(pivot_id, session_id=session_id, run_id=run_id)
+                if response is None:
                     self._write_json(404, {"error": "pivot nao encontrado"})
                     return
-                self._write_json(200, payload)
+                self._write_encoded_json(200, response)
                 return
 
             if path.startswith("/api/pivot/"):
@@ -1004,11 +1158,11 @@ def _build_handler(telemetry_store, reload_token_getter=None):
                 run_id = (query.get("run_id") or [None])[0]
                 if isinstance(run_id, str):
                     run_id = run_id.strip() or None
-                payload = telemetry_store.get_pivot_snapshot(pivot_id, session_id=session_id, run_id=run_id)
-                if payload is None:
+                response = telemetry_store.get_panel_response(pivot_id, session_id=session_id, run_id=run_id)
+                if response is None:
                     self._write_json(404, {"error": "pivot nao encontrado"})
                     return
-                self._write_json(200, payload)
+                self._write_encoded_json(200, response)
                 return
 
             if path == "/api/probe-config":
@@ -1028,7 +1182,7 @@ def _build_handler(telemetry_store, reload_token_getter=None):
                 self._write_html_file(alias_file)
                 return
 
-            super().do_GET()
+            self._write_dashboard_asset()
 
         def do_POST(self):
             parsed = urlparse(self.path)
@@ -1449,13 +1603,65 @@ def _build_handler(telemetry_store, reload_token_getter=None):
         def log_message(self, format_text, *args):
             return
 
+    DashboardHandler.auth_service = auth_service
     return DashboardHandler
 
 
-def start_dashboard_server(port, telemetry_store, reload_token_getter=None, host="127.0.0.1"):
+class DashboardHTTPServer(ThreadingHTTPServer):
+    state_stream = None
+    auth_service = None
+
+    def server_close(self):
+        # Encerra o stream antes: libera as conexoes SSE presas em wait_events.
+        if self.state_stream is not None:
+            self.state_stream.stop()
+        super().server_close()
+        if self.auth_service is not None:
+            self.auth_service.close()
+
+
+def start_dashboard_server(
+    port,
+    telemetry_store,
+    reload_token_getter=None,
+    host="127.0.0.1",
+    server_mode="asyncio",
+    http_workers=16,
+    http_max_connections=512,
+    http_request_timeout_sec=15.0,
+    http_keepalive_sec=15.0,
+):
     ensure_dirs()
-    handler = _build_handler(telemetry_store, reload_token_getter=reload_token_getter)
-    server = ThreadingHTTPServer((str(host), int(port)), handler)
-    thread = threading.Thread(target=server.serve_forever, daemon=True)
-    thread.start()
+    state_stream = None
+    if getattr(telemetry_store, "api_stream_enabled", False):
+        state_stream = StateChangeStream(
+            telemetry_store,
+            interval_sec=telemetry_store.api_stream_interval_sec,
+            max_clients=telemetry_store.api_stream_max_clients,
+        )
+    handler = _build_handler(telemetry_store, reload_token_getter=reload_token_getter, state_stream=state_stream)
+    if normalize_server_mode(server_mode) == SERVER_MODE_THREADING:
+        server = DashboardHTTPServer((str(host), int(port)), handler)
+        server.state_stream = state_stream
+        server.auth_service = handler.auth_service
+        if state_stream is not None:
+            state_stream.start()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+    server = AsyncDashboardServer(
+        (str(host), int(port)),
+        handler,
+        max_workers=http_workers,
+        max_connections=http_max_connections,
+        request_timeout_sec=http_request_timeout_sec,
+        keepalive_timeout_sec=http_keepalive_sec,
+        long_request_paths=("/api/stream",),
+    )
+    server.state_stream = state_stream
+    server.auth_service = handler.auth_service
+    server.start()
+    if state_stream is not None:
+        state_stream.start()
     return server
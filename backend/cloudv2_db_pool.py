@@ -0,0 +1,183 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+LOCK_WAIT_SAMPLE_LIMIT = 2048
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = int(round((len(sorted_values) - 1) * (float(pct) / 100.0)))
+    index = max(0, min(len(sorted_values) - 1, index))
+    return sorted_values[index]
+
+
+class LockWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acquire_count = 0
+        self._contended_count = 0
+        self._wait_total_sec = 0.0
+        self._wait_max_sec = 0.0
+        self._samples = deque(maxlen=LOCK_WAIT_SAMPLE_LIMIT)
+
+    def record(self, wait_sec, contended):
+        with self._lock:
+            self._acquire_count += 1
+            if not contended:
+                return
+            self._contended_count += 1
+            self._wait_total_sec += wait_sec
+            self._samples.append(wait_sec)
+            if wait_sec > self._wait_max_sec:
+                self._wait_max_sec = wait_sec
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            contended = self._contended_count
+            return {
+                "acquire_count": self._acquire_count,
+                "contended_count": contended,
+                "wait_total_ms": round(self._wait_total_sec * 1000.0, 3),
+                "wait_avg_ms": round(self._wait_total_sec / contended * 1000.0, 3) if contended > 0 else None,
+                "wait_p95_ms": round(_percentile(samples, 95) * 1000.0, 3) if samples else None,
+                "wait_p99_ms": round(_percentile(samples, 99) * 1000.0, 3) if samples else None,
+                "wait_max_ms": round(self._wait_max_sec * 1000.0, 3) if contended > 0 else None,
+            }
+
+
+class TimedRLock:
+    # RLock com medicao do tempo de espera; so mede quando ha disputa.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.stats = LockWaitStats()
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking=False):
+            self.stats.record(0.0, False)
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        if acquired:
+            self.stats.record(time.perf_counter() - started, True)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class ReadConnectionPool:
+    def __init__(self, db_path, size=4, busy_timeout_ms=3000):
+        self.db_path = str(db_path)
+        self.size = max(1, int(size))
+        self.busy_timeout_ms = max(0, int(busy_timeout_ms))
+        self.stats = LockWaitStats()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        return conn
+
+    def acquire(self):
+        conn = None
+        create = False
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Persistence not started")
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+            self._in_use += 1
+
+        if conn is not None:
+            self.stats.record(0.0, False)
+            return conn
+        if create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+            self.stats.record(0.0, False)
+            return conn
+
+        started = time.perf_counter()
+        while True:
+            try:
+                conn = self._idle.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if self._closed:
+                    with self._lock:
+                        self._in_use -= 1
+                    raise RuntimeError("Persistence not started")
+        self.stats.record(time.perf_counter() - started, True)
+        return conn
+
+    def release(self, conn):
+        with self._lock:
+            self._in_use -= 1
+            if self._closed:
+                close_now = True
+                self._created -= 1
+            else:
+                close_now = False
+                self._idle.put(conn)
+        if close_now:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            self._created -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def get_metrics(self):
+        with self._lock:
+            created = self._created
+            in_use = self._in_use
+        return {
+            "size": self.size,
+            "created": created,
+            "in_use": in_use,
+            "acquire": self.stats.snapshot(),
+        }
@@ -0,0 +1,509 @@
+import json
+import math
+import threading
+from array import array
+from bisect import bisect_left
+
+_NO_CODE = 0xFFFF
+_COMPACT_MIN = 64
+_JSON_SEPARATORS = (",", ":")
+
+# Flags por evento da timeline.
+_FLAG_RAW = 1  # evento fora do formato canonico: JSON inteiro no arena
+_FLAG_REPARSE = 2  # details.parsed_payload == parse(details.raw_payload)
+
+_CANONICAL_EVENT_KEYS = ("id", "ts", "at", "type", "topic", "summary", "details")
+_CANONICAL_POINT_KEYS = ("ts", "at", "rssi")
+
+
+class _CodeTable:
+    # Strings de baixa cardinalidade (tipo, topico, resumo) compartilhadas por
+    # todas as timelines; cada evento guarda so o codigo de 16 bits.
+    def __init__(self):
+        self._codes = {}
+        self._values = []
+        self._lock = threading.Lock()
+
+    def code_for(self, value):
+        code = self._codes.get(value)
+        if code is not None:
+            return code
+        with self._lock:
+            code = self._codes.get(value)
+            if code is None:
+                if len(self._values) >= _NO_CODE:
+                    return _NO_CODE
+                code = len(self._values)
+                self._values.append(value)
+                self._codes[value] = code
+        return code
+
+    def value_for(self, code):
+        return self._values[code]
+
+
+_STRINGS = _CodeTable()
+
+
+def string_table(start=0):
+    # Copia da tabela de strings a partir de start (checkpoint binario). A
+    # tabela so cresce, entao os codigos ja gravados continuam validos.
+    with _STRINGS._lock:
+        return _STRINGS._values[start:]
+
+
+def string_code_map(values):
+    # Codigos deste processo para uma tabela gravada; None quando coincidem.
+    codes = [_STRINGS.code_for(value) for value in values]
+    if _NO_CODE in codes:
+        raise ValueError("tabela de strings cheia")
+    if all(code == index for index, code in enumerate(codes)):
+        return None
+    return codes
+
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=_JSON_SEPARATORS).encode("utf-8")
+
+
+class _ColumnRing:
+    # Buffer de capacidade fixa em colunas (array) com cabeca movel: descartar
+    # os mais antigos so avanca a cabeca; as colunas sao compactadas quando a
+    # parte morta passa da parte viva. start_seq/end_seq numeram os itens de
+    # forma absoluta; epoch muda quando o conteudo e reescrito fora da ordem
+    # (filtro de poda com timestamps fora de ordem, substituicao).
+    def __init__(self, capacity=None, format_ts=None):
+        self.capacity = int(capacity) if capacity else None
+        self._format_ts = format_ts
+        self._head = 0
+        self._ts = array("d")
+        self._sorted = True
+        self.start_seq = 0
+        self.epoch = 0
+
+    def __len__(self):
+        return len(self._ts) - self._head
+
+    def __bool__(self):
+        return len(self._ts) > self._head
+
+    def __iter__(self):
+        for index in range(self._head, len(self._ts)):
+            yield self._materialize(index)
+
+    def __getitem__(self, position):
+        size = len(self)
+        if isinstance(position, slice):
+            return [self._materialize(self._head + index) for index in range(*position.indices(size))]
+        if position < 0:
+            position += size
+        if position < 0 or position >= size:
+            raise IndexError("indice fora do buffer")
+        return self._materialize(self._head + position)
+
+    def __eq__(self, other):
+        if isinstance(other, (_ColumnRing, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    @property
+    def end_seq(self):
+        return self.start_seq + len(self)
+
+    def to_list(self):
+        return list(self)
+
+    def first_ts(self):
+        # Primeiro timestamp valido (itens sem ts ficam como NaN).
+        for index in range(self._head, len(self._ts)):
+            value = self._ts[index]
+            if not math.isnan(value):
+                return value
+        return None
+
+    def ts_at_seq(self, seq):
+        value = self._ts[self._head + seq - self.start_seq]
+        return None if math.isnan(value) else value
+
+    def min_ts(self):
+        # Menor timestamp positivo entre os itens vivos.
+        if self._sorted:
+            for index in range(self._head, len(self._ts)):
+                value = self._ts[index]
+                if value > 0:
+                    return value
+            return None
+        values = [value for value in self._ts[self._head :] if value > 0]
+        return min(values) if values else None
+
+    def extend(self, items):
+        for item in items:
+            self.append_item(item)
+
+    def clear(self):
+        self._advance(len(self))
+        self.epoch += 1
+        self._sorted = True
+
+    def prune_before(self, cutoff_ts):
+        # Remove itens com ts < cutoff (ou sem ts); devolve quantos sairam.
+        if not self:
+            return 0
+        if self._sorted:
+            index = bisect_left(self._ts, cutoff_ts, self._head)
+            removed = index - self._head
+            if removed:
+                self._advance(removed)
+            return removed
+        keep = [index for index in range(self._head, len(self._ts)) if self._ts[index] >= cutoff_ts]
+        removed = len(self) - len(keep)
+        if removed:
+            self._rewrite(keep)
+        return removed
+
+    def export_columns(self):
+        # Itens vivos como secoes de bytes (checkpoint binario): devolve o
+        # meta (tipos e tamanhos das secoes) e a lista de secoes na ordem.
+        head = self._head
+        meta = {"count": len(self), "sorted": self._sorted, "sections": []}
+        sections = []
+        for name, column, start in self._export_items(head):
+            data = bytes(memoryview(column)[start:]) if isinstance(column, array) else bytes(column[start:])
+            typecode = column.typecode if isinstance(column, array) else ""
+            itemsize = column.itemsize if isinstance(column, array) else 1
+            meta["sections"].append([name, typecode, itemsize, len(data)])
+            sections.append(data)
+        self._export_meta(meta, head)
+        return meta, sections
+
+    def load_columns(self, meta, sections, swap=False, code_map=None):
+        # Inverso de export_columns: substitui o conteudo do anel. sections
+        # mapeia nome -> bytes; swap inverte a ordem dos bytes (arquivo
+        # gravado em outra arquitetura).
+        columns = {}
+        for name, typecode, itemsize, _size in meta["sections"]:
+            data = sections[name]
+            if not typecode:
+                columns[name] = bytearray(data)
+                continue
+            column = array(typecode)
+            if column.itemsize != itemsize:
+                raise ValueError(f"coluna {name}: itemsize {itemsize} != {column.itemsize}")
+            column.frombytes(data)
+            if swap:
+                column.byteswap()
+            columns[name] = column
+        self._reset_columns()
+        self._head = 0
+        self._ts = columns["ts"]
+        self._sorted = bool(meta.get("sorted"))
+        self.start_seq = 0
+        self.epoch += 1
+        self._load_items(columns, meta, code_map)
+        if len(self._ts) != meta["count"]:
+            raise ValueError("quantidade de itens inconsistente")
+        if self.capacity is not None and len(self) > self.capacity:
+            self._advance(len(self) - self.capacity)
+
+    def _push_ts(self, ts):
+        if self._sorted and (math.isnan(ts) or (len(self._ts) > self._head and ts < self._ts[-1])):
+            self._sorted = False
+        self._ts.append(ts)
+        if self.capacity is not None and len(self) > self.capacity:
+            self._advance(len(self) - self.capacity)
+
+    def _advance(self, count):
+        self._head += count
+        self.start_seq += count
+        if self._head >= _COMPACT_MIN and self._head >= len(self._ts) - self._head:
+            self._compact()
+
+    def _compact(self):
+        head = self._head
+        del self._ts[:head]
+        self._compact_columns(head)
+        self._head = 0
+
+    def _rewrite(self, keep):
+        # Reescreve so com os indices de keep (em ordem); os seqs continuam
+        # terminando em end_seq e epoch avisa quem acompanhava por posicao.
+        items = [self._materialize(index) for index in keep]
+        end_seq = self.end_seq
+        self._reset_columns()
+        self._head = 0
+        self._ts = array("d")
+        self._sorted = True
+        self.start_seq = end_seq - len(items)
+        self.epoch += 1
+        for item in items:
+            self.append_item(item)
+
+    @staticmethod
+    def _as_ts(value):
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, float):
+            return value
+        if isinstance(value, int):
+            return float(value)
+        return None
+
+
+class EventRing(_ColumnRing):
+    # Timeline de um pivo: ts (array d), id (array q), codigos de tipo, topico
+    # e resumo (array H) e os details em JSON compacto num arena de bytes.
+    # O campo "at" e recalculado do ts; o parsed_payload que so repete o
+    # parse do raw_payload nao e guardado.
+    def __init__(self, capacity=None, format_ts=None, parse_payload=None, events=None):
+        super().__init__(capacity=capacity, format_ts=format_ts)
+        self._parse_payload = parse_payload
+        self._reset_columns()
+        if events:
+            self.extend(events)
+
+    def _reset_columns(self):
+        self._ids = array("q")
+        self._types = array("H")
+        self._topics = array("H")
+        self._summaries = array("H")
+        self._flags = array("B")
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._arena = bytearray()
+        self._arena_base = 0
+
+    def append(self, event_id, ts, event_type, topic, summary, details):
+        flags = 0
+        type_code = _STRINGS.code_for(event_type) if isinstance(event_type, str) else _NO_CODE
+        topic_code = _STRINGS.code_for(topic) if isinstance(topic, str) else _NO_CODE
+        summary_code = _STRINGS.code_for(summary) if isinstance(summary, str) else _NO_CODE
+        canonical = (
+            isinstance(event_id, int)
+            and not isinstance(event_id, bool)
+            and isinstance(ts, float)
+            and self._format_ts is not None
+            and isinstance(details, dict)
+            and _NO_CODE not in (type_code, topic_code, summary_code)
+        )
+        if not canonical:
+            event = {
+                "id": event_id,
+                "ts": ts,
+                "at": self._format_ts(ts) if self._format_ts is not None else None,
+                "type": event_type,
+                "topic": topic,
+                "summary": summary,
+                "details": details,
+            }
+            self._append_raw(event)
+            return
+
+        stored_details = details
+        parsed_payload = details.get("parsed_payload")
+        if parsed_payload is not None and self._parse_payload is not None and next(reversed(details)) == "parsed_payload":
+            raw_payload = details.get("raw_payload")
+            if isinstance(raw_payload, str) and self._parse_payload(raw_payload) == parsed_payload:
+                stored_details = dict(details)
+                del stored_details["parsed_payload"]
+                flags |= _FLAG_REPARSE
+        self._append_columns(
+            event_id,
+            ts,
+            type_code,
+            topic_code,
+            summary_code,
+            flags,
+            _encode_json(stored_details) if stored_details else b"",
+        )
+
+    def append_item(self, event):
+        # Evento ja montado (restauracao do runtime ou do painel).
+        if isinstance(event, dict) and tuple(event) == _CANONICAL_EVENT_KEYS:
+            ts = event["ts"]
+            if isinstance(ts, float) and self._format_ts is not None and event["at"] == self._format_ts(ts):
+                self.append(event["id"], ts, event["type"], event["topic"], event["summary"], event["details"])
+                return
+        self._append_raw(event)
+
+    def _append_raw(self, event):
+        ts = self._as_ts(event.get("ts")) if isinstance(event, dict) else None
+        self._append_columns(
+            0,
+            ts if ts is not None else math.nan,
+            _NO_CODE,
+            _NO_CODE,
+            _NO_CODE,
+            _FLAG_RAW,
+            _encode_json(event),
+        )
+
+    def _append_columns(self, event_id, ts, type_code, topic_code, summary_code, flags, payload):
+        self._ids.append(event_id)
+        self._types.append(type_code)
+        self._topics.append(topic_code)
+        self._summaries.append(summary_code)
+        self._flags.append(flags)
+        self._offsets.append(self._arena_base + len(self._arena))
+        self._lengths.append(len(payload))
+        self._arena += payload
+        self._push_ts(ts)
+
+    def _compact_columns(self, head):
+        if head < len(self._offsets):
+            cut = self._offsets[head] - self._arena_base
+        else:
+            cut = len(self._arena)
+        del self._arena[:cut]
+        self._arena_base += cut
+        for column in (self._ids, self._types, self._topics, self._summaries, self._flags, self._offsets, self._lengths):
+            del column[:head]
+
+    def _payload(self, index):
+        start = self._offsets[index] - self._arena_base
+        length = self._lengths[index]
+        if not length:
+            return None
+        return json.loads(self._arena[start : start + length].decode("utf-8"))
+
+    def _materialize(self, index):
+        flags = self._flags[index]
+        if flags & _FLAG_RAW:
+            return self._payload(index)
+        details = self._payload(index) or {}
+        if flags & _FLAG_REPARSE:
+            details["parsed_payload"] = self._parse_payload(details["raw_payload"])
+        ts = self._ts[index]
+        return {
+            "id": self._ids[index],
+            "ts": ts,
+            "at": self._format_ts(ts),
+            "type": _STRINGS.value_for(self._types[index]),
+            "topic": _STRINGS.value_for(self._topics[index]),
+            "summary": _STRINGS.value_for(self._summaries[index]),
+            "details": details,
+        }
+
+    def _export_items(self, head):
+        if head < len(self._offsets):
+            arena_start = self._offsets[head] - self._arena_base
+        else:
+            arena_start = len(self._arena)
+        return (
+            ("ts", self._ts, head),
+            ("ids", self._ids, head),
+            ("types", self._types, head),
+            ("topics", self._topics, head),
+            ("summaries", self._summaries, head),
+            ("flags", self._flags, head),
+            ("lengths", self._lengths, head),
+            ("arena", self._arena, arena_start),
+        )
+
+    def _export_meta(self, meta, head):
+        return None
+
+    def _load_items(self, columns, meta, code_map):
+        if code_map is not None:
+            for name in ("types", "topics", "summaries"):
+                columns[name] = array(
+                    "H", [code if code == _NO_CODE else code_map[code] for code in columns[name]]
+                )
+        self._ids = columns["ids"]
+        self._types = columns["types"]
+        self._topics = columns["topics"]
+        self._summaries = columns["summaries"]
+        self._flags = columns["flags"]
+        self._lengths = columns["lengths"]
+        self._arena = columns["arena"]
+        offsets = array("Q")
+        position = 0
+        for length in self._lengths:
+            offsets.append(position)
+            position += length
+        if position != len(self._arena):
+            raise ValueError("arena inconsistente")
+        self._offsets = offsets
+
+    def topic_at_seq(self, seq):
+        index = self._head + seq - self.start_seq
+        code = self._topics[index]
+        if code != _NO_CODE:
+            return _STRINGS.value_for(code)
+        event = self._materialize(index)
+        return str(event.get("topic") or "") if isinstance(event, dict) else ""
+
+    def memory_bytes(self):
+        columns = (self._ts, self._ids, self._types, self._topics, self._summaries, self._flags, self._offsets, self._lengths)
+        return sum(column.buffer_info()[1] * column.itemsize for column in columns) + len(self._arena)
+
+
+class PointRing(_ColumnRing):
+    # Serie de RSSI: ts (array d) e valor (array b, RSSI 0..31). Pontos fora
+    # do formato {ts, at, rssi} ficam num dict lateral por seq.
+    def __init__(self, capacity=None, format_ts=None, points=None):
+        super().__init__(capacity=capacity, format_ts=format_ts)
+        self._reset_columns()
+        if points:
+            self.extend(points)
+
+    def _reset_columns(self):
+        self._values = array("b")
+        self._raw = {}
+
+    def append(self, ts, rssi):
+        if (
+            isinstance(ts, float)
+            and isinstance(rssi, int)
+            and not isinstance(rssi, bool)
+            and -128 <= rssi <= 127
+            and self._format_ts is not None
+        ):
+            self._values.append(rssi)
+            self._push_ts(ts)
+            return
+        self._append_raw({"ts": ts, "at": self._format_ts(ts) if self._format_ts is not None else None, "rssi": rssi})
+
+    def append_item(self, point):
+        if isinstance(point, dict) and tuple(point) == _CANONICAL_POINT_KEYS:
+            ts = point["ts"]
+            if isinstance(ts, float) and self._format_ts is not None and point["at"] == self._format_ts(ts):
+                self.append(ts, point["rssi"])
+                return
+        self._append_raw(point)
+
+    def _append_raw(self, point):
+        ts = self._as_ts(point.get("ts")) if isinstance(point, dict) else None
+        self._raw[self.end_seq] = point
+        self._values.append(0)
+        self._push_ts(ts if ts is not None else math.nan)
+
+    def _advance(self, count):
+        if self._raw:
+            first_live = self.start_seq + count
+            for seq in [seq for seq in self._raw if seq < first_live]:
+                del self._raw[seq]
+        super()._advance(count)
+
+    def _compact_columns(self, head):
+        del self._values[:head]
+
+    def _export_items(self, head):
+        return (("ts", self._ts, head), ("values", self._values, head))
+
+    def _export_meta(self, meta, head):
+        if self._raw:
+            meta["raw"] = [[seq - self.start_seq, point] for seq, point in sorted(self._raw.items())]
+
+    def _load_items(self, columns, meta, code_map):
+        self._values = columns["values"]
+        self._raw = {int(offset): point for offset, point in meta.get("raw") or ()}
+
+    def _materialize(self, index):
+        if self._raw:
+            point = self._raw.get(self.start_seq + index - self._head)
+            if point is not None:
+                return point
+        ts = self._ts[index]
+        return {"ts": ts, "at": self._format_ts(ts), "rssi": self._values[index]}
@@ -0,0 +1,295 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+INGEST_POLICY_BLOCK = "block"
+INGEST_POLICY_DROP_OLDEST = "drop_oldest"
+INGEST_POLICY_COALESCE_PING = "coalesce_ping"
+INGEST_POLICIES = (INGEST_POLICY_BLOCK, INGEST_POLICY_DROP_OLDEST, INGEST_POLICY_COALESCE_PING)
+
+INGEST_COALESCE_TOPICS = ("cloudv2-ping",)
+INGEST_LATENCY_SAMPLE_LIMIT = 2048
+
+
+def normalize_ingest_policy(value):
+    text = str(value or "").strip().lower().replace("-", "_")
+    if text in ("drop_oldest", "drop", "descartar_antigo", "descartar"):
+        return INGEST_POLICY_DROP_OLDEST
+    if text in ("coalesce_ping", "coalesce", "coalescer", "coalescer_ping"):
+        return INGEST_POLICY_COALESCE_PING
+    return INGEST_POLICY_BLOCK
+
+
+def _extract_pivot_key(payload_text):
+    text = str(payload_text or "").strip()
+    if not text.startswith("#"):
+        return ""
+    parts = text[1:].split("-", 2)
+    if len(parts) < 2:
+        return ""
+    return parts[1].rstrip("$").strip()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = int(round((len(sorted_values) - 1) * (float(pct) / 100.0)))
+    index = max(0, min(len(sorted_values) - 1, index))
+    return sorted_values[index]
+
+
+class _IngestShard:
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self.items = deque()
+        self.pending_pings = {}
+        self.cond = threading.Condition(threading.Lock())
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        handler,
+        max_size=10000,
+        workers=1,
+        policy=INGEST_POLICY_BLOCK,
+        block_timeout_sec=2.0,
+        coalesce_topics=INGEST_COALESCE_TOPICS,
+        log=None,
+    ):
+        if not callable(handler):
+            raise ValueError("handler de ingestao invalido")
+
+        self.log = log or logging.getLogger("cloudv2.ingest")
+        self.handler = handler
+        self.max_size = max(1, int(max_size))
+        self.worker_count = max(1, int(workers))
+        self.policy = normalize_ingest_policy(policy)
+        self.block_timeout_sec = max(0.0, float(block_timeout_sec))
+        self.coalesce_topics = {str(topic or "").strip() for topic in (coalesce_topics or ()) if str(topic or "").strip()}
+
+        # Cada worker tem sua propria fila; mensagens do mesmo pivo caem sempre
+        # no mesmo shard para preservar a ordem de chegada por pivo.
+        shard_capacity = max(1, -(-self.max_size // self.worker_count))
+        self._shards = [_IngestShard(shard_capacity) for _ in range(self.worker_count)]
+        self._workers = []
+        self._stop_event = threading.Event()
+        self._started = False
+
+        self._metrics_lock = threading.Lock()
+        self._enqueued_count = 0
+        self._processed_count = 0
+        self._error_count = 0
+        self._dropped_oldest_count = 0
+        self._dropped_full_count = 0
+        self._coalesced_count = 0
+        self._blocked_count = 0
+        self._max_depth = 0
+        self._latency_samples = deque(maxlen=INGEST_LATENCY_SAMPLE_LIMIT)
+        self._latency_sum_sec = 0.0
+        self._latency_max_sec = 0.0
+        self._last_drop_log_ts = 0.0
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self._stop_event.clear()
+        for index, shard in enumerate(self._shards):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                args=(shard,),
+                name=f"cloudv2-ingest-{index}",
+                daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def stop(self, timeout=5.0):
+        if not self._started:
+            return
+        self._stop_event.set()
+        for shard in self._shards:
+            with shard.cond:
+                shard.cond.notify_all()
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        for worker in self._workers:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._workers = []
+        self._started = False
+
+        pending = self.depth()
+        if pending > 0:
+            self.log.warning("Fila de ingestao encerrada com %s mensagens pendentes.", pending)
+
+    def depth(self):
+        total = 0
+        for shard in self._shards:
+            with shard.cond:
+                total += len(shard.items)
+        return total
+
+    def _shard_for(self, pivot_key, topic):
+        if self.worker_count == 1:
+            return self._shards[0]
+        key = pivot_key or topic
+        return self._shards[hash(key) % self.worker_count]
+
+    def submit(self, topic, payload, ts=None):
+        topic_text = str(topic or "").strip()
+        payload_text = str(payload or "")
+        received_ts = float(ts if ts is not None else time.time())
+        enqueued_mono = time.monotonic()
+        pivot_key = _extract_pivot_key(payload_text)
+        shard = self._shard_for(pivot_key, topic_text)
+
+        dropped_oldest = 0
+        dropped_full = False
+        coalesced = False
+        blocked = False
+        depth_after = 0
+
+        with shard.cond:
+            coalesce_key = None
+            if self.policy == INGEST_POLICY_COALESCE_PING and topic_text in self.coalesce_topics and pivot_key:
+                coalesce_key = (topic_text, pivot_key)
+                pending = shard.pending_pings.get(coalesce_key)
+                if pending is not None:
+                    # Ping mais recente substitui o pendente do mesmo pivo; a
+                    # latencia continua sendo medida a partir do primeiro enfileiramento.
+                    pending[1] = payload_text
+                    pending[2] = received_ts
+                    coalesced = True
+
+            if not coalesced:
+                if len(shard.items) >= shard.capacity:
+                    if self.policy == INGEST_POLICY_DROP_OLDEST:
+                        while len(shard.items) >= shard.capacity:
+                            self._discard_oldest_locked(shard)
+                            dropped_oldest += 1
+                    else:
+                        blocked = True
+                        deadline = enqueued_mono + self.block_timeout_sec
+                        while len(shard.items) >= shard.capacity and not self._stop_event.is_set():
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            shard.cond.wait(remaining)
+                        if len(shard.items) >= shard.capacity:
+                            dropped_full = True
+
+                if not dropped_full:
+                    entry = [topic_text, payload_text, received_ts, enqueued_mono, coalesce_key]
+                    shard.items.append(entry)
+                    if coalesce_key is not None:
+                        shard.pending_pings[coalesce_key] = entry
+                    shard.cond.notify_all()
+            depth_after = len(shard.items)
+
+        total_depth = depth_after if self.worker_count == 1 else self.depth()
+        with self._metrics_lock:
+            if coalesced:
+                self._coalesced_count += 1
+            elif not dropped_full:
+                self._enqueued_count += 1
+            if blocked:
+                self._blocked_count += 1
+            if dropped_full:
+                self._dropped_full_count += 1
+            self._dropped_oldest_count += dropped_oldest
+            if total_depth > self._max_depth:
+                self._max_depth = total_depth
+
+        if dropped_full or dropped_oldest:
+            self._log_drop(topic_text, dropped_full, dropped_oldest)
+        return not dropped_full
+
+    def _discard_oldest_locked(self, shard):
+        entry = shard.items.popleft()
+        coalesce_key = entry[4]
+        if coalesce_key is not None and shard.pending_pings.get(coalesce_key) is entry:
+            shard.pending_pings.pop(coalesce_key, None)
+        return entry
+
+    def _log_drop(self, topic, dropped_full, dropped_oldest):
+        now_mono = time.monotonic()
+        with self._metrics_lock:
+            if now_mono - self._last_drop_log_ts < 10.0:
+                return
+            self._last_drop_log_ts = now_mono
+            total_dropped = self._dropped_full_count + self._dropped_oldest_count
+        if dropped_full:
+            self.log.warning(
+                "Fila de ingestao cheia: mensagem descartada topic=%s (politica=%s, descartes=%s).",
+                topic,
+                self.policy,
+                total_dropped,
+            )
+        else:
+            self.log.warning(
+                "Fila de ingestao cheia: %s mensagens antigas descartadas (politica=%s, descartes=%s).",
+                dropped_oldest,
+                self.policy,
+                total_dropped,
+            )
+
+    def _worker_loop(self, shard):
+        while True:
+            with shard.cond:
+                while not shard.items and not self._stop_event.is_set():
+                    shard.cond.wait(0.5)
+                if not shard.items:
+                    return
+                entry = shard.items.popleft()
+                if entry[4] is not None and shard.pending_pings.get(entry[4]) is entry:
+                    shard.pending_pings.pop(entry[4], None)
+                shard.cond.notify_all()
+
+            topic, payload, received_ts, enqueued_mono, _ = entry
+            failed = False
+            try:
+                self.handler(topic, payload, received_ts)
+            except Exception as exc:
+                failed = True
+                self.log.exception("Erro ao processar mensagem da fila de ingestao topic=%s: %s", topic, exc)
+
+            latency_sec = max(0.0, time.monotonic() - enqueued_mono)
+            with self._metrics_lock:
+                self._processed_count += 1
+                if failed:
+                    self._error_count += 1
+                self._latency_samples.append(latency_sec)
+                self._latency_sum_sec += latency_sec
+                if latency_sec > self._latency_max_sec:
+                    self._latency_max_sec = latency_sec
+
+    def get_metrics(self):
+        depth = self.depth()
+        with self._metrics_lock:
+            samples = sorted(self._latency_samples)
+            processed = self._processed_count
+            dropped_total = self._dropped_full_count + self._dropped_oldest_count
+            avg_latency = (self._latency_sum_sec / processed) if processed > 0 else None
+            return {
+                "policy": self.policy,
+                "workers": self.worker_count,
+                "max_size": self.max_size,
+                "depth": depth,
+                "max_depth": self._max_depth,
+                "enqueued_count": self._enqueued_count,
+                "processed_count": processed,
+                "error_count": self._error_count,
+                "blocked_count": self._blocked_count,
+                "coalesced_count": self._coalesced_count,
+                "dropped_oldest_count": self._dropped_oldest_count,
+                "dropped_full_count": self._dropped_full_count,
+                "dropped_count": dropped_total,
+                "latency_avg_ms": round(avg_latency * 1000.0, 3) if avg_latency is not None else None,
+                "latency_p50_ms": round(_percentile(samples, 50) * 1000.0, 3) if samples else None,
+                "latency_p95_ms": round(_percentile(samples, 95) * 1000.0, 3) if samples else None,
+                "latency_p99_ms": round(_percentile(samples, 99) * 1000.0, 3) if samples else None,
+                "latency_max_ms": round(self._latency_max_sec * 1000.0, 3) if processed > 0 else None,
+                "latency_sample_count": len(samples),
+            }
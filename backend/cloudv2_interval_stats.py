@@ -0,0 +1,164 @@
+import statistics
+from bisect import insort
+
+
+def _clean_intervals(intervals):
+    cleaned = []
+    if isinstance(intervals, (list, tuple)):
+        for item in intervals:
+            try:
+                parsed = float(item)
+            except (TypeError, ValueError):
+                continue
+            if parsed > 0:
+                cleaned.append(parsed)
+    return cleaned
+
+
+def _empty_stats():
+    return {
+        "median_interval_sec": None,
+        "sample_count": 0,
+        "total_sample_count": 0,
+    }
+
+
+def compute_interval_stats(intervals, tolerance_pct):
+    # Agrupa os intervalos em baldes de tolerancia (na ordem de chegada) e
+    # devolve a mediana do balde mais numeroso. Versao de referencia, que
+    # reagrupa tudo a cada chamada; o caminho quente usa IntervalMedianEngine.
+    cleaned = _clean_intervals(intervals)
+    if not cleaned:
+        return _empty_stats()
+
+    buckets = []
+    for index, interval_sec in enumerate(cleaned):
+        matched_bucket = None
+        matched_delta_ratio = None
+        for bucket in buckets:
+            reference = bucket["reference_sec"]
+            if reference <= 0:
+                continue
+            tolerance = reference * tolerance_pct
+            delta = abs(interval_sec - reference)
+            if delta > tolerance:
+                continue
+
+            delta_ratio = delta / reference
+            if matched_bucket is None or delta_ratio < matched_delta_ratio:
+                matched_bucket = bucket
+                matched_delta_ratio = delta_ratio
+
+        if matched_bucket is None:
+            buckets.append(
+                {
+                    "reference_sec": interval_sec,
+                    "samples": [interval_sec],
+                    "last_index": index,
+                }
+            )
+            continue
+
+        matched_bucket["samples"].append(interval_sec)
+        matched_bucket["last_index"] = index
+        matched_bucket["reference_sec"] = statistics.median(matched_bucket["samples"])
+
+    best_bucket = max(buckets, key=lambda bucket: (len(bucket["samples"]), bucket["last_index"]))
+    best_samples = best_bucket["samples"]
+    return {
+        "median_interval_sec": statistics.median(best_samples),
+        "sample_count": len(best_samples),
+        "total_sample_count": len(cleaned),
+    }
+
+
+def _sorted_median(values):
+    # Mesmo resultado de statistics.median para uma lista ja ordenada.
+    size = len(values)
+    middle = size // 2
+    if size % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+class IntervalMedianEngine:
+    # Mesmo agrupamento de compute_interval_stats, mantido entre chamadas:
+    # - janela igual a anterior: devolve o resultado memorizado;
+    # - janela anterior + um intervalo novo: so o novo entra nos baldes;
+    # - janela deslizou (saiu o mais antigo): reagrupa a janela, que e curta.
+    # Cada balde guarda as amostras ordenadas (bisect), sem reordenar para
+    # calcular a mediana.
+    def __init__(self, tolerance_pct):
+        self.tolerance_pct = float(tolerance_pct)
+        self._window = []
+        self._references = []
+        self._samples = []
+        self._last_index = []
+        self._result = _empty_stats()
+        self.rebuild_count = 0
+        self.append_count = 0
+
+    def stats(self, intervals):
+        cleaned = _clean_intervals(intervals)
+        window = self._window
+        size = len(window)
+        if cleaned == window:
+            return dict(self._result)
+        if size and len(cleaned) == size + 1 and cleaned[:size] == window:
+            self.append_count += 1
+            self._add(cleaned[-1], size)
+        else:
+            self.rebuild_count += 1
+            self._references = []
+            self._samples = []
+            self._last_index = []
+            for index, interval_sec in enumerate(cleaned):
+                self._add(interval_sec, index)
+        self._window = cleaned
+        self._result = self._summarize(len(cleaned))
+        return dict(self._result)
+
+    def _add(self, interval_sec, index):
+        references = self._references
+        tolerance_pct = self.tolerance_pct
+        matched = -1
+        matched_delta_ratio = None
+        for position, reference in enumerate(references):
+            if reference <= 0:
+                continue
+            delta = abs(interval_sec - reference)
+            if delta > reference * tolerance_pct:
+                continue
+            delta_ratio = delta / reference
+            if matched < 0 or delta_ratio < matched_delta_ratio:
+                matched = position
+                matched_delta_ratio = delta_ratio
+
+        if matched < 0:
+            references.append(interval_sec)
+            self._samples.append([interval_sec])
+            self._last_index.append(index)
+            return
+
+        samples = self._samples[matched]
+        insort(samples, interval_sec)
+        self._last_index[matched] = index
+        references[matched] = _sorted_median(samples)
+
+    def _summarize(self, total):
+        if not self._samples:
+            return _empty_stats()
+        best = 0
+        best_key = (len(self._samples[0]), self._last_index[0])
+        for position in range(1, len(self._samples)):
+            key = (len(self._samples[position]), self._last_index[position])
+            if key > best_key:
+                best = position
+                best_key = key
+        samples = self._samples[best]
+        return {
+            "median_interval_sec": _sorted_median(samples),
+            "sample_count": len(samples),
+            "total_sample_count": total,
+        }
+
@@ -1,3 +1,4 @@
+import bisect
 import json
 import os
 import re
@@ -6,10 +7,26 @@ import statistics
 import threading
 import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
 
 from backend.cloudv2_paths import resolve_data_dir
 from backend.cloudv2_dashboard import slugify
+from backend.cloudv2_db_pool import ReadConnectionPool, TimedRLock
+from backend.cloudv2_retention import RETENTION_TABLES
+from backend.cloudv2_rollups import (
+    ROLLUP_COUNTER_COLUMNS,
+    ROLLUP_DAILY,
+    ROLLUP_GRANULARITIES,
+    ROLLUP_HOURLY,
+    ROLLUP_TABLES,
+    RollupAccumulator,
+    advance_connectivity,
+    normalize_rollup_granularity,
+    record_connectivity_message,
+    rollup_bucket_end,
+    rollup_bucket_start,
+)
 
 
 DEFAULT_DB_PATH = os.path.join(resolve_data_dir(), "telemetry.sqlite3")
@@ -18,7 +35,148 @@ PROBE_STATS_WINDOW_SEC = 30 * 24 * 3600
 TIMELINE_MINI_BINS = 96
 TIMELINE_MINI_DEFAULT_WINDOW_SEC = 30 * 24 * 3600
 TIMELINE_MINI_EMPTY_FALLBACK_SEC = 24 * 3600
+# Runs de mensagens por pivo/sessao (timeline_mini materializado): o limiar
+# de desconexao nunca fica abaixo de 30s, entao esse e o menor gap de mescla.
+TIMELINE_RUNS_MIN_MERGE_GAP_SEC = 30.0
+# Log de mudancas do /api/state?since=: remocoes lembradas antes de forcar
+# o estado completo para quem esta atras da mais antiga esquecida.
+CHANGE_LOG_MAX_REMOVED = 1024
+TIMELINE_RUNS_MAX = 4096
+TIMELINE_RUNS_RETENTION_MARGIN_SEC = 24 * 3600
 CONNECTIVITY_TOPICS = ("cloudv2", "cloudv2-ping", "cloudv2-info", "cloudv2-network")
+# Formato 2: snapshot guarda apenas identificacao, resumo e metricas; as series
+# (timeline, probes, cloud2, rssi) sao montadas a partir das tabelas de eventos.
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_STORED_KEYS = (
+    "pivot_id",
+    "pivot_slug",
+    "session_id",
+    "run_id",
+    "updated_at",
+    "updated_at_ts",
+    "summary",
+    "metrics",
+)
+# Campos da listagem (/api/state, quality-lite) mantidos em colunas tipadas de
+# pivot_state_summary: (coluna, caminho no resumo, tipo).
+STATE_SUMMARY_FIELDS = (
+    ("status_code", ("status", "code"), "text"),
+    ("status_label", ("status", "label"), "text"),
+    ("status_rank", ("status", "rank"), "int"),
+    ("status_reason", ("status", "reason"), "text"),
+    ("quality_code", ("quality", "code"), "text"),
+    ("quality_label", ("quality", "label"), "text"),
+    ("quality_rank", ("quality", "rank"), "int"),
+    ("quality_reason", ("quality", "reason"), "text"),
+    ("flag_online", ("flags", "online"), "bool"),
+    ("flag_offline", ("flags", "offline"), "bool"),
+    ("ping_ok", ("ping_ok",), "bool"),
+    ("cloudv2_ok", ("cloudv2_ok",), "bool"),
+    ("median_ready", ("median_ready",), "bool"),
+    ("median_sample_count", ("median_sample_count",), "int"),
+    ("median_cloudv2_interval_sec", ("median_cloudv2_interval_sec",), "float"),
+    ("max_expected_interval_sec", ("max_expected_interval_sec",), "float"),
+    ("disconnect_threshold_sec", ("disconnect_threshold_sec",), "float"),
+    ("disconnected_by_inactivity", ("disconnected_by_inactivity",), "bool"),
+    ("connected_pct", ("connected_pct",), "float"),
+    ("disconnected_pct", ("disconnected_pct",), "float"),
+    ("attention_disconnected_pct", ("attention_disconnected_pct",), "float"),
+    ("attention_disconnected_pct_threshold", ("attention_disconnected_pct_threshold",), "float"),
+    ("critical_disconnected_pct_threshold", ("critical_disconnected_pct_threshold",), "float"),
+    ("attention_window_sec", ("attention_window_sec",), "float"),
+    ("last_monitored_message_ts", ("last_monitored_message_ts",), "float"),
+    ("last_ping_ts", ("last_ping_ts",), "float"),
+    ("last_cloudv2_ts", ("last_cloudv2_ts",), "float"),
+    ("last_activity_ts", ("last_activity_ts",), "float"),
+    ("signal", ("signal",), "text"),
+    ("technology", ("technology",), "text"),
+    ("signal_technology", ("signal_technology",), "text"),
+    ("last_cloud2_ts", ("last_cloud2", "ts"), "float"),
+    ("last_cloud2_rssi", ("last_cloud2", "rssi"), "raw"),
+    ("last_cloud2_technology", ("last_cloud2", "technology"), "raw"),
+    ("last_cloud2_firmware", ("last_cloud2", "firmware"), "raw"),
+    ("last_cloud2_event_date", ("last_cloud2", "event_date"), "raw"),
+    ("last_cloud2_drop_duration_sec", ("last_cloud2", "drop_duration_sec"), "float"),
+    ("probe_enabled", ("probe", "enabled"), "bool"),
+    ("probe_interval_sec", ("probe", "interval_sec"), "int"),
+    ("probe_last_sent_ts", ("probe", "last_sent_ts"), "float"),
+    ("probe_last_response_ts", ("probe", "last_response_ts"), "float"),
+    ("probe_pending", ("probe", "pending"), "bool"),
+    ("probe_pending_deadline_ts", ("probe", "pending_deadline_ts"), "float"),
+    ("probe_timeout_streak", ("probe", "timeout_streak"), "int"),
+    ("probe_last_result", ("probe", "last_result"), "raw"),
+    ("probe_alert", ("probe", "alert"), "bool"),
+    ("probe_sent_count", ("probe", "sent_count"), "int"),
+    ("probe_response_count", ("probe", "response_count"), "int"),
+    ("probe_timeout_count", ("probe", "timeout_count"), "int"),
+    ("probe_response_ratio_pct", ("probe", "response_ratio_pct"), "float"),
+    ("probe_latency_sample_count", ("probe", "latency_sample_count"), "int"),
+    ("probe_latency_last_sec", ("probe", "latency_last_sec"), "float"),
+    ("probe_latency_avg_sec", ("probe", "latency_avg_sec"), "float"),
+    ("probe_latency_median_sec", ("probe", "latency_median_sec"), "float"),
+    ("probe_latency_min_sec", ("probe", "latency_min_sec"), "float"),
+    ("probe_latency_max_sec", ("probe", "latency_max_sec"), "float"),
+)
+STATE_SUMMARY_COLUMNS = tuple(field[0] for field in STATE_SUMMARY_FIELDS)
+STATE_SUMMARY_UPSERT_SQL = """
+    INSERT INTO pivot_state_summary (
+        pivot_id,
+        session_id,
+        pivot_slug,
+        updated_at_ts,
+        timeline_mini_json,
+        timeline_mini_threshold_sec,
+        change_seq,
+        extra_json,
+        {columns}
+    ) VALUES ({placeholders})
+    ON CONFLICT(pivot_id, session_id) DO UPDATE SET
+        pivot_slug = excluded.pivot_slug,
+        updated_at_ts = excluded.updated_at_ts,
+        timeline_mini_json = excluded.timeline_mini_json,
+        timeline_mini_threshold_sec = excluded.timeline_mini_threshold_sec,
+        change_seq = excluded.change_seq,
+        extra_json = excluded.extra_json,
+        {updates}
+""".format(
+    columns=",\n        ".join(STATE_SUMMARY_COLUMNS),
+    placeholders=", ".join(["?"] * (len(STATE_SUMMARY_COLUMNS) + 8)),
+    updates=",\n        ".join(f"{column} = excluded.{column}" for column in STATE_SUMMARY_COLUMNS),
+)
+STATE_SUMMARY_SELECT_COLUMNS = ",\n".join(
+    [
+        "state.pivot_id AS state_pivot_id",
+        "state.pivot_slug AS state_pivot_slug",
+        "state.timeline_mini_json AS state_timeline_mini_json",
+        "state.timeline_mini_threshold_sec AS state_timeline_mini_threshold_sec",
+        "state.change_seq AS state_change_seq",
+        "state.extra_json AS state_extra_json",
+    ]
+    + [f"state.{column} AS state_{column}" for column in STATE_SUMMARY_COLUMNS]
+)
+STATE_SUMMARY_TS_LABELS = (
+    (("last_monitored_message_ts",), ("last_monitored_message_at",)),
+    (("last_ping_ts",), ("last_ping_at",)),
+    (("last_cloudv2_ts",), ("last_cloudv2_at",)),
+    (("last_activity_ts",), ("last_activity_at",)),
+    (("last_cloud2", "ts"), ("last_cloud2", "at")),
+    (("probe", "last_sent_ts"), ("probe", "last_sent_at")),
+    (("probe", "last_response_ts"), ("probe", "last_response_at")),
+    (("probe", "pending_deadline_ts"), ("probe", "pending_deadline_at")),
+)
+# Chaves cobertas pelas colunas (e rotulos *_at derivados delas); o resto do
+# resumo vai para extra_json.
+STATE_SUMMARY_COLUMN_PATHS = frozenset(
+    [path for _, path, _ in STATE_SUMMARY_FIELDS] + [label_path for _, label_path in STATE_SUMMARY_TS_LABELS]
+)
+STATE_SUMMARY_GROUP_KEYS = frozenset(path[0] for path in STATE_SUMMARY_COLUMN_PATHS if len(path) > 1)
+
+
+def change_log_seed():
+    # Geracoes de mudanca comecam no relogio em microssegundos: uma geracao
+    # guardada por um cliente antes de um reinicio fica abaixo do piso novo
+    # (estado completo) em vez de coincidir com numeros reutilizados.
+    return time.time_ns() // 1000
 
 
 def _ts_to_str(ts):
@@ -111,6 +269,76 @@ def _ensure_summary_signal_fields(item):
     return item
 
 
+def _encode_state_summary_value(summary, path, kind):
+    value = summary
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if value is None:
+        return None
+    if kind == "text":
+        return str(value)
+    if kind == "int":
+        return _safe_int(value, None)
+    if kind == "float":
+        return _safe_float(value, None)
+    if kind == "bool":
+        parsed = _safe_bool(value, None)
+        return None if parsed is None else int(parsed)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (str, int, float)):
+        return value
+    return None
+
+
+def _state_summary_extras(summary):
+    # Parte do resumo sem coluna tipada (modem_reset, expected_by_topic_sec,
+    # topic_counters...). timeline_mini tem coluna propria.
+    extras = {}
+    for key, value in (summary or {}).items():
+        if key == "timeline_mini" or (key,) in STATE_SUMMARY_COLUMN_PATHS:
+            continue
+        if key in STATE_SUMMARY_GROUP_KEYS and isinstance(value, dict):
+            rest = {child: item for child, item in value.items() if (key, child) not in STATE_SUMMARY_COLUMN_PATHS}
+            if rest:
+                extras[key] = rest
+            continue
+        extras[key] = value
+    return extras
+
+
+def _decode_state_summary_value(value, kind):
+    if value is None:
+        return None
+    if kind == "bool":
+        return _safe_bool(value, None)
+    if kind == "int":
+        return _safe_int(value, None)
+    if kind == "float":
+        return _safe_float(value, None)
+    return value
+
+
+def _set_summary_path(target, path, value):
+    for key in path[:-1]:
+        child = target.get(key)
+        if not isinstance(child, dict):
+            child = {}
+            target[key] = child
+        target = child
+    target[path[-1]] = value
+
+
+def _get_summary_path(source, path):
+    for key in path:
+        if not isinstance(source, dict):
+            return None
+        source = source.get(key)
+    return source
+
+
 def _normalize_timeline_mini_segments(raw_segments):
     if not isinstance(raw_segments, list):
         return []
@@ -168,15 +396,6 @@ def _build_timeline_mini_segments(events, window_end_ts, window_sec, disconnect_
     if min_timeline_ts is None:
         min_timeline_ts = max(0.0, end_ts - TIMELINE_MINI_EMPTY_FALLBACK_SEC)
 
-    start_ts = end_ts - safe_window_sec
-    if start_ts < min_timeline_ts:
-        start_ts = min_timeline_ts
-    if start_ts >= end_ts:
-        start_ts = max(min_timeline_ts, end_ts - TIMELINE_MINI_EMPTY_FALLBACK_SEC)
-    if start_ts >= end_ts:
-        return []
-
-    min_relevant_ts = start_ts - threshold_sec
     message_ts = []
     for event in events or []:
         if not isinstance(event, dict):
@@ -185,26 +404,85 @@ def _build_timeline_mini_segments(events, window_end_ts, window_sec, disconnect_
         if topic not in CONNECTIVITY_TOPICS:
             continue
         ts_value = _safe_float(event.get("ts"), None)
-        if ts_value is None:
-            continue
-        if ts_value < min_relevant_ts or ts_value > end_ts:
+        if ts_value is None or ts_value > end_ts:
             continue
         message_ts.append(ts_value)
 
+    runs = [(ts_value, ts_value) for ts_value in sorted(set(message_ts))]
+    return _build_timeline_mini_from_runs(runs, min_timeline_ts, end_ts, safe_window_sec, threshold_sec)
+
+
+def _merge_timeline_run(runs, ts_value, merge_gap_sec):
+    # runs: lista ordenada de [inicio, fim, maior intervalo interno] de
+    # mensagens com intervalos <= merge_gap_sec. O maior intervalo diz se o
+    # run continua valido quando o merge gap diminui.
+    if runs and ts_value >= runs[-1][0]:
+        last = runs[-1]
+        if ts_value <= last[1]:
+            return False
+        if ts_value - last[1] <= merge_gap_sec:
+            last[2] = max(last[2], ts_value - last[1])
+            last[1] = ts_value
+            return True
+        runs.append([ts_value, ts_value, 0.0])
+        return True
+
+    index = bisect.bisect_right([run[0] for run in runs], ts_value)
+    if index > 0 and ts_value <= runs[index - 1][1]:
+        return False
+    runs.insert(index, [ts_value, ts_value, 0.0])
+    merged = []
+    for run in runs:
+        if merged and run[0] - merged[-1][1] <= merge_gap_sec:
+            previous = merged[-1]
+            previous[2] = max(previous[2], run[2], run[0] - previous[1])
+            previous[1] = max(previous[1], run[1])
+        else:
+            merged.append(run)
+    runs[:] = merged
+    return True
+
+
+def _build_timeline_mini_from_runs(runs, first_ts, window_end_ts, window_sec, disconnect_threshold_sec):
+    end_ts = _safe_float(window_end_ts, None)
+    safe_window_sec = _safe_float(window_sec, None)
+    threshold_sec = _safe_float(disconnect_threshold_sec, None)
+    if end_ts is None or safe_window_sec is None or safe_window_sec <= 0 or threshold_sec is None or threshold_sec <= 0:
+        return []
+
+    min_timeline_ts = _safe_float(first_ts, None)
+    if min_timeline_ts is None or min_timeline_ts <= 0 or min_timeline_ts > end_ts:
+        min_timeline_ts = max(0.0, end_ts - TIMELINE_MINI_EMPTY_FALLBACK_SEC)
+
+    start_ts = end_ts - safe_window_sec
+    if start_ts < min_timeline_ts:
+        start_ts = min_timeline_ts
+    if start_ts >= end_ts:
+        start_ts = max(min_timeline_ts, end_ts - TIMELINE_MINI_EMPTY_FALLBACK_SEC)
+    if start_ts >= end_ts:
+        return []
+
+    min_relevant_ts = start_ts - threshold_sec
+    relevant_runs = []
+    for run in runs or []:
+        run_start, run_end = run[0], run[1]
+        if run_end < min_relevant_ts or run_start > end_ts:
+            continue
+        relevant_runs.append((max(run_start, min_relevant_ts), min(run_end, end_ts)))
+
     total_duration = end_ts - start_ts
     if total_duration <= 0:
         return []
 
-    if not message_ts:
+    if not relevant_runs:
         return [{"state": "offline", "ratio": 1.0}]
 
-    message_ts = sorted(set(message_ts))
     online_intervals = []
     current_start = None
     current_end = None
-    for ts_value in message_ts:
-        interval_start = max(start_ts, ts_value)
-        interval_end = min(end_ts, ts_value + threshold_sec)
+    for run_start, run_end in relevant_runs:
+        interval_start = max(start_ts, run_start)
+        interval_end = min(end_ts, run_end + threshold_sec)
         if interval_end <= interval_start:
             continue
         if current_start is None:
@@ -310,6 +588,31 @@ def _build_timeline_mini_segments(events, window_end_ts, window_sec, disconnect_
     return compressed
 
 
+def _apply_timeline_event(state, ts_value, topic):
+    if ts_value is None or ts_value <= 0:
+        return
+    if state["first_ts"] is None or ts_value < state["first_ts"]:
+        state["first_ts"] = ts_value
+    if state["last_event_ts"] is None or ts_value > state["last_event_ts"]:
+        state["last_event_ts"] = ts_value
+    if _normalize_text(topic) in CONNECTIVITY_TOPICS:
+        _merge_timeline_run(state["runs"], ts_value, state["merge_gap_sec"])
+
+
+def _prune_timeline_runs(state):
+    last_event_ts = state["last_event_ts"]
+    runs = state["runs"]
+    if last_event_ts is not None:
+        cutoff_ts = last_event_ts - TIMELINE_MINI_DEFAULT_WINDOW_SEC - TIMELINE_RUNS_RETENTION_MARGIN_SEC
+        drop_count = 0
+        while drop_count < len(runs) and runs[drop_count][1] < cutoff_ts:
+            drop_count += 1
+        if drop_count:
+            del runs[:drop_count]
+    if len(runs) > TIMELINE_RUNS_MAX:
+        del runs[: len(runs) - TIMELINE_RUNS_MAX]
+
+
 def _resolve_timeline_disconnect_threshold(summary, settings=None):
     safe_summary = summary if isinstance(summary, dict) else {}
     safe_settings = settings if isinstance(settings, dict) else {}
@@ -342,14 +645,52 @@ def _resolve_timeline_disconnect_threshold(summary, settings=None):
 
 
 class TelemetryPersistence:
-    def __init__(self, db_path=None, migrations_dir=None, max_events_per_pivot=5000, log=None):
+    def __init__(
+        self,
+        db_path=None,
+        migrations_dir=None,
+        max_events_per_pivot=5000,
+        log=None,
+        write_behind_ms=0,
+        write_behind_max_rows=500,
+        read_pool_size=4,
+    ):
         self.db_path = str(db_path or DEFAULT_DB_PATH)
         self.migrations_dir = str(migrations_dir or DEFAULT_MIGRATIONS_DIR)
         self.max_events_per_pivot = max(100, int(max_events_per_pivot or 5000))
         self.log = log
-
-        self._lock = threading.RLock()
+        # write_behind_ms define a janela de durabilidade: inserts de eventos e
+        # upserts de snapshot ficam em memoria por no maximo esse tempo antes
+        # de serem gravados em lote. Com 0 cada escrita e confirmada na hora.
+        self.write_behind_sec = max(0.0, float(_safe_float(write_behind_ms, 0.0) or 0.0) / 1000.0)
+        self.write_behind_max_rows = max(1, int(_safe_int(write_behind_max_rows, 500) or 500))
+
+        # Conexao unica de escrita protegida por _lock; consultas de API usam
+        # um pool de conexoes somente leitura (WAL permite leitores paralelos).
+        self.read_pool_size = max(0, int(_safe_int(read_pool_size, 4) or 0))
+        if self.db_path == ":memory:":
+            self.read_pool_size = 0
+        self._lock = TimedRLock()
         self._conn = None
+        self._read_pool = None
+        self._pending_writes = []
+        self._pending_since_mono = None
+        self._flush_stop_event = threading.Event()
+        self._flush_worker = None
+        self._flush_count = 0
+        self._flush_rows_total = 0
+        self._flush_error_count = 0
+        self._flush_last_ms = None
+        self._flush_max_ms = 0.0
+        self._flush_total_ms = 0.0
+        self._flush_last_batch_rows = 0
+        self._flush_max_batch_rows = 0
+        self._timeline_runs = {}
+        # Geracao de mudancas do resumo de listagem (coluna change_seq) e
+        # pivos removidos desde o piso, para get_run_state_payload(since=...).
+        self._change_seq = 0
+        self._change_floor = 0
+        self._removed_pivot_seq = {}
 
     def start(self):
         with self._lock:
@@ -362,6 +703,9 @@ class TelemetryPersistence:
 
             conn = sqlite3.connect(self.db_path, check_same_thread=False)
             conn.row_factory = sqlite3.Row
+            # So tem efeito em banco novo; bancos antigos precisam de um VACUUM
+            # (ver vacuum_full) para liberar espaco de forma incremental.
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
             conn.execute("PRAGMA foreign_keys = ON")
             conn.execute("PRAGMA journal_mode = WAL")
             conn.execute("PRAGMA synchronous = NORMAL")
@@ -370,22 +714,177 @@ class TelemetryPersistence:
             self._conn = conn
             self._ensure_migrations_table_locked()
             self._apply_migrations_locked()
+            row = conn.execute("SELECT MAX(change_seq) FROM pivot_state_summary").fetchone()
+            self._change_seq = max(_safe_int(row[0], 0) or 0, change_log_seed())
+            self._change_floor = self._change_seq
+            self._removed_pivot_seq = {}
+            if self.read_pool_size > 0:
+                self._read_pool = ReadConnectionPool(self.db_path, size=self.read_pool_size)
+
+            if self.write_behind_sec > 0 and self._flush_worker is None:
+                self._flush_stop_event.clear()
+                self._flush_worker = threading.Thread(
+                    target=self._flush_loop,
+                    name="cloudv2-persistence-flush",
+                    daemon=True,
+                )
+                self._flush_worker.start()
 
     def stop(self):
+        worker = self._flush_worker
+        if worker is not None:
+            self._flush_stop_event.set()
+            worker.join(timeout=2.5)
+            self._flush_worker = None
+
         with self._lock:
             if self._conn is None:
                 return
+            self._flush_pending_writes_locked()
+            if self._read_pool is not None:
+                self._read_pool.close()
+                self._read_pool = None
             try:
                 self._conn.close()
             except Exception:
                 pass
             self._conn = None
 
-    def _require_conn_locked(self):
+    def _require_conn_locked(self, flush_pending=True):
         if self._conn is None:
             raise RuntimeError("Persistence not started")
+        # Leituras e escritas sincronas enxergam tudo que ja foi enfileirado.
+        if flush_pending and self._pending_writes:
+            self._flush_pending_writes_locked()
         return self._conn
 
+    @contextmanager
+    def _read_connection(self):
+        # Leituras enxergam o que ja foi enfileirado no write-behind; o lock de
+        # escrita so e disputado quando ha algo pendente.
+        if self._pending_writes:
+            with self._lock:
+                self._require_conn_locked()
+        pool = self._read_pool
+        if pool is None:
+            with self._lock:
+                yield self._require_conn_locked()
+            return
+        if self._conn is None:
+            raise RuntimeError("Persistence not started")
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+    def _execute_writes_locked(self, statements):
+        if self._conn is None:
+            raise RuntimeError("Persistence not started")
+        if self.write_behind_sec <= 0:
+            conn = self._conn
+            with conn:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+            return
+
+        if not self._pending_writes:
+            self._pending_since_mono = time.monotonic()
+        self._pending_writes.extend(statements)
+        if len(self._pending_writes) >= self.write_behind_max_rows:
+            self._flush_pending_writes_locked()
+
+    def _flush_pending_writes_locked(self):
+        if not self._pending_writes or self._conn is None:
+            return 0
+
+        pending = self._pending_writes
+        self._pending_writes = []
+        self._pending_since_mono = None
+
+        # Agrupa comandos consecutivos iguais para usar executemany sem
+        # alterar a ordem relativa entre tabelas (pivots antes de eventos etc.).
+        groups = []
+        for sql, params in pending:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+
+        conn = self._conn
+        started = time.perf_counter()
+        try:
+            with conn:
+                for sql, rows in groups:
+                    conn.executemany(sql, rows)
+        except sqlite3.Error as exc:
+            if self.log is not None:
+                self.log.warning(
+                    "Falha ao gravar lote de %s escritas; reprocessando individualmente: %s",
+                    len(pending),
+                    exc,
+                )
+            for sql, params in pending:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except sqlite3.Error as row_exc:
+                    self._flush_error_count += 1
+                    if self.log is not None:
+                        self.log.error("Falha ao gravar escrita pendente: %s", row_exc)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        batch_rows = len(pending)
+        self._flush_count += 1
+        self._flush_rows_total += batch_rows
+        self._flush_last_ms = elapsed_ms
+        self._flush_total_ms += elapsed_ms
+        if elapsed_ms > self._flush_max_ms:
+            self._flush_max_ms = elapsed_ms
+        self._flush_last_batch_rows = batch_rows
+        if batch_rows > self._flush_max_batch_rows:
+            self._flush_max_batch_rows = batch_rows
+        return batch_rows
+
+    def _flush_loop(self):
+        wait_sec = max(0.01, self.write_behind_sec / 2.0)
+        while not self._flush_stop_event.wait(wait_sec):
+            with self._lock:
+                if not self._pending_writes or self._pending_since_mono is None:
+                    continue
+                if (time.monotonic() - self._pending_since_mono) < self.write_behind_sec:
+                    continue
+                try:
+                    self._flush_pending_writes_locked()
+                except Exception as exc:
+                    if self.log is not None:
+                        self.log.exception("Erro no flush periodico da persistencia: %s", exc)
+
+    def flush(self):
+        with self._lock:
+            return self._flush_pending_writes_locked()
+
+    def get_write_metrics(self):
+        with self._lock:
+            flush_count = self._flush_count
+            return {
+                "write_behind_enabled": self.write_behind_sec > 0,
+                "durability_window_ms": round(self.write_behind_sec * 1000.0, 3),
+                "max_batch_rows": self.write_behind_max_rows,
+                "pending_rows": len(self._pending_writes),
+                "flush_count": flush_count,
+                "flush_rows_total": self._flush_rows_total,
+                "flush_error_count": self._flush_error_count,
+                "flush_last_ms": round(self._flush_last_ms, 3) if self._flush_last_ms is not None else None,
+                "flush_avg_ms": round(self._flush_total_ms / flush_count, 3) if flush_count > 0 else None,
+                "flush_max_ms": round(self._flush_max_ms, 3) if flush_count > 0 else None,
+                "batch_last_rows": self._flush_last_batch_rows,
+                "batch_avg_rows": round(self._flush_rows_total / flush_count, 3) if flush_count > 0 else None,
+                "batch_max_rows": self._flush_max_batch_rows,
+                "writer_lock": self._lock.stats.snapshot(),
+                "read_pool": self._read_pool.get_metrics() if self._read_pool is not None else None,
+            }
+
     def _ensure_migrations_table_locked(self):
         conn = self._require_conn_locked()
         with conn:
@@ -441,46 +940,49 @@ class TelemetryPersistence:
             if self.log is not None:
                 self.log.info("Migration aplicada: v%s (%s)", version, name)
 
-    def _upsert_pivot_locked(self, conn, pivot_id, pivot_slug, seen_ts=None):
+    def _pivot_upsert_statement(self, pivot_id, pivot_slug, seen_ts=None):
         now_ts = time.time()
         seen_value = _safe_float(seen_ts, None)
+        return (
+            """
+            INSERT INTO pivots (
+                pivot_id,
+                pivot_slug,
+                first_seen_ts,
+                last_seen_ts,
+                created_at_ts,
+                updated_at_ts
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(pivot_id) DO UPDATE SET
+                pivot_slug = excluded.pivot_slug,
+                first_seen_ts = CASE
+                    WHEN pivots.first_seen_ts IS NULL THEN excluded.first_seen_ts
+                    WHEN excluded.first_seen_ts IS NULL THEN pivots.first_seen_ts
+                    WHEN excluded.first_seen_ts < pivots.first_seen_ts THEN excluded.first_seen_ts
+                    ELSE pivots.first_seen_ts
+                END,
+                last_seen_ts = CASE
+                    WHEN pivots.last_seen_ts IS NULL THEN excluded.last_seen_ts
+                    WHEN excluded.last_seen_ts IS NULL THEN pivots.last_seen_ts
+                    WHEN excluded.last_seen_ts > pivots.last_seen_ts THEN excluded.last_seen_ts
+                    ELSE pivots.last_seen_ts
+                END,
+                updated_at_ts = excluded.updated_at_ts
+            """,
+            (
+                str(pivot_id),
+                str(pivot_slug),
+                seen_value,
+                seen_value,
+                now_ts,
+                now_ts,
+            ),
+        )
 
+    def _upsert_pivot_locked(self, conn, pivot_id, pivot_slug, seen_ts=None):
+        sql, params = self._pivot_upsert_statement(pivot_id, pivot_slug, seen_ts)
         with conn:
-            conn.execute(
-                """
-                INSERT INTO pivots (
-                    pivot_id,
-                    pivot_slug,
-                    first_seen_ts,
-                    last_seen_ts,
-                    created_at_ts,
-                    updated_at_ts
-                ) VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(pivot_id) DO UPDATE SET
-                    pivot_slug = excluded.pivot_slug,
-                    first_seen_ts = CASE
-                        WHEN pivots.first_seen_ts IS NULL THEN excluded.first_seen_ts
-                        WHEN excluded.first_seen_ts IS NULL THEN pivots.first_seen_ts
-                        WHEN excluded.first_seen_ts < pivots.first_seen_ts THEN excluded.first_seen_ts
-                        ELSE pivots.first_seen_ts
-                    END,
-                    last_seen_ts = CASE
-                        WHEN pivots.last_seen_ts IS NULL THEN excluded.last_seen_ts
-                        WHEN excluded.last_seen_ts IS NULL THEN pivots.last_seen_ts
-                        WHEN excluded.last_seen_ts > pivots.last_seen_ts THEN excluded.last_seen_ts
-                        ELSE pivots.last_seen_ts
-                    END,
-                    updated_at_ts = excluded.updated_at_ts
-                """,
-                (
-                    str(pivot_id),
-                    str(pivot_slug),
-                    seen_value,
-                    seen_value,
-                    now_ts,
-                    now_ts,
-                ),
-            )
+            conn.execute(sql, params)
 
     def ensure_pivot(self, pivot_id, pivot_slug=None, seen_ts=None):
         normalized_id = str(pivot_id or "").strip()
@@ -488,16 +990,14 @@ class TelemetryPersistence:
             return
         normalized_slug = str(pivot_slug or slugify(normalized_id))
         with self._lock:
-            conn = self._require_conn_locked()
-            self._upsert_pivot_locked(conn, normalized_id, normalized_slug, seen_ts)
+            self._execute_writes_locked([self._pivot_upsert_statement(normalized_id, normalized_slug, seen_ts)])
 
     def pivot_exists(self, pivot_id):
         normalized_id = str(pivot_id or "").strip()
         if not normalized_id:
             return False
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             row = conn.execute(
                 """
                 SELECT 1
@@ -516,29 +1016,30 @@ class TelemetryPersistence:
         seen_value = _safe_float(seen_ts, None)
         if seen_value is None:
             seen_value = time.time()
+        statements = [
+            (
+                """
+                UPDATE pivots
+                SET
+                    last_seen_ts = CASE
+                        WHEN last_seen_ts IS NULL THEN ?
+                        WHEN ? > last_seen_ts THEN ?
+                        ELSE last_seen_ts
+                    END,
+                    updated_at_ts = ?
+                WHERE pivot_id = ?
+                """,
+                (
+                    seen_value,
+                    seen_value,
+                    seen_value,
+                    time.time(),
+                    normalized_id,
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    UPDATE pivots
-                    SET
-                        last_seen_ts = CASE
-                            WHEN last_seen_ts IS NULL THEN ?
-                            WHEN ? > last_seen_ts THEN ?
-                            ELSE last_seen_ts
-                        END,
-                        updated_at_ts = ?
-                    WHERE pivot_id = ?
-                    """,
-                    (
-                        seen_value,
-                        seen_value,
-                        seen_value,
-                        time.time(),
-                        normalized_id,
-                    ),
-                )
+            self._execute_writes_locked(statements)
 
     def set_pivot_is_concentrator(self, pivot_id, is_concentrator, pivot_slug=None, seen_ts=None):
         normalized_id = str(pivot_id or "").strip()
@@ -561,6 +1062,10 @@ class TelemetryPersistence:
                     """,
                     (normalized_flag, time.time(), normalized_id),
                 )
+                conn.execute(
+                    "UPDATE pivot_state_summary SET change_seq = ? WHERE pivot_id = ?",
+                    (self._next_change_seq_locked(), normalized_id),
+                )
         return bool(normalized_flag)
 
     def get_pivot_is_concentrator(self, pivot_id):
@@ -568,8 +1073,7 @@ class TelemetryPersistence:
         if not normalized_id:
             return False
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             row = conn.execute(
                 """
                 SELECT is_concentrator
@@ -609,6 +1113,10 @@ class TelemetryPersistence:
                     """,
                     (lat_value, lon_value, time.time(), normalized_id),
                 )
+                conn.execute(
+                    "UPDATE pivot_state_summary SET change_seq = ? WHERE pivot_id = ?",
+                    (self._next_change_seq_locked(), normalized_id),
+                )
         return {"latitude": lat_value, "longitude": lon_value}
 
     def get_pivot_coordinates(self, pivot_id):
@@ -616,8 +1124,7 @@ class TelemetryPersistence:
         if not normalized_id:
             return {"latitude": None, "longitude": None}
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             row = conn.execute(
                 """
                 SELECT latitude, longitude
@@ -700,7 +1207,7 @@ class TelemetryPersistence:
 
     def resolve_run(self, run_id=None):
         with self._lock:
-            conn = self._require_conn_locked()
+            conn = self._require_conn_locked(flush_pending=False)
             row = self._query_run_row_locked(conn, run_id=run_id)
             return self._row_to_run_dict_locked(row)
 
@@ -932,8 +1439,7 @@ class TelemetryPersistence:
 
     def list_runs(self, limit=200):
         safe_limit = max(1, min(1000, int(limit or 200)))
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT
@@ -1039,8 +1545,7 @@ class TelemetryPersistence:
         return row is not None
 
     def get_cloud2_filter_options(self, run_id=None, limit=500):
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             effective_run = self._resolve_effective_run_id_locked(conn, run_id=run_id)
             technologies = self._list_distinct_cloud2_column_locked(
                 conn,
@@ -1148,7 +1653,7 @@ class TelemetryPersistence:
 
     def resolve_session(self, pivot_id, session_id=None, run_id=None):
         with self._lock:
-            conn = self._require_conn_locked()
+            conn = self._require_conn_locked(flush_pending=False)
             row = self._query_session_row_locked(conn, pivot_id, session_id=session_id, run_id=run_id)
             return self._row_to_session_dict_locked(row)
 
@@ -1343,8 +1848,7 @@ class TelemetryPersistence:
         safe_limit = max(1, min(1000, int(limit or 200)))
         normalized_run_id = str(run_id or "").strip()
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             query = """
                 SELECT *
                 FROM monitoring_sessions
@@ -1361,8 +1865,7 @@ class TelemetryPersistence:
 
     def get_active_sessions_map(self, run_id=None):
         normalized_run_id = str(run_id or "").strip()
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             query = """
                 SELECT pivot_id, session_id
                 FROM monitoring_sessions
@@ -1435,6 +1938,10 @@ class TelemetryPersistence:
                 conn.execute("DELETE FROM ping_rssi_points")
                 conn.execute("DELETE FROM cloud2_events")
                 conn.execute("DELETE FROM drop_events")
+                conn.execute("DELETE FROM connectivity_rollups_hourly")
+                conn.execute("DELETE FROM connectivity_rollups_daily")
+                conn.execute("DELETE FROM pivot_timeline_runs")
+                conn.execute("DELETE FROM pivot_state_summary")
                 conn.execute("DELETE FROM pivot_snapshots")
                 conn.execute("DELETE FROM monitoring_sessions")
                 conn.execute("DELETE FROM monitoring_runs")
@@ -1453,6 +1960,158 @@ class TelemetryPersistence:
                     )
                     """
                 )
+            self._timeline_runs = {}
+            self._change_floor = self._next_change_seq_locked()
+            self._removed_pivot_seq.clear()
+
+    def delete_rows_before(self, table, cutoff_ts, limit=500):
+        ts_column = RETENTION_TABLES.get(table)
+        if ts_column is None:
+            raise ValueError(f"tabela sem politica de retencao: {table}")
+        cutoff_value = _safe_float(cutoff_ts, None)
+        if cutoff_value is None:
+            return 0
+
+        with self._lock:
+            conn = self._require_conn_locked()
+            with conn:
+                cursor = conn.execute(
+                    f"""
+                    DELETE FROM {table}
+                    WHERE rowid IN (
+                        SELECT rowid
+                        FROM {table}
+                        WHERE {ts_column} < ?
+                        ORDER BY {ts_column} ASC
+                        LIMIT ?
+                    )
+                    """,
+                    (cutoff_value, max(1, int(limit))),
+                )
+            return max(0, int(cursor.rowcount or 0))
+
+    def strip_event_payloads_before(self, cutoff_ts, limit=500, start_ts=None):
+        cutoff_value = _safe_float(cutoff_ts, None)
+        if cutoff_value is None:
+            return 0, None
+        start_value = _safe_float(start_ts, None)
+
+        with self._lock:
+            conn = self._require_conn_locked()
+            rows = conn.execute(
+                """
+                SELECT id, ts
+                FROM connectivity_events
+                WHERE ts < ?
+                    AND ts >= ?
+                    AND (raw_payload IS NOT NULL OR parsed_payload_json IS NOT NULL)
+                ORDER BY ts ASC
+                LIMIT ?
+                """,
+                (cutoff_value, start_value if start_value is not None else float("-inf"), max(1, int(limit))),
+            ).fetchall()
+            if not rows:
+                return 0, None
+
+            # Mantem o evento (timeline, rollups) e descarta so o payload bruto.
+            with conn:
+                conn.executemany(
+                    """
+                    UPDATE connectivity_events
+                    SET
+                        raw_payload = NULL,
+                        parsed_payload_json = NULL,
+                        details_json = CASE
+                            WHEN json_valid(details_json)
+                                THEN json_remove(details_json, '$.raw_payload', '$.parsed_payload')
+                            ELSE details_json
+                        END,
+                        event_json = CASE
+                            WHEN json_valid(event_json)
+                                THEN json_remove(event_json, '$.details.raw_payload', '$.details.parsed_payload')
+                            ELSE event_json
+                        END
+                    WHERE id = ?
+                    """,
+                    [(row["id"],) for row in rows],
+                )
+            return len(rows), float(rows[-1]["ts"])
+
+    def _storage_stats_locked(self, conn):
+        page_size = int(conn.execute("PRAGMA page_size").fetchone()[0])
+        page_count = int(conn.execute("PRAGMA page_count").fetchone()[0])
+        freelist_count = int(conn.execute("PRAGMA freelist_count").fetchone()[0])
+        auto_vacuum = int(conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+        return {
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "db_size_bytes": page_size * page_count,
+            "freelist_bytes": page_size * freelist_count,
+            "incremental": auto_vacuum == 2,
+        }
+
+    def get_storage_stats(self):
+        with self._lock:
+            conn = self._require_conn_locked(flush_pending=False)
+            return self._storage_stats_locked(conn)
+
+    def incremental_vacuum(self, pages_per_step=256, stop_event=None):
+        with self._lock:
+            conn = self._require_conn_locked()
+            before = self._storage_stats_locked(conn)
+        if not before["incremental"] or before["freelist_count"] <= 0:
+            before["bytes_reclaimed"] = 0
+            return before
+
+        step = max(1, int(pages_per_step))
+        after = before
+        while after["freelist_count"] > 0:
+            if stop_event is not None and stop_event.is_set():
+                break
+            with self._lock:
+                conn = self._require_conn_locked()
+                conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+                after = self._storage_stats_locked(conn)
+            if after["freelist_count"] >= before["freelist_count"]:
+                break
+
+        with self._lock:
+            conn = self._require_conn_locked()
+            # Em WAL o arquivo so encolhe depois do checkpoint.
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        after["bytes_reclaimed"] = max(0, before["db_size_bytes"] - after["db_size_bytes"])
+        return after
+
+    def vacuum_full(self):
+        with self._lock:
+            conn = self._require_conn_locked()
+            before = self._storage_stats_locked(conn)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            after = self._storage_stats_locked(conn)
+        after["bytes_reclaimed"] = max(0, before["db_size_bytes"] - after["db_size_bytes"])
+        return after
+
+    def _next_change_seq_locked(self):
+        self._change_seq += 1
+        return self._change_seq
+
+    def reset_change_log(self):
+        # Mudanca global (purge, configuracao): deltas anteriores deixam de
+        # valer e get_run_state_payload(since=...) devolve o estado completo.
+        with self._lock:
+            self._change_floor = self._next_change_seq_locked()
+            self._removed_pivot_seq.clear()
+
+    def _read_change_log(self):
+        # Geracao lida junto com o flush do write-behind: toda linha com
+        # change_seq <= geracao ja esta no banco quando a consulta roda.
+        with self._lock:
+            if self._pending_writes:
+                self._require_conn_locked()
+            return self._change_seq, self._change_floor, dict(self._removed_pivot_seq)
 
     def delete_pivot(self, pivot_id):
         normalized_id = str(pivot_id or "").strip()
@@ -1474,6 +2133,13 @@ class TelemetryPersistence:
                     "DELETE FROM pivots WHERE pivot_id = ?",
                     (normalized_id,),
                 )
+            for key in [item for item in self._timeline_runs if item[0] == normalized_id]:
+                self._timeline_runs.pop(key, None)
+            if row is not None:
+                self._removed_pivot_seq[normalized_id] = self._next_change_seq_locked()
+                if len(self._removed_pivot_seq) > CHANGE_LOG_MAX_REMOVED:
+                    oldest_id = min(self._removed_pivot_seq, key=self._removed_pivot_seq.get)
+                    self._change_floor = max(self._change_floor, self._removed_pivot_seq.pop(oldest_id))
             return row is not None
 
     def _json_dumps(self, value):
@@ -1515,103 +2181,280 @@ class TelemetryPersistence:
         if ts_value is None:
             ts_value = time.time()
 
+        stored_snapshot = {key: snapshot[key] for key in SNAPSHOT_STORED_KEYS if key in snapshot}
+        stored_snapshot["snapshot_format"] = SNAPSHOT_FORMAT_VERSION
+
+        statements = [
+            (
+                """
+                INSERT INTO pivot_snapshots (
+                    pivot_id,
+                    session_id,
+                    updated_at_ts,
+                    status_code,
+                    quality_code,
+                    last_activity_ts,
+                    last_seen_ts,
+                    median_ready,
+                    median_sample_count,
+                    median_cloudv2_interval_sec,
+                    disconnect_threshold_sec,
+                    snapshot_format,
+                    snapshot_json
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(pivot_id, session_id) DO UPDATE SET
+                    updated_at_ts = excluded.updated_at_ts,
+                    status_code = excluded.status_code,
+                    quality_code = excluded.quality_code,
+                    last_activity_ts = excluded.last_activity_ts,
+                    last_seen_ts = excluded.last_seen_ts,
+                    median_ready = COALESCE(excluded.median_ready, pivot_snapshots.median_ready),
+                    median_sample_count = COALESCE(excluded.median_sample_count, pivot_snapshots.median_sample_count),
+                    median_cloudv2_interval_sec = COALESCE(excluded.median_cloudv2_interval_sec, pivot_snapshots.median_cloudv2_interval_sec),
+                    disconnect_threshold_sec = COALESCE(excluded.disconnect_threshold_sec, pivot_snapshots.disconnect_threshold_sec),
+                    snapshot_format = excluded.snapshot_format,
+                    snapshot_json = excluded.snapshot_json
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    status_code,
+                    quality_code,
+                    last_activity_ts,
+                    last_seen_ts,
+                    median_ready,
+                    median_sample_count,
+                    median_cloudv2_interval_sec,
+                    disconnect_threshold_sec,
+                    SNAPSHOT_FORMAT_VERSION,
+                    self._json_dumps(stored_snapshot),
+                ),
+            ),
+            (
+                """
+                UPDATE monitoring_sessions
+                SET updated_at_ts = ?
+                WHERE session_id = ?
+                """,
+                (ts_value, normalized_session),
+            ),
+            (
+                """
+                UPDATE monitoring_runs
+                SET updated_at_ts = ?
+                WHERE run_id = (
+                    SELECT run_id
+                    FROM monitoring_sessions
+                    WHERE session_id = ?
+                    LIMIT 1
+                )
+                """,
+                (ts_value, normalized_session),
+            ),
+            (
+                """
+                UPDATE pivots
+                SET
+                    updated_at_ts = ?,
+                    last_seen_ts = CASE
+                        WHEN ? IS NULL THEN last_seen_ts
+                        WHEN last_seen_ts IS NULL THEN ?
+                        WHEN ? > last_seen_ts THEN ?
+                        ELSE last_seen_ts
+                    END
+                WHERE pivot_id = ?
+                """,
+                (
+                    ts_value,
+                    last_seen_ts,
+                    last_seen_ts,
+                    last_seen_ts,
+                    last_seen_ts,
+                    normalized_id,
+                ),
+            ),
+        ]
+        timeline_threshold_sec = _resolve_timeline_disconnect_threshold(summary)
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO pivot_snapshots (
-                        pivot_id,
-                        session_id,
-                        updated_at_ts,
-                        status_code,
-                        quality_code,
-                        last_activity_ts,
-                        last_seen_ts,
-                        median_ready,
-                        median_sample_count,
-                        median_cloudv2_interval_sec,
-                        disconnect_threshold_sec,
-                        snapshot_json
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(pivot_id, session_id) DO UPDATE SET
-                        updated_at_ts = excluded.updated_at_ts,
-                        status_code = excluded.status_code,
-                        quality_code = excluded.quality_code,
-                        last_activity_ts = excluded.last_activity_ts,
-                        last_seen_ts = excluded.last_seen_ts,
-                        median_ready = COALESCE(excluded.median_ready, pivot_snapshots.median_ready),
-                        median_sample_count = COALESCE(excluded.median_sample_count, pivot_snapshots.median_sample_count),
-                        median_cloudv2_interval_sec = COALESCE(excluded.median_cloudv2_interval_sec, pivot_snapshots.median_cloudv2_interval_sec),
-                        disconnect_threshold_sec = COALESCE(excluded.disconnect_threshold_sec, pivot_snapshots.disconnect_threshold_sec),
-                        snapshot_json = excluded.snapshot_json
-                    """,
+            timeline_state = self._get_timeline_runs_locked(normalized_id, normalized_session)
+            self._set_timeline_merge_gap_locked(
+                normalized_id,
+                normalized_session,
+                timeline_state,
+                max(TIMELINE_RUNS_MIN_MERGE_GAP_SEC, timeline_threshold_sec),
+            )
+            _prune_timeline_runs(timeline_state)
+            timeline_mini = _build_timeline_mini_from_runs(
+                timeline_state["runs"],
+                timeline_state["first_ts"],
+                window_end_ts=ts_value,
+                window_sec=TIMELINE_MINI_DEFAULT_WINDOW_SEC,
+                disconnect_threshold_sec=timeline_threshold_sec,
+            )
+            statements.append(
+                (
+                    STATE_SUMMARY_UPSERT_SQL,
                     (
                         normalized_id,
                         normalized_session,
+                        str(snapshot.get("pivot_slug") or slugify(normalized_id)),
                         ts_value,
-                        status_code,
-                        quality_code,
-                        last_activity_ts,
-                        last_seen_ts,
-                        median_ready,
-                        median_sample_count,
-                        median_cloudv2_interval_sec,
-                        disconnect_threshold_sec,
-                        self._json_dumps(snapshot),
-                    ),
-                )
-                conn.execute(
-                    """
-                    UPDATE monitoring_sessions
-                    SET updated_at_ts = ?
-                    WHERE session_id = ?
-                    """,
-                    (ts_value, normalized_session),
-                )
-                conn.execute(
-                    """
-                    UPDATE monitoring_runs
-                    SET updated_at_ts = ?
-                    WHERE run_id = (
-                        SELECT run_id
-                        FROM monitoring_sessions
-                        WHERE session_id = ?
-                        LIMIT 1
-                    )
-                    """,
-                    (ts_value, normalized_session),
-                )
-                conn.execute(
-                    """
-                    UPDATE pivots
-                    SET
-                        updated_at_ts = ?,
-                        last_seen_ts = CASE
-                            WHEN ? IS NULL THEN last_seen_ts
-                            WHEN last_seen_ts IS NULL THEN ?
-                            WHEN ? > last_seen_ts THEN ?
-                            ELSE last_seen_ts
-                        END
-                    WHERE pivot_id = ?
-                    """,
-                    (
-                        ts_value,
-                        last_seen_ts,
-                        last_seen_ts,
-                        last_seen_ts,
-                        last_seen_ts,
-                        normalized_id,
+                        self._json_dumps(timeline_mini),
+                        timeline_threshold_sec,
+                        self._next_change_seq_locked(),
+                        self._json_dumps(_state_summary_extras(summary)),
+                        *[_encode_state_summary_value(summary, path, kind) for _, path, kind in STATE_SUMMARY_FIELDS],
                     ),
                 )
+            )
+            statements.append(self._timeline_runs_statement(normalized_id, normalized_session, timeline_state, ts_value))
+            self._execute_writes_locked(statements)
+
+    def _get_timeline_runs_locked(self, pivot_id, session_id):
+        key = (pivot_id, session_id)
+        state = self._timeline_runs.get(key)
+        if state is not None:
+            return state
+
+        conn = self._require_conn_locked()
+        state = {
+            "first_ts": None,
+            "last_event_ts": None,
+            "merge_gap_sec": TIMELINE_RUNS_MIN_MERGE_GAP_SEC,
+            "runs": [],
+        }
+        row = conn.execute(
+            """
+            SELECT runs.first_ts, runs.last_event_ts, runs.merge_gap_sec, runs.runs_json
+            FROM pivot_timeline_runs AS runs
+            WHERE runs.pivot_id = ? AND runs.session_id = ?
+            LIMIT 1
+            """,
+            (pivot_id, session_id),
+        ).fetchone()
+        since_ts = None
+        if row is not None:
+            state["first_ts"] = _safe_float(row["first_ts"], None)
+            state["last_event_ts"] = _safe_float(row["last_event_ts"], None)
+            state["merge_gap_sec"] = max(
+                TIMELINE_RUNS_MIN_MERGE_GAP_SEC,
+                _safe_float(row["merge_gap_sec"], TIMELINE_RUNS_MIN_MERGE_GAP_SEC) or TIMELINE_RUNS_MIN_MERGE_GAP_SEC,
+            )
+            for item in self._json_loads(row["runs_json"], []):
+                if not isinstance(item, list) or len(item) not in (2, 3):
+                    continue
+                run_start = _safe_float(item[0], None)
+                run_end = _safe_float(item[1], None)
+                if run_start is None or run_end is None or run_end < run_start:
+                    continue
+                # Runs gravados sem o maior intervalo interno: assume o merge gap da linha.
+                run_gap = _safe_float(item[2], None) if len(item) == 3 else None
+                if run_gap is None:
+                    run_gap = min(state["merge_gap_sec"], run_end - run_start)
+                state["runs"].append([run_start, run_end, run_gap])
+            since_ts = state["last_event_ts"]
+
+        # Eventos gravados depois do ultimo registro dos runs (ou todos, na
+        # primeira carga da sessao). Reaplicar um ts ja coberto nao altera os runs.
+        if since_ts is None:
+            cursor = conn.execute(
+                """
+                SELECT ts, topic
+                FROM connectivity_events
+                WHERE pivot_id = ? AND session_id = ?
+                ORDER BY ts ASC
+                """,
+                (pivot_id, session_id),
+            )
+        else:
+            cursor = conn.execute(
+                """
+                SELECT ts, topic
+                FROM connectivity_events
+                WHERE pivot_id = ? AND session_id = ? AND ts >= ?
+                ORDER BY ts ASC
+                """,
+                (pivot_id, session_id, since_ts),
+            )
+        for event_row in cursor:
+            _apply_timeline_event(state, _safe_float(event_row["ts"], None), event_row["topic"])
+
+        # Mantem em memoria apenas a sessao corrente de cada pivo.
+        for stale_key in [item for item in self._timeline_runs if item[0] == pivot_id]:
+            self._timeline_runs.pop(stale_key, None)
+        self._timeline_runs[key] = state
+        return state
+
+    def _set_timeline_merge_gap_locked(self, pivot_id, session_id, state, merge_gap_sec):
+        # Limiar menor que o usado nos runs: quem tem intervalo interno acima
+        # dele e refeito a partir dos eventos. Se a retencao ja removeu o
+        # inicio do run, ele fica como esta.
+        state["merge_gap_sec"] = merge_gap_sec
+        if not any(run[2] > merge_gap_sec for run in state["runs"]):
+            return
+        conn = self._require_conn_locked()
+        rebuilt = []
+        for run in state["runs"]:
+            if run[2] <= merge_gap_sec:
+                rebuilt.append(run)
+                continue
+            pieces = []
+            rows = conn.execute(
+                """
+                SELECT ts, topic
+                FROM connectivity_events
+                WHERE pivot_id = ? AND session_id = ? AND ts >= ? AND ts <= ?
+                ORDER BY ts ASC
+                """,
+                (pivot_id, session_id, run[0] - 0.001, run[1] + 0.001),
+            )
+            for event_row in rows:
+                ts_value = _safe_float(event_row["ts"], None)
+                if ts_value is not None and _normalize_text(event_row["topic"]) in CONNECTIVITY_TOPICS:
+                    _merge_timeline_run(pieces, ts_value, merge_gap_sec)
+            if not pieces or pieces[0][0] > run[0] + 0.001:
+                rebuilt.append(run)
+                continue
+            rebuilt.extend(pieces)
+        state["runs"] = rebuilt
+
+    def _timeline_runs_statement(self, pivot_id, session_id, state, updated_at_ts):
+        return (
+            """
+            INSERT INTO pivot_timeline_runs (
+                pivot_id,
+                session_id,
+                first_ts,
+                last_event_ts,
+                merge_gap_sec,
+                runs_json,
+                updated_at_ts
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(pivot_id, session_id) DO UPDATE SET
+                first_ts = excluded.first_ts,
+                last_event_ts = excluded.last_event_ts,
+                merge_gap_sec = excluded.merge_gap_sec,
+                runs_json = excluded.runs_json,
+                updated_at_ts = excluded.updated_at_ts
+            """,
+            (
+                pivot_id,
+                session_id,
+                state["first_ts"],
+                state["last_event_ts"],
+                state["merge_gap_sec"],
+                self._json_dumps([[round(run[0], 3), round(run[1], 3), round(run[2], 3)] for run in state["runs"]]),
+                updated_at_ts,
+            ),
+        )
 
     def has_snapshot(self, pivot_id, session_id):
         normalized_id = str(pivot_id or "").strip()
         normalized_session = str(session_id or "").strip()
         if not normalized_id or not normalized_session:
             return False
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             row = conn.execute(
                 """
                 SELECT 1
@@ -1628,8 +2471,7 @@ class TelemetryPersistence:
         normalized_session = str(session_id or "").strip()
         if not normalized_id or not normalized_session:
             return False
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             checks = (
                 "SELECT 1 FROM connectivity_events WHERE pivot_id = ? AND session_id = ? LIMIT 1",
                 "SELECT 1 FROM probe_events WHERE pivot_id = ? AND session_id = ? LIMIT 1",
@@ -1663,41 +2505,44 @@ class TelemetryPersistence:
         if ts_value is None:
             ts_value = time.time()
 
+        statements = [
+            (
+                """
+                INSERT INTO connectivity_events (
+                    pivot_id,
+                    session_id,
+                    ts,
+                    topic,
+                    event_type,
+                    summary,
+                    details_json,
+                    source_topic,
+                    raw_payload,
+                    parsed_payload_json,
+                    event_json,
+                    created_at_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    str(event_payload.get("topic") or ""),
+                    str(event_payload.get("type") or ""),
+                    str(event_payload.get("summary") or ""),
+                    self._json_dumps(details),
+                    str(source_topic or ""),
+                    None if raw_payload is None else str(raw_payload),
+                    self._json_dumps(parsed_payload if isinstance(parsed_payload, dict) else {}),
+                    self._json_dumps(event_payload),
+                    time.time(),
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO connectivity_events (
-                        pivot_id,
-                        session_id,
-                        ts,
-                        topic,
-                        event_type,
-                        summary,
-                        details_json,
-                        source_topic,
-                        raw_payload,
-                        parsed_payload_json,
-                        event_json,
-                        created_at_ts
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        normalized_id,
-                        normalized_session,
-                        ts_value,
-                        str(event_payload.get("topic") or ""),
-                        str(event_payload.get("type") or ""),
-                        str(event_payload.get("summary") or ""),
-                        self._json_dumps(details),
-                        str(source_topic or ""),
-                        None if raw_payload is None else str(raw_payload),
-                        self._json_dumps(parsed_payload if isinstance(parsed_payload, dict) else {}),
-                        self._json_dumps(event_payload),
-                        time.time(),
-                    ),
-                )
+            timeline_state = self._get_timeline_runs_locked(normalized_id, normalized_session)
+            _apply_timeline_event(timeline_state, ts_value, event_payload.get("topic"))
+            self._execute_writes_locked(statements)
 
     def insert_probe_event(self, pivot_id, session_id, event):
         normalized_id = str(pivot_id or "").strip()
@@ -1710,41 +2555,42 @@ class TelemetryPersistence:
         if ts_value is None:
             ts_value = time.time()
 
+        statements = [
+            (
+                """
+                INSERT INTO probe_events (
+                    pivot_id,
+                    session_id,
+                    ts,
+                    event_type,
+                    topic,
+                    latency_sec,
+                    deadline_ts,
+                    sent_ts,
+                    payload,
+                    details_json,
+                    event_json,
+                    created_at_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    str(event_payload.get("type") or ""),
+                    str(event_payload.get("topic") or ""),
+                    _safe_float(event_payload.get("latency_sec"), None),
+                    _safe_float(event_payload.get("deadline_ts"), None),
+                    _safe_float(event_payload.get("sent_ts"), None),
+                    str(event_payload.get("payload") or ""),
+                    self._json_dumps(event_payload.get("details") or {}),
+                    self._json_dumps(event_payload),
+                    time.time(),
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO probe_events (
-                        pivot_id,
-                        session_id,
-                        ts,
-                        event_type,
-                        topic,
-                        latency_sec,
-                        deadline_ts,
-                        sent_ts,
-                        payload,
-                        details_json,
-                        event_json,
-                        created_at_ts
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        normalized_id,
-                        normalized_session,
-                        ts_value,
-                        str(event_payload.get("type") or ""),
-                        str(event_payload.get("topic") or ""),
-                        _safe_float(event_payload.get("latency_sec"), None),
-                        _safe_float(event_payload.get("deadline_ts"), None),
-                        _safe_float(event_payload.get("sent_ts"), None),
-                        str(event_payload.get("payload") or ""),
-                        self._json_dumps(event_payload.get("details") or {}),
-                        self._json_dumps(event_payload),
-                        time.time(),
-                    ),
-                )
+            self._execute_writes_locked(statements)
 
     def insert_probe_delay_point(
         self,
@@ -1769,33 +2615,34 @@ class TelemetryPersistence:
         if ts_value is None or latency_value is None or avg_value is None or sample_value <= 0:
             return
 
+        statements = [
+            (
+                """
+                INSERT INTO probe_delay_points (
+                    pivot_id,
+                    session_id,
+                    ts,
+                    latency_sec,
+                    avg_latency_sec,
+                    median_latency_sec,
+                    sample_count,
+                    created_at_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    latency_value,
+                    avg_value,
+                    _safe_float(median_latency_sec, None),
+                    sample_value,
+                    time.time(),
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO probe_delay_points (
-                        pivot_id,
-                        session_id,
-                        ts,
-                        latency_sec,
-                        avg_latency_sec,
-                        median_latency_sec,
-                        sample_count,
-                        created_at_ts
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        normalized_id,
-                        normalized_session,
-                        ts_value,
-                        latency_value,
-                        avg_value,
-                        _safe_float(median_latency_sec, None),
-                        sample_value,
-                        time.time(),
-                    ),
-                )
+            self._execute_writes_locked(statements)
 
     def insert_ping_rssi_point(self, pivot_id, session_id, ts, rssi):
         normalized_id = str(pivot_id or "").strip()
@@ -1808,27 +2655,28 @@ class TelemetryPersistence:
         if ts_value is None or rssi_value is None or rssi_value < 0 or rssi_value > 31:
             return
 
+        statements = [
+            (
+                """
+                INSERT INTO ping_rssi_points (
+                    pivot_id,
+                    session_id,
+                    ts,
+                    rssi,
+                    created_at_ts
+                ) VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    rssi_value,
+                    time.time(),
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO ping_rssi_points (
-                        pivot_id,
-                        session_id,
-                        ts,
-                        rssi,
-                        created_at_ts
-                    ) VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        normalized_id,
-                        normalized_session,
-                        ts_value,
-                        rssi_value,
-                        time.time(),
-                    ),
-                )
+            self._execute_writes_locked(statements)
 
     def insert_cloud2_event(self, pivot_id, session_id, event):
         normalized_id = str(pivot_id or "").strip()
@@ -1841,41 +2689,42 @@ class TelemetryPersistence:
         if ts_value is None:
             ts_value = time.time()
 
+        statements = [
+            (
+                """
+                INSERT INTO cloud2_events (
+                    pivot_id,
+                    session_id,
+                    ts,
+                    rssi,
+                    technology,
+                    drop_duration_raw,
+                    drop_duration_sec,
+                    firmware,
+                    event_date,
+                    event_json,
+                    created_at_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    None if event_payload.get("rssi") is None else str(event_payload.get("rssi")),
+                    None if event_payload.get("technology") is None else str(event_payload.get("technology")),
+                    None
+                    if event_payload.get("drop_duration_raw") is None
+                    else str(event_payload.get("drop_duration_raw")),
+                    _safe_float(event_payload.get("drop_duration_sec"), None),
+                    None if event_payload.get("firmware") is None else str(event_payload.get("firmware")),
+                    None if event_payload.get("event_date") is None else str(event_payload.get("event_date")),
+                    self._json_dumps(event_payload),
+                    time.time(),
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO cloud2_events (
-                        pivot_id,
-                        session_id,
-                        ts,
-                        rssi,
-                        technology,
-                        drop_duration_raw,
-                        drop_duration_sec,
-                        firmware,
-                        event_date,
-                        event_json,
-                        created_at_ts
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        normalized_id,
-                        normalized_session,
-                        ts_value,
-                        None if event_payload.get("rssi") is None else str(event_payload.get("rssi")),
-                        None if event_payload.get("technology") is None else str(event_payload.get("technology")),
-                        None
-                        if event_payload.get("drop_duration_raw") is None
-                        else str(event_payload.get("drop_duration_raw")),
-                        _safe_float(event_payload.get("drop_duration_sec"), None),
-                        None if event_payload.get("firmware") is None else str(event_payload.get("firmware")),
-                        None if event_payload.get("event_date") is None else str(event_payload.get("event_date")),
-                        self._json_dumps(event_payload),
-                        time.time(),
-                    ),
-                )
+            self._execute_writes_locked(statements)
 
     def insert_drop_event(self, pivot_id, session_id, event):
         normalized_id = str(pivot_id or "").strip()
@@ -1889,33 +2738,34 @@ class TelemetryPersistence:
         if ts_value is None or duration_sec is None:
             return
 
+        statements = [
+            (
+                """
+                INSERT INTO drop_events (
+                    pivot_id,
+                    session_id,
+                    ts,
+                    duration_sec,
+                    technology,
+                    rssi,
+                    event_json,
+                    created_at_ts
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    normalized_id,
+                    normalized_session,
+                    ts_value,
+                    duration_sec,
+                    None if event_payload.get("technology") is None else str(event_payload.get("technology")),
+                    None if event_payload.get("rssi") is None else str(event_payload.get("rssi")),
+                    self._json_dumps(event_payload),
+                    time.time(),
+                ),
+            ),
+        ]
         with self._lock:
-            conn = self._require_conn_locked()
-            with conn:
-                conn.execute(
-                    """
-                    INSERT INTO drop_events (
-                        pivot_id,
-                        session_id,
-                        ts,
-                        duration_sec,
-                        technology,
-                        rssi,
-                        event_json,
-                        created_at_ts
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        normalized_id,
-                        normalized_session,
-                        ts_value,
-                        duration_sec,
-                        None if event_payload.get("technology") is None else str(event_payload.get("technology")),
-                        None if event_payload.get("rssi") is None else str(event_payload.get("rssi")),
-                        self._json_dumps(event_payload),
-                        time.time(),
-                    ),
-                )
+            self._execute_writes_locked(statements)
 
     def upsert_probe_setting(self, pivot_id, enabled, interval_sec):
         normalized_id = str(pivot_id or "").strip()
@@ -1949,8 +2799,7 @@ class TelemetryPersistence:
                 )
 
     def load_probe_settings(self):
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT pivot_id, enabled, interval_sec
@@ -1988,8 +2837,7 @@ class TelemetryPersistence:
             return []
         safe_limit = max(1, min(50000, int(limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT *
@@ -2037,8 +2885,7 @@ class TelemetryPersistence:
             return []
         safe_limit = max(1, min(50000, int(limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT ts, topic
@@ -2068,8 +2915,7 @@ class TelemetryPersistence:
             return []
         safe_limit = max(1, min(50000, int(limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT *
@@ -2104,8 +2950,7 @@ class TelemetryPersistence:
             return []
         safe_limit = max(1, min(50000, int(limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT *
@@ -2140,8 +2985,7 @@ class TelemetryPersistence:
             return []
         safe_limit = max(1, min(50000, int(limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT *
@@ -2169,6 +3013,280 @@ class TelemetryPersistence:
             )
         return points
 
+    def _rollup_upsert_sql(self, granularity):
+        table = ROLLUP_TABLES[granularity]
+        columns = ROLLUP_COUNTER_COLUMNS + ("rssi_min", "rssi_max")
+        additive = ",\n                ".join(f"{column} = {table}.{column} + excluded.{column}" for column in ROLLUP_COUNTER_COLUMNS)
+        return f"""
+            INSERT INTO {table} (
+                pivot_id,
+                session_id,
+                bucket_ts,
+                {", ".join(columns)},
+                updated_at_ts
+            ) VALUES ({", ".join(["?"] * (len(columns) + 4))})
+            ON CONFLICT(pivot_id, session_id, bucket_ts) DO UPDATE SET
+                {additive},
+                rssi_min = MIN(COALESCE({table}.rssi_min, excluded.rssi_min), COALESCE(excluded.rssi_min, {table}.rssi_min)),
+                rssi_max = MAX(COALESCE({table}.rssi_max, excluded.rssi_max), COALESCE(excluded.rssi_max, {table}.rssi_max)),
+                updated_at_ts = excluded.updated_at_ts
+            """
+
+    def apply_rollup_rows(self, rows, updated_at_ts=None):
+        if not rows:
+            return 0
+        ts_value = _safe_float(updated_at_ts, None)
+        if ts_value is None:
+            ts_value = time.time()
+
+        sql_by_granularity = {granularity: self._rollup_upsert_sql(granularity) for granularity in ROLLUP_GRANULARITIES}
+        statements = []
+        for row in rows:
+            pivot_id = str(row.get("pivot_id") or "").strip()
+            session_id = str(row.get("session_id") or "").strip()
+            granularity = row.get("granularity")
+            if not pivot_id or not session_id or granularity not in sql_by_granularity:
+                continue
+            statements.append(
+                (
+                    sql_by_granularity[granularity],
+                    (
+                        pivot_id,
+                        session_id,
+                        float(row["bucket_ts"]),
+                        *[row.get(column) or 0 for column in ROLLUP_COUNTER_COLUMNS],
+                        row.get("rssi_min"),
+                        row.get("rssi_max"),
+                        ts_value,
+                    ),
+                )
+            )
+        # Mesma tabela em sequencia para o write-behind agrupar em executemany.
+        statements.sort(key=lambda item: item[0])
+        with self._lock:
+            self._execute_writes_locked(statements)
+        return len(statements)
+
+    def _row_to_rollup_dict(self, row, granularity):
+        rssi_count = int(row["rssi_count"] or 0)
+        bucket_ts = float(row["bucket_ts"])
+        return {
+            "pivot_id": str(row["pivot_id"]),
+            "session_id": str(row["session_id"]),
+            "granularity": granularity,
+            "bucket_ts": bucket_ts,
+            "bucket_at": _ts_to_str(bucket_ts),
+            "bucket_end_ts": rollup_bucket_end(bucket_ts, granularity),
+            "message_count": int(row["message_count"] or 0),
+            "topic_counts": {
+                "cloudv2": int(row["cloudv2_count"] or 0),
+                "cloudv2-ping": int(row["ping_count"] or 0),
+                "cloudv2-info": int(row["info_count"] or 0),
+                "cloudv2-network": int(row["network_count"] or 0),
+            },
+            "online_sec": float(row["online_sec"] or 0.0),
+            "offline_sec": float(row["offline_sec"] or 0.0),
+            "drop_count": int(row["drop_count"] or 0),
+            "drop_sec": float(row["drop_sec"] or 0.0),
+            "rssi_count": rssi_count,
+            "rssi_min": _safe_float(row["rssi_min"], None),
+            "rssi_max": _safe_float(row["rssi_max"], None),
+            "rssi_avg": (float(row["rssi_sum"] or 0.0) / rssi_count) if rssi_count > 0 else None,
+        }
+
+    def fetch_rollups(self, pivot_id, session_id=None, granularity=ROLLUP_HOURLY, start_ts=None, end_ts=None):
+        normalized_id = str(pivot_id or "").strip()
+        if not normalized_id:
+            return []
+        normalized_granularity = normalize_rollup_granularity(granularity)
+        table = ROLLUP_TABLES[normalized_granularity]
+
+        query = f"""
+            SELECT *
+            FROM {table}
+            WHERE pivot_id = ?
+        """
+        params = [normalized_id]
+        normalized_session = str(session_id or "").strip()
+        if normalized_session:
+            query += " AND session_id = ?"
+            params.append(normalized_session)
+        start_value = _safe_float(start_ts, None)
+        if start_value is not None:
+            query += " AND bucket_ts >= ?"
+            params.append(start_value)
+        end_value = _safe_float(end_ts, None)
+        if end_value is not None:
+            query += " AND bucket_ts < ?"
+            params.append(end_value)
+        query += " ORDER BY bucket_ts ASC, session_id ASC"
+
+        with self._read_connection() as conn:
+            rows = conn.execute(query, tuple(params)).fetchall()
+        return [self._row_to_rollup_dict(row, normalized_granularity) for row in rows]
+
+    def summarize_rollups(self, pivot_id, start_ts, end_ts, session_id=None):
+        start_value = _safe_float(start_ts, None)
+        end_value = _safe_float(end_ts, None)
+        if start_value is None or end_value is None or end_value <= start_value:
+            return None
+
+        # Dias inteiros vem da tabela diaria; as bordas, da horaria.
+        first_day_ts = rollup_bucket_start(start_value, ROLLUP_DAILY)
+        if first_day_ts < start_value:
+            first_day_ts = rollup_bucket_end(first_day_ts, ROLLUP_DAILY)
+        last_day_ts = rollup_bucket_start(end_value, ROLLUP_DAILY)
+        rows = []
+        if first_day_ts < last_day_ts:
+            rows.extend(self.fetch_rollups(pivot_id, session_id, ROLLUP_HOURLY, start_value, first_day_ts))
+            rows.extend(self.fetch_rollups(pivot_id, session_id, ROLLUP_DAILY, first_day_ts, last_day_ts))
+            rows.extend(self.fetch_rollups(pivot_id, session_id, ROLLUP_HOURLY, last_day_ts, end_value))
+        else:
+            rows.extend(self.fetch_rollups(pivot_id, session_id, ROLLUP_HOURLY, start_value, end_value))
+
+        totals = {
+            "pivot_id": str(pivot_id or "").strip(),
+            "session_id": str(session_id or "").strip() or None,
+            "start_ts": start_value,
+            "end_ts": end_value,
+            "bucket_count": len(rows),
+            "message_count": 0,
+            "topic_counts": {"cloudv2": 0, "cloudv2-ping": 0, "cloudv2-info": 0, "cloudv2-network": 0},
+            "online_sec": 0.0,
+            "offline_sec": 0.0,
+            "drop_count": 0,
+            "drop_sec": 0.0,
+            "rssi_count": 0,
+            "rssi_min": None,
+            "rssi_max": None,
+            "rssi_avg": None,
+        }
+        rssi_sum = 0.0
+        for row in rows:
+            totals["message_count"] += row["message_count"]
+            for topic, count in row["topic_counts"].items():
+                totals["topic_counts"][topic] += count
+            totals["online_sec"] += row["online_sec"]
+            totals["offline_sec"] += row["offline_sec"]
+            totals["drop_count"] += row["drop_count"]
+            totals["drop_sec"] += row["drop_sec"]
+            if row["rssi_count"] > 0:
+                totals["rssi_count"] += row["rssi_count"]
+                rssi_sum += row["rssi_avg"] * row["rssi_count"]
+                if totals["rssi_min"] is None or row["rssi_min"] < totals["rssi_min"]:
+                    totals["rssi_min"] = row["rssi_min"]
+                if totals["rssi_max"] is None or row["rssi_max"] > totals["rssi_max"]:
+                    totals["rssi_max"] = row["rssi_max"]
+        if totals["rssi_count"] > 0:
+            totals["rssi_avg"] = rssi_sum / totals["rssi_count"]
+        tracked_sec = totals["online_sec"] + totals["offline_sec"]
+        totals["connected_pct"] = (totals["online_sec"] / tracked_sec) * 100.0 if tracked_sec > 0 else None
+        return totals
+
+    def rebuild_rollups(self, pivot_id=None, session_id=None, connectivity_settings=None):
+        normalized_id = str(pivot_id or "").strip()
+        normalized_session = str(session_id or "").strip()
+
+        with self._lock:
+            conn = self._require_conn_locked()
+            query = """
+                SELECT
+                    sessions.pivot_id,
+                    sessions.session_id,
+                    sessions.ended_at_ts,
+                    snapshots.disconnect_threshold_sec,
+                    state.max_expected_interval_sec
+                FROM monitoring_sessions AS sessions
+                LEFT JOIN pivot_snapshots AS snapshots
+                    ON snapshots.pivot_id = sessions.pivot_id
+                    AND snapshots.session_id = sessions.session_id
+                LEFT JOIN pivot_state_summary AS state
+                    ON state.pivot_id = sessions.pivot_id
+                    AND state.session_id = sessions.session_id
+                WHERE 1 = 1
+            """
+            params = []
+            if normalized_id:
+                query += " AND sessions.pivot_id = ?"
+                params.append(normalized_id)
+            if normalized_session:
+                query += " AND sessions.session_id = ?"
+                params.append(normalized_session)
+            session_rows = conn.execute(query, tuple(params)).fetchall()
+
+        result = {"sessions": 0, "rows": 0}
+        for session_row in session_rows:
+            row_pivot_id = str(session_row["pivot_id"])
+            row_session_id = str(session_row["session_id"])
+            threshold_sec = _resolve_timeline_disconnect_threshold(
+                {
+                    "disconnect_threshold_sec": session_row["disconnect_threshold_sec"],
+                    "max_expected_interval_sec": session_row["max_expected_interval_sec"],
+                },
+                settings=connectivity_settings,
+            )
+            accumulator = RollupAccumulator()
+            state = {"cursor_ts": None, "covered_until_ts": None}
+
+            with self._lock:
+                conn = self._require_conn_locked()
+                for event_row in conn.execute(
+                    """
+                    SELECT ts, topic, source_topic
+                    FROM connectivity_events
+                    WHERE pivot_id = ? AND session_id = ?
+                    ORDER BY ts ASC, id ASC
+                    """,
+                    (row_pivot_id, row_session_id),
+                ):
+                    ts_value = _safe_float(event_row["ts"], None)
+                    if ts_value is None:
+                        continue
+                    record_connectivity_message(
+                        accumulator,
+                        state,
+                        row_pivot_id,
+                        row_session_id,
+                        ts_value,
+                        event_row["topic"],
+                        threshold_sec,
+                        counted=bool(str(event_row["source_topic"] or "").strip()),
+                    )
+                ended_at_ts = _safe_float(session_row["ended_at_ts"], None)
+                if ended_at_ts is not None:
+                    advance_connectivity(accumulator, state, row_pivot_id, row_session_id, ended_at_ts)
+
+                for point_row in conn.execute(
+                    "SELECT ts, rssi FROM ping_rssi_points WHERE pivot_id = ? AND session_id = ?",
+                    (row_pivot_id, row_session_id),
+                ):
+                    ts_value = _safe_float(point_row["ts"], None)
+                    rssi_value = _safe_float(point_row["rssi"], None)
+                    if ts_value is not None and rssi_value is not None:
+                        accumulator.add_rssi(row_pivot_id, row_session_id, ts_value, rssi_value)
+
+                for drop_row in conn.execute(
+                    "SELECT ts, duration_sec FROM drop_events WHERE pivot_id = ? AND session_id = ?",
+                    (row_pivot_id, row_session_id),
+                ):
+                    ts_value = _safe_float(drop_row["ts"], None)
+                    if ts_value is not None:
+                        accumulator.add_drop(row_pivot_id, row_session_id, ts_value, drop_row["duration_sec"])
+
+                rows = accumulator.drain()
+                with conn:
+                    for table in ROLLUP_TABLES.values():
+                        conn.execute(
+                            f"DELETE FROM {table} WHERE pivot_id = ? AND session_id = ?",
+                            (row_pivot_id, row_session_id),
+                        )
+                self.apply_rollup_rows(rows)
+                self._flush_pending_writes_locked()
+
+            result["sessions"] += 1
+            result["rows"] += len(rows)
+        return result
+
     def summarize_probe_stats_for_pivot(self, pivot_id, window_sec=None, now_ts=None):
         normalized_id = str(pivot_id or "").strip()
         if not normalized_id:
@@ -2194,8 +3312,7 @@ class TelemetryPersistence:
             reference_ts = time.time()
         cutoff_ts = reference_ts - safe_window
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT event_type, latency_sec, ts
@@ -2248,8 +3365,7 @@ class TelemetryPersistence:
             return []
         safe_limit = max(1, min(50000, int(limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             rows = conn.execute(
                 """
                 SELECT *
@@ -2346,17 +3462,43 @@ class TelemetryPersistence:
             },
         }
 
+    def _build_state_summary_from_columns_row(self, row):
+        if row["state_pivot_id"] is None:
+            return None
+
+        summary = {}
+        if row["state_extra_json"] is not None:
+            extras = self._json_loads(row["state_extra_json"], {})
+            if isinstance(extras, dict):
+                summary = extras
+                summary.pop("timeline_mini", None)
+        for column, path, kind in STATE_SUMMARY_FIELDS:
+            _set_summary_path(summary, path, _decode_state_summary_value(row[f"state_{column}"], kind))
+        for ts_path, label_path in STATE_SUMMARY_TS_LABELS:
+            ts_value = _get_summary_path(summary, ts_path)
+            _set_summary_path(summary, label_path, _ts_to_str(ts_value) if ts_value is not None else "-")
+
+        for group in ("status", "quality"):
+            if (summary.get(group) or {}).get("code") is None:
+                summary.pop(group, None)
+        if summary["last_cloud2"].get("ts") is None:
+            summary["last_cloud2"] = {
+                key: value for key, value in summary["last_cloud2"].items() if value is not None and key != "at"
+            }
+        if row["state_pivot_slug"]:
+            summary["pivot_slug"] = row["state_pivot_slug"]
+        if row["state_timeline_mini_json"] is not None:
+            summary["timeline_mini"] = self._json_loads(row["state_timeline_mini_json"], [])
+        return summary
+
     def _build_state_summary_from_snapshot_row(self, row, run_id):
         pivot_id = str(row["pivot_id"] or "").strip()
         session_id = str(row["session_id"] or "").strip()
-        snapshot_payload = self._json_loads(row["snapshot_json"], {})
-        if not isinstance(snapshot_payload, dict):
-            snapshot_payload = {}
+        summary = self._build_state_summary_from_columns_row(row)
 
-        pivot_slug = str(snapshot_payload.get("pivot_slug") or slugify(pivot_id))
-        summary = snapshot_payload.get("summary")
+        pivot_slug = str((summary or {}).get("pivot_slug") or slugify(pivot_id))
         if isinstance(summary, dict):
-            item = dict(summary)
+            item = summary
         else:
             item = self._fallback_state_pivot_summary(
                 pivot_id=pivot_id,
@@ -2472,9 +3614,14 @@ class TelemetryPersistence:
         item["timeline_mini"] = _normalize_timeline_mini_segments(item.get("timeline_mini"))
         return item
 
-    def get_run_state_payload(self, run_id=None, connectivity_settings=None):
-        with self._lock:
-            conn = self._require_conn_locked()
+    def get_run_state_payload(self, run_id=None, connectivity_settings=None, since=None):
+        # since=<geracao>: so os pivos cujo resumo mudou depois dela (e os ids
+        # removidos); full=True quando since falta, e anterior ao piso do log
+        # ou posterior a geracao atual (outro processo).
+        since = _safe_int(since, None)
+        generation, floor, removed_seq = self._read_change_log()
+        full = since is None or since < floor or since > generation
+        with self._read_connection() as conn:
             run_row = self._query_run_row_locked(conn, run_id=run_id)
             if run_row is None:
                 return None
@@ -2484,7 +3631,7 @@ class TelemetryPersistence:
                 return None
 
             rows = conn.execute(
-                """
+                f"""
                 SELECT
                     sessions.pivot_id,
                     sessions.session_id,
@@ -2492,7 +3639,7 @@ class TelemetryPersistence:
                     COALESCE(pivots.is_concentrator, 0) AS pivot_is_concentrator,
                     pivots.latitude AS pivot_latitude,
                     pivots.longitude AS pivot_longitude,
-                    snapshots.snapshot_json,
+                    {STATE_SUMMARY_SELECT_COLUMNS},
                     snapshots.median_ready AS snapshot_median_ready,
                     snapshots.median_sample_count AS snapshot_median_sample_count,
                     snapshots.median_cloudv2_interval_sec AS snapshot_median_cloudv2_interval_sec,
@@ -2504,6 +3651,9 @@ class TelemetryPersistence:
                 LEFT JOIN pivot_snapshots AS snapshots
                     ON snapshots.pivot_id = sessions.pivot_id
                     AND snapshots.session_id = sessions.session_id
+                LEFT JOIN pivot_state_summary AS state
+                    ON state.pivot_id = sessions.pivot_id
+                    AND state.session_id = sessions.session_id
                 WHERE sessions.run_id = ?
                     AND sessions.session_id = (
                         SELECT sessions_inner.session_id
@@ -2521,37 +3671,48 @@ class TelemetryPersistence:
         pivots = []
         last_updated_ts = _safe_float(run_row["updated_at_ts"], None)
         for row in rows:
-            summary = self._build_state_summary_from_snapshot_row(row, resolved_run_id)
-            pivot_id = str(summary.get("pivot_id") or row["pivot_id"] or "").strip()
-            session_id = str(summary.get("session_id") or row["session_id"] or "").strip()
             row_updated = _safe_float(row["snapshot_updated_at_ts"], _safe_float(row["session_updated_at_ts"], None))
             if row_updated is None:
                 row_updated = time.time()
+            if last_updated_ts is None or row_updated > last_updated_ts:
+                last_updated_ts = row_updated
+            # Sessao ainda sem resumo (change_seq nulo) sempre entra no delta.
+            row_seq = row["state_change_seq"]
+            if not full and row_seq is not None and row_seq <= since:
+                continue
+
+            summary = self._build_state_summary_from_snapshot_row(row, resolved_run_id)
+            pivot_id = str(summary.get("pivot_id") or row["pivot_id"] or "").strip()
+            session_id = str(summary.get("session_id") or row["session_id"] or "").strip()
 
             if pivot_id and session_id:
-                timeline_events = self.fetch_timeline_events_light(
-                    pivot_id,
-                    session_id,
-                    limit=self.max_events_per_pivot,
-                )
                 disconnect_threshold_sec = _resolve_timeline_disconnect_threshold(
                     summary,
                     settings=connectivity_settings,
                 )
-                summary["timeline_mini"] = _build_timeline_mini_segments(
-                    timeline_events,
-                    window_end_ts=row_updated,
-                    window_sec=TIMELINE_MINI_DEFAULT_WINDOW_SEC,
-                    disconnect_threshold_sec=disconnect_threshold_sec,
-                )
+                materialized_threshold_sec = _safe_float(row["state_timeline_mini_threshold_sec"], None)
+                # timeline_mini materializado no upsert do snapshot; so recalcula a
+                # partir dos eventos em linhas antigas ou se o limiar mudou.
+                if (
+                    row["state_timeline_mini_json"] is None
+                    or materialized_threshold_sec is None
+                    or abs(materialized_threshold_sec - disconnect_threshold_sec) > 1e-6
+                ):
+                    timeline_events = self.fetch_timeline_events_light(
+                        pivot_id,
+                        session_id,
+                        limit=self.max_events_per_pivot,
+                    )
+                    summary["timeline_mini"] = _build_timeline_mini_segments(
+                        timeline_events,
+                        window_end_ts=row_updated,
+                        window_sec=TIMELINE_MINI_DEFAULT_WINDOW_SEC,
+                        disconnect_threshold_sec=disconnect_threshold_sec,
+                    )
             else:
                 summary["timeline_mini"] = []
 
             pivots.append(summary)
-            if row_updated is None:
-                continue
-            if last_updated_ts is None or row_updated > last_updated_ts:
-                last_updated_ts = row_updated
 
         if last_updated_ts is None:
             last_updated_ts = time.time()
@@ -2561,14 +3722,20 @@ class TelemetryPersistence:
             "run": self._row_to_run_dict_locked(run_row, now_ts=last_updated_ts),
             "updated_at_ts": last_updated_ts,
             "updated_at": _ts_to_str(last_updated_ts),
+            "generation": generation,
+            "since": since,
+            "full": full,
+            "pivot_count": len(rows),
             "pivots": pivots,
+            "removed": []
+            if full
+            else sorted((pivot_id for pivot_id, seq in removed_seq.items() if seq > since), key=str.lower),
         }
 
     def get_quality_cards_payload(self, run_id=None, timeline_limit=None):
         safe_timeline_limit = max(1, min(50000, int(timeline_limit or self.max_events_per_pivot)))
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             run_row = self._query_run_row_locked(conn, run_id=run_id)
             if run_row is None:
                 return None
@@ -2578,7 +3745,7 @@ class TelemetryPersistence:
                 return None
 
             rows = conn.execute(
-                """
+                f"""
                 SELECT
                     sessions.pivot_id,
                     sessions.session_id,
@@ -2586,7 +3753,7 @@ class TelemetryPersistence:
                     COALESCE(pivots.is_concentrator, 0) AS pivot_is_concentrator,
                     pivots.latitude AS pivot_latitude,
                     pivots.longitude AS pivot_longitude,
-                    snapshots.snapshot_json,
+                    {STATE_SUMMARY_SELECT_COLUMNS},
                     snapshots.median_ready AS snapshot_median_ready,
                     snapshots.median_sample_count AS snapshot_median_sample_count,
                     snapshots.median_cloudv2_interval_sec AS snapshot_median_cloudv2_interval_sec,
@@ -2598,6 +3765,9 @@ class TelemetryPersistence:
                 LEFT JOIN pivot_snapshots AS snapshots
                     ON snapshots.pivot_id = sessions.pivot_id
                     AND snapshots.session_id = sessions.session_id
+                LEFT JOIN pivot_state_summary AS state
+                    ON state.pivot_id = sessions.pivot_id
+                    AND state.session_id = sessions.session_id
                 WHERE sessions.run_id = ?
                     AND sessions.session_id = (
                         SELECT sessions_inner.session_id
@@ -2665,8 +3835,7 @@ class TelemetryPersistence:
         if not normalized_id:
             return None
 
-        with self._lock:
-            conn = self._require_conn_locked()
+        with self._read_connection() as conn:
             session_row = self._query_session_row_locked(
                 conn,
                 normalized_id,
@@ -10,6 +10,7 @@ import paho.mqtt.client as mqtt
 
 from backend.cloudv2_config import FIXED_MONITOR_TOPICS, get_config_file_path, load_runtime_config
 from backend.cloudv2_dashboard import generate_dashboard_assets, start_dashboard_server
+from backend.cloudv2_ingest import IngestQueue
 from backend.cloudv2_paths import LEGACY_WEB_DIRS, resolve_data_dir
 from backend.cloudv2_telemetry import TelemetryStore
 
@@ -35,6 +36,8 @@ MONITOR_TOPICS = tuple(runtime_config.get("monitor_topics") or FIXED_MONITOR_TOP
 DASHBOARD_ENABLED = runtime_config["dashboard_enabled"]
 DASHBOARD_PORT = runtime_config["dashboard_port"]
 DASHBOARD_REFRESH_SEC = runtime_config["dashboard_refresh_sec"]
+DASHBOARD_SERVER_MODE = runtime_config["dashboard_server_mode"]
+INGEST_QUEUE_ENABLED = runtime_config["ingest_queue_enabled"]
 DASHBOARD_HOST = str(os.environ.get("DASHBOARD_HOST", "127.0.0.1")).strip() or "127.0.0.1"
 DEV_HOT_RELOAD = str(os.environ.get("CLOUDV2_DEV_HOT_RELOAD", "1")).strip().lower() in (
     "1",
@@ -53,6 +56,7 @@ if tuple(MONITOR_TOPICS) != tuple(FIXED_MONITOR_TOPICS):
 
 logger = logging.getLogger("cloudv2.monitor")
 telemetry = None
+ingest_queue = None
 dashboard_server = None
 mqtt_client = None
 mqtt_connected = threading.Event()
@@ -245,7 +249,11 @@ def on_message(client, userdata, msg):
         payload = str(msg.payload)
 
     try:
-        if telemetry is not None:
+        # Com a fila ativa, a thread de rede do paho apenas enfileira e volta
+        # ao loop MQTT; o processamento ocorre nos workers de ingestao.
+        if ingest_queue is not None:
+            ingest_queue.submit(msg.topic, payload)
+        elif telemetry is not None:
             telemetry.process_message(msg.topic, payload)
     except Exception as exc:
         logger.exception("Erro ao processar mensagem MQTT topic=%s: %s", msg.topic, exc)
@@ -344,6 +352,7 @@ def _hot_reload_loop():
 
 def main():
     global telemetry
+    global ingest_queue
     global dashboard_server
     global mqtt_client
     global hot_reload_watcher
@@ -360,6 +369,24 @@ def main():
     telemetry.set_modem_reset_sender(_publish_modem_reset_to_dynamic_topic)
     telemetry.start()
 
+    if INGEST_QUEUE_ENABLED:
+        ingest_queue = IngestQueue(
+            telemetry.process_message,
+            max_size=runtime_config["ingest_queue_max_size"],
+            workers=runtime_config["ingest_queue_workers"],
+            policy=runtime_config["ingest_queue_policy"],
+            block_timeout_sec=runtime_config["ingest_queue_block_timeout_sec"],
+            log=logging.getLogger("cloudv2.ingest"),
+        )
+        ingest_queue.start()
+        telemetry.set_ingest_metrics_provider(ingest_queue.get_metrics)
+        logger.info(
+            "Fila de ingestao ativa (capacidade=%s workers=%s politica=%s).",
+            ingest_queue.max_size,
+            ingest_queue.worker_count,
+            ingest_queue.policy,
+        )
+
     if DASHBOARD_ENABLED:
         generate_dashboard_assets(DASHBOARD_REFRESH_SEC)
         dashboard_server = start_dashboard_server(
@@ -367,8 +394,13 @@ def main():
             telemetry,
             reload_token_getter=lambda: dev_reload_token,
             host=DASHBOARD_HOST,
+            server_mode=DASHBOARD_SERVER_MODE,
+            http_workers=runtime_config["dashboard_http_workers"],
+            http_max_connections=runtime_config["dashboard_http_max_connections"],
+            http_request_timeout_sec=runtime_config["dashboard_http_request_timeout_sec"],
+            http_keepalive_sec=runtime_config["dashboard_http_keepalive_sec"],
         )
-        logger.info("Dashboard ativo em %s", _dashboard_log_url())
+        logger.info("Dashboard ativo em %s (servidor %s).", _dashboard_log_url(), DASHBOARD_SERVER_MODE)
         if DEV_HOT_RELOAD:
             logger.info("Hot reload DEV ativo (poll %.1fs).", DEV_HOT_RELOAD_POLL_SEC)
 
@@ -407,6 +439,8 @@ def main():
             mqtt_client.disconnect()
         except Exception:
             pass
+        if ingest_queue is not None:
+            ingest_queue.stop()
         if telemetry is not None:
             telemetry.stop()
         if dashboard_server is not None:
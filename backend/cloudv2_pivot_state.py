@@ -0,0 +1,106 @@
+from dataclasses import dataclass, field, fields
+
+from backend.cloudv2_event_ring import EventRing, PointRing
+
+
+class _SlotRecord:
+    # Interface de dict (pivot["campo"], .get, .setdefault, "campo" in pivot)
+    # sobre campos em __slots__, para quem ainda acessa o estado pela chave
+    # (restauracao campo a campo, testes). O caminho quente usa atributos.
+    __slots__ = ()
+    _FIELDS = ()
+    _FIELD_NAMES = frozenset()
+
+    def __getitem__(self, key):
+        if key not in self._FIELD_NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._FIELD_NAMES:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._FIELD_NAMES
+
+    def get(self, key, default=None):
+        if key not in self._FIELD_NAMES:
+            return default
+        return getattr(self, key)
+
+    def setdefault(self, key, default=None):
+        value = self.get(key)
+        if value is None:
+            self[key] = default
+            return default
+        return value
+
+    def keys(self):
+        return list(self._FIELDS)
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self._FIELDS]
+
+    def to_dict(self):
+        # Formato JSON do runtime_store.json/snapshots (so na borda).
+        payload = {}
+        for name in self._FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, _SlotRecord):
+                value = value.to_dict()
+            elif isinstance(value, (EventRing, PointRing)):
+                value = value.to_list()
+            payload[name] = value
+        return payload
+
+
+@dataclass(slots=True, eq=False)
+class ProbeState(_SlotRecord):
+    enabled: bool = False
+    interval_sec: int = 0
+    last_sent_ts: float | None = None
+    last_response_ts: float | None = None
+    pending_sent_ts: float | None = None
+    pending_deadline_ts: float | None = None
+    timeout_streak: int = 0
+    last_result: str | None = None
+    events: list = field(default_factory=list)
+
+
+@dataclass(slots=True, eq=False)
+class PivotState(_SlotRecord):
+    pivot_id: str
+    pivot_slug: str
+    session_id: str | None = None
+    run_id: str | None = None
+    is_concentrator: bool = False
+    latitude: float | None = None
+    longitude: float | None = None
+    discovered_at_ts: float | None = None
+    last_seen_ts: float | None = None
+    last_ping_ts: float | None = None
+    last_cloudv2_ts: float | None = None
+    last_cloud2_ts: float | None = None
+    topic_counters: dict = field(default_factory=dict)
+    cloudv2_intervals_sec: list = field(default_factory=list)
+    median_latched_ready: bool = False
+    median_latched_interval_sec: float | None = None
+    topic_last_ts: dict = field(default_factory=dict)
+    topic_intervals_sec: dict = field(default_factory=dict)
+    last_cloud2: dict | None = None
+    cloud2_events: list = field(default_factory=list)
+    ping_rssi_points: PointRing = field(default_factory=PointRing)
+    drop_events: list = field(default_factory=list)
+    timeline: EventRing = field(default_factory=EventRing)
+    probe: ProbeState = field(default_factory=ProbeState)
+    modem_reset: dict = field(default_factory=dict)
+    status_cache: dict = field(default_factory=dict)
+    signal_technology: str | None = None
+    rollup_threshold_sec: float | None = None
+    rollup: dict | None = None
+
+
+for _record_type in (ProbeState, PivotState):
+    _record_type._FIELDS = tuple(item.name for item in fields(_record_type))
+    _record_type._FIELD_NAMES = frozenset(_record_type._FIELDS)
@@ -0,0 +1,319 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_JSON_SEPARATORS = (",", ":")
+_BUILD_LOCK_STRIPES = 16
+# Ordem de preferencia quando o cliente aceita mais de uma codificacao.
+_ENCODING_PREFERENCE = ("br", "gzip")
+_ETAG_SUFFIXES = {"gzip": "-gz", "br": "-br"}
+_COMPRESSIBLE_TYPES = ("application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+
+def brotli_available():
+    return brotli is not None
+
+
+def compress_bytes(body, encoding, best=False):
+    # best: nivel maximo, para bytes comprimidos uma vez e servidos muitas
+    # (arquivos estaticos); respostas da API usam nivel rapido.
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9 if best else 5, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=9 if best else 5)
+    return None
+
+
+def is_compressible_type(content_type):
+    content_type = str(content_type or "").split(";", 1)[0].strip().lower()
+    return content_type.startswith("text/") or content_type in _COMPRESSIBLE_TYPES
+
+
+def negotiate_encoding(accept_encoding, available):
+    # Escolhe entre as codificacoes disponiveis pelo Accept-Encoding do
+    # cliente (q-values; q=0 recusa). None: enviar sem compressao.
+    if not accept_encoding or not available:
+        return None
+    weights = {}
+    for item in str(accept_encoding).lower().split(","):
+        name, _sep, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _sep, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip()] = weight
+    chosen = None
+    chosen_weight = 0.0
+    for encoding in _ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > chosen_weight:
+            chosen = encoding
+            chosen_weight = weight
+    return chosen
+
+
+class EncodedResponse:
+    # Resposta JSON ja codificada (e opcionalmente comprimida), imutavel:
+    # varias requisicoes escrevem os mesmos bytes sem copiar o payload.
+    __slots__ = ("body", "gzip_body", "br_body", "generation", "built_at_ts", "etag")
+
+    def __init__(self, body, gzip_body, generation, built_at_ts, etag=None, br_body=None):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.br_body = br_body
+        self.generation = generation
+        self.built_at_ts = built_at_ts
+        self.etag = etag
+
+    def encodings(self):
+        available = []
+        if self.br_body is not None:
+            available.append("br")
+        if self.gzip_body is not None:
+            available.append("gzip")
+        return tuple(available)
+
+    def encoded_body(self, encoding):
+        if encoding == "br":
+            return self.br_body
+        if encoding == "gzip":
+            return self.gzip_body
+        return self.body
+
+    def payload(self):
+        # Copia independente para quem ainda quer o dict (API Python, testes).
+        return json.loads(self.body)
+
+    def representation_etag(self, gzipped=False, encoding=None):
+        # Cada codificacao (identidade/gzip/br) e uma representacao com ETag
+        # propria; todas vem da mesma geracao de dados.
+        suffix = _ETAG_SUFFIXES.get("gzip" if gzipped else encoding)
+        if self.etag is None or suffix is None:
+            return self.etag
+        return f'{self.etag[:-1]}{suffix}"'
+
+
+def encode_json_response(payload, generation, built_at_ts, gzip_min_bytes=None, etag=None, brotli_enabled=False):
+    body = json.dumps(payload, ensure_ascii=False, separators=_JSON_SEPARATORS).encode("utf-8")
+    gzip_body = None
+    br_body = None
+    if gzip_min_bytes is not None and len(body) >= gzip_min_bytes:
+        gzip_body = compress_bytes(body, "gzip")
+        if brotli_enabled:
+            br_body = compress_bytes(body, "br")
+    return EncodedResponse(body, gzip_body, generation, built_at_ts, etag=etag, br_body=br_body)
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match usa comparacao fraca (RFC 9110 13.1.2): ignora "W/" e
+    # aceita a ETag de qualquer codificacao da mesma geracao.
+    if not if_none_match or not etag:
+        return False
+    base = etag[:-1]
+    accepted = {etag}
+    accepted.update(f'{base}{suffix}"' for suffix in _ETAG_SUFFIXES.values())
+    for candidate in str(if_none_match).split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in accepted:
+            return True
+    return False
+
+
+class ResponseCache:
+    # Respostas da API por chave (endpoint, run, pivo...). Uma entrada vale
+    # por ttl_sec a partir da montagem, mesmo que cheguem mensagens: sob
+    # trafego continuo cada chave e remontada no maximo uma vez por TTL.
+    # Montagens da mesma chave sao serializadas (lock por faixa de chave),
+    # entao requisicoes simultaneas esperam a primeira em vez de remontar.
+    # clear() descarta tudo (acoes administrativas) e invalida montagens em
+    # andamento.
+    #
+    # A ETag e "<instancia>-<geracao>": muda quando os dados mudam e nao se
+    # repete entre reinicios do processo (geracoes voltam a zero).
+    def __init__(self, gzip_enabled=True, gzip_min_bytes=1024, max_entries=256, brotli_enabled=False):
+        self.gzip_min_bytes = max(0, int(gzip_min_bytes)) if gzip_enabled else None
+        self.brotli_enabled = bool(brotli_enabled) and brotli is not None
+        self.max_entries = max(1, int(max_entries))
+        self.instance_id = format(int(time.time() * 1000), "x")
+        self._lock = threading.Lock()
+        self._build_locks = [threading.Lock() for _ in range(_BUILD_LOCK_STRIPES)]
+        self._entries = {}
+        self._epoch = 0
+        self._hits = 0
+        self._misses = 0
+        self._builds = 0
+        self._evictions = 0
+        self._not_modified = 0
+
+    def _fresh_locked(self, key, now_ts, ttl_sec):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = now_ts - entry.built_at_ts
+        if age < 0 or age >= ttl_sec:
+            del self._entries[key]
+            return None
+        return entry
+
+    def get_or_build(self, key, now_ts, ttl_sec, generation, builder):
+        # builder() devolve o payload (dict) ou None (nada a responder; nao
+        # entra no cache). generation identifica os dados usados na montagem.
+        if ttl_sec > 0:
+            with self._lock:
+                entry = self._fresh_locked(key, now_ts, ttl_sec)
+                if entry is not None:
+                    self._hits += 1
+                    return entry
+
+        with self._build_locks[hash(key) % _BUILD_LOCK_STRIPES]:
+            with self._lock:
+                if ttl_sec > 0:
+                    entry = self._fresh_locked(key, now_ts, ttl_sec)
+                    if entry is not None:
+                        self._hits += 1
+                        return entry
+                self._misses += 1
+                epoch = self._epoch
+
+            payload = builder()
+            if payload is None:
+                return None
+            response = encode_json_response(
+                payload,
+                generation,
+                now_ts,
+                self.gzip_min_bytes,
+                etag=f'"{self.instance_id}-{generation}"',
+                brotli_enabled=self.brotli_enabled,
+            )
+
+            with self._lock:
+                self._builds += 1
+                if ttl_sec > 0 and epoch == self._epoch:
+                    self._entries[key] = response
+                    if len(self._entries) > self.max_entries:
+                        oldest = min(self._entries, key=lambda item: self._entries[item].built_at_ts)
+                        del self._entries[oldest]
+                        self._evictions += 1
+            return response
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def get_metrics(self):
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(entry.body) for entry in self._entries.values()),
+                "gzip_bytes": sum(len(entry.gzip_body or b"") for entry in self._entries.values()),
+                "br_bytes": sum(len(entry.br_body or b"") for entry in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+                "builds": self._builds,
+                "evictions": self._evictions,
+                "not_modified": self._not_modified,
+                "hit_ratio": round(self._hits / requests, 4) if requests else None,
+                "gzip_min_bytes": self.gzip_min_bytes,
+                "brotli": self.brotli_enabled,
+            }
+
+
+class StaticFileCache:
+    # Arquivos do dashboard (html, js, css) lidos uma vez e guardados junto
+    # com as versoes comprimidas (nivel maximo, ja que sao servidos muitas
+    # vezes). A entrada vale enquanto mtime e tamanho do arquivo nao mudam:
+    # um os.stat por requisicao, entao edicoes no frontend aparecem sem
+    # reiniciar. A ETag vem da mesma assinatura.
+    def __init__(self, gzip_enabled=True, gzip_min_bytes=1024, brotli_enabled=False, max_file_bytes=4194304, max_entries=128):
+        self.gzip_min_bytes = max(0, int(gzip_min_bytes)) if gzip_enabled else None
+        self.brotli_enabled = bool(brotli_enabled) and brotli is not None
+        self.max_file_bytes = max(0, int(max_file_bytes))
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, path, content_type):
+        # None quando o arquivo nao existe (ou nao e arquivo regular).
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == signature:
+                self._hits += 1
+                return cached[1]
+            self._misses += 1
+
+        try:
+            with open(path, "rb") as file:
+                body = file.read()
+        except OSError:
+            return None
+        gzip_body = None
+        br_body = None
+        cacheable = len(body) <= self.max_file_bytes
+        if (
+            cacheable
+            and self.gzip_min_bytes is not None
+            and len(body) >= self.gzip_min_bytes
+            and is_compressible_type(content_type)
+        ):
+            gzip_body = compress_bytes(body, "gzip", best=True)
+            if self.brotli_enabled:
+                br_body = compress_bytes(body, "br", best=True)
+        response = EncodedResponse(
+            body,
+            gzip_body,
+            None,
+            time.time(),
+            etag=f'"{signature[0]:x}-{signature[1]:x}"',
+            br_body=br_body,
+        )
+        if cacheable:
+            with self._lock:
+                self._entries[path] = (signature, response)
+                if len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+        return response
+
+    def get_metrics(self):
+        with self._lock:
+            responses = [entry[1] for entry in self._entries.values()]
+            return {
+                "entries": len(responses),
+                "bytes": sum(len(entry.body) for entry in responses),
+                "gzip_bytes": sum(len(entry.gzip_body or b"") for entry in responses),
+                "br_bytes": sum(len(entry.br_body or b"") for entry in responses),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+
+
+DAY_SEC = 24 * 3600
+
+# Tabela -> coluna de tempo usada no corte. A ordem define a ordem de varredura.
+RETENTION_TABLES = {
+    "connectivity_events": "ts",
+    "probe_events": "ts",
+    "probe_delay_points": "ts",
+    "ping_rssi_points": "ts",
+    "cloud2_events": "ts",
+    "drop_events": "ts",
+    "connectivity_rollups_hourly": "bucket_ts",
+    "connectivity_rollups_daily": "bucket_ts",
+}
+RETENTION_EVENT_TABLES = ("connectivity_events", "probe_events", "cloud2_events", "drop_events")
+RETENTION_POINT_TABLES = ("probe_delay_points", "ping_rssi_points")
+RETENTION_CHUNK_PAUSE_SEC = 0.01
+RETENTION_VACUUM_PAGES_PER_STEP = 256
+RETENTION_INITIAL_DELAY_SEC = 60.0
+
+
+def build_retention_policies(config, history_retention_hours=24):
+    values = dict(config or {})
+    # Dados brutos nunca saem do banco antes da janela que o painel ainda exibe.
+    minimum_days = max(1.0, float(history_retention_hours or 24) / 24.0)
+
+    def _days(key, fallback, floor=0.0):
+        try:
+            days = float(values.get(key, fallback))
+        except (TypeError, ValueError):
+            days = float(fallback)
+        if days <= 0:
+            return 0.0
+        return max(floor, days)
+
+    policies = {}
+    events_days = _days("retention_events_days", 30, minimum_days)
+    points_days = _days("retention_points_days", 30, minimum_days)
+    for table in RETENTION_EVENT_TABLES:
+        policies[table] = events_days
+    for table in RETENTION_POINT_TABLES:
+        policies[table] = points_days
+    policies["connectivity_rollups_hourly"] = _days("retention_rollups_hourly_days", 0)
+    policies["connectivity_rollups_daily"] = _days("retention_rollups_daily_days", 0)
+    return {
+        "tables": policies,
+        "raw_payload_days": _days("retention_raw_payload_days", 7, minimum_days),
+    }
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        persistence,
+        policies,
+        interval_sec=3600,
+        chunk_rows=500,
+        vacuum_pages=RETENTION_VACUUM_PAGES_PER_STEP,
+        log=None,
+    ):
+        self.log = log or logging.getLogger("cloudv2.retention")
+        self.persistence = persistence
+        self.table_days = {
+            table: float(days or 0.0)
+            for table, days in dict((policies or {}).get("tables") or {}).items()
+            if table in RETENTION_TABLES
+        }
+        self.raw_payload_days = float((policies or {}).get("raw_payload_days") or 0.0)
+        self.interval_sec = max(60.0, float(interval_sec))
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.vacuum_pages = max(1, int(vacuum_pages))
+
+        self._stop_event = threading.Event()
+        self._worker = None
+        self._run_lock = threading.Lock()
+        self._strip_cursor_ts = None
+        self._vacuum_hint_logged = False
+
+        self._metrics_lock = threading.Lock()
+        self._run_count = 0
+        self._error_count = 0
+        self._deleted_total = 0
+        self._stripped_total = 0
+        self._bytes_reclaimed_total = 0
+        self._last_report = None
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._loop, name="cloudv2-retention", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout=5.0):
+        worker = self._worker
+        if worker is None:
+            return
+        self._stop_event.set()
+        worker.join(timeout=max(0.0, float(timeout)))
+        self._worker = None
+
+    def _loop(self):
+        delay = min(self.interval_sec, RETENTION_INITIAL_DELAY_SEC)
+        while not self._stop_event.wait(delay):
+            try:
+                self.run_once()
+            except Exception as exc:
+                with self._metrics_lock:
+                    self._error_count += 1
+                self.log.exception("Falha na rotina de retencao do SQLite: %s", exc)
+            delay = self.interval_sec
+
+    def run_once(self, now=None):
+        with self._run_lock:
+            return self._run_once(float(now if now is not None else time.time()))
+
+    def _run_once(self, now_ts):
+        started_mono = time.monotonic()
+        deleted = {}
+        for table, days in self.table_days.items():
+            if days <= 0:
+                continue
+            cutoff_ts = now_ts - days * DAY_SEC
+            total = 0
+            while not self._stop_event.is_set():
+                count = self.persistence.delete_rows_before(table, cutoff_ts, self.chunk_rows)
+                total += count
+                if count < self.chunk_rows:
+                    break
+                # Libera o writer entre blocos para nao travar a ingestao.
+                self._stop_event.wait(RETENTION_CHUNK_PAUSE_SEC)
+            if total:
+                deleted[table] = total
+
+        stripped = 0
+        if self.raw_payload_days > 0:
+            cutoff_ts = now_ts - self.raw_payload_days * DAY_SEC
+            while not self._stop_event.is_set():
+                count, last_ts = self.persistence.strip_event_payloads_before(
+                    cutoff_ts,
+                    self.chunk_rows,
+                    start_ts=self._strip_cursor_ts,
+                )
+                stripped += count
+                if last_ts is not None:
+                    self._strip_cursor_ts = last_ts
+                if count < self.chunk_rows:
+                    break
+                self._stop_event.wait(RETENTION_CHUNK_PAUSE_SEC)
+
+        vacuum = self.persistence.incremental_vacuum(self.vacuum_pages, stop_event=self._stop_event)
+        if not vacuum.get("incremental") and not self._vacuum_hint_logged:
+            self._vacuum_hint_logged = True
+            self.log.info(
+                "SQLite sem auto_vacuum incremental; espaco liberado fica na freelist ate um VACUUM "
+                "(python backend/run_retention.py --vacuum com o monitor parado)."
+            )
+
+        deleted_rows = sum(deleted.values())
+        report = {
+            "run_at_ts": now_ts,
+            "duration_ms": round((time.monotonic() - started_mono) * 1000.0, 3),
+            "deleted_rows": deleted_rows,
+            "deleted_by_table": deleted,
+            "stripped_payload_rows": stripped,
+            "bytes_reclaimed": vacuum.get("bytes_reclaimed", 0),
+            "db_size_bytes": vacuum.get("db_size_bytes"),
+            "freelist_bytes": vacuum.get("freelist_bytes"),
+            "incremental_vacuum": bool(vacuum.get("incremental")),
+        }
+        with self._metrics_lock:
+            self._run_count += 1
+            self._deleted_total += deleted_rows
+            self._stripped_total += stripped
+            self._bytes_reclaimed_total += report["bytes_reclaimed"]
+            self._last_report = report
+
+        if deleted_rows or stripped or report["bytes_reclaimed"]:
+            self.log.info(
+                "Retencao SQLite: %s linhas apagadas, %s payloads compactados, %s bytes recuperados (%.1f ms).",
+                deleted_rows,
+                stripped,
+                report["bytes_reclaimed"],
+                report["duration_ms"],
+            )
+        return report
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            return {
+                "running": self._worker is not None,
+                "interval_sec": self.interval_sec,
+                "chunk_rows": self.chunk_rows,
+                "policies_days": dict(self.table_days),
+                "raw_payload_days": self.raw_payload_days,
+                "run_count": self._run_count,
+                "error_count": self._error_count,
+                "deleted_rows_total": self._deleted_total,
+                "stripped_payload_rows_total": self._stripped_total,
+                "bytes_reclaimed_total": self._bytes_reclaimed_total,
+                "last_run": dict(self._last_report) if self._last_report else None,
+            }
@@ -0,0 +1,170 @@
+import threading
+
+
+ROLLUP_HOURLY = "hourly"
+ROLLUP_DAILY = "daily"
+ROLLUP_GRANULARITIES = (ROLLUP_HOURLY, ROLLUP_DAILY)
+ROLLUP_BUCKET_SEC = {
+    ROLLUP_HOURLY: 3600.0,
+    ROLLUP_DAILY: 86400.0,
+}
+ROLLUP_TABLES = {
+    ROLLUP_HOURLY: "connectivity_rollups_hourly",
+    ROLLUP_DAILY: "connectivity_rollups_daily",
+}
+ROLLUP_TOPIC_COLUMNS = {
+    "cloudv2": "cloudv2_count",
+    "cloudv2-ping": "ping_count",
+    "cloudv2-info": "info_count",
+    "cloudv2-network": "network_count",
+}
+ROLLUP_COUNTER_COLUMNS = (
+    "message_count",
+    "cloudv2_count",
+    "ping_count",
+    "info_count",
+    "network_count",
+    "online_sec",
+    "offline_sec",
+    "drop_count",
+    "drop_sec",
+    "rssi_count",
+    "rssi_sum",
+)
+
+
+def normalize_rollup_granularity(value):
+    text = str(value or "").strip().lower()
+    if text in ("daily", "day", "dia", "diario", "d"):
+        return ROLLUP_DAILY
+    return ROLLUP_HOURLY
+
+
+def rollup_bucket_start(ts, granularity):
+    # Hora e dia na mesma base (UTC): um dia e exatamente a soma de 24 horas,
+    # e a juncao horaria/diaria de summarize_rollups fica sempre alinhada.
+    size = ROLLUP_BUCKET_SEC[granularity]
+    return float(int(float(ts) // size) * size)
+
+
+def rollup_bucket_end(bucket_start, granularity):
+    return float(bucket_start) + ROLLUP_BUCKET_SEC[granularity]
+
+
+def _empty_rollup_row():
+    row = {column: 0 for column in ROLLUP_COUNTER_COLUMNS}
+    row["online_sec"] = 0.0
+    row["offline_sec"] = 0.0
+    row["drop_sec"] = 0.0
+    row["rssi_sum"] = 0.0
+    row["rssi_min"] = None
+    row["rssi_max"] = None
+    return row
+
+
+class RollupAccumulator:
+    # Compartilhado entre pivos processados em paralelo; o estado por pivo
+    # (cursor) continua protegido pelo lock do pivo.
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _rows_for(self, pivot_id, session_id, ts):
+        rows = []
+        for granularity in ROLLUP_GRANULARITIES:
+            key = (pivot_id, session_id, granularity, rollup_bucket_start(ts, granularity))
+            row = self._rows.get(key)
+            if row is None:
+                row = _empty_rollup_row()
+                self._rows[key] = row
+            rows.append(row)
+        return rows
+
+    def add_message(self, pivot_id, session_id, ts, topic):
+        column = ROLLUP_TOPIC_COLUMNS.get(str(topic or "").strip())
+        if column is None:
+            return
+        with self._lock:
+            for row in self._rows_for(pivot_id, session_id, ts):
+                row["message_count"] += 1
+                row[column] += 1
+
+    def add_rssi(self, pivot_id, session_id, ts, rssi):
+        value = float(rssi)
+        with self._lock:
+            for row in self._rows_for(pivot_id, session_id, ts):
+                row["rssi_count"] += 1
+                row["rssi_sum"] += value
+                row["rssi_min"] = value if row["rssi_min"] is None else min(row["rssi_min"], value)
+                row["rssi_max"] = value if row["rssi_max"] is None else max(row["rssi_max"], value)
+
+    def add_drop(self, pivot_id, session_id, ts, duration_sec):
+        with self._lock:
+            for row in self._rows_for(pivot_id, session_id, ts):
+                row["drop_count"] += 1
+                row["drop_sec"] += max(0.0, float(duration_sec or 0.0))
+
+    def add_span(self, pivot_id, session_id, start_ts, end_ts, online):
+        column = "online_sec" if online else "offline_sec"
+        with self._lock:
+            for granularity in ROLLUP_GRANULARITIES:
+                cursor = float(start_ts)
+                while cursor < end_ts:
+                    bucket_start = rollup_bucket_start(cursor, granularity)
+                    bucket_end = min(float(end_ts), rollup_bucket_end(bucket_start, granularity))
+                    key = (pivot_id, session_id, granularity, bucket_start)
+                    row = self._rows.get(key)
+                    if row is None:
+                        row = _empty_rollup_row()
+                        self._rows[key] = row
+                    row[column] += bucket_end - cursor
+                    cursor = bucket_end
+
+    def drain(self):
+        with self._lock:
+            pending = self._rows
+            self._rows = {}
+        return [
+            {
+                "pivot_id": pivot_id,
+                "session_id": session_id,
+                "granularity": granularity,
+                "bucket_ts": bucket_ts,
+                **values,
+            }
+            for (pivot_id, session_id, granularity, bucket_ts), values in pending.items()
+        ]
+
+
+def advance_connectivity(accumulator, state, pivot_id, session_id, now_ts):
+    # Contabiliza [cursor, now]: online ate a cobertura da ultima mensagem
+    # (ts + limiar de desconexao), offline no restante.
+    cursor = state.get("cursor_ts")
+    if cursor is None or now_ts <= cursor:
+        return
+    covered_until = state.get("covered_until_ts")
+    online_end = min(float(now_ts), max(cursor, covered_until if covered_until is not None else cursor))
+    if online_end > cursor:
+        accumulator.add_span(pivot_id, session_id, cursor, online_end, True)
+    if now_ts > online_end:
+        accumulator.add_span(pivot_id, session_id, online_end, now_ts, False)
+    state["cursor_ts"] = float(now_ts)
+
+
+def record_connectivity_message(accumulator, state, pivot_id, session_id, ts, topic, threshold_sec, counted=True):
+    # Eventos sinteticos (ex.: pivot_discovered) mantem a conectividade, mas
+    # nao contam como mensagem recebida.
+    if str(topic or "").strip() not in ROLLUP_TOPIC_COLUMNS:
+        return
+    if counted:
+        accumulator.add_message(pivot_id, session_id, ts, topic)
+    if state.get("cursor_ts") is None:
+        state["cursor_ts"] = float(ts)
+    advance_connectivity(accumulator, state, pivot_id, session_id, ts)
+    coverage_end = float(ts) + max(0.0, float(threshold_sec or 0.0))
+    covered_until = state.get("covered_until_ts")
+    if covered_until is None or coverage_end > covered_until:
+        state["covered_until_ts"] = coverage_end
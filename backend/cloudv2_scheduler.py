@@ -0,0 +1,92 @@
+import heapq
+import threading
+
+
+class DeadlineScheduler:
+    # Min-heap de (deadline_ts, chave) com um unico prazo vivo por chave.
+    # Reagendar nao remove a entrada antiga do heap: ela vira "stale" e e
+    # descartada ao sair do topo (ou numa compactacao quando acumula demais).
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+        self._stale = 0
+        self._lock = threading.Lock()
+        self._pop_count = 0
+        self._last_due_count = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._deadlines)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._deadlines
+
+    def schedule(self, key, deadline_ts):
+        deadline_ts = float(deadline_ts)
+        with self._lock:
+            current = self._deadlines.get(key)
+            if current == deadline_ts:
+                return
+            if current is not None:
+                self._stale += 1
+            self._deadlines[key] = deadline_ts
+            heapq.heappush(self._heap, (deadline_ts, key))
+            self._compact_if_needed()
+
+    def discard(self, key):
+        with self._lock:
+            if self._deadlines.pop(key, None) is not None:
+                self._stale += 1
+                self._compact_if_needed()
+
+    def deadline_for(self, key):
+        with self._lock:
+            return self._deadlines.get(key)
+
+    def next_deadline(self):
+        with self._lock:
+            while self._heap:
+                deadline_ts, key = self._heap[0]
+                if self._deadlines.get(key) == deadline_ts:
+                    return deadline_ts
+                heapq.heappop(self._heap)
+                self._stale -= 1
+            return None
+
+    def pop_due(self, now_ts):
+        # Remove e devolve as chaves vencidas; quem processa deve reagendar.
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts:
+                deadline_ts, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) != deadline_ts:
+                    self._stale -= 1
+                    continue
+                del self._deadlines[key]
+                due.append(key)
+            self._pop_count += 1
+            self._last_due_count = len(due)
+        return due
+
+    def _compact_if_needed(self):
+        if self._stale <= 64 or self._stale <= len(self._deadlines):
+            return
+        self._heap = [(deadline_ts, key) for key, deadline_ts in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def get_metrics(self):
+        with self._lock:
+            next_deadline_ts = None
+            for deadline_ts, key in self._heap[:1]:
+                if self._deadlines.get(key) == deadline_ts:
+                    next_deadline_ts = deadline_ts
+            return {
+                "scheduled": len(self._deadlines),
+                "heap_size": len(self._heap),
+                "stale_entries": self._stale,
+                "pop_count": self._pop_count,
+                "last_due_count": self._last_due_count,
+                "next_deadline_ts": next_deadline_ts,
+            }
@@ -0,0 +1,163 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+_JSON_SEPARATORS = (",", ":")
+
+
+def _encode_event(event_name, event_id, payload):
+    data = json.dumps(payload, ensure_ascii=False, separators=_JSON_SEPARATORS)
+    return f"id: {event_id}\nevent: {event_name}\ndata: {data}\n\n".encode("utf-8")
+
+
+class StateChangeStream:
+    # Deltas do estado para o /api/stream (Server-Sent Events). Um unico
+    # thread consulta store.get_pivot_changes() a cada interval_sec e guarda
+    # o evento ja codificado; todos os clientes escrevem os mesmos bytes,
+    # entao o custo no servidor nao cresce com clientes x refresh.
+    #
+    # O id do evento e "<instancia>-<geracao>": o navegador o reenvia em
+    # Last-Event-ID ao reconectar e recebe so o que perdeu, ou um evento
+    # "reset" (recarregar /api/state) se o historico ja nao cobre o ponto
+    # ou o processo reiniciou.
+    def __init__(self, store, interval_sec=1.0, max_clients=32, history_size=120, keepalive_sec=15.0, log=None):
+        self.store = store
+        self.interval_sec = max(0.1, float(interval_sec))
+        self.max_clients = max(1, int(max_clients))
+        self.keepalive_sec = max(1.0, float(keepalive_sec))
+        self.instance_id = format(int(time.time() * 1000), "x")
+        self.log = log or logging.getLogger("cloudv2.stream")
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=max(1, int(history_size)))
+        self._history_floor = 0
+        self._generation = None
+        self._clients = 0
+        self._stopped = threading.Event()
+        self._thread = None
+        self._metrics = {
+            "events": 0,
+            "resets": 0,
+            "last_event_pivots": 0,
+            "last_event_bytes": 0,
+            "last_publish_ms": None,
+            "rejected_clients": 0,
+            "lagged_clients": 0,
+            "errors": 0,
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            self._generation = self.store.get_change_generation()
+            self._history_floor = self._generation
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="cloudv2-state-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=max(2.0, self.interval_sec * 2))
+        self._thread = None
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval_sec):
+            try:
+                self.publish_once()
+            except Exception as exc:
+                self._metrics["errors"] += 1
+                self.log.warning("Falha ao publicar delta do stream: %s", exc)
+
+    def publish_once(self, now=None):
+        started = time.perf_counter()
+        with self._cond:
+            since = self._generation
+        changes = self.store.get_pivot_changes(since=since, now=now)
+        generation = int(changes.get("generation") or 0)
+        if changes.get("full"):
+            event_name = "reset"
+            payload = {"generation": generation, "run_id": changes.get("run_id")}
+        elif changes.get("pivots") or changes.get("removed"):
+            event_name = "delta"
+            payload = changes
+        else:
+            with self._cond:
+                self._generation = generation
+            return False
+
+        event = _encode_event(event_name, self._event_id(generation), payload)
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self._history_floor = self._events[0][0]
+            self._events.append((generation, event))
+            self._generation = generation
+            self._cond.notify_all()
+        self._metrics["resets" if event_name == "reset" else "events"] += 1
+        self._metrics["last_event_pivots"] = len(payload.get("pivots") or [])
+        self._metrics["last_event_bytes"] = len(event)
+        self._metrics["last_publish_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+        return True
+
+    def _event_id(self, generation):
+        return f"{self.instance_id}-{generation}"
+
+    def open_client(self):
+        with self._cond:
+            if self._stopped.is_set() or self._clients >= self.max_clients:
+                self._metrics["rejected_clients"] += 1
+                return False
+            self._clients += 1
+            return True
+
+    def close_client(self):
+        with self._cond:
+            self._clients = max(0, self._clients - 1)
+
+    def resume_point(self, last_event_id):
+        # (geracao a partir da qual enviar, evento de reset ou None).
+        with self._cond:
+            current = self._generation if self._generation is not None else 0
+            floor = self._history_floor
+        instance_id, _sep, raw_generation = str(last_event_id or "").strip().rpartition("-")
+        try:
+            generation = int(raw_generation)
+        except ValueError:
+            generation = None
+        if instance_id == self.instance_id and generation is not None and floor <= generation <= current:
+            return generation, None
+        if not last_event_id:
+            return current, None
+        reset = _encode_event("reset", self._event_id(current), {"generation": current})
+        return current, reset
+
+    def wait_events(self, after_generation, timeout=None):
+        # Eventos com geracao > after_generation; [] no timeout (keepalive) e
+        # None quando o stream foi encerrado. Cliente atrasado alem do
+        # historico (deltas ja descartados) recebe um reset, como na reconexao.
+        timeout = self.keepalive_sec if timeout is None else timeout
+        with self._cond:
+            ready = lambda: self._stopped.is_set() or (self._events and self._events[-1][0] > after_generation)
+            self._cond.wait_for(ready, timeout=timeout)
+            if self._stopped.is_set():
+                return None
+            if after_generation < self._history_floor:
+                self._metrics["lagged_clients"] += 1
+                current = self._generation if self._generation is not None else 0
+                return [(current, _encode_event("reset", self._event_id(current), {"generation": current}))]
+            return [(generation, event) for generation, event in self._events if generation > after_generation]
+
+    def get_metrics(self):
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics["clients"] = self._clients
+            metrics["max_clients"] = self.max_clients
+            metrics["generation"] = self._generation
+            metrics["history"] = len(self._events)
+        metrics["interval_sec"] = self.interval_sec
+        return metrics
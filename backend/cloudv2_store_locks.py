@@ -0,0 +1,110 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.cloudv2_db_pool import LockWaitStats
+
+
+class StoreLock:
+    # Lock leitor/escritor do TelemetryStore.
+    # - "with lock:" e o modo exclusivo (acoes administrativas, troca de run,
+    #   restauracao): nenhum outro thread esta dentro do store.
+    # - "with lock.shared():" e o modo compartilhado usado por ingestao, tick e
+    #   leitores da frota; o estado de cada pivo e protegido pelo lock do pivo.
+    # Os dois modos sao reentrantes e o modo compartilhado pode ser aberto dentro
+    # do exclusivo; o contrario (upgrade) nao e permitido.
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+        self.exclusive_stats = LockWaitStats()
+        self.shared_stats = LockWaitStats()
+
+    def _shared_depth(self):
+        return getattr(self._local, "shared_depth", 0)
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return True
+            if self._shared_depth() > 0:
+                raise RuntimeError("upgrade de lock compartilhado para exclusivo nao suportado")
+            contended = self._writer is not None or self._readers > 0
+            started = time.perf_counter() if contended else 0.0
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers > 0:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+        self.exclusive_stats.record(time.perf_counter() - started if contended else 0.0, contended)
+        return True
+
+    def release(self):
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("release de lock exclusivo por thread que nao o possui")
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+    def acquire_shared(self):
+        depth = self._shared_depth()
+        if depth > 0 or self._writer == threading.get_ident():
+            # Reentrante: nao espera escritor pendente para nao travar a si mesmo.
+            self._local.shared_depth = depth + 1
+            if depth == 0:
+                self._local.shared_counted = False
+            return True
+        with self._cond:
+            contended = self._writer is not None or self._writers_waiting > 0
+            started = time.perf_counter() if contended else 0.0
+            while self._writer is not None or self._writers_waiting > 0:
+                self._cond.wait()
+            self._readers += 1
+        self._local.shared_depth = 1
+        self._local.shared_counted = True
+        self.shared_stats.record(time.perf_counter() - started if contended else 0.0, contended)
+        return True
+
+    def release_shared(self):
+        depth = self._shared_depth() - 1
+        if depth < 0:
+            raise RuntimeError("release de lock compartilhado sem acquire")
+        self._local.shared_depth = depth
+        if depth > 0 or not getattr(self._local, "shared_counted", False):
+            return
+        self._local.shared_counted = False
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    @contextmanager
+    def shared(self):
+        self.acquire_shared()
+        try:
+            yield self
+        finally:
+            self.release_shared()
+
+    def get_metrics(self):
+        return {
+            "exclusive": self.exclusive_stats.snapshot(),
+            "shared": self.shared_stats.snapshot(),
+        }
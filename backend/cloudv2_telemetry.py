@@ -6,12 +6,29 @@ import re
 import statistics
 import threading
 import time
-import copy
 from datetime import datetime
 
 from backend.cloudv2_dashboard import DATA_DIR, ensure_dirs, slugify, write_json_atomic
-from backend.cloudv2_persistence import TelemetryPersistence
+from backend.cloudv2_persistence import CHANGE_LOG_MAX_REMOVED, TelemetryPersistence, change_log_seed
+from backend.cloudv2_retention import RetentionJob, build_retention_policies
+from backend.cloudv2_rollups import (
+    ROLLUP_HOURLY,
+    RollupAccumulator,
+    advance_connectivity,
+    normalize_rollup_granularity,
+    record_connectivity_message,
+    rollup_bucket_end,
+    rollup_bucket_start,
+)
 from backend.cloudv2_security import get_db_purge_password
+from backend.cloudv2_connectivity import OnlineIntervalTracker
+from backend.cloudv2_interval_stats import IntervalMedianEngine
+from backend.cloudv2_checkpoint import CheckpointWriter, RingColumns, encode_pivot_frame, read_checkpoint
+from backend.cloudv2_event_ring import EventRing, PointRing
+from backend.cloudv2_pivot_state import PivotState, ProbeState
+from backend.cloudv2_response_cache import ResponseCache
+from backend.cloudv2_scheduler import DeadlineScheduler
+from backend.cloudv2_store_locks import StoreLock
 
 
 TOPIC_CLOUDV2 = "cloudv2"
@@ -25,6 +42,8 @@ CONNECTIVITY_TOPICS = (TOPIC_CLOUDV2, TOPIC_PING, TOPIC_INFO, TOPIC_NETWORK)
 TIMELINE_MINI_BINS = 96
 TIMELINE_MINI_WINDOW_SEC = 30 * 24 * 3600
 TIMELINE_MINI_EMPTY_FALLBACK_SEC = 24 * 3600
+SCHEDULER_MIN_DELAY_SEC = 1.0
+SCHEDULER_EPSILON_SEC = 0.001
 
 STATUS_LABELS = {
     "green": "Online",
@@ -205,6 +224,10 @@ def parse_device_payload(payload):
     return parsed, None
 
 
+def _reparse_device_payload(payload):
+    return parse_device_payload(payload)[0]
+
+
 def parse_ping_rssi(parsed):
     if not isinstance(parsed, dict):
         return None
@@ -233,6 +256,9 @@ class TelemetryStore:
 
         self.monitor_topics = tuple(config.get("monitor_topics") or MONITOR_TOPICS)
         self.refresh_sec = max(1, int(config.get("dashboard_refresh_sec", 5)))
+        # Exportacao legada em arquivos (state.json, pivots.json, pivot_*.json);
+        # desligada, write() so grava o checkpoint do runtime.
+        self.dashboard_files_enabled = bool(config.get("dashboard_files_enabled", True))
         self.enable_background_worker = bool(config.get("enable_background_worker", True))
         self.require_apply_to_start = bool(config.get("require_apply_to_start", True))
         self.history_mode = str(config.get("history_mode", "merge")).strip().lower()
@@ -298,8 +324,82 @@ class TelemetryStore:
             5.0,
             max(0.0, quality_cache_ttl if quality_cache_ttl is not None else 2.0),
         )
+        self.api_response_gzip = bool(config.get("api_response_gzip", True))
+        self.api_response_brotli = bool(config.get("api_response_brotli", True))
+        self.api_stream_enabled = bool(config.get("api_stream_enabled", True))
+        stream_interval = _safe_float(config.get("api_stream_interval_sec"), 1.0)
+        self.api_stream_interval_sec = min(30.0, max(0.2, stream_interval if stream_interval is not None else 1.0))
+        stream_max_clients = _safe_int(config.get("api_stream_max_clients"), 32)
+        self.api_stream_max_clients = min(1000, max(1, stream_max_clients if stream_max_clients is not None else 32))
+        gzip_min_bytes = _safe_int(config.get("api_response_gzip_min_bytes"), 1024)
+        self.api_response_gzip_min_bytes = min(
+            1048576,
+            max(0, gzip_min_bytes if gzip_min_bytes is not None else 1024),
+        )
+        status_refresh = _safe_float(config.get("status_refresh_interval_sec"), 30.0)
+        self.status_refresh_interval_sec = min(
+            3600.0,
+            max(0.0, status_refresh if status_refresh is not None else 30.0),
+        )
+        summary_bucket = _safe_float(config.get("summary_cache_bucket_sec"), 1.0)
+        self.summary_cache_bucket_sec = min(
+            60.0,
+            max(0.0, summary_bucket if summary_bucket is not None else 1.0),
+        )
+        snapshot_interval = _safe_float(config.get("snapshot_persist_interval_sec"), 15.0)
+        self.snapshot_persist_interval_sec = min(
+            300.0,
+            max(0.0, snapshot_interval if snapshot_interval is not None else 15.0),
+        )
 
-        self._lock = threading.Lock()
+        # Hierarquia de locks (sempre nesta ordem):
+        #   _lock (StoreLock) -> lock do pivo -> _registry_lock -> persistencia.
+        # Ingestao, tick e leitores da frota usam _lock.shared() + o lock de cada
+        # pivo; _registry_lock protege o dict de pivos, caches, contadores e
+        # acumuladores compartilhados por poucos instantes. Acoes administrativas
+        # usam "with self._lock" (exclusivo). Metodos *_locked exigem _lock (em
+        # qualquer modo) e, no modo compartilhado, o lock do pivo tratado.
+        self._lock = StoreLock()
+        self._registry_lock = threading.RLock()
+        self._pivot_locks = {}
+        # Visao copy-on-write de (pivot_id, pivot) ordenada; trocada inteira a
+        # cada mudanca em self.pivots para leitores sem lock global.
+        self._pivot_view = ()
+        # Serializa write(): os .tmp de write_json_atomic tem nome fixo. Fica
+        # fora da hierarquia acima (write() nunca roda com _lock).
+        self._file_write_lock = threading.Lock()
+        # (pivo, versao) de cada pivot_<slug>.json ja gravado e o ultimo
+        # pivots.json: write() so regenera o que mudou. Acesso sob
+        # _file_write_lock.
+        self._dashboard_file_tokens = {}
+        self._dashboard_mapping = None
+        self._dashboard_file_metrics = {
+            "writes": 0,
+            "pivot_files_written": 0,
+            "pivot_files_skipped": 0,
+            "last_pivot_files_written": 0,
+            "last_write_ms": None,
+        }
+        # Prazos por pivo (proximo probe, timeout, queda por inatividade, poda,
+        # refresh periodico); tick() so visita os pivos vencidos.
+        self._scheduler = DeadlineScheduler()
+        # Contabilidade incremental de conectividade por pivo (ver
+        # _connectivity_tracker_locked); fica fora do dict do pivo para nao
+        # entrar no runtime_store.json.
+        self._connectivity_trackers = {}
+        # Baldes de tolerancia da mediana cloudv2 por pivo, atualizados a cada
+        # intervalo novo em vez de reagrupar a janela inteira.
+        self._interval_engines = {}
+        # Resumo e status memorizados por pivo: valem enquanto a versao do pivo
+        # (incrementada a cada mutacao) e o balde de tempo forem os mesmos.
+        self._pivot_versions = {}
+        self._change_generation = change_log_seed()
+        self._change_floor = self._change_generation
+        self._pivot_change_seq = {}
+        self._removed_pivot_seq = {}
+        self._summary_memo = {}
+        self._summary_memo_hits = 0
+        self._summary_memo_misses = 0
         self._stop_event = threading.Event()
         self._worker = threading.Thread(target=self._background_loop, name="cloudv2-telemetry", daemon=True)
         self._started = False
@@ -308,9 +408,22 @@ class TelemetryStore:
         self._event_seq = 0
         self._probe_sender = None
         self._modem_reset_sender = None
+        self._ingest_metrics_provider = None
         self._api_cache_generation = 0
-        self._state_snapshot_cache = {}
-        self._quality_cards_cache = {}
+        self._api_hard_generation = 0
+        self._api_run_generations = {}
+        self._response_cache = ResponseCache(
+            gzip_enabled=self.api_response_gzip,
+            gzip_min_bytes=self.api_response_gzip_min_bytes,
+            brotli_enabled=self.api_response_brotli,
+        )
+        self._snapshot_dirty_pivots = {}
+        self._snapshot_persisted_ts = {}
+        self._snapshot_persisted_codes = {}
+        self._snapshot_persist_count = 0
+        self._snapshot_coalesced_count = 0
+        # Deltas de rollup (hora/dia) acumulados entre ticks e gravados em lote.
+        self._rollups = RollupAccumulator()
 
         self.pivots = {}
         self.pending_ping_unknown = {}
@@ -327,13 +440,38 @@ class TelemetryStore:
         self.sqlite_db_path = str(config.get("sqlite_db_path", os.path.join(DATA_DIR, "telemetry.sqlite3"))).strip()
         if not self.sqlite_db_path:
             self.sqlite_db_path = os.path.join(DATA_DIR, "telemetry.sqlite3")
+        self.sqlite_write_behind_ms = min(5000, max(0, int(config.get("sqlite_write_behind_ms", 250) or 0)))
+        self.sqlite_write_behind_max_rows = max(1, int(config.get("sqlite_write_behind_max_rows", 500) or 500))
+        self.sqlite_read_pool_size = min(16, max(0, int(config.get("sqlite_read_pool_size", 4) or 0)))
         self.persistence = TelemetryPersistence(
             db_path=self.sqlite_db_path,
             max_events_per_pivot=self.max_events_per_pivot_panel,
             log=self.log,
+            write_behind_ms=self.sqlite_write_behind_ms,
+            write_behind_max_rows=self.sqlite_write_behind_max_rows,
+            read_pool_size=self.sqlite_read_pool_size,
+        )
+        self.retention_enabled = bool(config.get("retention_enabled", True))
+        self.retention = RetentionJob(
+            self.persistence,
+            build_retention_policies(config, history_retention_hours=self.history_retention_hours),
+            interval_sec=max(60, int(config.get("retention_interval_sec", 3600) or 3600)),
+            chunk_rows=max(1, int(config.get("retention_chunk_rows", 500) or 500)),
+            log=self.log,
         )
 
         self.runtime_path = os.path.join(DATA_DIR, "runtime_store.json")
+        # Formato "binary": checkpoint versionado com acrescimos so dos pivos
+        # alterados (ver backend/cloudv2_checkpoint.py); "json" mantem o
+        # runtime_store.json completo a cada escrita.
+        runtime_format = str(config.get("runtime_store_format", "binary") or "binary").strip().lower()
+        self.runtime_store_format = runtime_format if runtime_format in ("binary", "json") else "binary"
+        self.checkpoint_path = os.path.join(DATA_DIR, "runtime_store.ckpt")
+        max_appends = _safe_int(config.get("runtime_checkpoint_max_appends"), 60)
+        self._checkpoint = CheckpointWriter(
+            self.checkpoint_path,
+            max_appends=min(1000, max(0, max_appends if max_appends is not None else 60)),
+        )
 
     def _restore_pending_expected_pivots_locked(self, pending_expected):
         if not isinstance(pending_expected, dict):
@@ -352,16 +490,35 @@ class TelemetryStore:
             }
         self.pending_expected_pivots = cleaned_expected
 
-    def _load_pending_expected_pivots_from_runtime(self):
+    def _read_runtime_payload(self):
+        # Checkpoint binario primeiro; o runtime_store.json so e lido no
+        # formato "json" ou quando ainda nao ha checkpoint (migracao).
+        if self.runtime_store_format == "binary":
+            try:
+                loaded, info = read_checkpoint(self.checkpoint_path)
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self.log.warning("Nao foi possivel restaurar runtime_store.ckpt: %s", exc)
+                loaded, info = None, {}
+            if info.get("truncated"):
+                self.log.warning(
+                    "runtime_store.ckpt com final incompleto: restaurados %s quadros validos",
+                    info.get("frames"),
+                )
+            if loaded is not None:
+                return loaded
+
         if not os.path.exists(self.runtime_path):
-            return
+            return None
 
         try:
             with open(self.runtime_path, "r", encoding="utf-8") as file:
                 loaded = json.load(file)
-        except (OSError, json.JSONDecodeError):
-            return
+        except (OSError, json.JSONDecodeError) as exc:
+            self.log.warning("Nao foi possivel restaurar runtime_store.json: %s", exc)
+            return None
+        return loaded
 
+    def _load_pending_expected_pivots_from_runtime(self, loaded):
         if not isinstance(loaded, dict):
             return
 
@@ -379,7 +536,8 @@ class TelemetryStore:
         ensure_dirs()
         os.makedirs(self.log_dir, exist_ok=True)
         self.persistence.start()
-        self._load_pending_expected_pivots_from_runtime()
+        loaded_runtime = self._read_runtime_payload()
+        self._load_pending_expected_pivots_from_runtime(loaded_runtime)
 
         db_probe_settings = self.persistence.load_probe_settings()
         if isinstance(db_probe_settings, dict) and db_probe_settings:
@@ -402,6 +560,7 @@ class TelemetryStore:
                 self._active_run_id = None
                 self._monitoring_mode = "idle"
                 self.pivots = {}
+                self._publish_pivot_view_locked()
                 self.pending_ping_unknown = {}
                 self.malformed_messages = []
                 self.duplicate_count = 0
@@ -430,7 +589,7 @@ class TelemetryStore:
                     self._active_run_id = None
 
             if self.history_mode == "merge":
-                self._load_runtime_state()
+                self._load_runtime_state(loaded_runtime)
             else:
                 self._clear_dashboard_data_files()
 
@@ -439,10 +598,10 @@ class TelemetryStore:
                 self._monitoring_mode = "live"
                 self._ensure_active_run_locked(now, source="runtime_start")
                 for pivot_id, pivot in self.pivots.items():
-                    discovered_ts = _safe_float(pivot.get("discovered_at_ts"), now)
+                    discovered_ts = _safe_float(pivot.discovered_at_ts, now)
                     session_id = self._ensure_active_session_locked(pivot_id, discovered_ts, source="runtime")
-                    pivot["session_id"] = session_id
-                    pivot["run_id"] = self._active_run_id
+                    pivot.session_id = session_id
+                    pivot.run_id = self._active_run_id
                     self._backfill_pivot_session_locked(pivot)
                     baseline_summary = self._load_pivot_baseline_from_persistence_locked(pivot_id)
                     if isinstance(baseline_summary, dict):
@@ -466,11 +625,23 @@ class TelemetryStore:
         if self.enable_background_worker and (not self._started):
             self._started = True
             self._worker.start()
+            if self.retention_enabled:
+                self.retention.start()
 
     def stop(self):
         self._stop_event.set()
+        self.retention.stop()
         if self._started:
             self._worker.join(timeout=2.5)
+        with self._lock:
+            try:
+                self._flush_dirty_snapshots_locked(time.time(), force=True)
+            except RuntimeError as exc:
+                self.log.warning("Falha ao gravar snapshots pendentes no encerramento: %s", exc)
+            try:
+                self._flush_rollups_locked(time.time())
+            except RuntimeError as exc:
+                self.log.warning("Falha ao gravar rollups pendentes no encerramento: %s", exc)
         self.write()
         self.persistence.stop()
 
@@ -480,58 +651,168 @@ class TelemetryStore:
     def set_modem_reset_sender(self, sender_fn):
         self._modem_reset_sender = sender_fn
 
-    def _api_cache_key(self, run_id):
-        normalized_run = str(run_id or "").strip()
-        return normalized_run or "__default__"
-
-    def _invalidate_api_caches_locked(self):
-        self._api_cache_generation += 1
-        self._state_snapshot_cache.clear()
-        self._quality_cards_cache.clear()
-
-    def _get_cached_api_payload_locked(self, cache, cache_key, now_ts):
-        entry = cache.get(cache_key)
-        if not isinstance(entry, dict):
-            return None
+    def set_ingest_metrics_provider(self, provider_fn):
+        self._ingest_metrics_provider = provider_fn
 
-        generation = _safe_int(entry.get("generation"), None)
-        if generation is None or generation != self._api_cache_generation:
-            cache.pop(cache_key, None)
-            return None
+    def get_runtime_metrics(self):
+        ingest_metrics = None
+        provider = self._ingest_metrics_provider
+        if callable(provider):
+            try:
+                ingest_metrics = provider()
+            except Exception as exc:
+                self.log.warning("Falha ao coletar metricas da fila de ingestao: %s", exc)
+        return {
+            "generated_at_ts": time.time(),
+            "ingest": ingest_metrics,
+            "persistence": self.persistence.get_write_metrics(),
+            "snapshots": self._get_snapshot_metrics(),
+            "retention": self.retention.get_metrics(),
+            "locks": self._get_lock_metrics(),
+            "scheduler": self._scheduler.get_metrics(),
+            "summaries": self._get_summary_memo_metrics(),
+            "checkpoint": self._get_checkpoint_metrics(),
+            "dashboard_files": self._get_dashboard_file_metrics(),
+            "responses": self._get_response_metrics(),
+        }
 
-        expires_at_ts = _safe_float(entry.get("expires_at_ts"), None)
-        if expires_at_ts is None or expires_at_ts <= now_ts:
-            cache.pop(cache_key, None)
-            return None
+    def _get_lock_metrics(self):
+        with self._registry_lock:
+            pivot_lock_count = len(self._pivot_locks)
+        metrics = self._lock.get_metrics()
+        metrics["pivot_locks"] = pivot_lock_count
+        return metrics
+
+    def _get_dashboard_file_metrics(self):
+        metrics = dict(self._dashboard_file_metrics)
+        metrics["enabled"] = self.dashboard_files_enabled
+        return metrics
+
+    def _get_checkpoint_metrics(self):
+        metrics = self._checkpoint.get_metrics()
+        metrics["format"] = self.runtime_store_format
+        return metrics
+
+    def _get_summary_memo_metrics(self):
+        with self._registry_lock:
+            return {
+                "bucket_sec": self.summary_cache_bucket_sec,
+                "memoized": len(self._summary_memo),
+                "hits": self._summary_memo_hits,
+                "misses": self._summary_memo_misses,
+            }
 
-        payload = entry.get("payload")
-        if not isinstance(payload, dict):
-            cache.pop(cache_key, None)
-            return None
-        return copy.deepcopy(payload)
+    def _pivot_lock_for(self, pivot_id):
+        with self._registry_lock:
+            lock = self._pivot_locks.get(pivot_id)
+            if lock is None:
+                lock = threading.RLock()
+                self._pivot_locks[pivot_id] = lock
+            return lock
+
+    def _publish_pivot_view_locked(self):
+        # Chamado com _lock exclusivo ou com _registry_lock apos mudar self.pivots.
+        with self._registry_lock:
+            previous = dict(self._pivot_view)
+            self._pivot_view = tuple(sorted(self.pivots.items(), key=lambda item: item[0].lower()))
+            for pivot_id in list(self._pivot_locks.keys()):
+                if pivot_id not in self.pivots:
+                    self._pivot_locks.pop(pivot_id, None)
+            for pivot_id in previous:
+                if pivot_id not in self.pivots:
+                    self._scheduler.discard(pivot_id)
+                    self._connectivity_trackers.pop(pivot_id, None)
+                    self._interval_engines.pop(pivot_id, None)
+                    self._pivot_versions.pop(pivot_id, None)
+                    self._summary_memo.pop(pivot_id, None)
+                    self._record_pivot_removed_locked(pivot_id)
+            # Pivo novo ou substituido (restauracao, troca de run): vence no
+            # proximo tick para recalcular os prazos a partir do estado novo.
+            for pivot_id, pivot in self._pivot_view:
+                if previous.get(pivot_id) is not pivot:
+                    self._scheduler.schedule(pivot_id, 0.0)
+                    self._record_pivot_change_locked(pivot_id)
+
+    def _record_pivot_change_locked(self, pivot_id):
+        # Geracao de mudancas: cada alteracao de pivo recebe um numero
+        # crescente; quem guardou a ultima geracao vista pede so o que mudou.
+        with self._registry_lock:
+            self._change_generation += 1
+            self._pivot_change_seq[pivot_id] = self._change_generation
+            self._removed_pivot_seq.pop(pivot_id, None)
+
+    def _record_pivot_removed_locked(self, pivot_id):
+        with self._registry_lock:
+            self._change_generation += 1
+            self._pivot_change_seq.pop(pivot_id, None)
+            self._removed_pivot_seq[pivot_id] = self._change_generation
+            if len(self._removed_pivot_seq) > CHANGE_LOG_MAX_REMOVED:
+                oldest_id = min(self._removed_pivot_seq, key=self._removed_pivot_seq.get)
+                # Remocao esquecida: quem esta antes dela precisa do estado completo.
+                self._change_floor = max(self._change_floor, self._removed_pivot_seq.pop(oldest_id))
+
+    def _reset_change_log_locked(self):
+        # Mudanca global (purge, run/sessao nova, configuracao): deltas
+        # anteriores deixam de valer e os clientes recarregam tudo.
+        with self._registry_lock:
+            self._change_generation += 1
+            self._change_floor = self._change_generation
+            self._removed_pivot_seq.clear()
+        self.persistence.reset_change_log()
+
+    def _get_snapshot_metrics(self):
+        with self._registry_lock:
+            return {
+                "persist_interval_sec": self.snapshot_persist_interval_sec,
+                "dirty_pivots": len(self._snapshot_dirty_pivots),
+                "persisted_count": self._snapshot_persist_count,
+                "coalesced_count": self._snapshot_coalesced_count,
+            }
 
-    def _set_cached_api_payload_locked(
-        self,
-        cache,
-        cache_key,
-        payload,
-        ttl_sec,
-        now_ts,
-        expected_generation=None,
-    ):
-        ttl_value = _safe_float(ttl_sec, 0.0)
-        if ttl_value is None or ttl_value <= 0:
-            return
-        if expected_generation is not None and int(expected_generation) != int(self._api_cache_generation):
-            return
-        if not isinstance(payload, dict):
-            return
+    def _api_cache_key(self, run_id):
+        normalized_run = str(run_id or "").strip()
+        return normalized_run or "__default__"
 
-        cache[cache_key] = {
-            "generation": int(self._api_cache_generation),
-            "expires_at_ts": float(now_ts) + float(ttl_value),
-            "payload": copy.deepcopy(payload),
-        }
+    def _bump_api_generation_locked(self):
+        # Mudanca de dados por mensagem/tick: as respostas em cache continuam
+        # valendo ate o TTL (montadas no maximo uma vez por TTL), so a geracao
+        # anda para quem compara (run ativo e estado ao vivo).
+        with self._registry_lock:
+            self._api_cache_generation += 1
+            run_key = self._api_cache_key(self._active_run_id)
+            self._api_run_generations[run_key] = self._api_run_generations.get(run_key, 0) + 1
+
+    def _invalidate_api_caches_locked(self, reset_changes=True):
+        # Acoes administrativas (purge, run/sessao nova, configuracao, remocao)
+        # descartam as respostas ja montadas na hora. Acoes de um pivo so
+        # (reset_changes=False) seguem como delta no log de mudancas.
+        with self._registry_lock:
+            self._api_cache_generation += 1
+            self._api_hard_generation += 1
+        self._response_cache.clear()
+        if reset_changes:
+            self._reset_change_log_locked()
+
+    def _api_generation_for_run(self, normalized_run):
+        with self._registry_lock:
+            if not normalized_run:
+                return self._api_cache_generation
+            return self._api_hard_generation + self._api_run_generations.get(normalized_run, 0)
+
+    def _api_generation_for_pivot(self, pivot_id):
+        with self._registry_lock:
+            return self._api_hard_generation + self._pivot_versions.get(pivot_id, 0)
+
+    def note_api_not_modified(self):
+        self._response_cache.record_not_modified()
+
+    def _get_response_metrics(self):
+        metrics = self._response_cache.get_metrics()
+        metrics["state_ttl_sec"] = self.api_state_cache_ttl_sec
+        metrics["quality_ttl_sec"] = self.api_quality_cache_ttl_sec
+        with self._registry_lock:
+            metrics["generation"] = self._api_cache_generation
+        return metrics
 
     def process_message(self, topic, payload, ts=None):
         ts = float(ts if ts is not None else time.time())
@@ -541,7 +822,13 @@ class TelemetryStore:
         if not topic:
             return {"accepted": False, "reason": "topic vazio"}
 
-        with self._lock:
+        if payload_text.startswith("#92-") and payload_text.endswith("-reset_system$"):
+            # ACK de reset e raro: segue pelo caminho exclusivo original.
+            return self._process_message_exclusive(topic, payload_text, ts)
+
+        parsed, parse_error = parse_device_payload(payload_text)
+
+        with self._lock.shared():
             if self._monitoring_mode != "live":
                 return {
                     "accepted": False,
@@ -549,33 +836,29 @@ class TelemetryStore:
                     "mode": self._monitoring_mode,
                 }
 
-            modem_reset_ack = self._record_modem_reset_ack_if_applicable_locked(topic, payload_text, ts)
-            if modem_reset_ack is not None:
-                return modem_reset_ack
-
             if topic not in self.monitor_topics:
                 self.log.warning("Mensagem em topico nao monitorado descartada: topic=%s", topic)
                 return {"accepted": False, "reason": "topic nao monitorado"}
 
             if self._is_duplicate_locked(topic, payload_text, ts):
-                self.duplicate_count += 1
+                with self._registry_lock:
+                    self.duplicate_count += 1
                 return {"accepted": False, "reason": "duplicada"}
 
-            parsed, parse_error = parse_device_payload(payload_text)
             if parse_error:
                 self._record_malformed_locked(topic, payload_text, parse_error, ts)
-                self._invalidate_api_caches_locked()
+                self._bump_api_generation_locked()
                 return {"accepted": False, "reason": parse_error}
 
             pivot_id = parsed["pivot_id"]
-
-            if topic == TOPIC_CLOUDV2:
-                pivot = self.pivots.get(pivot_id)
-                known_pivot = pivot is not None or self._pivot_exists_locked(pivot_id)
-                pending_expected = self.pending_expected_pivots.get(pivot_id)
-                if (not known_pivot) and pending_expected is None:
+            pivot = self.pivots.get(pivot_id)
+            if pivot is None:
+                if topic == TOPIC_CLOUDV2:
+                    create_pivot = True
+                else:
                     self.log.info(
-                        "Mensagem cloudv2 descartada para pivot nao autorizado: pivot_id=%s",
+                        "Mensagem descartada para pivot nao autorizado: topic=%s pivot_id=%s",
+                        topic,
                         pivot_id,
                     )
                     return {
@@ -583,56 +866,113 @@ class TelemetryStore:
                         "reason": "pivot nao autorizado",
                         "pivot_id": pivot_id,
                     }
+            else:
+                create_pivot = False
+                with self._pivot_lock_for(pivot_id):
+                    return self._apply_pivot_message_locked(pivot, parsed, topic, payload_text, ts)
 
-                pivot = self._get_or_create_pivot_locked(pivot_id, ts)
-                if pending_expected is not None:
-                    self.pending_expected_pivots.pop(pivot_id, None)
-                self._record_message_common_locked(pivot, topic, ts)
-                self._record_cloudv2_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
-                self._refresh_status_locked(pivot, ts)
-                self._prune_pivot_locked(pivot, ts)
-                self._persist_pivot_snapshot_locked(pivot, ts)
-                self._dirty = True
-                self._invalidate_api_caches_locked()
-                return {
-                    "accepted": True,
-                    "pivot_id": pivot_id,
-                    "event": "cloudv2",
-                    "session_id": pivot.get("session_id"),
-                }
+        if create_pivot:
+            # Criacao de pivo altera o registro inteiro: caminho exclusivo.
+            with self._lock:
+                return self._process_cloudv2_new_pivot_locked(parsed, topic, payload_text, ts)
+
+    def _apply_pivot_message_locked(self, pivot, parsed, topic, payload_text, ts):
+        if topic == TOPIC_CLOUDV2:
+            pivot = self._get_or_create_pivot_locked(pivot.pivot_id, ts)
+        self._touch_pivot_locked(pivot)
+        self._record_message_common_locked(pivot, topic, ts)
+
+        if topic == TOPIC_CLOUDV2:
+            self._record_cloudv2_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
+        elif topic == TOPIC_PING:
+            self._record_ping_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
+        elif topic == TOPIC_CLOUD2:
+            self._record_cloud2_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
+        elif topic in PROBE_RESPONSE_TOPICS:
+            self._record_probe_response_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
+
+        self._refresh_status_locked(pivot, ts)
+        self._prune_pivot_locked(pivot, ts)
+        self._mark_snapshot_dirty_locked(pivot, ts)
+        self._schedule_pivot_locked(pivot, ts)
+        self._dirty = True
+        self._bump_api_generation_locked()
+        return {
+            "accepted": True,
+            "pivot_id": pivot.pivot_id,
+            "event": "cloudv2" if topic == TOPIC_CLOUDV2 else topic,
+            "session_id": pivot.session_id,
+        }
 
-            pivot = self.pivots.get(pivot_id)
-            if pivot is None:
-                self.log.info(
-                    "Mensagem descartada para pivot nao autorizado: topic=%s pivot_id=%s",
-                    topic,
-                    pivot_id,
-                )
+    def _process_cloudv2_new_pivot_locked(self, parsed, topic, payload_text, ts):
+        if self._monitoring_mode != "live":
+            return {
+                "accepted": False,
+                "reason": "monitoramento aguardando aplicacao",
+                "mode": self._monitoring_mode,
+            }
+
+        pivot_id = parsed["pivot_id"]
+        pivot = self.pivots.get(pivot_id)
+        known_pivot = pivot is not None or self._pivot_exists_locked(pivot_id)
+        pending_expected = self.pending_expected_pivots.get(pivot_id)
+        if (not known_pivot) and pending_expected is None:
+            self.log.info(
+                "Mensagem cloudv2 descartada para pivot nao autorizado: pivot_id=%s",
+                pivot_id,
+            )
+            return {
+                "accepted": False,
+                "reason": "pivot nao autorizado",
+                "pivot_id": pivot_id,
+            }
+
+        pivot = self._get_or_create_pivot_locked(pivot_id, ts)
+        if pending_expected is not None:
+            self.pending_expected_pivots.pop(pivot_id, None)
+        return self._apply_pivot_message_locked(pivot, parsed, topic, payload_text, ts)
+
+    def _process_message_exclusive(self, topic, payload_text, ts):
+        with self._lock:
+            if self._monitoring_mode != "live":
                 return {
                     "accepted": False,
-                    "reason": "pivot nao autorizado",
-                    "pivot_id": pivot_id,
+                    "reason": "monitoramento aguardando aplicacao",
+                    "mode": self._monitoring_mode,
                 }
 
-            self._record_message_common_locked(pivot, topic, ts)
+            modem_reset_ack = self._record_modem_reset_ack_if_applicable_locked(topic, payload_text, ts)
+            if modem_reset_ack is not None:
+                return modem_reset_ack
 
-            if topic == TOPIC_PING:
-                self._record_ping_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
-            elif topic == TOPIC_CLOUD2:
-                self._record_cloud2_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
-            elif topic in PROBE_RESPONSE_TOPICS:
-                self._record_probe_response_locked(pivot, parsed, topic, ts, raw_payload=payload_text)
+            if topic not in self.monitor_topics:
+                self.log.warning("Mensagem em topico nao monitorado descartada: topic=%s", topic)
+                return {"accepted": False, "reason": "topic nao monitorado"}
 
-            self._refresh_status_locked(pivot, ts)
-            self._prune_pivot_locked(pivot, ts)
-            self._persist_pivot_snapshot_locked(pivot, ts)
-            self._dirty = True
-            self._invalidate_api_caches_locked()
+            if self._is_duplicate_locked(topic, payload_text, ts):
+                self.duplicate_count += 1
+                return {"accepted": False, "reason": "duplicada"}
+
+            parsed, parse_error = parse_device_payload(payload_text)
+            if parse_error:
+                self._record_malformed_locked(topic, payload_text, parse_error, ts)
+                self._bump_api_generation_locked()
+                return {"accepted": False, "reason": parse_error}
+
+            pivot = self.pivots.get(parsed["pivot_id"])
+            if pivot is not None:
+                return self._apply_pivot_message_locked(pivot, parsed, topic, payload_text, ts)
+            if topic == TOPIC_CLOUDV2:
+                return self._process_cloudv2_new_pivot_locked(parsed, topic, payload_text, ts)
+            self.log.info(
+                "Mensagem descartada para pivot nao autorizado: topic=%s pivot_id=%s",
+                topic,
+                parsed["pivot_id"],
+            )
             return {
-                "accepted": True,
-                "pivot_id": pivot_id,
-                "event": topic,
-                "session_id": pivot.get("session_id"),
+                "accepted": False,
+                "reason": "pivot nao autorizado",
+                "pivot_id": parsed["pivot_id"],
             }
 
     def _record_modem_reset_ack_if_applicable_locked(self, topic, payload_text, ts):
@@ -675,10 +1015,11 @@ class TelemetryStore:
             )
             return {"accepted": False, "reason": "ack reset para pivot nao descoberto", "pivot_id": pivot_id}
 
-        modem_reset = pivot.get("modem_reset")
+        self._touch_pivot_locked(pivot)
+        modem_reset = pivot.modem_reset
         if not isinstance(modem_reset, dict):
             modem_reset = {}
-            pivot["modem_reset"] = modem_reset
+            pivot.modem_reset = modem_reset
 
         modem_reset["last_ack_ts"] = ts
         modem_reset["last_ack_topic"] = topic
@@ -688,14 +1029,14 @@ class TelemetryStore:
 
         self._persist_pivot_snapshot_locked(pivot, ts)
         self._dirty = True
-        self._invalidate_api_caches_locked()
+        self._bump_api_generation_locked()
 
         self.log.info("ACK de reset registrado: pivot_id=%s topic=%s payload=%s", pivot_id, topic, payload_text)
         return {
             "accepted": True,
             "pivot_id": pivot_id,
             "event": "modem_reset_ack",
-            "session_id": pivot.get("session_id"),
+            "session_id": pivot.session_id,
         }
 
     def tick(self, now=None):
@@ -703,26 +1044,37 @@ class TelemetryStore:
         send_candidates = []
         changed = False
 
-        with self._lock:
+        with self._lock.shared():
             if self._monitoring_mode != "live":
                 return False
-            for pivot in self.pivots.values():
-                pivot_changed = False
-                timed_out = self._check_probe_timeout_locked(pivot, now)
-                if timed_out:
-                    pivot_changed = True
-                    changed = True
-                if self._refresh_status_locked(pivot, now):
-                    pivot_changed = True
-                    changed = True
-                if self._prune_pivot_locked(pivot, now):
-                    pivot_changed = True
-                    changed = True
-                if pivot_changed:
-                    self._persist_pivot_snapshot_locked(pivot, now)
-                if (not timed_out) and self._probe_should_send_locked(pivot, now):
-                    send_candidates.append(pivot["pivot_id"])
-
+            for pivot_id in self._scheduler.pop_due(now):
+                pivot = self.pivots.get(pivot_id)
+                if pivot is None:
+                    continue
+                with self._pivot_lock_for(pivot_id):
+                    pivot_changed = False
+                    timed_out = self._check_probe_timeout_locked(pivot, now)
+                    if timed_out:
+                        pivot_changed = True
+                        changed = True
+                    if self._refresh_status_locked(pivot, now):
+                        pivot_changed = True
+                        changed = True
+                    if self._prune_pivot_locked(pivot, now):
+                        pivot_changed = True
+                        changed = True
+                    if pivot_changed:
+                        # Visita sem mudanca nao gera versao, delta nem checkpoint;
+                        # a versao nova descarta o resumo memorizado antes das mudancas.
+                        self._touch_pivot_locked(pivot)
+                        self._mark_snapshot_dirty_locked(pivot, now)
+                    if (not timed_out) and self._probe_should_send_locked(pivot, now):
+                        send_candidates.append(pivot_id)
+                    self._advance_rollup_locked(pivot, now)
+                    self._schedule_pivot_locked(pivot, now)
+
+            self._flush_dirty_snapshots_locked(now)
+            self._flush_rollups_locked(now)
             self._cleanup_pending_ping_locked(now)
             self._cleanup_dedupe_locked(now)
 
@@ -745,155 +1097,270 @@ class TelemetryStore:
                 self.log.exception("Erro ao enviar probe #11$ para %s: %s", pivot_id, exc)
 
             if ok:
-                with self._lock:
+                with self._lock.shared():
                     pivot = self.pivots.get(pivot_id)
                     if pivot is not None:
-                        self._record_probe_sent_locked(pivot, now)
-                        self._refresh_status_locked(pivot, now)
-                        self._persist_pivot_snapshot_locked(pivot, now)
+                        with self._pivot_lock_for(pivot_id):
+                            self._touch_pivot_locked(pivot)
+                            self._record_probe_sent_locked(pivot, now)
+                            self._refresh_status_locked(pivot, now)
+                            self._mark_snapshot_dirty_locked(pivot, now)
+                            self._schedule_pivot_locked(pivot, now)
                         changed = True
             else:
                 self.log.warning("Falha ao publicar probe #11$ para pivot %s", pivot_id)
 
         if changed:
-            with self._lock:
+            with self._lock.shared():
                 self._dirty = True
-                self._invalidate_api_caches_locked()
+                self._bump_api_generation_locked()
         return changed
 
     def write(self):
-        now = time.time()
-        with self._lock:
-            state_payload = self._build_state_snapshot_locked(now)
-            pivot_payloads = {
-                pivot_id: self._build_pivot_snapshot_locked(pivot, now)
-                for pivot_id, pivot in self.pivots.items()
-            }
-            mapping = [
-                {
-                    "pivot_id": pivot_id,
-                    "slug": pivot["pivot_slug"],
-                    "file": f"pivot_{pivot['pivot_slug']}.json",
-                }
-                for pivot_id, pivot in sorted(self.pivots.items(), key=lambda item: item[0].lower())
-            ]
-            runtime_payload = self._build_runtime_payload_locked(now)
+        with self._file_write_lock:
+            self._write_files()
 
+    def _write_files(self):
+        now = time.time()
+        started = time.perf_counter()
+        files_enabled = self.dashboard_files_enabled
+        with self._lock.shared():
+            # Limpa antes de montar: mensagens que chegarem durante a montagem
+            # voltam a marcar _dirty e entram na proxima escrita.
             self._dirty = False
             self._last_write_ts = now
+            pivot_view = self._pivot_view
+            if files_enabled:
+                state_payload = self._build_state_snapshot_locked(now)
+                pivot_payloads = self._collect_dirty_pivot_files_locked(pivot_view, now)
+                mapping = [
+                    {
+                        "pivot_id": pivot_id,
+                        "slug": pivot.pivot_slug,
+                        "file": f"pivot_{pivot.pivot_slug}.json",
+                    }
+                    for pivot_id, pivot in pivot_view
+                ]
+            if self.runtime_store_format == "binary":
+                checkpoint = self._capture_checkpoint_locked(now, pivot_view)
+            else:
+                runtime_payload = self._build_runtime_payload_locked(now)
+
+        if files_enabled:
+            # Serializacao (JSON compacto) fora dos locks.
+            write_json_atomic(os.path.join(DATA_DIR, "state.json"), state_payload, compact=True)
+            if mapping != self._dashboard_mapping:
+                write_json_atomic(os.path.join(DATA_DIR, "pivots.json"), mapping, compact=True)
+                self._dashboard_mapping = mapping
+
+            for pivot_id, (token, payload) in pivot_payloads.items():
+                slug = slugify(pivot_id)
+                write_json_atomic(os.path.join(DATA_DIR, f"pivot_{slug}.json"), payload, compact=True)
+                self._dashboard_file_tokens[pivot_id] = token
+            live_ids = {pivot_id for pivot_id, _pivot in pivot_view}
+            for pivot_id in [pivot_id for pivot_id in self._dashboard_file_tokens if pivot_id not in live_ids]:
+                del self._dashboard_file_tokens[pivot_id]
+
+            metrics = self._dashboard_file_metrics
+            metrics["writes"] += 1
+            metrics["pivot_files_written"] += len(pivot_payloads)
+            metrics["pivot_files_skipped"] += len(pivot_view) - len(pivot_payloads)
+            metrics["last_pivot_files_written"] = len(pivot_payloads)
+            metrics["last_write_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+
+        if self.runtime_store_format == "binary":
+            try:
+                self._checkpoint.write(*checkpoint)
+            except OSError as exc:
+                self.log.warning("Falha ao gravar runtime_store.ckpt: %s", exc)
+            else:
+                # Ja migrado: um runtime_store.json antigo nao deve voltar a
+                # ser lido se o formato for trocado depois.
+                if os.path.exists(self.runtime_path):
+                    try:
+                        os.remove(self.runtime_path)
+                    except OSError:
+                        pass
+        else:
+            write_json_atomic(self.runtime_path, runtime_payload)
+
+    def _collect_dirty_pivot_files_locked(self, pivot_view, now):
+        # So os pivos cuja versao mudou desde o ultimo pivot_<slug>.json
+        # gravado; o payload completo (timeline inteira) e o custo maior.
+        pivot_payloads = {}
+        for pivot_id, pivot in pivot_view:
+            with self._pivot_lock_for(pivot_id):
+                version = self._pivot_versions.get(pivot_id, 0)
+                written = self._dashboard_file_tokens.get(pivot_id)
+                if written is not None and written[0] is pivot and written[1] == version:
+                    continue
+                pivot_payloads[pivot_id] = ((pivot, version), self._build_pivot_snapshot_locked(pivot, now))
+        return pivot_payloads
+
+    def _capture_checkpoint_locked(self, now, pivot_view):
+        # Com _lock compartilhado: so os pivos cuja versao mudou desde o
+        # ultimo checkpoint sao copiados (sob o lock do pivo); a gravacao fica
+        # fora dos locks.
+        full = self._checkpoint.wants_full()
+        pivot_frames = {}
+        for pivot_id, pivot in pivot_view:
+            with self._pivot_lock_for(pivot_id):
+                token = (pivot, self._pivot_versions.get(pivot_id, 0))
+                if not full and self._checkpoint.is_current(pivot_id, token):
+                    continue
+                pivot_frames[pivot_id] = (token, encode_pivot_frame(pivot))
+        pivot_ids = frozenset(pivot_id for pivot_id, _pivot in pivot_view)
+        return self._build_runtime_meta_locked(now), pivot_frames, pivot_ids, full
 
-        write_json_atomic(os.path.join(DATA_DIR, "state.json"), state_payload)
-        write_json_atomic(os.path.join(DATA_DIR, "pivots.json"), mapping)
-
-        for pivot_id, payload in pivot_payloads.items():
-            slug = slugify(pivot_id)
-            write_json_atomic(os.path.join(DATA_DIR, f"pivot_{slug}.json"), payload)
-
-        write_json_atomic(self.runtime_path, runtime_payload)
+    def get_state_snapshot(self, now=None, run_id=None, since=None):
+        return self.get_state_response(now=now, run_id=run_id, since=since).payload()
 
-    def get_state_snapshot(self, now=None, run_id=None):
+    def get_state_response(self, now=None, run_id=None, since=None):
+        # since=<geracao> (campo "generation" da resposta anterior): so os
+        # pivos que mudaram e os ids removidos, ou o estado completo com
+        # full=True quando a geracao ja nao e coberta pelo log.
         now = float(now if now is not None else time.time())
         normalized_run = str(run_id or "").strip()
-        cache_key = self._api_cache_key(normalized_run if normalized_run else None)
-        cache_ttl_sec = self.api_state_cache_ttl_sec
+        since = _safe_int(since, None)
+        cache_key = ("state", self._api_cache_key(normalized_run))
+        if since is not None:
+            cache_key = ("state-since", self._api_cache_key(normalized_run), since)
+        return self._response_cache.get_or_build(
+            cache_key,
+            now,
+            self.api_state_cache_ttl_sec,
+            self._api_generation_for_run(normalized_run),
+            lambda: self._build_state_response_payload(now, normalized_run, since),
+        )
+
+    def _build_state_response_payload(self, now, normalized_run, since=None):
         if normalized_run:
-            with self._lock:
-                cached_payload = self._get_cached_api_payload_locked(self._state_snapshot_cache, cache_key, now)
-                if cached_payload is not None:
-                    return cached_payload
-                cache_generation = int(self._api_cache_generation)
-                settings = self._build_state_settings_locked()
-                expected_pivots_pending = self._build_expected_pivots_pending_locked()
+            payload = self._build_run_state_payload(now, normalized_run, since)
+        elif since is not None:
+            payload = self.get_pivot_changes(since=since, now=now)
+        else:
+            with self._lock.shared():
+                payload = self._build_state_snapshot_locked(now)
+        selected_run_id = str(payload.get("run_id") or "").strip() or normalized_run or None
+        filter_options = self.get_cloud2_filter_options(run_id=selected_run_id)
+        payload["cloud2_filter_options"] = {
+            "run_id": str(filter_options.get("run_id") or "").strip() or None,
+            "technologies": list(filter_options.get("technologies") or []),
+            "firmwares": list(filter_options.get("firmwares") or []),
+        }
+        return payload
 
-            try:
-                persisted = self.persistence.get_run_state_payload(
-                    run_id=normalized_run,
-                    connectivity_settings={
-                        "ping_expected_sec": self.ping_expected_sec,
-                        "tolerance_factor": self.tolerance_factor,
-                    },
-                )
-            except RuntimeError:
-                persisted = None
-            if persisted is None:
-                payload = {
-                    "updated_at": _ts_to_str(now),
-                    "updated_at_ts": now,
-                    "run_id": normalized_run,
-                    "run": None,
-                    "settings": settings,
-                    "counts": {
-                        "pivots": 0,
-                        "pending_ping_unknown": 0,
-                        "expected_pivots_pending": len(expected_pivots_pending),
-                        "malformed_messages": 0,
-                        "duplicate_drops": 0,
-                    },
-                    "pivots": [],
-                    "pending_ping": [],
-                    "expected_pivots_pending": expected_pivots_pending,
-                    "malformed_recent": [],
-                    "mode": "history",
-                }
-                with self._lock:
-                    self._set_cached_api_payload_locked(
-                        self._state_snapshot_cache,
-                        cache_key,
-                        payload,
-                        ttl_sec=cache_ttl_sec,
-                        now_ts=now,
-                        expected_generation=cache_generation,
-                    )
-                return payload
+    def _build_run_state_payload(self, now, normalized_run, since=None):
+        with self._lock.shared():
+            settings = self._build_state_settings_locked()
+            expected_pivots_pending = self._build_expected_pivots_pending_locked()
+            self._flush_dirty_snapshots_for_read_locked(normalized_run, now)
 
-            pivot_items = persisted.get("pivots") if isinstance(persisted.get("pivots"), list) else []
-            run_info = persisted.get("run") if isinstance(persisted.get("run"), dict) else None
-            mode = "live" if bool((run_info or {}).get("is_active")) else "history"
+        try:
+            persisted = self.persistence.get_run_state_payload(
+                run_id=normalized_run,
+                connectivity_settings={
+                    "ping_expected_sec": self.ping_expected_sec,
+                    "tolerance_factor": self.tolerance_factor,
+                },
+                since=since,
+            )
+        except RuntimeError:
+            persisted = None
+        if persisted is None:
             payload = {
-                "updated_at": persisted.get("updated_at") or _ts_to_str(now),
-                "updated_at_ts": _safe_float(persisted.get("updated_at_ts"), now),
-                "run_id": str(persisted.get("run_id") or normalized_run),
-                "run": run_info,
+                "updated_at": _ts_to_str(now),
+                "updated_at_ts": now,
+                "run_id": normalized_run,
+                "run": None,
                 "settings": settings,
                 "counts": {
-                    "pivots": len(pivot_items),
+                    "pivots": 0,
                     "pending_ping_unknown": 0,
                     "expected_pivots_pending": len(expected_pivots_pending),
                     "malformed_messages": 0,
                     "duplicate_drops": 0,
                 },
-                "pivots": pivot_items,
+                "pivots": [],
                 "pending_ping": [],
                 "expected_pivots_pending": expected_pivots_pending,
                 "malformed_recent": [],
-                "mode": mode,
+                "mode": "history",
+                "generation": None,
             }
-            with self._lock:
-                self._set_cached_api_payload_locked(
-                    self._state_snapshot_cache,
-                    cache_key,
-                    payload,
-                    ttl_sec=cache_ttl_sec,
-                    now_ts=now,
-                    expected_generation=cache_generation,
-                )
+            if since is not None:
+                payload.update({"since": since, "full": True, "removed": []})
             return payload
 
-        with self._lock:
-            cached_payload = self._get_cached_api_payload_locked(self._state_snapshot_cache, cache_key, now)
-            if cached_payload is not None:
-                return cached_payload
-
-            payload = self._build_state_snapshot_locked(now)
-            self._set_cached_api_payload_locked(
-                self._state_snapshot_cache,
-                cache_key,
-                payload,
-                ttl_sec=cache_ttl_sec,
-                now_ts=now,
-                expected_generation=self._api_cache_generation,
-            )
-            return payload
+        pivot_items = persisted.get("pivots") if isinstance(persisted.get("pivots"), list) else []
+        run_info = persisted.get("run") if isinstance(persisted.get("run"), dict) else None
+        mode = "live" if bool((run_info or {}).get("is_active")) else "history"
+        payload = {
+            "updated_at": persisted.get("updated_at") or _ts_to_str(now),
+            "updated_at_ts": _safe_float(persisted.get("updated_at_ts"), now),
+            "run_id": str(persisted.get("run_id") or normalized_run),
+            "run": run_info,
+            "settings": settings,
+            "counts": {
+                "pivots": _safe_int(persisted.get("pivot_count"), len(pivot_items)),
+                "pending_ping_unknown": 0,
+                "expected_pivots_pending": len(expected_pivots_pending),
+                "malformed_messages": 0,
+                "duplicate_drops": 0,
+            },
+            "pivots": pivot_items,
+            "pending_ping": [],
+            "expected_pivots_pending": expected_pivots_pending,
+            "malformed_recent": [],
+            "mode": mode,
+            "generation": persisted.get("generation"),
+        }
+        if since is not None:
+            payload["since"] = since
+            payload["full"] = bool(persisted.get("full"))
+            payload["removed"] = list(persisted.get("removed") or [])
+        return payload
+
+    def get_change_generation(self):
+        with self._registry_lock:
+            return self._change_generation
+
+    def get_pivot_changes(self, since=None, now=None):
+        # Resumos dos pivos que mudaram depois da geracao `since` e ids
+        # removidos. full=True (todos os pivos) quando `since` falta, e
+        # anterior ao ultimo reset do log ou de outra instancia do processo.
+        now = float(now if now is not None else time.time())
+        since = _safe_int(since, None)
+        with self._lock.shared():
+            with self._registry_lock:
+                generation = self._change_generation
+                full = since is None or since < self._change_floor or since > generation
+                changed_ids = None
+                removed = []
+                if not full:
+                    changed_ids = {
+                        pivot_id for pivot_id, seq in self._pivot_change_seq.items() if seq > since
+                    }
+                    removed = sorted(
+                        (pivot_id for pivot_id, seq in self._removed_pivot_seq.items() if seq > since),
+                        key=str.lower,
+                    )
+                pivot_view = self._pivot_view
+
+            pivots = []
+            for pivot_id, pivot in pivot_view:
+                if changed_ids is not None and pivot_id not in changed_ids:
+                    continue
+                with self._pivot_lock_for(pivot_id):
+                    pivots.append(self._build_pivot_summary_locked(pivot, now))
+            payload = self._build_state_header_locked(now, len(pivot_view))
+
+        payload["generation"] = generation
+        payload["since"] = since
+        payload["full"] = full
+        payload["pivots"] = pivots
+        payload["removed"] = removed
+        return payload
 
     def get_pivot_snapshot(self, pivot_id, now=None, session_id=None, run_id=None):
         explicit_now = now is not None
@@ -905,10 +1372,23 @@ class TelemetryStore:
 
         # Mantem compatibilidade para simuladores/tests que passam "now" explicitamente.
         if explicit_now and session_id is None and normalized_run is None:
-            with self._lock:
+            with self._lock.shared():
                 pivot = self.pivots.get(normalized)
                 if pivot is not None:
-                    return self._build_pivot_snapshot_locked(pivot, now)
+                    with self._pivot_lock_for(normalized):
+                        return self._build_pivot_snapshot_locked(pivot, now)
+
+        if session_id is None:
+            with self._lock.shared():
+                with self._registry_lock:
+                    pending_flush = normalized in self._snapshot_dirty_pivots
+                if pending_flush:
+                    self._flush_dirty_snapshots_for_read_locked(
+                        normalized_run,
+                        now,
+                        pivot_ids={normalized},
+                        force=True,
+                    )
 
         try:
             panel = self.persistence.get_panel_payload(
@@ -923,25 +1403,80 @@ class TelemetryStore:
         if normalized_run is not None:
             return None
 
-        with self._lock:
+        with self._lock.shared():
             pivot = self.pivots.get(normalized)
             if pivot is None:
                 return None
-            return self._build_pivot_snapshot_locked(pivot, now)
+            with self._pivot_lock_for(normalized):
+                return self._build_pivot_snapshot_locked(pivot, now)
 
     def get_complete_panel(self, pivot_id, session_id=None, run_id=None, now=None):
         return self.get_pivot_snapshot(pivot_id, now=now, session_id=session_id, run_id=run_id)
 
+    def get_panel_response(self, pivot_id, session_id=None, run_id=None):
+        # Painel ja codificado para o HTTP; None quando o pivo nao existe.
+        normalized = str(pivot_id or "").strip()
+        if not normalized:
+            return None
+        normalized_session = str(session_id or "").strip() or None
+        normalized_run = str(run_id or "").strip() or None
+        return self._response_cache.get_or_build(
+            ("panel", normalized, normalized_session, normalized_run),
+            time.time(),
+            self.api_state_cache_ttl_sec,
+            self._api_generation_for_pivot(normalized),
+            lambda: self.get_pivot_snapshot(normalized, session_id=normalized_session, run_id=normalized_run),
+        )
+
+    def get_connectivity_rollups(self, pivot_id, session_id=None, granularity="hourly", start_ts=None, end_ts=None):
+        normalized = str(pivot_id or "").strip()
+        if not normalized:
+            return None
+
+        with self._lock.shared():
+            self._flush_rollups_locked(time.time())
+
+        try:
+            rollups = self.persistence.fetch_rollups(
+                normalized,
+                session_id=session_id,
+                granularity=granularity,
+                start_ts=start_ts,
+                end_ts=end_ts,
+            )
+            totals = None
+            if start_ts is not None and end_ts is not None:
+                totals = self.persistence.summarize_rollups(normalized, start_ts, end_ts, session_id=session_id)
+        except RuntimeError:
+            return None
+
+        return {
+            "pivot_id": normalized,
+            "session_id": str(session_id or "").strip() or None,
+            "granularity": normalize_rollup_granularity(granularity),
+            "start_ts": start_ts,
+            "end_ts": end_ts,
+            "rollups": rollups,
+            "totals": totals,
+        }
+
     def get_quality_cards_snapshot(self, run_id=None):
+        return self.get_quality_cards_response(run_id=run_id).payload()
+
+    def get_quality_cards_response(self, run_id=None):
         normalized_run = str(run_id or "").strip() or None
         now = time.time()
-        cache_key = self._api_cache_key(normalized_run)
-        cache_ttl_sec = self.api_quality_cache_ttl_sec
-        with self._lock:
-            cached_payload = self._get_cached_api_payload_locked(self._quality_cards_cache, cache_key, now)
-            if cached_payload is not None:
-                return cached_payload
-            cache_generation = int(self._api_cache_generation)
+        return self._response_cache.get_or_build(
+            ("quality", self._api_cache_key(normalized_run)),
+            now,
+            self.api_quality_cache_ttl_sec,
+            self._api_generation_for_run(normalized_run),
+            lambda: self._build_quality_cards_payload(normalized_run, now),
+        )
+
+    def _build_quality_cards_payload(self, normalized_run, now):
+        with self._lock.shared():
+            self._flush_dirty_snapshots_for_read_locked(normalized_run, now)
 
         try:
             payload = self.persistence.get_quality_cards_payload(
@@ -951,15 +1486,6 @@ class TelemetryStore:
         except RuntimeError:
             payload = None
         if payload is not None:
-            with self._lock:
-                self._set_cached_api_payload_locked(
-                    self._quality_cards_cache,
-                    cache_key,
-                    payload,
-                    ttl_sec=cache_ttl_sec,
-                    now_ts=now,
-                    expected_generation=cache_generation,
-                )
             return payload
 
         now = time.time()
@@ -991,7 +1517,7 @@ class TelemetryStore:
                     }
                 )
 
-            run_payload = self._build_runtime_payload_locked(now).get("active_run")
+            run_payload = self._build_runtime_meta_locked(now).get("active_run")
             payload = {
                 "run_id": str((run_payload or {}).get("run_id") or normalized_run or ""),
                 "run": run_payload,
@@ -999,14 +1525,6 @@ class TelemetryStore:
                 "updated_at": _ts_to_str(now),
                 "pivots": fallback_pivots,
             }
-            self._set_cached_api_payload_locked(
-                self._quality_cards_cache,
-                cache_key,
-                payload,
-                ttl_sec=cache_ttl_sec,
-                now_ts=now,
-                expected_generation=cache_generation,
-            )
             return payload
 
     def list_monitoring_runs(self, limit=200):
@@ -1031,8 +1549,8 @@ class TelemetryStore:
             by_technology = {}
             by_firmware = {}
             for pivot in self.pivots.values():
-                cloud2 = pivot.get("last_cloud2") if isinstance(pivot.get("last_cloud2"), dict) else {}
-                is_concentrator = bool(pivot.get("is_concentrator"))
+                cloud2 = pivot.last_cloud2 if isinstance(pivot.last_cloud2, dict) else {}
+                is_concentrator = bool(pivot.is_concentrator)
                 technology = CONCENTRATOR_TECH_LABEL if is_concentrator else str(cloud2.get("technology") or "").strip()
                 firmware = str(cloud2.get("firmware") or "").strip()
                 if technology:
@@ -1066,10 +1584,12 @@ class TelemetryStore:
         current_ts = float(now if now is not None else time.time())
         with self._lock:
             self.persistence.purge_all_data()
+            self._reset_snapshot_tracking_locked()
             self._active_session_by_pivot = {}
             self._active_run_id = None
             self._monitoring_mode = "idle"
             self.pivots = {}
+            self._publish_pivot_view_locked()
             self.pending_ping_unknown = {}
             self.malformed_messages = []
             self.duplicate_count = 0
@@ -1249,6 +1769,7 @@ class TelemetryStore:
             removed_runtime = False
             if normalized in self.pivots:
                 del self.pivots[normalized]
+                self._publish_pivot_view_locked()
                 removed_runtime = True
             if normalized in self._active_session_by_pivot:
                 del self._active_session_by_pivot[normalized]
@@ -1256,10 +1777,11 @@ class TelemetryStore:
                 del self.pending_ping_unknown[normalized]
             if normalized in self._probe_settings:
                 del self._probe_settings[normalized]
+            self._reset_snapshot_tracking_locked(pivot_id=normalized)
 
             removed_db = self.persistence.delete_pivot(normalized)
             self._dirty = True
-            self._invalidate_api_caches_locked()
+            self._invalidate_api_caches_locked(reset_changes=False)
 
             result = {
                 "ok": True,
@@ -1432,48 +1954,48 @@ class TelemetryStore:
                 last_seen_candidates.append(value)
         last_seen_ts = max(last_seen_candidates) if last_seen_candidates else discovered_ts
 
-        probe = pivot["probe"]
-        probe["enabled"] = bool(probe_summary.get("enabled", probe.get("enabled")))
-        probe_interval = _safe_int(probe_summary.get("interval_sec"), probe.get("interval_sec"))
+        probe = pivot.probe
+        probe.enabled = bool(probe_summary.get("enabled", probe.enabled))
+        probe_interval = _safe_int(probe_summary.get("interval_sec"), probe.interval_sec)
         if probe_interval is None:
             probe_interval = self.probe_default_interval_sec
         if probe_interval < self.probe_min_interval_sec:
             probe_interval = self.probe_min_interval_sec
-        probe["interval_sec"] = probe_interval
-        probe["events"] = probe_events
-        probe["last_sent_ts"] = _safe_float(probe_summary.get("last_sent_ts"), None)
-        probe["last_response_ts"] = _safe_float(probe_summary.get("last_response_ts"), None)
+        probe.interval_sec = probe_interval
+        probe.events = probe_events
+        probe.last_sent_ts = _safe_float(probe_summary.get("last_sent_ts"), None)
+        probe.last_response_ts = _safe_float(probe_summary.get("last_response_ts"), None)
 
         pending = bool(probe_summary.get("pending"))
         pending_deadline_ts = _safe_float(probe_summary.get("pending_deadline_ts"), None)
-        pending_sent_ts = probe["last_sent_ts"] if pending else None
+        pending_sent_ts = probe.last_sent_ts if pending else None
         if pending and pending_deadline_ts is None and pending_sent_ts is not None:
             pending_deadline_ts = pending_sent_ts + (probe_interval * self.probe_timeout_factor)
-        probe["pending_sent_ts"] = pending_sent_ts
-        probe["pending_deadline_ts"] = pending_deadline_ts
-        probe["timeout_streak"] = max(0, _safe_int(probe_summary.get("timeout_streak"), 0) or 0)
+        probe.pending_sent_ts = pending_sent_ts
+        probe.pending_deadline_ts = pending_deadline_ts
+        probe.timeout_streak = max(0, _safe_int(probe_summary.get("timeout_streak"), 0) or 0)
         probe_last_result = probe_summary.get("last_result")
-        probe["last_result"] = str(probe_last_result).strip().lower() if probe_last_result not in (None, "") else None
-
-        pivot["run_id"] = run_id
-        pivot["session_id"] = session_id
-        pivot["last_seen_ts"] = last_seen_ts
-        pivot["last_ping_ts"] = last_ping_ts
-        pivot["last_cloudv2_ts"] = last_cloudv2_ts
-        pivot["last_cloud2_ts"] = last_cloud2_ts
-        pivot["topic_counters"] = topic_counters
-        pivot["topic_last_ts"] = topic_last_ts
-        pivot["topic_intervals_sec"] = topic_intervals
-        pivot["cloudv2_intervals_sec"] = list(topic_intervals.get(TOPIC_CLOUDV2) or [])
-        pivot["last_cloud2"] = last_cloud2
-        pivot["timeline"] = timeline_events
-        pivot["cloud2_events"] = cloud2_events
-        pivot["ping_rssi_points"] = rssi_series
-        pivot["drop_events"] = self._build_drop_events_from_cloud2_locked(cloud2_events)
+        probe.last_result = str(probe_last_result).strip().lower() if probe_last_result not in (None, "") else None
+
+        pivot.run_id = run_id
+        pivot.session_id = session_id
+        pivot.last_seen_ts = last_seen_ts
+        pivot.last_ping_ts = last_ping_ts
+        pivot.last_cloudv2_ts = last_cloudv2_ts
+        pivot.last_cloud2_ts = last_cloud2_ts
+        pivot.topic_counters = topic_counters
+        pivot.topic_last_ts = topic_last_ts
+        pivot.topic_intervals_sec = topic_intervals
+        pivot.cloudv2_intervals_sec = list(topic_intervals.get(TOPIC_CLOUDV2) or [])
+        pivot.last_cloud2 = last_cloud2
+        pivot.timeline.extend(timeline_events)
+        pivot.cloud2_events = cloud2_events
+        pivot.ping_rssi_points.extend(rssi_series)
+        pivot.drop_events = self._build_drop_events_from_cloud2_locked(cloud2_events)
 
         status_summary = summary.get("status") if isinstance(summary.get("status"), dict) else {}
         quality_summary = summary.get("quality") if isinstance(summary.get("quality"), dict) else {}
-        pivot["status_cache"] = {
+        pivot.status_cache = {
             "code": str(status_summary.get("code") or "gray"),
             "reason": str(status_summary.get("reason") or "Aguardando amostras iniciais de cloudv2."),
             "quality_code": str(quality_summary.get("code") or "green"),
@@ -1491,6 +2013,7 @@ class TelemetryStore:
 
         current_ts = float(now if now is not None else time.time())
         with self._lock:
+            self._flush_dirty_snapshots_locked(current_ts, force=True)
             run = self.persistence.activate_existing_run(normalized_run, now_ts=current_ts)
             if not run:
                 raise ValueError("historico nao encontrado")
@@ -1551,25 +2074,26 @@ class TelemetryStore:
 
                 active_session_id = str(self._active_session_by_pivot.get(pivot_id) or "").strip()
                 if active_session_id:
-                    pivot["session_id"] = active_session_id
-                elif not pivot.get("session_id"):
-                    pivot["session_id"] = self._ensure_active_session_locked(
+                    pivot.session_id = active_session_id
+                elif not pivot.session_id:
+                    pivot.session_id = self._ensure_active_session_locked(
                         pivot_id,
                         current_ts,
                         source="history_resume",
                     )
 
-                pivot["run_id"] = normalized_run
+                pivot.run_id = normalized_run
                 self._refresh_status_locked(pivot, current_ts)
                 self._prune_pivot_locked(pivot, current_ts)
                 self._persist_pivot_snapshot_locked(pivot, current_ts)
                 restored_pivots[pivot_id] = pivot
 
             self.pivots = restored_pivots
+            self._publish_pivot_view_locked()
             restored_session_map = {
-                pivot_id: str(pivot.get("session_id") or "").strip()
+                pivot_id: str(pivot.session_id or "").strip()
                 for pivot_id, pivot in restored_pivots.items()
-                if str(pivot.get("session_id") or "").strip()
+                if str(pivot.session_id or "").strip()
             }
             self._active_session_by_pivot = {
                 pivot_id: session_id
@@ -1600,6 +2124,7 @@ class TelemetryStore:
         self._ensure_manual_session_rotation_allowed("start_new_monitoring_run")
         current_ts = float(now if now is not None else time.time())
         with self._lock:
+            self._flush_dirty_snapshots_locked(current_ts, force=True)
             self.persistence.deactivate_all_active_sessions(now_ts=current_ts)
             created_run = self.persistence.create_new_run(
                 now_ts=current_ts,
@@ -1630,7 +2155,7 @@ class TelemetryStore:
                     run_id=run_id,
                 )
                 previous_pivot = previous_pivots.get(pivot_id)
-                if isinstance(previous_pivot, dict):
+                if isinstance(previous_pivot, PivotState):
                     baseline_summary = self._build_pivot_summary_locked(previous_pivot, current_ts)
                 else:
                     baseline_summary = self._load_pivot_baseline_from_persistence_locked(pivot_id)
@@ -1653,6 +2178,7 @@ class TelemetryStore:
                 self._persist_pivot_snapshot_locked(pivot, current_ts)
 
             self.pivots = rebuilt
+            self._publish_pivot_view_locked()
             self._dirty = True
             self._invalidate_api_caches_locked()
 
@@ -1687,6 +2213,7 @@ class TelemetryStore:
         with self._lock:
             if not self._pivot_exists_locked(normalized):
                 raise ValueError("pivot ainda nao foi autorizado para descoberta via cloudv2")
+            self._flush_dirty_snapshots_locked(current_ts, force=True, pivot_ids={normalized})
             self._monitoring_mode = "live"
             active_run_id = self._ensure_active_run_locked(current_ts, source=source)
             if not active_run_id:
@@ -1711,13 +2238,14 @@ class TelemetryStore:
                 run_id=active_run_id,
             )
             previous_pivot = self.pivots.get(normalized)
-            if isinstance(previous_pivot, dict):
+            if isinstance(previous_pivot, PivotState):
                 baseline_summary = self._build_pivot_summary_locked(previous_pivot, current_ts)
             else:
                 baseline_summary = self._load_pivot_baseline_from_persistence_locked(normalized)
             if isinstance(baseline_summary, dict):
                 self._apply_baseline_snapshot_locked(pivot, baseline_summary, now=current_ts)
             self.pivots[normalized] = pivot
+            self._publish_pivot_view_locked()
 
             self._record_timeline_locked(
                 pivot,
@@ -1764,6 +2292,10 @@ class TelemetryStore:
         if not normalized:
             return None
 
+        with self._registry_lock:
+            return self._ensure_active_session_registry_locked(normalized, ts, source)
+
+    def _ensure_active_session_registry_locked(self, normalized, ts, source):
         active_run_id = self._ensure_active_run_locked(ts, source=source)
         if not active_run_id:
             return None
@@ -1793,41 +2325,127 @@ class TelemetryStore:
         return None
 
     def _persist_pivot_snapshot_locked(self, pivot, now):
-        if not isinstance(pivot, dict):
+        if not isinstance(pivot, PivotState):
             return None
 
-        pivot_id = str(pivot.get("pivot_id") or "").strip()
+        pivot_id = str(pivot.pivot_id or "").strip()
         if not pivot_id:
             return None
 
-        session_id = str(pivot.get("session_id") or "").strip()
+        session_id = str(pivot.session_id or "").strip()
         if not session_id:
             session_id = self._ensure_active_session_locked(pivot_id, now, source="runtime")
-            pivot["session_id"] = session_id
+            pivot.session_id = session_id
         if not session_id:
             return None
 
-        if not pivot.get("run_id"):
-            pivot["run_id"] = self._active_run_id
+        if not pivot.run_id:
+            pivot.run_id = self._active_run_id
 
         self.persistence.ensure_pivot(pivot_id, pivot_slug=slugify(pivot_id), seen_ts=now)
-        snapshot = self._build_pivot_snapshot_locked(pivot, now)
+        snapshot = self._build_pivot_snapshot_record_locked(pivot, now)
         self.persistence.upsert_snapshot(pivot_id, session_id, snapshot, updated_at_ts=now)
+
+        status_cache = pivot.status_cache if isinstance(pivot.status_cache, dict) else {}
+        with self._registry_lock:
+            self._snapshot_dirty_pivots.pop(pivot_id, None)
+            self._snapshot_persisted_ts[pivot_id] = now
+            self._snapshot_persisted_codes[pivot_id] = (status_cache.get("code"), status_cache.get("quality_code"))
+            self._snapshot_persist_count += 1
         return snapshot
 
+    def _mark_snapshot_dirty_locked(self, pivot, now):
+        pivot_id = str(pivot.pivot_id or "").strip()
+        if not pivot_id:
+            return
+
+        # Transicao de status/qualidade grava na hora; o restante e coalescido
+        # e gravado no maximo uma vez por snapshot_persist_interval_sec.
+        status_cache = pivot.status_cache if isinstance(pivot.status_cache, dict) else {}
+        current_codes = (status_cache.get("code"), status_cache.get("quality_code"))
+        with self._registry_lock:
+            persist_now = (
+                self.snapshot_persist_interval_sec <= 0
+                or self._snapshot_persisted_codes.get(pivot_id) != current_codes
+            )
+            if not persist_now:
+                if pivot_id in self._snapshot_dirty_pivots:
+                    self._snapshot_coalesced_count += 1
+                else:
+                    self._snapshot_dirty_pivots[pivot_id] = now
+        if persist_now:
+            self._persist_pivot_snapshot_locked(pivot, now)
+
+    def _flush_dirty_snapshots_locked(self, now, force=False, pivot_ids=None):
+        # Nao pode ser chamado segurando o lock de um pivo: pega o lock de cada
+        # pivo pendente.
+        with self._registry_lock:
+            if not self._snapshot_dirty_pivots:
+                return 0
+            candidates = []
+            for pivot_id in list(self._snapshot_dirty_pivots.keys()):
+                if pivot_ids is not None and pivot_id not in pivot_ids:
+                    continue
+                pivot = self.pivots.get(pivot_id)
+                if pivot is None:
+                    self._snapshot_dirty_pivots.pop(pivot_id, None)
+                    continue
+                candidates.append((pivot_id, pivot))
+
+        flushed = 0
+        for pivot_id, pivot in candidates:
+            with self._pivot_lock_for(pivot_id):
+                with self._registry_lock:
+                    if pivot_id not in self._snapshot_dirty_pivots:
+                        continue
+                    last_persisted_ts = self._snapshot_persisted_ts.get(pivot_id)
+                if (
+                    (not force)
+                    and last_persisted_ts is not None
+                    and (now - last_persisted_ts) < self.snapshot_persist_interval_sec
+                ):
+                    continue
+                self._persist_pivot_snapshot_locked(pivot, now)
+                flushed += 1
+        return flushed
+
+    def _reset_snapshot_tracking_locked(self, pivot_id=None):
+        with self._registry_lock:
+            if pivot_id is None:
+                self._snapshot_dirty_pivots.clear()
+                self._snapshot_persisted_ts.clear()
+                self._snapshot_persisted_codes.clear()
+                return
+            self._snapshot_dirty_pivots.pop(pivot_id, None)
+            self._snapshot_persisted_ts.pop(pivot_id, None)
+            self._snapshot_persisted_codes.pop(pivot_id, None)
+
+    def _flush_dirty_snapshots_for_read_locked(self, run_id, now, pivot_ids=None, force=False):
+        # Leituras do run ativo via SQLite. Listagens (state, quality-lite),
+        # pedidas a cada poll do dashboard, aceitam snapshot com ate
+        # snapshot_persist_interval_sec de idade (transicoes de status/qualidade
+        # ja gravam na hora); o painel de um pivo forca a gravacao dele.
+        normalized_run = str(run_id or "").strip()
+        if normalized_run and normalized_run != str(self._active_run_id or "").strip():
+            return 0
+        try:
+            return self._flush_dirty_snapshots_locked(now, force=force, pivot_ids=pivot_ids)
+        except RuntimeError:
+            return 0
+
     def _backfill_pivot_session_locked(self, pivot):
-        if not isinstance(pivot, dict):
+        if not isinstance(pivot, PivotState):
             return
 
-        pivot_id = str(pivot.get("pivot_id") or "").strip()
-        session_id = str(pivot.get("session_id") or "").strip()
+        pivot_id = str(pivot.pivot_id or "").strip()
+        session_id = str(pivot.session_id or "").strip()
         if not pivot_id or not session_id:
             return
 
         if self.persistence.session_has_events(pivot_id, session_id):
             return
 
-        timeline = sorted(list(pivot.get("timeline", [])), key=lambda item: _safe_float(item.get("ts"), 0))
+        timeline = sorted(list(pivot.timeline), key=lambda item: _safe_float(item.get("ts"), 0))
         for event in timeline:
             if not isinstance(event, dict):
                 continue
@@ -1844,14 +2462,14 @@ class TelemetryStore:
                 parsed_payload=parsed_payload,
             )
 
-        cloud2_events = sorted(list(pivot.get("cloud2_events", [])), key=lambda item: _safe_float(item.get("ts"), 0))
+        cloud2_events = sorted(list(pivot.cloud2_events), key=lambda item: _safe_float(item.get("ts"), 0))
         for event in cloud2_events:
             if not isinstance(event, dict):
                 continue
             self.persistence.insert_cloud2_event(pivot_id, session_id, event)
 
         ping_rssi_points = sorted(
-            list(pivot.get("ping_rssi_points", [])),
+            list(pivot.ping_rssi_points),
             key=lambda item: _safe_float(item.get("ts"), 0),
         )
         for point in ping_rssi_points:
@@ -1864,14 +2482,14 @@ class TelemetryStore:
                 rssi=point.get("rssi"),
             )
 
-        drop_events = sorted(list(pivot.get("drop_events", [])), key=lambda item: _safe_float(item.get("ts"), 0))
+        drop_events = sorted(list(pivot.drop_events), key=lambda item: _safe_float(item.get("ts"), 0))
         for event in drop_events:
             if not isinstance(event, dict):
                 continue
             self.persistence.insert_drop_event(pivot_id, session_id, event)
 
-        probe = pivot.get("probe") if isinstance(pivot.get("probe"), dict) else {}
-        probe_events = sorted(list(probe.get("events", [])), key=lambda item: _safe_float(item.get("ts"), 0))
+        probe = pivot.probe
+        probe_events = sorted(list(probe.events), key=lambda item: _safe_float(item.get("ts"), 0))
         for event in probe_events:
             if not isinstance(event, dict):
                 continue
@@ -1930,18 +2548,20 @@ class TelemetryStore:
 
             pivot = self.pivots.get(normalized_pivot)
             if pivot is not None:
-                probe = pivot["probe"]
-                probe["enabled"] = normalized_enabled
-                probe["interval_sec"] = normalized_interval
+                self._touch_pivot_locked(pivot)
+                probe = pivot.probe
+                probe.enabled = normalized_enabled
+                probe.interval_sec = normalized_interval
                 if not normalized_enabled:
-                    probe["pending_sent_ts"] = None
-                    probe["pending_deadline_ts"] = None
+                    probe.pending_sent_ts = None
+                    probe.pending_deadline_ts = None
                 now_ts = time.time()
                 self._refresh_status_locked(pivot, now_ts)
                 self._persist_pivot_snapshot_locked(pivot, now_ts)
+                self._scheduler.schedule(normalized_pivot, 0.0)
 
             self._dirty = True
-            self._invalidate_api_caches_locked()
+            self._invalidate_api_caches_locked(reset_changes=False)
 
         self.log.info(
             "Configuracao de probe atualizada: pivot_id=%s enabled=%s interval_sec=%s",
@@ -1973,13 +2593,14 @@ class TelemetryStore:
             )
             pivot = self.pivots.get(normalized_pivot)
             if pivot is not None:
-                pivot["is_concentrator"] = bool(persisted_flag)
+                self._touch_pivot_locked(pivot)
+                pivot.is_concentrator = bool(persisted_flag)
                 now_ts = time.time()
                 self._refresh_status_locked(pivot, now_ts)
                 self._persist_pivot_snapshot_locked(pivot, now_ts)
 
             self._dirty = True
-            self._invalidate_api_caches_locked()
+            self._invalidate_api_caches_locked(reset_changes=False)
 
         self.log.info(
             "Tecnologia concentrador atualizada: pivot_id=%s is_concentrator=%s",
@@ -2017,14 +2638,15 @@ class TelemetryStore:
             )
             pivot = self.pivots.get(normalized_pivot)
             if pivot is not None:
-                pivot["latitude"] = _safe_float(persisted.get("latitude"), None)
-                pivot["longitude"] = _safe_float(persisted.get("longitude"), None)
+                self._touch_pivot_locked(pivot)
+                pivot.latitude = _safe_float(persisted.get("latitude"), None)
+                pivot.longitude = _safe_float(persisted.get("longitude"), None)
                 now_ts = time.time()
                 self._refresh_status_locked(pivot, now_ts)
                 self._persist_pivot_snapshot_locked(pivot, now_ts)
 
             self._dirty = True
-            self._invalidate_api_caches_locked()
+            self._invalidate_api_caches_locked(reset_changes=False)
 
         self.log.info(
             "Coordenadas atualizadas: pivot_id=%s latitude=%s longitude=%s",
@@ -2062,17 +2684,18 @@ class TelemetryStore:
         with self._lock:
             pivot = self.pivots.get(normalized_pivot)
             if pivot is not None:
-                modem_reset = pivot.get("modem_reset")
+                self._touch_pivot_locked(pivot)
+                modem_reset = pivot.modem_reset
                 if not isinstance(modem_reset, dict):
                     modem_reset = {}
-                    pivot["modem_reset"] = modem_reset
+                    pivot.modem_reset = modem_reset
                 modem_reset["last_command_ts"] = command_ts
                 modem_reset["last_command_topic"] = normalized_pivot
                 modem_reset["last_command_payload"] = payload
                 modem_reset["command_count"] = int(modem_reset.get("command_count") or 0) + 1
                 self._persist_pivot_snapshot_locked(pivot, command_ts)
                 self._dirty = True
-                self._invalidate_api_caches_locked()
+                self._invalidate_api_caches_locked(reset_changes=False)
 
         self.log.info("Comando de reset #92$ enviado para pivot_id=%s", normalized_pivot)
         return {
@@ -2095,8 +2718,9 @@ class TelemetryStore:
 
     def _is_duplicate_locked(self, topic, payload, ts):
         digest = hashlib.sha1(f"{topic}|{payload}".encode("utf-8", errors="ignore")).hexdigest()
-        last_ts = self._dedupe_cache.get(digest)
-        self._dedupe_cache[digest] = ts
+        with self._registry_lock:
+            last_ts = self._dedupe_cache.get(digest)
+            self._dedupe_cache[digest] = ts
 
         if last_ts is None:
             return False
@@ -2106,11 +2730,12 @@ class TelemetryStore:
         if len(self._dedupe_cache) < 5000:
             return
         threshold = now - (self.dedupe_window_sec * 4)
-        keep = {}
-        for digest, ts in self._dedupe_cache.items():
-            if ts >= threshold:
-                keep[digest] = ts
-        self._dedupe_cache = keep
+        with self._registry_lock:
+            keep = {}
+            for digest, ts in self._dedupe_cache.items():
+                if ts >= threshold:
+                    keep[digest] = ts
+            self._dedupe_cache = keep
 
     def _normalize_probe_settings(self, probe_settings):
         normalized = {}
@@ -2141,60 +2766,14 @@ class TelemetryStore:
 
         return normalized
 
-    def _compute_cloudv2_interval_stats_locked(self, intervals):
-        cleaned = []
-        if isinstance(intervals, list):
-            for item in intervals:
-                parsed = _safe_float(item, None)
-                if parsed is not None and parsed > 0:
-                    cleaned.append(parsed)
-
-        if not cleaned:
-            return {
-                "median_interval_sec": None,
-                "sample_count": 0,
-                "total_sample_count": 0,
-            }
-
-        buckets = []
-        for index, interval_sec in enumerate(cleaned):
-            matched_bucket = None
-            matched_delta_ratio = None
-            for bucket in buckets:
-                reference = bucket["reference_sec"]
-                if reference <= 0:
-                    continue
-                tolerance = reference * self.cloudv2_median_tolerance_pct
-                delta = abs(interval_sec - reference)
-                if delta > tolerance:
-                    continue
-
-                delta_ratio = delta / reference
-                if matched_bucket is None or delta_ratio < matched_delta_ratio:
-                    matched_bucket = bucket
-                    matched_delta_ratio = delta_ratio
-
-            if matched_bucket is None:
-                buckets.append(
-                    {
-                        "reference_sec": interval_sec,
-                        "samples": [interval_sec],
-                        "last_index": index,
-                    }
-                )
-                continue
-
-            matched_bucket["samples"].append(interval_sec)
-            matched_bucket["last_index"] = index
-            matched_bucket["reference_sec"] = statistics.median(matched_bucket["samples"])
-
-        best_bucket = max(buckets, key=lambda bucket: (len(bucket["samples"]), bucket["last_index"]))
-        best_samples = best_bucket["samples"]
-        return {
-            "median_interval_sec": statistics.median(best_samples),
-            "sample_count": len(best_samples),
-            "total_sample_count": len(cleaned),
-        }
+    def _compute_cloudv2_interval_stats_locked(self, pivot, intervals):
+        pivot_id = pivot.pivot_id
+        engine = self._interval_engines.get(pivot_id)
+        if engine is None or engine.tolerance_pct != self.cloudv2_median_tolerance_pct:
+            engine = IntervalMedianEngine(self.cloudv2_median_tolerance_pct)
+            with self._registry_lock:
+                self._interval_engines[pivot_id] = engine
+        return engine.stats(intervals)
 
     def _new_pivot_state(
         self,
@@ -2214,42 +2793,27 @@ class TelemetryStore:
         if probe_interval < self.probe_min_interval_sec:
             probe_interval = self.probe_min_interval_sec
 
-        return {
-            "pivot_id": pivot_id,
-            "pivot_slug": slugify(pivot_id),
-            "session_id": session_id,
-            "run_id": run_id,
-            "is_concentrator": bool(is_concentrator),
-            "latitude": _safe_float(latitude, None),
-            "longitude": _safe_float(longitude, None),
-            "discovered_at_ts": discovered_ts,
-            "last_seen_ts": discovered_ts,
-            "last_ping_ts": None,
-            "last_cloudv2_ts": None,
-            "last_cloud2_ts": None,
-            "topic_counters": {topic: 0 for topic in self.monitor_topics},
-            "cloudv2_intervals_sec": [],
-            "median_latched_ready": False,
-            "median_latched_interval_sec": None,
-            "topic_last_ts": {topic: None for topic in CONNECTIVITY_TOPICS},
-            "topic_intervals_sec": {topic: [] for topic in CONNECTIVITY_TOPICS},
-            "last_cloud2": None,
-            "cloud2_events": [],
-            "ping_rssi_points": [],
-            "drop_events": [],
-            "timeline": [],
-            "probe": {
-                "enabled": probe_enabled,
-                "interval_sec": probe_interval,
-                "last_sent_ts": None,
-                "last_response_ts": None,
-                "pending_sent_ts": None,
-                "pending_deadline_ts": None,
-                "timeout_streak": 0,
-                "last_result": None,
-                "events": [],
-            },
-            "modem_reset": {
+        return PivotState(
+            pivot_id=pivot_id,
+            pivot_slug=slugify(pivot_id),
+            session_id=session_id,
+            run_id=run_id,
+            is_concentrator=bool(is_concentrator),
+            latitude=_safe_float(latitude, None),
+            longitude=_safe_float(longitude, None),
+            discovered_at_ts=discovered_ts,
+            last_seen_ts=discovered_ts,
+            topic_counters={topic: 0 for topic in self.monitor_topics},
+            topic_last_ts={topic: None for topic in CONNECTIVITY_TOPICS},
+            topic_intervals_sec={topic: [] for topic in CONNECTIVITY_TOPICS},
+            timeline=EventRing(
+                capacity=self.max_events_per_pivot,
+                format_ts=_ts_to_str,
+                parse_payload=_reparse_device_payload,
+            ),
+            ping_rssi_points=PointRing(capacity=self.max_events_per_pivot, format_ts=_ts_to_str),
+            probe=ProbeState(enabled=probe_enabled, interval_sec=probe_interval),
+            modem_reset={
                 "last_command_ts": None,
                 "last_command_topic": None,
                 "last_command_payload": None,
@@ -2260,17 +2824,17 @@ class TelemetryStore:
                 "command_count": 0,
                 "ack_count": 0,
             },
-            "status_cache": {
+            status_cache={
                 "code": "gray",
                 "reason": "Aguardando amostras iniciais de cloudv2.",
                 "quality_code": "green",
                 "quality_reason": "Qualidade aguardando dados da janela.",
                 "changed_at_ts": discovered_ts,
             },
-        }
+        )
 
     def _apply_baseline_snapshot_locked(self, pivot, summary, now=None):
-        if not isinstance(pivot, dict) or not isinstance(summary, dict):
+        if not isinstance(pivot, PivotState) or not isinstance(summary, dict):
             return False
 
         changed = False
@@ -2287,56 +2851,56 @@ class TelemetryStore:
                     parsed_flag = True
                 elif normalized_flag in ("0", "false", "no", "nao", "não"):
                     parsed_flag = False
-            if parsed_flag is not None and bool(pivot.get("is_concentrator")) != bool(parsed_flag):
-                pivot["is_concentrator"] = bool(parsed_flag)
+            if parsed_flag is not None and bool(pivot.is_concentrator) != bool(parsed_flag):
+                pivot.is_concentrator = bool(parsed_flag)
                 changed = True
 
         baseline_latitude = _safe_float(summary.get("latitude"), None)
         baseline_longitude = _safe_float(summary.get("longitude"), None)
-        if baseline_latitude is not None and _safe_float(pivot.get("latitude"), None) is None:
-            pivot["latitude"] = baseline_latitude
+        if baseline_latitude is not None and _safe_float(pivot.latitude, None) is None:
+            pivot.latitude = baseline_latitude
             changed = True
-        if baseline_longitude is not None and _safe_float(pivot.get("longitude"), None) is None:
-            pivot["longitude"] = baseline_longitude
+        if baseline_longitude is not None and _safe_float(pivot.longitude, None) is None:
+            pivot.longitude = baseline_longitude
             changed = True
 
         baseline_last_ping_ts = _safe_float(summary.get("last_ping_ts"), None)
         baseline_last_cloudv2_ts = _safe_float(summary.get("last_cloudv2_ts"), None)
         baseline_last_activity_ts = _safe_float(summary.get("last_activity_ts"), None)
 
-        current_last_ping_ts = _safe_float(pivot.get("last_ping_ts"), None)
+        current_last_ping_ts = _safe_float(pivot.last_ping_ts, None)
         if baseline_last_ping_ts is not None and current_last_ping_ts is None:
-            pivot["last_ping_ts"] = baseline_last_ping_ts
-            pivot.setdefault("topic_last_ts", {})[TOPIC_PING] = baseline_last_ping_ts
+            pivot.last_ping_ts = baseline_last_ping_ts
+            pivot.topic_last_ts[TOPIC_PING] = baseline_last_ping_ts
             changed = True
 
-        current_last_cloudv2_ts = _safe_float(pivot.get("last_cloudv2_ts"), None)
+        current_last_cloudv2_ts = _safe_float(pivot.last_cloudv2_ts, None)
         if baseline_last_cloudv2_ts is not None and current_last_cloudv2_ts is None:
-            pivot["last_cloudv2_ts"] = baseline_last_cloudv2_ts
-            pivot.setdefault("topic_last_ts", {})[TOPIC_CLOUDV2] = baseline_last_cloudv2_ts
+            pivot.last_cloudv2_ts = baseline_last_cloudv2_ts
+            pivot.topic_last_ts[TOPIC_CLOUDV2] = baseline_last_cloudv2_ts
             changed = True
 
         if baseline_last_activity_ts is not None:
-            current_last_seen_ts = _safe_float(pivot.get("last_seen_ts"), None)
+            current_last_seen_ts = _safe_float(pivot.last_seen_ts, None)
             if current_last_seen_ts is None or baseline_last_activity_ts > current_last_seen_ts:
-                pivot["last_seen_ts"] = baseline_last_activity_ts
+                pivot.last_seen_ts = baseline_last_activity_ts
                 changed = True
 
         baseline_last_cloud2 = summary.get("last_cloud2")
-        current_last_cloud2 = pivot.get("last_cloud2")
+        current_last_cloud2 = pivot.last_cloud2
         if (not isinstance(current_last_cloud2, dict) or not current_last_cloud2) and isinstance(
             baseline_last_cloud2, dict
         ) and baseline_last_cloud2:
-            pivot["last_cloud2"] = dict(baseline_last_cloud2)
+            pivot.last_cloud2 = dict(baseline_last_cloud2)
             baseline_last_cloud2_ts = _safe_float(baseline_last_cloud2.get("ts"), None)
             if baseline_last_cloud2_ts is not None:
-                pivot["last_cloud2_ts"] = baseline_last_cloud2_ts
+                pivot.last_cloud2_ts = baseline_last_cloud2_ts
             changed = True
 
         current_intervals = (
-            pivot.get("topic_intervals_sec", {}).get(TOPIC_CLOUDV2)
-            if isinstance(pivot.get("topic_intervals_sec", {}).get(TOPIC_CLOUDV2), list)
-            else pivot.get("cloudv2_intervals_sec", [])
+            pivot.topic_intervals_sec.get(TOPIC_CLOUDV2)
+            if isinstance(pivot.topic_intervals_sec.get(TOPIC_CLOUDV2), list)
+            else pivot.cloudv2_intervals_sec
         ) or []
         has_current_intervals = any((_safe_float(item, None) or 0) > 0 for item in current_intervals)
 
@@ -2357,17 +2921,17 @@ class TelemetryStore:
                 max(self.cloudv2_min_samples, int(baseline_sample_count)),
             )
             seeded = [median_interval for _ in range(seed_size)]
-            topic_intervals = pivot.setdefault("topic_intervals_sec", {})
+            topic_intervals = pivot.topic_intervals_sec
             topic_intervals[TOPIC_CLOUDV2] = list(seeded)
-            pivot["cloudv2_intervals_sec"] = list(seeded)
-            pivot["median_latched_ready"] = True
-            pivot["median_latched_interval_sec"] = median_interval
+            pivot.cloudv2_intervals_sec = list(seeded)
+            pivot.median_latched_ready = True
+            pivot.median_latched_interval_sec = median_interval
             changed = True
 
         status_info = summary.get("status")
         quality_info = summary.get("quality")
         if isinstance(status_info, dict) and isinstance(quality_info, dict):
-            current_status_cache = pivot.get("status_cache") if isinstance(pivot.get("status_cache"), dict) else {}
+            current_status_cache = pivot.status_cache if isinstance(pivot.status_cache, dict) else {}
             current_status_code = str(current_status_cache.get("code") or "").strip().lower()
             status_code = str(status_info.get("code") or "").strip()
             quality_code = str(quality_info.get("code") or "").strip()
@@ -2376,7 +2940,7 @@ class TelemetryStore:
                 and quality_code in QUALITY_LABELS
                 and current_status_code in ("", "gray")
             ):
-                pivot["status_cache"] = {
+                pivot.status_cache = {
                     "code": status_code,
                     "reason": str(status_info.get("reason") or ""),
                     "quality_code": quality_code,
@@ -2480,20 +3044,18 @@ class TelemetryStore:
     def _get_or_create_pivot_locked(self, pivot_id, ts):
         pivot = self.pivots.get(pivot_id)
         if pivot is not None:
-            if not pivot.get("session_id"):
-                pivot["session_id"] = self._ensure_active_session_locked(pivot_id, ts, source="runtime")
-            if not pivot.get("run_id"):
-                pivot["run_id"] = self._active_run_id
-            if "is_concentrator" not in pivot:
-                pivot["is_concentrator"] = self._load_pivot_concentrator_flag_locked(pivot_id)
-            missing_latitude = "latitude" not in pivot or _safe_float(pivot.get("latitude"), None) is None
-            missing_longitude = "longitude" not in pivot or _safe_float(pivot.get("longitude"), None) is None
+            if not pivot.session_id:
+                pivot.session_id = self._ensure_active_session_locked(pivot_id, ts, source="runtime")
+            if not pivot.run_id:
+                pivot.run_id = self._active_run_id
+            missing_latitude = pivot.latitude is None
+            missing_longitude = pivot.longitude is None
             if missing_latitude or missing_longitude:
                 coordinates = self._load_pivot_coordinates_locked(pivot_id)
                 if missing_latitude:
-                    pivot["latitude"] = coordinates["latitude"]
+                    pivot.latitude = coordinates["latitude"]
                 if missing_longitude:
-                    pivot["longitude"] = coordinates["longitude"]
+                    pivot.longitude = coordinates["longitude"]
             return pivot
 
         session_id = self._ensure_active_session_locked(pivot_id, ts, source="cloudv2_discovery")
@@ -2512,7 +3074,8 @@ class TelemetryStore:
         if isinstance(baseline_summary, dict):
             self._apply_baseline_snapshot_locked(pivot, baseline_summary, now=ts)
         self.pivots[pivot_id] = pivot
-        self.persistence.ensure_pivot(pivot_id, pivot_slug=pivot["pivot_slug"], seen_ts=ts)
+        self._publish_pivot_view_locked()
+        self.persistence.ensure_pivot(pivot_id, pivot_slug=pivot.pivot_slug, seen_ts=ts)
 
         self._record_timeline_locked(
             pivot,
@@ -2526,16 +3089,16 @@ class TelemetryStore:
         return pivot
 
     def _record_message_common_locked(self, pivot, topic, ts):
-        pivot["last_seen_ts"] = ts
-        pivot_id = pivot.get("pivot_id")
+        pivot.last_seen_ts = ts
+        pivot_id = pivot.pivot_id
         if pivot_id:
             self.persistence.touch_pivot_seen(pivot_id, ts)
-        counters = pivot["topic_counters"]
+        counters = pivot.topic_counters
         counters[topic] = counters.get(topic, 0) + 1
 
         if topic in CONNECTIVITY_TOPICS:
-            topic_last = pivot.setdefault("topic_last_ts", {item: None for item in CONNECTIVITY_TOPICS})
-            topic_intervals = pivot.setdefault("topic_intervals_sec", {item: [] for item in CONNECTIVITY_TOPICS})
+            topic_last = pivot.topic_last_ts
+            topic_intervals = pivot.topic_intervals_sec
 
             previous_ts = _safe_float(topic_last.get(topic), None)
             if previous_ts is not None and ts > previous_ts:
@@ -2547,24 +3110,24 @@ class TelemetryStore:
 
     def _record_cloudv2_locked(self, pivot, parsed, topic, ts, raw_payload=None):
         intervals = (
-            pivot.get("topic_intervals_sec", {}).get(TOPIC_CLOUDV2)
-            or pivot.get("cloudv2_intervals_sec", [])
+            pivot.topic_intervals_sec.get(TOPIC_CLOUDV2)
+            or pivot.cloudv2_intervals_sec
         )
         interval_sec = intervals[-1] if intervals else None
         if intervals:
-            pivot["cloudv2_intervals_sec"] = intervals[-self.cloudv2_window :]
-            interval_stats = self._compute_cloudv2_interval_stats_locked(pivot["cloudv2_intervals_sec"])
+            pivot.cloudv2_intervals_sec = intervals[-self.cloudv2_window :]
+            interval_stats = self._compute_cloudv2_interval_stats_locked(pivot, pivot.cloudv2_intervals_sec)
             median_value = interval_stats["median_interval_sec"]
             if median_value is not None:
                 self.log.debug(
                     "Mediana cloudv2 atualizada: pivot_id=%s mediana=%.2fs amostras_validas=%s total=%s",
-                    pivot["pivot_id"],
+                    pivot.pivot_id,
                     median_value,
                     interval_stats["sample_count"],
                     interval_stats["total_sample_count"],
                 )
 
-        pivot["last_cloudv2_ts"] = ts
+        pivot.last_cloudv2_ts = ts
 
         details = {
             "idp": parsed.get("idp"),
@@ -2586,23 +3149,19 @@ class TelemetryStore:
         )
 
     def _record_ping_locked(self, pivot, parsed, topic, ts, raw_payload=None):
-        pivot["last_ping_ts"] = ts
+        pivot.last_ping_ts = ts
         rssi_value = parse_ping_rssi(parsed)
         if rssi_value is not None:
-            rssi_point = {
-                "ts": ts,
-                "at": _ts_to_str(ts),
-                "rssi": rssi_value,
-            }
             self.persistence.insert_ping_rssi_point(
-                pivot.get("pivot_id"),
-                pivot.get("session_id"),
+                pivot.pivot_id,
+                pivot.session_id,
                 ts=ts,
                 rssi=rssi_value,
             )
-            pivot["ping_rssi_points"].append(rssi_point)
-            if len(pivot["ping_rssi_points"]) > self.max_events_per_pivot:
-                pivot["ping_rssi_points"] = pivot["ping_rssi_points"][-self.max_events_per_pivot :]
+            rollup_state = self._rollup_state_locked(pivot)
+            if rollup_state is not None:
+                self._rollups.add_rssi(pivot.pivot_id, rollup_state["session_id"], ts, rssi_value)
+            pivot.ping_rssi_points.append(ts, rssi_value)
 
         details = {"idp": parsed.get("idp")}
         if rssi_value is not None:
@@ -2681,13 +3240,13 @@ class TelemetryStore:
             "event_date": event_date,
             "raw": parsed.get("raw"),
         }
-        self.persistence.insert_cloud2_event(pivot.get("pivot_id"), pivot.get("session_id"), cloud2_event)
+        self.persistence.insert_cloud2_event(pivot.pivot_id, pivot.session_id, cloud2_event)
 
-        pivot["last_cloud2_ts"] = ts
-        pivot["last_cloud2"] = cloud2_event
-        pivot["cloud2_events"].append(cloud2_event)
-        if len(pivot["cloud2_events"]) > self.max_events_per_pivot:
-            pivot["cloud2_events"] = pivot["cloud2_events"][-self.max_events_per_pivot :]
+        pivot.last_cloud2_ts = ts
+        pivot.last_cloud2 = cloud2_event
+        pivot.cloud2_events.append(cloud2_event)
+        if len(pivot.cloud2_events) > self.max_events_per_pivot:
+            pivot.cloud2_events = pivot.cloud2_events[-self.max_events_per_pivot :]
 
         drop_event = None
         if drop_duration_sec is not None and drop_duration_sec > 0:
@@ -2698,10 +3257,13 @@ class TelemetryStore:
                 "technology": technology,
                 "rssi": rssi,
             }
-            self.persistence.insert_drop_event(pivot.get("pivot_id"), pivot.get("session_id"), drop_event)
-            pivot["drop_events"].append(drop_event)
-            if len(pivot["drop_events"]) > self.max_events_per_pivot:
-                pivot["drop_events"] = pivot["drop_events"][-self.max_events_per_pivot :]
+            self.persistence.insert_drop_event(pivot.pivot_id, pivot.session_id, drop_event)
+            rollup_state = self._rollup_state_locked(pivot)
+            if rollup_state is not None:
+                self._rollups.add_drop(pivot.pivot_id, rollup_state["session_id"], ts, drop_duration_sec)
+            pivot.drop_events.append(drop_event)
+            if len(pivot.drop_events) > self.max_events_per_pivot:
+                pivot.drop_events = pivot.drop_events[-self.max_events_per_pivot :]
 
         self._record_timeline_locked(
             pivot,
@@ -2723,9 +3285,9 @@ class TelemetryStore:
         )
 
     def _record_probe_response_locked(self, pivot, parsed, topic, ts, raw_payload=None):
-        probe = pivot["probe"]
-        pending_sent_ts = probe.get("pending_sent_ts")
-        pending_deadline_ts = probe.get("pending_deadline_ts")
+        probe = pivot.probe
+        pending_sent_ts = probe.pending_sent_ts
+        pending_deadline_ts = probe.pending_deadline_ts
 
         if (
             pending_sent_ts is not None
@@ -2733,11 +3295,11 @@ class TelemetryStore:
             and pending_sent_ts <= ts <= pending_deadline_ts
         ):
             latency = ts - pending_sent_ts
-            probe["pending_sent_ts"] = None
-            probe["pending_deadline_ts"] = None
-            probe["last_response_ts"] = ts
-            probe["timeout_streak"] = 0
-            probe["last_result"] = "response"
+            probe.pending_sent_ts = None
+            probe.pending_deadline_ts = None
+            probe.last_response_ts = ts
+            probe.timeout_streak = 0
+            probe.last_result = "response"
             response_event = {
                 "type": "response",
                 "ts": ts,
@@ -2745,15 +3307,15 @@ class TelemetryStore:
                 "topic": topic,
                 "latency_sec": latency,
             }
-            probe["events"].append(response_event)
-            if len(probe["events"]) > self.max_events_per_pivot:
-                probe["events"] = probe["events"][-self.max_events_per_pivot :]
-            self.persistence.insert_probe_event(pivot.get("pivot_id"), pivot.get("session_id"), response_event)
+            probe.events.append(response_event)
+            if len(probe.events) > self.max_events_per_pivot:
+                probe.events = probe.events[-self.max_events_per_pivot :]
+            self.persistence.insert_probe_event(pivot.pivot_id, pivot.session_id, response_event)
 
             probe_stats = self._summarize_probe_stats_locked(probe)
             self.persistence.insert_probe_delay_point(
-                pivot.get("pivot_id"),
-                pivot.get("session_id"),
+                pivot.pivot_id,
+                pivot.session_id,
                 ts=ts,
                 latency_sec=latency,
                 avg_latency_sec=probe_stats.get("latency_avg_sec"),
@@ -2777,7 +3339,7 @@ class TelemetryStore:
             )
             self.log.info(
                 "Probe respondido: pivot_id=%s topic=%s latency=%.2fs",
-                pivot["pivot_id"],
+                pivot.pivot_id,
                 topic,
                 latency,
             )
@@ -2789,7 +3351,7 @@ class TelemetryStore:
             "at": _ts_to_str(ts),
             "topic": topic,
         }
-        self.persistence.insert_probe_event(pivot.get("pivot_id"), pivot.get("session_id"), unmatched_event)
+        self.persistence.insert_probe_event(pivot.pivot_id, pivot.session_id, unmatched_event)
         self._record_timeline_locked(
             pivot,
             event_type="probe_response_unmatched",
@@ -2803,58 +3365,58 @@ class TelemetryStore:
         )
 
     def _probe_should_send_locked(self, pivot, now):
-        probe = pivot["probe"]
-        if not probe.get("enabled"):
+        probe = pivot.probe
+        if not probe.enabled:
             return False
 
-        if probe.get("pending_sent_ts") is not None:
+        if probe.pending_sent_ts is not None:
             return False
 
-        interval_sec = _safe_int(probe.get("interval_sec"), self.probe_default_interval_sec)
+        interval_sec = _safe_int(probe.interval_sec, self.probe_default_interval_sec)
         if interval_sec is None:
             interval_sec = self.probe_default_interval_sec
         if interval_sec < self.probe_min_interval_sec:
             interval_sec = self.probe_min_interval_sec
-        probe["interval_sec"] = interval_sec
+        probe.interval_sec = interval_sec
 
-        last_sent_ts = probe.get("last_sent_ts")
+        last_sent_ts = probe.last_sent_ts
         if last_sent_ts is None:
             return True
 
         return (now - last_sent_ts) >= interval_sec
 
     def _record_probe_sent_locked(self, pivot, ts):
-        probe = pivot["probe"]
-        interval_sec = _safe_int(probe.get("interval_sec"), self.probe_default_interval_sec)
+        probe = pivot.probe
+        interval_sec = _safe_int(probe.interval_sec, self.probe_default_interval_sec)
         if interval_sec is None:
             interval_sec = self.probe_default_interval_sec
         if interval_sec < self.probe_min_interval_sec:
             interval_sec = self.probe_min_interval_sec
 
         deadline_ts = ts + (interval_sec * self.probe_timeout_factor)
-        probe["last_sent_ts"] = ts
-        probe["pending_sent_ts"] = ts
-        probe["pending_deadline_ts"] = deadline_ts
-        probe["last_result"] = "sent"
+        probe.last_sent_ts = ts
+        probe.pending_sent_ts = ts
+        probe.pending_deadline_ts = deadline_ts
+        probe.last_result = "sent"
 
         sent_event = {
             "type": "sent",
             "ts": ts,
             "at": _ts_to_str(ts),
-            "topic": pivot["pivot_id"],
+            "topic": pivot.pivot_id,
             "payload": "#11$",
             "deadline_ts": deadline_ts,
             "deadline_at": _ts_to_str(deadline_ts),
         }
-        probe["events"].append(sent_event)
-        if len(probe["events"]) > self.max_events_per_pivot:
-            probe["events"] = probe["events"][-self.max_events_per_pivot :]
-        self.persistence.insert_probe_event(pivot.get("pivot_id"), pivot.get("session_id"), sent_event)
+        probe.events.append(sent_event)
+        if len(probe.events) > self.max_events_per_pivot:
+            probe.events = probe.events[-self.max_events_per_pivot :]
+        self.persistence.insert_probe_event(pivot.pivot_id, pivot.session_id, sent_event)
 
         self._record_timeline_locked(
             pivot,
             event_type="probe_sent",
-            topic=pivot["pivot_id"],
+            topic=pivot.pivot_id,
             ts=ts,
             summary="Probe #11$ enviado no topico dinamico do pivot.",
             details={
@@ -2862,24 +3424,79 @@ class TelemetryStore:
                 "deadline_ts": deadline_ts,
                 "deadline_at": _ts_to_str(deadline_ts),
             },
-            source_topic=pivot["pivot_id"],
+            source_topic=pivot.pivot_id,
         )
-        self.log.info("Probe #11$ enviado: pivot_id=%s", pivot["pivot_id"])
+        self.log.info("Probe #11$ enviado: pivot_id=%s", pivot.pivot_id)
+
+    def _next_pivot_deadline_locked(self, pivot, now):
+        # Menor instante em que tick() pode mudar algo neste pivo. Prazos com
+        # comparacao estrita (timeout, queda, poda) ganham um epsilon.
+        candidates = [now + self.status_refresh_interval_sec]
+
+        probe = pivot.probe
+        if probe.enabled:
+            pending_deadline_ts = _safe_float(probe.pending_deadline_ts, None)
+            if probe.pending_sent_ts is not None and pending_deadline_ts is not None:
+                candidates.append(pending_deadline_ts + SCHEDULER_EPSILON_SEC)
+            else:
+                last_sent_ts = _safe_float(probe.last_sent_ts, None)
+                interval_sec = max(
+                    self.probe_min_interval_sec,
+                    _safe_int(probe.interval_sec, self.probe_default_interval_sec)
+                    or self.probe_default_interval_sec,
+                )
+                candidates.append(now if last_sent_ts is None else last_sent_ts + interval_sec)
+
+        topic_last_ts = pivot.topic_last_ts or {}
+        last_values = [_safe_float(topic_last_ts.get(topic), None) for topic in CONNECTIVITY_TOPICS]
+        last_values = [value for value in last_values if value is not None]
+        threshold_sec = _safe_float(pivot.rollup_threshold_sec, None)
+        if last_values and threshold_sec is not None and threshold_sec > 0:
+            candidates.append(max(last_values) + threshold_sec + SCHEDULER_EPSILON_SEC)
+
+        last_cloudv2_ts = _safe_float(topic_last_ts.get(TOPIC_CLOUDV2), None)
+        attention_window_sec = min(self.attention_disconnected_window_sec, self.retention_sec)
+        if last_cloudv2_ts is not None and attention_window_sec > 0:
+            candidates.append(last_cloudv2_ts + attention_window_sec + SCHEDULER_EPSILON_SEC)
+
+        # As listas sao cronologicas: o primeiro item e o proximo a sair da retencao.
+        for events in (
+            pivot.timeline,
+            pivot.cloud2_events,
+            pivot.ping_rssi_points,
+            pivot.drop_events,
+            probe.events,
+        ):
+            if events:
+                if isinstance(events, (EventRing, PointRing)):
+                    first_ts = events.first_ts()
+                else:
+                    first_ts = _safe_float(events[0].get("ts"), None)
+                if first_ts is not None:
+                    candidates.append(first_ts + self.retention_sec + SCHEDULER_EPSILON_SEC)
+
+        deadline_ts = min(candidates)
+        if deadline_ts <= now:
+            deadline_ts = now + SCHEDULER_MIN_DELAY_SEC
+        return deadline_ts
+
+    def _schedule_pivot_locked(self, pivot, now):
+        self._scheduler.schedule(pivot.pivot_id, self._next_pivot_deadline_locked(pivot, now))
 
     def _check_probe_timeout_locked(self, pivot, now):
-        probe = pivot["probe"]
-        pending_sent_ts = probe.get("pending_sent_ts")
-        pending_deadline_ts = probe.get("pending_deadline_ts")
+        probe = pivot.probe
+        pending_sent_ts = probe.pending_sent_ts
+        pending_deadline_ts = probe.pending_deadline_ts
         if pending_sent_ts is None or pending_deadline_ts is None:
             return False
 
         if now <= pending_deadline_ts:
             return False
 
-        probe["pending_sent_ts"] = None
-        probe["pending_deadline_ts"] = None
-        probe["timeout_streak"] = int(probe.get("timeout_streak", 0)) + 1
-        probe["last_result"] = "timeout"
+        probe.pending_sent_ts = None
+        probe.pending_deadline_ts = None
+        probe.timeout_streak = int(probe.timeout_streak) + 1
+        probe.last_result = "timeout"
 
         timeout_event = {
             "type": "timeout",
@@ -2888,28 +3505,28 @@ class TelemetryStore:
             "sent_ts": pending_sent_ts,
             "sent_at": _ts_to_str(pending_sent_ts),
         }
-        probe["events"].append(timeout_event)
-        if len(probe["events"]) > self.max_events_per_pivot:
-            probe["events"] = probe["events"][-self.max_events_per_pivot :]
-        self.persistence.insert_probe_event(pivot.get("pivot_id"), pivot.get("session_id"), timeout_event)
+        probe.events.append(timeout_event)
+        if len(probe.events) > self.max_events_per_pivot:
+            probe.events = probe.events[-self.max_events_per_pivot :]
+        self.persistence.insert_probe_event(pivot.pivot_id, pivot.session_id, timeout_event)
 
         self._record_timeline_locked(
             pivot,
             event_type="probe_timeout",
-            topic=pivot["pivot_id"],
+            topic=pivot.pivot_id,
             ts=now,
             summary="Probe #11$ sem resposta dentro da janela esperada.",
             details={
                 "sent_ts": pending_sent_ts,
                 "deadline_ts": pending_deadline_ts,
             },
-            source_topic=pivot["pivot_id"],
+            source_topic=pivot.pivot_id,
         )
 
         self.log.warning(
             "Probe com timeout: pivot_id=%s streak=%s",
-            pivot["pivot_id"],
-            probe["timeout_streak"],
+            pivot.pivot_id,
+            probe.timeout_streak,
         )
         return True
 
@@ -2934,9 +3551,11 @@ class TelemetryStore:
         if isinstance(parsed_payload, dict) and parsed_payload and "parsed_payload" not in event_details:
             event_details["parsed_payload"] = parsed_payload
 
-        self._event_seq += 1
+        with self._registry_lock:
+            self._event_seq += 1
+            event_id = self._event_seq
         event = {
-            "id": self._event_seq,
+            "id": event_id,
             "ts": ts,
             "at": _ts_to_str(ts),
             "type": event_type,
@@ -2944,18 +3563,55 @@ class TelemetryStore:
             "summary": summary,
             "details": event_details,
         }
-        pivot["timeline"].append(event)
-        if len(pivot["timeline"]) > self.max_events_per_pivot:
-            pivot["timeline"] = pivot["timeline"][-self.max_events_per_pivot :]
+        pivot.timeline.append(event_id, ts, event_type, topic, summary, event_details)
 
         self.persistence.insert_connectivity_event(
-            pivot.get("pivot_id"),
-            pivot.get("session_id"),
+            pivot.pivot_id,
+            pivot.session_id,
             event,
             source_topic=source_topic,
             raw_payload=raw_payload,
             parsed_payload=parsed_payload,
         )
+        rollup_state = self._rollup_state_locked(pivot)
+        if rollup_state is not None:
+            record_connectivity_message(
+                self._rollups,
+                rollup_state,
+                pivot.pivot_id,
+                rollup_state["session_id"],
+                ts,
+                topic,
+                self._rollup_threshold_locked(pivot),
+                counted=bool(str(source_topic or "").strip()),
+            )
+
+    def _rollup_state_locked(self, pivot):
+        session_id = str(pivot.session_id or "").strip()
+        if not session_id:
+            return None
+        state = pivot.rollup
+        if not isinstance(state, dict) or state.get("session_id") != session_id:
+            state = {"session_id": session_id, "cursor_ts": None, "covered_until_ts": None}
+            pivot.rollup = state
+        return state
+
+    def _rollup_threshold_locked(self, pivot):
+        threshold_sec = _safe_float(pivot.rollup_threshold_sec, None)
+        if threshold_sec is None or threshold_sec <= 0:
+            threshold_sec = self.ping_expected_sec * self.tolerance_factor
+        return threshold_sec
+
+    def _advance_rollup_locked(self, pivot, now):
+        state = pivot.rollup
+        if not isinstance(state, dict) or state.get("session_id") != str(pivot.session_id or "").strip():
+            return
+        advance_connectivity(self._rollups, state, pivot.pivot_id, state["session_id"], now)
+
+    def _flush_rollups_locked(self, now):
+        if not len(self._rollups):
+            return 0
+        return self.persistence.apply_rollup_rows(self._rollups.drain(), updated_at_ts=now)
 
     def _record_malformed_locked(self, topic, payload, reason, ts):
         excerpt = payload[:240]
@@ -2966,9 +3622,10 @@ class TelemetryStore:
             "reason": reason,
             "payload_excerpt": excerpt,
         }
-        self.malformed_messages.append(info)
-        if len(self.malformed_messages) > 500:
-            self.malformed_messages = self.malformed_messages[-500:]
+        with self._registry_lock:
+            self.malformed_messages.append(info)
+            if len(self.malformed_messages) > 500:
+                self.malformed_messages = self.malformed_messages[-500:]
 
         self.log.warning(
             "Payload malformado descartado: topic=%s reason=%s payload=%s",
@@ -3001,44 +3658,51 @@ class TelemetryStore:
 
     def _cleanup_pending_ping_locked(self, now):
         cutoff = now - self.retention_sec
-        keep = {}
-        for pivot_id, entry in self.pending_ping_unknown.items():
-            last_seen_ts = _safe_float(entry.get("last_seen_ts"), 0)
-            if last_seen_ts >= cutoff:
-                keep[pivot_id] = entry
-        self.pending_ping_unknown = keep
+        with self._registry_lock:
+            keep = {}
+            for pivot_id, entry in self.pending_ping_unknown.items():
+                last_seen_ts = _safe_float(entry.get("last_seen_ts"), 0)
+                if last_seen_ts >= cutoff:
+                    keep[pivot_id] = entry
+            self.pending_ping_unknown = keep
 
     def _prune_pivot_locked(self, pivot, now):
         cutoff = now - self.retention_sec
         changed = False
 
-        timeline = [event for event in pivot["timeline"] if _safe_float(event.get("ts"), 0) >= cutoff]
-        if len(timeline) != len(pivot["timeline"]):
+        if pivot.timeline.prune_before(cutoff):
             changed = True
-        pivot["timeline"] = timeline
 
-        cloud2_events = [event for event in pivot["cloud2_events"] if _safe_float(event.get("ts"), 0) >= cutoff]
-        if len(cloud2_events) != len(pivot["cloud2_events"]):
+        cloud2_events = [event for event in pivot.cloud2_events if _safe_float(event.get("ts"), 0) >= cutoff]
+        if len(cloud2_events) != len(pivot.cloud2_events):
             changed = True
-        pivot["cloud2_events"] = cloud2_events
+        pivot.cloud2_events = cloud2_events
 
-        ping_rssi_points = [event for event in pivot["ping_rssi_points"] if _safe_float(event.get("ts"), 0) >= cutoff]
-        if len(ping_rssi_points) != len(pivot["ping_rssi_points"]):
+        if pivot.ping_rssi_points.prune_before(cutoff):
             changed = True
-        pivot["ping_rssi_points"] = ping_rssi_points
 
-        drop_events = [event for event in pivot["drop_events"] if _safe_float(event.get("ts"), 0) >= cutoff]
-        if len(drop_events) != len(pivot["drop_events"]):
+        drop_events = [event for event in pivot.drop_events if _safe_float(event.get("ts"), 0) >= cutoff]
+        if len(drop_events) != len(pivot.drop_events):
             changed = True
-        pivot["drop_events"] = drop_events
+        pivot.drop_events = drop_events
 
-        probe = pivot["probe"]
-        probe_events = [event for event in probe["events"] if _safe_float(event.get("ts"), 0) >= cutoff]
-        if len(probe_events) != len(probe["events"]):
+        probe = pivot.probe
+        probe_events = [event for event in probe.events if _safe_float(event.get("ts"), 0) >= cutoff]
+        if len(probe_events) != len(probe.events):
             changed = True
-        probe["events"] = probe_events
+        probe.events = probe_events
         return changed
 
+    def _connectivity_tracker_locked(self, pivot):
+        pivot_id = pivot.pivot_id
+        tracker = self._connectivity_trackers.get(pivot_id)
+        if tracker is None:
+            tracker = OnlineIntervalTracker(CONNECTIVITY_TOPICS)
+            with self._registry_lock:
+                self._connectivity_trackers[pivot_id] = tracker
+        tracker.sync(pivot.timeline)
+        return tracker
+
     def _compute_disconnected_pct_locked(self, pivot, now, disconnect_threshold_sec):
         if disconnect_threshold_sec is None or disconnect_threshold_sec <= 0:
             return None
@@ -3048,52 +3712,8 @@ class TelemetryStore:
             return None
 
         start_ts = now - window_sec
-        min_relevant_ts = start_ts - disconnect_threshold_sec
-
-        message_ts = []
-        for event in pivot.get("timeline", []):
-            topic = str(event.get("topic") or "")
-            if topic not in CONNECTIVITY_TOPICS:
-                continue
-            ts = _safe_float(event.get("ts"), None)
-            if ts is None:
-                continue
-            if ts > now or ts < min_relevant_ts:
-                continue
-            message_ts.append(ts)
-
-        if not message_ts:
-            return 100.0
-
-        message_ts = sorted(set(message_ts))
-
-        connected_sec = 0.0
-        current_start = None
-        current_end = None
-
-        for ts in message_ts:
-            seg_start = max(start_ts, ts)
-            seg_end = min(now, ts + disconnect_threshold_sec)
-            if seg_end <= seg_start:
-                continue
-
-            if current_start is None:
-                current_start = seg_start
-                current_end = seg_end
-                continue
-
-            if seg_start <= current_end:
-                if seg_end > current_end:
-                    current_end = seg_end
-                continue
-
-            connected_sec += current_end - current_start
-            current_start = seg_start
-            current_end = seg_end
-
-        if current_start is not None:
-            connected_sec += current_end - current_start
-
+        tracker = self._connectivity_tracker_locked(pivot)
+        connected_sec = tracker.connected_seconds(start_ts, now, disconnect_threshold_sec)
         connected_sec = max(0.0, min(float(window_sec), connected_sec))
         disconnected_sec = max(0.0, float(window_sec) - connected_sec)
         return (disconnected_sec / float(window_sec)) * 100.0
@@ -3108,16 +3728,10 @@ class TelemetryStore:
         if end_ts is None:
             return []
 
-        min_timeline_ts = None
-        for event in pivot.get("timeline", []):
-            if not isinstance(event, dict):
-                continue
-            event_ts = _safe_float(event.get("ts"), None)
-            if event_ts is None or event_ts <= 0 or event_ts > end_ts:
-                continue
-            if min_timeline_ts is None or event_ts < min_timeline_ts:
-                min_timeline_ts = event_ts
-
+        tracker = self._connectivity_tracker_locked(pivot)
+        min_timeline_ts = tracker.min_event_ts()
+        if min_timeline_ts is not None and min_timeline_ts > end_ts:
+            min_timeline_ts = None
         if min_timeline_ts is None:
             min_timeline_ts = max(0.0, end_ts - TIMELINE_MINI_EMPTY_FALLBACK_SEC)
 
@@ -3129,50 +3743,11 @@ class TelemetryStore:
         if start_ts >= end_ts:
             return []
 
-        min_relevant_ts = start_ts - threshold_sec
-        message_ts = []
-        for event in pivot.get("timeline", []):
-            if not isinstance(event, dict):
-                continue
-            topic = str(event.get("topic") or "")
-            if topic not in CONNECTIVITY_TOPICS:
-                continue
-            ts = _safe_float(event.get("ts"), None)
-            if ts is None:
-                continue
-            if ts < min_relevant_ts or ts > end_ts:
-                continue
-            message_ts.append(ts)
-
         total_duration = end_ts - start_ts
         if total_duration <= 0:
             return []
 
-        if not message_ts:
-            return [{"state": "offline", "ratio": 1.0}]
-
-        message_ts = sorted(set(message_ts))
-        online_intervals = []
-        current_start = None
-        current_end = None
-        for ts in message_ts:
-            interval_start = max(start_ts, ts)
-            interval_end = min(end_ts, ts + threshold_sec)
-            if interval_end <= interval_start:
-                continue
-            if current_start is None:
-                current_start = interval_start
-                current_end = interval_end
-                continue
-            if interval_start <= current_end:
-                current_end = max(current_end, interval_end)
-                continue
-            online_intervals.append((current_start, current_end))
-            current_start = interval_start
-            current_end = interval_end
-        if current_start is not None:
-            online_intervals.append((current_start, current_end))
-
+        online_intervals = tracker.online_intervals(start_ts, end_ts, threshold_sec)
         if not online_intervals:
             return [{"state": "offline", "ratio": 1.0}]
 
@@ -3263,11 +3838,11 @@ class TelemetryStore:
         return compressed
 
     def _compute_status_locked(self, pivot, now):
-        topic_last_ts = pivot.get("topic_last_ts") or {}
-        topic_intervals = pivot.get("topic_intervals_sec") or {}
+        topic_last_ts = pivot.topic_last_ts or {}
+        topic_intervals = pivot.topic_intervals_sec or {}
 
-        last_ping_ts = _safe_float(pivot.get("last_ping_ts"), None)
-        last_cloudv2_ts = _safe_float(pivot.get("last_cloudv2_ts"), None)
+        last_ping_ts = _safe_float(pivot.last_ping_ts, None)
+        last_cloudv2_ts = _safe_float(pivot.last_cloudv2_ts, None)
 
         ping_window = self.ping_expected_sec * self.tolerance_factor
         ping_ok = False
@@ -3279,16 +3854,16 @@ class TelemetryStore:
         cloudv2_intervals = (
             topic_intervals.get(TOPIC_CLOUDV2)
             if isinstance(topic_intervals.get(TOPIC_CLOUDV2), list)
-            else pivot.get("cloudv2_intervals_sec", [])
+            else pivot.cloudv2_intervals_sec
         ) or []
-        cloudv2_interval_stats = self._compute_cloudv2_interval_stats_locked(cloudv2_intervals)
+        cloudv2_interval_stats = self._compute_cloudv2_interval_stats_locked(pivot, cloudv2_intervals)
         sample_count = int(cloudv2_interval_stats["sample_count"] or 0)
         median_interval_sec = cloudv2_interval_stats["median_interval_sec"]
-        latched_ready = bool(pivot.get("median_latched_ready"))
-        latched_interval = _safe_float(pivot.get("median_latched_interval_sec"), None)
+        latched_ready = bool(pivot.median_latched_ready)
+        latched_interval = _safe_float(pivot.median_latched_interval_sec, None)
         if median_interval_sec is not None and sample_count >= self.cloudv2_min_samples:
-            pivot["median_latched_ready"] = True
-            pivot["median_latched_interval_sec"] = median_interval_sec
+            pivot.median_latched_ready = True
+            pivot.median_latched_interval_sec = median_interval_sec
             latched_ready = True
             latched_interval = median_interval_sec
         elif (
@@ -3365,17 +3940,11 @@ class TelemetryStore:
         has_aux_payload_in_window = False
         if attention_window_sec > 0:
             start_ts = now - attention_window_sec
-            for event in pivot.get("timeline", []):
-                topic = str(event.get("topic") or "")
-                if topic not in CONNECTIVITY_TOPICS:
-                    continue
-                ts = _safe_float(event.get("ts"), None)
-                if ts is None or ts < start_ts or ts > now:
-                    continue
-                if topic == TOPIC_CLOUDV2:
-                    has_principal_payload_in_window = True
-                elif topic in (TOPIC_PING, TOPIC_NETWORK, TOPIC_INFO):
-                    has_aux_payload_in_window = True
+            tracker = self._connectivity_tracker_locked(pivot)
+            has_principal_payload_in_window = tracker.has_topic_between(TOPIC_CLOUDV2, start_ts, now)
+            has_aux_payload_in_window = any(
+                tracker.has_topic_between(topic, start_ts, now) for topic in (TOPIC_PING, TOPIC_NETWORK, TOPIC_INFO)
+            )
 
         attention_by_only_aux_topics = (not has_principal_payload_in_window) and has_aux_payload_in_window
 
@@ -3466,7 +4035,9 @@ class TelemetryStore:
 
     def _refresh_status_locked(self, pivot, now):
         computed = self._compute_status_locked(pivot, now)
-        cached = pivot.get("status_cache", {})
+        self._remember_status_locked(pivot, now, computed)
+        pivot.rollup_threshold_sec = computed.get("disconnect_threshold_sec")
+        cached = pivot.status_cache
         previous_code = cached.get("code")
         previous_reason = cached.get("reason")
         previous_quality_code = cached.get("quality_code")
@@ -3481,7 +4052,7 @@ class TelemetryStore:
         if not changed:
             return False
 
-        pivot["status_cache"] = {
+        pivot.status_cache = {
             "code": computed["code"],
             "reason": computed["reason"],
             "quality_code": computed["quality_code"],
@@ -3492,7 +4063,7 @@ class TelemetryStore:
         if previous_code != computed["code"]:
             self.log.info(
                 "Mudanca de estado: pivot_id=%s %s -> %s (%s)",
-                pivot["pivot_id"],
+                pivot.pivot_id,
                 previous_code or "-",
                 computed["code"],
                 computed["reason"],
@@ -3501,7 +4072,7 @@ class TelemetryStore:
         if previous_quality_code != computed["quality_code"]:
             self.log.info(
                 "Mudanca de qualidade: pivot_id=%s %s -> %s (%s)",
-                pivot["pivot_id"],
+                pivot.pivot_id,
                 previous_quality_code or "-",
                 computed["quality_code"],
                 computed["quality_reason"],
@@ -3527,13 +4098,29 @@ class TelemetryStore:
         }
 
     def _build_state_snapshot_locked(self, now):
-        pivots = [
-            self._build_pivot_summary_locked(pivot, now)
-            for _, pivot in sorted(self.pivots.items(), key=lambda item: item[0].lower())
-        ]
+        # Geracao lida antes dos resumos: mudancas durante a montagem voltam
+        # no proximo delta em vez de se perderem.
+        generation = self.get_change_generation()
+        pivots = []
+        for pivot_id, pivot in self._pivot_view:
+            with self._pivot_lock_for(pivot_id):
+                pivots.append(self._build_pivot_summary_locked(pivot, now))
+
+        payload = self._build_state_header_locked(now, len(pivots))
+        payload["generation"] = generation
+        payload["pivots"] = pivots
+        return payload
+
+    def _build_state_header_locked(self, now, pivot_count):
+        # Tudo do /api/state menos a lista de pivos (compartilhado com os deltas).
+        with self._registry_lock:
+            pending_items = sorted(self.pending_ping_unknown.items(), key=lambda item: item[0].lower())
+            malformed_items = list(self.malformed_messages[-50:])
+            malformed_count = len(self.malformed_messages)
+            duplicate_count = self.duplicate_count
 
         pending_ping = []
-        for pivot_id, entry in sorted(self.pending_ping_unknown.items(), key=lambda item: item[0].lower()):
+        for pivot_id, entry in pending_items:
             pending_ping.append(
                 {
                     "pivot_id": pivot_id,
@@ -3556,7 +4143,7 @@ class TelemetryStore:
                 "reason": item.get("reason"),
                 "payload_excerpt": item.get("payload_excerpt"),
             }
-            for item in self.malformed_messages[-50:]
+            for item in malformed_items
         ]
 
         run_info = None
@@ -3576,20 +4163,19 @@ class TelemetryStore:
             "require_apply_to_start": bool(self.require_apply_to_start),
             "settings": self._build_state_settings_locked(),
             "counts": {
-                "pivots": len(pivots),
+                "pivots": pivot_count,
                 "pending_ping_unknown": len(pending_ping),
                 "expected_pivots_pending": len(expected_pivots_pending),
-                "malformed_messages": len(self.malformed_messages),
-                "duplicate_drops": self.duplicate_count,
+                "malformed_messages": malformed_count,
+                "duplicate_drops": duplicate_count,
             },
-            "pivots": pivots,
             "pending_ping": pending_ping,
             "expected_pivots_pending": expected_pivots_pending,
             "malformed_recent": malformed_recent,
         }
 
     def _summarize_probe_stats_locked(self, probe):
-        events = probe.get("events")
+        events = probe.events
         if not isinstance(events, list):
             events = []
 
@@ -3665,21 +4251,62 @@ class TelemetryStore:
             )
         return points
 
+    def _touch_pivot_locked(self, pivot):
+        pivot_id = pivot.pivot_id
+        self._pivot_versions[pivot_id] = self._pivot_versions.get(pivot_id, 0) + 1
+        self._record_pivot_change_locked(pivot_id)
+
+    def _summary_memo_entry_locked(self, pivot, now):
+        # Entrada valida para (pivo, versao, balde de tempo) ou None. Campos
+        # que dependem do relogio (idades, % desconectado, mini timeline)
+        # ficam no maximo um balde atrasados.
+        if self.summary_cache_bucket_sec <= 0:
+            return None
+        pivot_id = pivot.pivot_id
+        version = self._pivot_versions.get(pivot_id, 0)
+        bucket = int(now // self.summary_cache_bucket_sec)
+        entry = self._summary_memo.get(pivot_id)
+        if entry is None or entry["pivot"] is not pivot or entry["version"] != version or entry["bucket"] != bucket:
+            entry = {"pivot": pivot, "version": version, "bucket": bucket, "status": None, "summary": None}
+            self._summary_memo[pivot_id] = entry
+        return entry
+
+    def _remember_status_locked(self, pivot, now, status):
+        entry = self._summary_memo_entry_locked(pivot, now)
+        if entry is not None and entry["status"] is None:
+            entry["status"] = status
+
     def _build_pivot_summary_locked(self, pivot, now):
-        status = self._compute_status_locked(pivot, now)
-        probe = pivot["probe"]
+        entry = self._summary_memo_entry_locked(pivot, now)
+        if entry is None:
+            return self._compute_pivot_summary_locked(pivot, now, None)
+        summary = entry["summary"]
+        with self._registry_lock:
+            if summary is None:
+                self._summary_memo_misses += 1
+            else:
+                self._summary_memo_hits += 1
+        if summary is None:
+            summary = self._compute_pivot_summary_locked(pivot, now, entry["status"])
+            entry["summary"] = summary
+        return summary
+
+    def _compute_pivot_summary_locked(self, pivot, now, status):
+        if status is None:
+            status = self._compute_status_locked(pivot, now)
+        probe = pivot.probe
         probe_stats = self._summarize_probe_stats_locked(probe)
-        modem_reset = pivot.get("modem_reset")
+        modem_reset = pivot.modem_reset
         if not isinstance(modem_reset, dict):
             modem_reset = {}
-        is_concentrator = bool(pivot.get("is_concentrator"))
-        source_last_cloud2 = pivot.get("last_cloud2")
+        is_concentrator = bool(pivot.is_concentrator)
+        source_last_cloud2 = pivot.last_cloud2
         last_cloud2 = dict(source_last_cloud2) if isinstance(source_last_cloud2, dict) else {}
         if is_concentrator:
             last_cloud2["technology"] = CONCENTRATOR_TECH_LABEL
         signal = _normalize_text(last_cloud2.get("rssi"))
         technology = _normalize_text(last_cloud2.get("technology"))
-        combined_signal_technology = _normalize_text(pivot.get("signal_technology"))
+        combined_signal_technology = _normalize_text(pivot.signal_technology)
         if combined_signal_technology:
             parsed_signal, parsed_technology = _parse_signal_technology_combined(combined_signal_technology)
             if not signal and parsed_signal:
@@ -3693,16 +4320,16 @@ class TelemetryStore:
         signal_technology = f"{signal or '-'} / {technology or '-'}"
         last_activity_ts = max(
             [
-                _safe_float(pivot.get("last_seen_ts"), 0) or 0,
-                _safe_float(pivot.get("last_ping_ts"), 0) or 0,
-                _safe_float(pivot.get("last_cloudv2_ts"), 0) or 0,
-                _safe_float(pivot.get("last_cloud2_ts"), 0) or 0,
-                _safe_float(probe.get("last_sent_ts"), 0) or 0,
-                _safe_float(probe.get("last_response_ts"), 0) or 0,
+                _safe_float(pivot.last_seen_ts, 0) or 0,
+                _safe_float(pivot.last_ping_ts, 0) or 0,
+                _safe_float(pivot.last_cloudv2_ts, 0) or 0,
+                _safe_float(pivot.last_cloud2_ts, 0) or 0,
+                _safe_float(probe.last_sent_ts, 0) or 0,
+                _safe_float(probe.last_response_ts, 0) or 0,
             ]
         )
 
-        probe_alert = int(probe.get("timeout_streak", 0)) >= self.probe_timeout_streak_alert
+        probe_alert = int(probe.timeout_streak) >= self.probe_timeout_streak_alert
         timeline_mini = self._build_timeline_mini_segments_locked(
             pivot,
             now,
@@ -3711,13 +4338,13 @@ class TelemetryStore:
         )
 
         return {
-            "pivot_id": pivot["pivot_id"],
-            "pivot_slug": pivot["pivot_slug"],
-            "session_id": pivot.get("session_id"),
-            "run_id": pivot.get("run_id"),
+            "pivot_id": pivot.pivot_id,
+            "pivot_slug": pivot.pivot_slug,
+            "session_id": pivot.session_id,
+            "run_id": pivot.run_id,
             "is_concentrator": is_concentrator,
-            "latitude": _safe_float(pivot.get("latitude"), None),
-            "longitude": _safe_float(pivot.get("longitude"), None),
+            "latitude": _safe_float(pivot.latitude, None),
+            "longitude": _safe_float(pivot.longitude, None),
             "flags": {
                 "online": status["online"],
                 "offline": status["offline"],
@@ -3757,10 +4384,10 @@ class TelemetryStore:
             "last_monitored_message_at": _ts_to_str(status["last_monitored_message_ts"]),
             "last_monitored_message_age_sec": status["last_monitored_message_age_sec"],
             "expected_by_topic_sec": status["expected_by_topic_sec"],
-            "last_ping_ts": pivot.get("last_ping_ts"),
-            "last_ping_at": _ts_to_str(pivot.get("last_ping_ts")),
-            "last_cloudv2_ts": pivot.get("last_cloudv2_ts"),
-            "last_cloudv2_at": _ts_to_str(pivot.get("last_cloudv2_ts")),
+            "last_ping_ts": pivot.last_ping_ts,
+            "last_ping_at": _ts_to_str(pivot.last_ping_ts),
+            "last_cloudv2_ts": pivot.last_cloudv2_ts,
+            "last_cloudv2_at": _ts_to_str(pivot.last_cloudv2_ts),
             "last_cloud2": last_cloud2,
             "signal": signal,
             "technology": technology,
@@ -3769,19 +4396,19 @@ class TelemetryStore:
             "last_activity_ts": last_activity_ts if last_activity_ts > 0 else None,
             "last_activity_at": _ts_to_str(last_activity_ts) if last_activity_ts > 0 else "-",
             "last_activity_ago": _format_ago(now - last_activity_ts) if last_activity_ts > 0 else "-",
-            "topic_counters": dict(pivot.get("topic_counters", {})),
+            "topic_counters": dict(pivot.topic_counters),
             "probe": {
-                "enabled": bool(probe.get("enabled")),
-                "interval_sec": int(probe.get("interval_sec", self.probe_default_interval_sec)),
-                "last_sent_ts": probe.get("last_sent_ts"),
-                "last_sent_at": _ts_to_str(probe.get("last_sent_ts")),
-                "last_response_ts": probe.get("last_response_ts"),
-                "last_response_at": _ts_to_str(probe.get("last_response_ts")),
-                "pending": probe.get("pending_sent_ts") is not None,
-                "pending_deadline_ts": probe.get("pending_deadline_ts"),
-                "pending_deadline_at": _ts_to_str(probe.get("pending_deadline_ts")),
-                "timeout_streak": int(probe.get("timeout_streak", 0)),
-                "last_result": probe.get("last_result"),
+                "enabled": bool(probe.enabled),
+                "interval_sec": int(probe.interval_sec),
+                "last_sent_ts": probe.last_sent_ts,
+                "last_sent_at": _ts_to_str(probe.last_sent_ts),
+                "last_response_ts": probe.last_response_ts,
+                "last_response_at": _ts_to_str(probe.last_response_ts),
+                "pending": probe.pending_sent_ts is not None,
+                "pending_deadline_ts": probe.pending_deadline_ts,
+                "pending_deadline_at": _ts_to_str(probe.pending_deadline_ts),
+                "timeout_streak": int(probe.timeout_streak),
+                "last_result": probe.last_result,
                 "alert": probe_alert,
                 "sent_count": int(probe_stats["sent_count"]),
                 "response_count": int(probe_stats["response_count"]),
@@ -3808,42 +4435,87 @@ class TelemetryStore:
             },
         }
 
-    def _build_pivot_snapshot_locked(self, pivot, now):
-        summary = self._build_pivot_summary_locked(pivot, now)
+    def _count_drops_locked(self, pivot, now, window_sec):
+        # Pelos rollups da sessao (nao limitados por max_events_per_pivot), com
+        # resolucao de uma hora: a hora parcial mais antiga da janela fica de
+        # fora. Sem sessao ou sem banco, conta a lista em memoria.
+        session_id = str(pivot.session_id or "").strip()
+        if session_id:
+            try:
+                self._flush_rollups_locked(now)
+                totals = self.persistence.summarize_rollups(
+                    pivot.pivot_id,
+                    now - window_sec,
+                    rollup_bucket_end(rollup_bucket_start(now, ROLLUP_HOURLY), ROLLUP_HOURLY),
+                    session_id=session_id,
+                )
+            except RuntimeError:
+                totals = None
+            if totals is not None:
+                return int(totals["drop_count"])
+        return sum(1 for item in pivot.drop_events if _safe_float(item.get("ts"), 0) >= (now - window_sec))
 
-        drop_events = list(pivot.get("drop_events", []))
-        drops_24h = [item for item in drop_events if _safe_float(item.get("ts"), 0) >= (now - 86400)]
-        drops_7d = [item for item in drop_events if _safe_float(item.get("ts"), 0) >= (now - 604800)]
+    def _build_pivot_metrics_locked(self, pivot, summary, now):
+        drop_events = list(pivot.drop_events)
 
         last_drop = drop_events[-1] if drop_events else None
         summary_last_cloud2 = summary.get("last_cloud2") if isinstance(summary.get("last_cloud2"), dict) else None
-        last_cloud2 = dict(summary_last_cloud2) if isinstance(summary_last_cloud2, dict) else (pivot.get("last_cloud2") or {})
+        last_cloud2 = dict(summary_last_cloud2) if isinstance(summary_last_cloud2, dict) else (pivot.last_cloud2 or {})
         if not isinstance(last_cloud2, dict):
             last_cloud2 = {}
 
+        return {
+            "drops_24h": self._count_drops_locked(pivot, now, 86400),
+            "drops_7d": self._count_drops_locked(pivot, now, 604800),
+            "last_drop_duration_sec": (last_drop or {}).get("duration_sec"),
+            "last_drop_at": (last_drop or {}).get("at", "-"),
+            "last_rssi": last_cloud2.get("rssi"),
+            "last_technology": last_cloud2.get("technology"),
+            "last_firmware": last_cloud2.get("firmware"),
+            "last_cloud2_event_date": last_cloud2.get("event_date"),
+            "last_cloud2_at": last_cloud2.get("at", "-"),
+        }
+
+    def _build_pivot_snapshot_record_locked(self, pivot, now):
+        # Registro persistido: so resumo e metricas; series ficam nas tabelas de eventos.
+        summary = self._build_pivot_summary_locked(pivot, now)
+        return {
+            "pivot_id": pivot.pivot_id,
+            "pivot_slug": pivot.pivot_slug,
+            "session_id": pivot.session_id,
+            "run_id": str(pivot.run_id or self._active_run_id or "").strip() or None,
+            "updated_at": _ts_to_str(now),
+            "updated_at_ts": now,
+            "summary": summary,
+            "metrics": self._build_pivot_metrics_locked(pivot, summary, now),
+        }
+
+    def _build_pivot_snapshot_locked(self, pivot, now):
+        summary = self._build_pivot_summary_locked(pivot, now)
+
         timeline = sorted(
-            list(pivot.get("timeline", [])),
+            list(pivot.timeline),
             key=lambda item: _safe_float(item.get("ts"), 0),
             reverse=True,
         )
 
         probe_events = sorted(
-            list(pivot.get("probe", {}).get("events", [])),
+            list(pivot.probe.events),
             key=lambda item: _safe_float(item.get("ts"), 0),
             reverse=True,
         )
         probe_delay_points = self._build_probe_delay_points_locked(probe_events)
         rssi_series = sorted(
-            list(pivot.get("ping_rssi_points", [])),
+            list(pivot.ping_rssi_points),
             key=lambda item: _safe_float(item.get("ts"), 0),
         )
         session_info = self.persistence.resolve_session(
-            pivot["pivot_id"],
-            session_id=pivot.get("session_id"),
-            run_id=pivot.get("run_id"),
+            pivot.pivot_id,
+            session_id=pivot.session_id,
+            run_id=pivot.run_id,
         )
         run_id = str(
-            pivot.get("run_id")
+            pivot.run_id
             or (session_info or {}).get("run_id")
             or self._active_run_id
             or ""
@@ -3851,68 +4523,58 @@ class TelemetryStore:
         run_info = self.persistence.resolve_run(run_id=run_id) if run_id else None
 
         return {
-            "pivot_id": pivot["pivot_id"],
-            "pivot_slug": pivot["pivot_slug"],
-            "session_id": pivot.get("session_id"),
+            "pivot_id": pivot.pivot_id,
+            "pivot_slug": pivot.pivot_slug,
+            "session_id": pivot.session_id,
             "run_id": run_id,
             "run": run_info,
             "session": session_info,
             "updated_at": _ts_to_str(now),
             "updated_at_ts": now,
             "summary": summary,
-            "metrics": {
-                "drops_24h": len(drops_24h),
-                "drops_7d": len(drops_7d),
-                "last_drop_duration_sec": (last_drop or {}).get("duration_sec"),
-                "last_drop_at": (last_drop or {}).get("at", "-"),
-                "last_rssi": last_cloud2.get("rssi"),
-                "last_technology": last_cloud2.get("technology"),
-                "last_firmware": last_cloud2.get("firmware"),
-                "last_cloud2_event_date": last_cloud2.get("event_date"),
-                "last_cloud2_at": last_cloud2.get("at", "-"),
-            },
+            "metrics": self._build_pivot_metrics_locked(pivot, summary, now),
             "timeline": timeline,
             "probe_events": probe_events,
             "probe_delay_points": probe_delay_points,
             "hasRssi": bool(rssi_series),
             "rssiSeries": rssi_series,
             "cloud2_events": sorted(
-                list(pivot.get("cloud2_events", [])),
+                list(pivot.cloud2_events),
                 key=lambda item: _safe_float(item.get("ts"), 0),
                 reverse=True,
             ),
         }
 
     def _build_runtime_payload_locked(self, now):
-        payload = {
-            "version": 5,
-            "updated_at": _ts_to_str(now),
-            "updated_at_ts": now,
-            "event_seq": self._event_seq,
-            "active_run_id": self._active_run_id,
-            "monitoring_mode": self._monitoring_mode,
-            "probe_settings": self._probe_settings,
-            "pending_ping_unknown": self.pending_ping_unknown,
-            "pending_expected_pivots": self.pending_expected_pivots,
-            "malformed_messages": self.malformed_messages,
-            "duplicate_count": self.duplicate_count,
-            "pivots": self.pivots,
-        }
-
         # Garante serializacao JSON sem referencias compartilhadas mutaveis.
-        return json.loads(json.dumps(payload, ensure_ascii=False))
-
-    def _load_runtime_state(self):
-        if not os.path.exists(self.runtime_path):
-            return
-
-        try:
-            with open(self.runtime_path, "r", encoding="utf-8") as file:
-                loaded = json.load(file)
-        except (OSError, json.JSONDecodeError) as exc:
-            self.log.warning("Nao foi possivel restaurar runtime_store.json: %s", exc)
-            return
+        pivots = {}
+        for pivot_id, pivot in self._pivot_view:
+            with self._pivot_lock_for(pivot_id):
+                pivots[pivot_id] = json.loads(json.dumps(pivot.to_dict(), ensure_ascii=False))
+
+        payload = self._build_runtime_meta_locked(now)
+        payload["pivots"] = pivots
+        return payload
+
+    def _build_runtime_meta_locked(self, now):
+        # Estado global do runtime (tudo menos os pivos), copiado.
+        with self._registry_lock:
+            payload = {
+                "version": 5,
+                "updated_at": _ts_to_str(now),
+                "updated_at_ts": now,
+                "event_seq": self._event_seq,
+                "active_run_id": self._active_run_id,
+                "monitoring_mode": self._monitoring_mode,
+                "probe_settings": self._probe_settings,
+                "pending_ping_unknown": self.pending_ping_unknown,
+                "pending_expected_pivots": self.pending_expected_pivots,
+                "malformed_messages": self.malformed_messages,
+                "duplicate_count": self.duplicate_count,
+            }
+            return json.loads(json.dumps(payload, ensure_ascii=False))
 
+    def _load_runtime_state(self, loaded):
         if not isinstance(loaded, dict):
             return
 
@@ -3947,28 +4609,28 @@ class TelemetryStore:
                     )
                     raw_is_concentrator = raw_pivot.get("is_concentrator")
                     if isinstance(raw_is_concentrator, bool):
-                        pivot["is_concentrator"] = raw_is_concentrator
+                        pivot.is_concentrator = raw_is_concentrator
                     elif isinstance(raw_is_concentrator, (int, float)):
-                        pivot["is_concentrator"] = bool(raw_is_concentrator)
+                        pivot.is_concentrator = bool(raw_is_concentrator)
                     elif isinstance(raw_is_concentrator, str):
                         normalized_flag = raw_is_concentrator.strip().lower()
                         if normalized_flag in ("1", "true", "yes", "sim"):
-                            pivot["is_concentrator"] = True
+                            pivot.is_concentrator = True
                         elif normalized_flag in ("0", "false", "no", "nao", "não"):
-                            pivot["is_concentrator"] = False
+                            pivot.is_concentrator = False
 
                     raw_latitude = _safe_float(raw_pivot.get("latitude"), None)
                     raw_longitude = _safe_float(raw_pivot.get("longitude"), None)
                     if raw_latitude is not None:
-                        pivot["latitude"] = raw_latitude
+                        pivot.latitude = raw_latitude
                     if raw_longitude is not None:
-                        pivot["longitude"] = raw_longitude
+                        pivot.longitude = raw_longitude
                     if raw_latitude is None or raw_longitude is None:
                         persisted_coordinates = self._load_pivot_coordinates_locked(normalized_pivot_id)
                         if raw_latitude is None:
-                            pivot["latitude"] = persisted_coordinates["latitude"]
+                            pivot.latitude = persisted_coordinates["latitude"]
                         if raw_longitude is None:
-                            pivot["longitude"] = persisted_coordinates["longitude"]
+                            pivot.longitude = persisted_coordinates["longitude"]
 
                     for field in (
                         "last_seen_ts",
@@ -3983,12 +4645,12 @@ class TelemetryStore:
                     topic_counters = raw_pivot.get("topic_counters")
                     if isinstance(topic_counters, dict):
                         for topic in self.monitor_topics:
-                            pivot["topic_counters"][topic] = int(topic_counters.get(topic, 0))
+                            pivot.topic_counters[topic] = int(topic_counters.get(topic, 0))
 
                     raw_topic_last = raw_pivot.get("topic_last_ts")
                     if isinstance(raw_topic_last, dict):
                         for topic in CONNECTIVITY_TOPICS:
-                            pivot["topic_last_ts"][topic] = _safe_float(raw_topic_last.get(topic), None)
+                            pivot.topic_last_ts[topic] = _safe_float(raw_topic_last.get(topic), None)
 
                     raw_topic_intervals = raw_pivot.get("topic_intervals_sec")
                     if isinstance(raw_topic_intervals, dict):
@@ -4001,7 +4663,7 @@ class TelemetryStore:
                                 parsed_interval = _safe_float(item, None)
                                 if parsed_interval is not None and parsed_interval > 0:
                                     cleaned.append(parsed_interval)
-                            pivot["topic_intervals_sec"][topic] = cleaned[-self.cloudv2_window :]
+                            pivot.topic_intervals_sec[topic] = cleaned[-self.cloudv2_window :]
 
                     intervals = raw_pivot.get("cloudv2_intervals_sec")
                     if isinstance(intervals, list):
@@ -4010,49 +4672,61 @@ class TelemetryStore:
                             parsed = _safe_float(item, None)
                             if parsed is not None and parsed > 0:
                                 cleaned_intervals.append(parsed)
-                        pivot["cloudv2_intervals_sec"] = cleaned_intervals[-self.cloudv2_window :]
+                        pivot.cloudv2_intervals_sec = cleaned_intervals[-self.cloudv2_window :]
 
                     # Compatibilidade entre estado legado e estrutura por topico.
-                    if not pivot["topic_intervals_sec"].get(TOPIC_CLOUDV2):
-                        pivot["topic_intervals_sec"][TOPIC_CLOUDV2] = list(pivot["cloudv2_intervals_sec"])
+                    if not pivot.topic_intervals_sec.get(TOPIC_CLOUDV2):
+                        pivot.topic_intervals_sec[TOPIC_CLOUDV2] = list(pivot.cloudv2_intervals_sec)
                     else:
-                        pivot["cloudv2_intervals_sec"] = list(pivot["topic_intervals_sec"][TOPIC_CLOUDV2])
-                    if pivot.get("last_cloudv2_ts") is not None:
-                        pivot["topic_last_ts"][TOPIC_CLOUDV2] = _safe_float(pivot.get("last_cloudv2_ts"), None)
-                    if pivot.get("last_ping_ts") is not None:
-                        pivot["topic_last_ts"][TOPIC_PING] = _safe_float(pivot.get("last_ping_ts"), None)
+                        pivot.cloudv2_intervals_sec = list(pivot.topic_intervals_sec[TOPIC_CLOUDV2])
+                    if pivot.last_cloudv2_ts is not None:
+                        pivot.topic_last_ts[TOPIC_CLOUDV2] = _safe_float(pivot.last_cloudv2_ts, None)
+                    if pivot.last_ping_ts is not None:
+                        pivot.topic_last_ts[TOPIC_PING] = _safe_float(pivot.last_ping_ts, None)
 
                     last_cloud2 = raw_pivot.get("last_cloud2")
                     if isinstance(last_cloud2, dict):
-                        pivot["last_cloud2"] = last_cloud2
+                        pivot.last_cloud2 = last_cloud2
 
-                    for list_field in ("cloud2_events", "ping_rssi_points", "drop_events", "timeline"):
+                    for list_field in ("cloud2_events", "drop_events"):
                         raw_list = raw_pivot.get(list_field)
                         if isinstance(raw_list, list):
                             pivot[list_field] = raw_list[-self.max_events_per_pivot :]
+                    for ring_field in ("timeline", "ping_rssi_points"):
+                        raw_list = raw_pivot.get(ring_field)
+                        if isinstance(raw_list, RingColumns):
+                            try:
+                                raw_list.load_into(pivot[ring_field])
+                            except (ValueError, KeyError, TypeError) as exc:
+                                self.log.warning(
+                                    "Checkpoint de %s (%s) ignorado: %s", ring_field, normalized_pivot_id, exc
+                                )
+                                pivot[ring_field].clear()
+                        elif isinstance(raw_list, list):
+                            pivot[ring_field].extend(raw_list[-self.max_events_per_pivot :])
 
                     raw_probe = raw_pivot.get("probe")
                     if isinstance(raw_probe, dict):
-                        probe = pivot["probe"]
-                        probe["enabled"] = bool(raw_probe.get("enabled", probe["enabled"]))
-                        probe_interval = _safe_int(raw_probe.get("interval_sec"), probe["interval_sec"])
+                        probe = pivot.probe
+                        probe.enabled = bool(raw_probe.get("enabled", probe.enabled))
+                        probe_interval = _safe_int(raw_probe.get("interval_sec"), probe.interval_sec)
                         if probe_interval is not None and probe_interval >= self.probe_min_interval_sec:
-                            probe["interval_sec"] = probe_interval
-                        probe["last_sent_ts"] = _safe_float(raw_probe.get("last_sent_ts"), None)
-                        probe["last_response_ts"] = _safe_float(raw_probe.get("last_response_ts"), None)
-                        probe["pending_sent_ts"] = _safe_float(raw_probe.get("pending_sent_ts"), None)
-                        probe["pending_deadline_ts"] = _safe_float(raw_probe.get("pending_deadline_ts"), None)
-                        probe["timeout_streak"] = _safe_int(raw_probe.get("timeout_streak"), 0) or 0
-                        probe["last_result"] = raw_probe.get("last_result")
+                            probe.interval_sec = probe_interval
+                        probe.last_sent_ts = _safe_float(raw_probe.get("last_sent_ts"), None)
+                        probe.last_response_ts = _safe_float(raw_probe.get("last_response_ts"), None)
+                        probe.pending_sent_ts = _safe_float(raw_probe.get("pending_sent_ts"), None)
+                        probe.pending_deadline_ts = _safe_float(raw_probe.get("pending_deadline_ts"), None)
+                        probe.timeout_streak = _safe_int(raw_probe.get("timeout_streak"), 0) or 0
+                        probe.last_result = raw_probe.get("last_result")
                         if isinstance(raw_probe.get("events"), list):
-                            probe["events"] = raw_probe.get("events")[-self.max_events_per_pivot :]
+                            probe.events = raw_probe.get("events")[-self.max_events_per_pivot :]
 
                     raw_modem_reset = raw_pivot.get("modem_reset")
                     if isinstance(raw_modem_reset, dict):
-                        modem_reset = pivot.get("modem_reset")
+                        modem_reset = pivot.modem_reset
                         if not isinstance(modem_reset, dict):
                             modem_reset = {}
-                            pivot["modem_reset"] = modem_reset
+                            pivot.modem_reset = modem_reset
                         modem_reset["last_command_ts"] = _safe_float(raw_modem_reset.get("last_command_ts"), None)
                         modem_reset["last_command_topic"] = raw_modem_reset.get("last_command_topic")
                         modem_reset["last_command_payload"] = raw_modem_reset.get("last_command_payload")
@@ -4065,7 +4739,7 @@ class TelemetryStore:
 
                     raw_status = raw_pivot.get("status_cache")
                     if isinstance(raw_status, dict):
-                        pivot["status_cache"] = {
+                        pivot.status_cache = {
                             "code": str(raw_status.get("code") or "gray"),
                             "reason": str(raw_status.get("reason") or ""),
                             "quality_code": str(raw_status.get("quality_code") or "green"),
@@ -4076,10 +4750,11 @@ class TelemetryStore:
                     restored[normalized_pivot_id] = pivot
 
                 self.pivots = restored
+                self._publish_pivot_view_locked()
                 for normalized_pivot_id, pivot in self.pivots.items():
-                    session_id = str(pivot.get("session_id") or "").strip()
+                    session_id = str(pivot.session_id or "").strip()
                     if session_id:
-                        pivot_run = str(pivot.get("run_id") or "").strip()
+                        pivot_run = str(pivot.run_id or "").strip()
                         if self._active_run_id and pivot_run and pivot_run != self._active_run_id:
                             continue
                         self._active_session_by_pivot[normalized_pivot_id] = session_id
@@ -4107,11 +4782,14 @@ class TelemetryStore:
         self.log.info("Estado de runtime restaurado com %s pivots.", len(self.pivots))
 
     def _clear_dashboard_data_files(self):
+        self._checkpoint.force_full()
+        self._dashboard_file_tokens = {}
+        self._dashboard_mapping = None
         if not os.path.isdir(DATA_DIR):
             return
 
         for name in os.listdir(DATA_DIR):
-            if not name.endswith(".json"):
+            if not name.endswith((".json", ".ckpt")):
                 continue
             path = os.path.join(DATA_DIR, name)
             try:
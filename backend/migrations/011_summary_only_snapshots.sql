@@ -0,0 +1,23 @@
+-- Snapshots passam a guardar apenas resumo e metricas; as series ja vivem nas
+-- tabelas de eventos e sao montadas na leitura (painel/estado).
+ALTER TABLE pivot_snapshots ADD COLUMN snapshot_format INTEGER NOT NULL DEFAULT 1;
+
+UPDATE pivot_snapshots
+SET
+    snapshot_json = json_set(
+        json_remove(
+            snapshot_json,
+            '$.timeline',
+            '$.probe_events',
+            '$.probe_delay_points',
+            '$.cloud2_events',
+            '$.rssiSeries',
+            '$.hasRssi',
+            '$.run',
+            '$.session'
+        ),
+        '$.snapshot_format',
+        2
+    ),
+    snapshot_format = 2
+WHERE json_valid(snapshot_json);
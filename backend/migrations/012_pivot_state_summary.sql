@@ -0,0 +1,193 @@
+-- Resumo de listagem por pivo/sessao em colunas tipadas: /api/state e
+-- quality-lite deixam de decodificar snapshot_json por pivo.
+CREATE TABLE IF NOT EXISTS pivot_state_summary (
+    pivot_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    pivot_slug TEXT,
+    updated_at_ts REAL NOT NULL,
+    status_code TEXT,
+    status_label TEXT,
+    status_rank INTEGER,
+    status_reason TEXT,
+    quality_code TEXT,
+    quality_label TEXT,
+    quality_rank INTEGER,
+    quality_reason TEXT,
+    flag_online INTEGER,
+    flag_offline INTEGER,
+    ping_ok INTEGER,
+    cloudv2_ok INTEGER,
+    median_ready INTEGER,
+    median_sample_count INTEGER,
+    median_cloudv2_interval_sec REAL,
+    max_expected_interval_sec REAL,
+    disconnect_threshold_sec REAL,
+    disconnected_by_inactivity INTEGER,
+    connected_pct REAL,
+    disconnected_pct REAL,
+    attention_disconnected_pct REAL,
+    attention_disconnected_pct_threshold REAL,
+    critical_disconnected_pct_threshold REAL,
+    attention_window_sec REAL,
+    last_monitored_message_ts REAL,
+    last_ping_ts REAL,
+    last_cloudv2_ts REAL,
+    last_activity_ts REAL,
+    signal TEXT,
+    technology TEXT,
+    signal_technology TEXT,
+    last_cloud2_ts REAL,
+    last_cloud2_rssi,
+    last_cloud2_technology,
+    last_cloud2_firmware,
+    last_cloud2_event_date,
+    last_cloud2_drop_duration_sec REAL,
+    probe_enabled INTEGER,
+    probe_interval_sec INTEGER,
+    probe_last_sent_ts REAL,
+    probe_last_response_ts REAL,
+    probe_pending INTEGER,
+    probe_pending_deadline_ts REAL,
+    probe_timeout_streak INTEGER,
+    probe_last_result,
+    probe_alert INTEGER,
+    probe_sent_count INTEGER,
+    probe_response_count INTEGER,
+    probe_timeout_count INTEGER,
+    probe_response_ratio_pct REAL,
+    probe_latency_sample_count INTEGER,
+    probe_latency_last_sec REAL,
+    probe_latency_avg_sec REAL,
+    probe_latency_median_sec REAL,
+    probe_latency_min_sec REAL,
+    probe_latency_max_sec REAL,
+    PRIMARY KEY (pivot_id, session_id),
+    FOREIGN KEY (pivot_id) REFERENCES pivots(pivot_id) ON DELETE CASCADE,
+    FOREIGN KEY (session_id) REFERENCES monitoring_sessions(session_id) ON DELETE CASCADE
+);
+
+INSERT OR REPLACE INTO pivot_state_summary (
+    pivot_id,
+    session_id,
+    pivot_slug,
+    updated_at_ts,
+    status_code,
+    status_label,
+    status_rank,
+    status_reason,
+    quality_code,
+    quality_label,
+    quality_rank,
+    quality_reason,
+    flag_online,
+    flag_offline,
+    ping_ok,
+    cloudv2_ok,
+    median_ready,
+    median_sample_count,
+    median_cloudv2_interval_sec,
+    max_expected_interval_sec,
+    disconnect_threshold_sec,
+    disconnected_by_inactivity,
+    connected_pct,
+    disconnected_pct,
+    attention_disconnected_pct,
+    attention_disconnected_pct_threshold,
+    critical_disconnected_pct_threshold,
+    attention_window_sec,
+    last_monitored_message_ts,
+    last_ping_ts,
+    last_cloudv2_ts,
+    last_activity_ts,
+    signal,
+    technology,
+    signal_technology,
+    last_cloud2_ts,
+    last_cloud2_rssi,
+    last_cloud2_technology,
+    last_cloud2_firmware,
+    last_cloud2_event_date,
+    last_cloud2_drop_duration_sec,
+    probe_enabled,
+    probe_interval_sec,
+    probe_last_sent_ts,
+    probe_last_response_ts,
+    probe_pending,
+    probe_pending_deadline_ts,
+    probe_timeout_streak,
+    probe_last_result,
+    probe_alert,
+    probe_sent_count,
+    probe_response_count,
+    probe_timeout_count,
+    probe_response_ratio_pct,
+    probe_latency_sample_count,
+    probe_latency_last_sec,
+    probe_latency_avg_sec,
+    probe_latency_median_sec,
+    probe_latency_min_sec,
+    probe_latency_max_sec
+)
+SELECT
+    pivot_id,
+    session_id,
+    json_extract(snapshot_json, '$.pivot_slug'),
+    updated_at_ts,
+    json_extract(snapshot_json, '$.summary.status.code'),
+    json_extract(snapshot_json, '$.summary.status.label'),
+    json_extract(snapshot_json, '$.summary.status.rank'),
+    json_extract(snapshot_json, '$.summary.status.reason'),
+    json_extract(snapshot_json, '$.summary.quality.code'),
+    json_extract(snapshot_json, '$.summary.quality.label'),
+    json_extract(snapshot_json, '$.summary.quality.rank'),
+    json_extract(snapshot_json, '$.summary.quality.reason'),
+    json_extract(snapshot_json, '$.summary.flags.online'),
+    json_extract(snapshot_json, '$.summary.flags.offline'),
+    json_extract(snapshot_json, '$.summary.ping_ok'),
+    json_extract(snapshot_json, '$.summary.cloudv2_ok'),
+    json_extract(snapshot_json, '$.summary.median_ready'),
+    json_extract(snapshot_json, '$.summary.median_sample_count'),
+    json_extract(snapshot_json, '$.summary.median_cloudv2_interval_sec'),
+    json_extract(snapshot_json, '$.summary.max_expected_interval_sec'),
+    json_extract(snapshot_json, '$.summary.disconnect_threshold_sec'),
+    json_extract(snapshot_json, '$.summary.disconnected_by_inactivity'),
+    json_extract(snapshot_json, '$.summary.connected_pct'),
+    json_extract(snapshot_json, '$.summary.disconnected_pct'),
+    json_extract(snapshot_json, '$.summary.attention_disconnected_pct'),
+    json_extract(snapshot_json, '$.summary.attention_disconnected_pct_threshold'),
+    json_extract(snapshot_json, '$.summary.critical_disconnected_pct_threshold'),
+    json_extract(snapshot_json, '$.summary.attention_window_sec'),
+    json_extract(snapshot_json, '$.summary.last_monitored_message_ts'),
+    json_extract(snapshot_json, '$.summary.last_ping_ts'),
+    json_extract(snapshot_json, '$.summary.last_cloudv2_ts'),
+    json_extract(snapshot_json, '$.summary.last_activity_ts'),
+    json_extract(snapshot_json, '$.summary.signal'),
+    json_extract(snapshot_json, '$.summary.technology'),
+    json_extract(snapshot_json, '$.summary.signal_technology'),
+    json_extract(snapshot_json, '$.summary.last_cloud2.ts'),
+    json_extract(snapshot_json, '$.summary.last_cloud2.rssi'),
+    json_extract(snapshot_json, '$.summary.last_cloud2.technology'),
+    json_extract(snapshot_json, '$.summary.last_cloud2.firmware'),
+    json_extract(snapshot_json, '$.summary.last_cloud2.event_date'),
+    json_extract(snapshot_json, '$.summary.last_cloud2.drop_duration_sec'),
+    json_extract(snapshot_json, '$.summary.probe.enabled'),
+    json_extract(snapshot_json, '$.summary.probe.interval_sec'),
+    json_extract(snapshot_json, '$.summary.probe.last_sent_ts'),
+    json_extract(snapshot_json, '$.summary.probe.last_response_ts'),
+    json_extract(snapshot_json, '$.summary.probe.pending'),
+    json_extract(snapshot_json, '$.summary.probe.pending_deadline_ts'),
+    json_extract(snapshot_json, '$.summary.probe.timeout_streak'),
+    json_extract(snapshot_json, '$.summary.probe.last_result'),
+    json_extract(snapshot_json, '$.summary.probe.alert'),
+    json_extract(snapshot_json, '$.summary.probe.sent_count'),
+    json_extract(snapshot_json, '$.summary.probe.response_count'),
+    json_extract(snapshot_json, '$.summary.probe.timeout_count'),
+    json_extract(snapshot_json, '$.summary.probe.response_ratio_pct'),
+    json_extract(snapshot_json, '$.summary.probe.latency_sample_count'),
+    json_extract(snapshot_json, '$.summary.probe.latency_last_sec'),
+    json_extract(snapshot_json, '$.summary.probe.latency_avg_sec'),
+    json_extract(snapshot_json, '$.summary.probe.latency_median_sec'),
+    json_extract(snapshot_json, '$.summary.probe.latency_min_sec'),
+    json_extract(snapshot_json, '$.summary.probe.latency_max_sec')
+FROM pivot_snapshots
+WHERE json_valid(snapshot_json);
@@ -0,0 +1,17 @@
+-- timeline_mini materializado: runs de mensagens por pivo/sessao mantidos
+-- incrementalmente e a barra pronta gravada junto ao resumo de listagem.
+CREATE TABLE IF NOT EXISTS pivot_timeline_runs (
+    pivot_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    first_ts REAL,
+    last_event_ts REAL,
+    merge_gap_sec REAL,
+    runs_json TEXT NOT NULL,
+    updated_at_ts REAL NOT NULL,
+    PRIMARY KEY (pivot_id, session_id),
+    FOREIGN KEY (pivot_id) REFERENCES pivots(pivot_id) ON DELETE CASCADE,
+    FOREIGN KEY (session_id) REFERENCES monitoring_sessions(session_id) ON DELETE CASCADE
+);
+
+ALTER TABLE pivot_state_summary ADD COLUMN timeline_mini_json TEXT;
+ALTER TABLE pivot_state_summary ADD COLUMN timeline_mini_threshold_sec REAL;
@@ -0,0 +1,52 @@
+-- Rollups de conectividade por pivo/sessao (hora e dia), mantidos na ingestao.
+CREATE TABLE IF NOT EXISTS connectivity_rollups_hourly (
+    pivot_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    bucket_ts REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    cloudv2_count INTEGER NOT NULL DEFAULT 0,
+    ping_count INTEGER NOT NULL DEFAULT 0,
+    info_count INTEGER NOT NULL DEFAULT 0,
+    network_count INTEGER NOT NULL DEFAULT 0,
+    online_sec REAL NOT NULL DEFAULT 0,
+    offline_sec REAL NOT NULL DEFAULT 0,
+    drop_count INTEGER NOT NULL DEFAULT 0,
+    drop_sec REAL NOT NULL DEFAULT 0,
+    rssi_count INTEGER NOT NULL DEFAULT 0,
+    rssi_sum REAL NOT NULL DEFAULT 0,
+    rssi_min REAL,
+    rssi_max REAL,
+    updated_at_ts REAL NOT NULL,
+    PRIMARY KEY (pivot_id, session_id, bucket_ts),
+    FOREIGN KEY (pivot_id) REFERENCES pivots(pivot_id) ON DELETE CASCADE,
+    FOREIGN KEY (session_id) REFERENCES monitoring_sessions(session_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS connectivity_rollups_daily (
+    pivot_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    bucket_ts REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    cloudv2_count INTEGER NOT NULL DEFAULT 0,
+    ping_count INTEGER NOT NULL DEFAULT 0,
+    info_count INTEGER NOT NULL DEFAULT 0,
+    network_count INTEGER NOT NULL DEFAULT 0,
+    online_sec REAL NOT NULL DEFAULT 0,
+    offline_sec REAL NOT NULL DEFAULT 0,
+    drop_count INTEGER NOT NULL DEFAULT 0,
+    drop_sec REAL NOT NULL DEFAULT 0,
+    rssi_count INTEGER NOT NULL DEFAULT 0,
+    rssi_sum REAL NOT NULL DEFAULT 0,
+    rssi_min REAL,
+    rssi_max REAL,
+    updated_at_ts REAL NOT NULL,
+    PRIMARY KEY (pivot_id, session_id, bucket_ts),
+    FOREIGN KEY (pivot_id) REFERENCES pivots(pivot_id) ON DELETE CASCADE,
+    FOREIGN KEY (session_id) REFERENCES monitoring_sessions(session_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_connectivity_rollups_hourly_pivot_bucket
+    ON connectivity_rollups_hourly (pivot_id, bucket_ts);
+
+CREATE INDEX IF NOT EXISTS idx_connectivity_rollups_daily_pivot_bucket
+    ON connectivity_rollups_daily (pivot_id, bucket_ts);
@@ -0,0 +1,18 @@
+-- Varredura da retencao: apaga/compacta em blocos ordenados por ts.
+CREATE INDEX IF NOT EXISTS idx_connectivity_events_ts
+    ON connectivity_events (ts);
+
+CREATE INDEX IF NOT EXISTS idx_probe_events_ts
+    ON probe_events (ts);
+
+CREATE INDEX IF NOT EXISTS idx_probe_delay_points_ts
+    ON probe_delay_points (ts);
+
+CREATE INDEX IF NOT EXISTS idx_ping_rssi_points_ts
+    ON ping_rssi_points (ts);
+
+CREATE INDEX IF NOT EXISTS idx_cloud2_events_ts
+    ON cloud2_events (ts);
+
+CREATE INDEX IF NOT EXISTS idx_drop_events_ts
+    ON drop_events (ts);
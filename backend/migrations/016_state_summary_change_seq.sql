@@ -0,0 +1,3 @@
+-- Marcador de mudanca do resumo de listagem: /api/state?since=<geracao>
+-- devolve so os pivos com change_seq maior que a geracao ja vista.
+ALTER TABLE pivot_state_summary ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
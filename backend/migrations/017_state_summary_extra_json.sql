@@ -0,0 +1,15 @@
+-- Chaves do resumo sem coluna tipada (modem_reset, expected_by_topic_sec,
+-- topic_counters, flags de atencao...): a listagem por run devolve o mesmo
+-- resumo do estado em memoria. Linhas antigas recebem o resumo do snapshot;
+-- as colunas tipadas continuam prevalecendo na leitura.
+ALTER TABLE pivot_state_summary ADD COLUMN extra_json TEXT;
+
+UPDATE pivot_state_summary
+SET extra_json = (
+    SELECT json_remove(json_extract(snapshots.snapshot_json, '$.summary'), '$.timeline_mini')
+    FROM pivot_snapshots AS snapshots
+    WHERE snapshots.pivot_id = pivot_state_summary.pivot_id
+        AND snapshots.session_id = pivot_state_summary.session_id
+        AND json_valid(snapshots.snapshot_json)
+        AND json_type(snapshots.snapshot_json, '$.summary') = 'object'
+);
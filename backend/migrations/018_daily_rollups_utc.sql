@@ -0,0 +1,55 @@
+-- Dias dos rollups passam a comecar a meia-noite UTC, como as horas. Dias
+-- que ainda tem baldes horarios sao refeitos a partir deles; os demais (horas
+-- ja removidas pela retencao) so mudam de rotulo para o dia UTC.
+DELETE FROM connectivity_rollups_daily
+WHERE EXISTS (
+    SELECT 1
+    FROM connectivity_rollups_hourly AS hourly
+    WHERE hourly.pivot_id = connectivity_rollups_daily.pivot_id
+      AND hourly.session_id = connectivity_rollups_daily.session_id
+      AND hourly.bucket_ts >= CAST(connectivity_rollups_daily.bucket_ts / 86400 AS INTEGER) * 86400.0
+      AND hourly.bucket_ts < CAST(connectivity_rollups_daily.bucket_ts / 86400 AS INTEGER) * 86400.0 + 86400.0
+);
+
+UPDATE connectivity_rollups_daily
+SET bucket_ts = CAST(bucket_ts / 86400 AS INTEGER) * 86400.0;
+
+INSERT INTO connectivity_rollups_daily (
+    pivot_id,
+    session_id,
+    bucket_ts,
+    message_count,
+    cloudv2_count,
+    ping_count,
+    info_count,
+    network_count,
+    online_sec,
+    offline_sec,
+    drop_count,
+    drop_sec,
+    rssi_count,
+    rssi_sum,
+    rssi_min,
+    rssi_max,
+    updated_at_ts
+)
+SELECT
+    pivot_id,
+    session_id,
+    CAST(bucket_ts / 86400 AS INTEGER) * 86400.0,
+    SUM(message_count),
+    SUM(cloudv2_count),
+    SUM(ping_count),
+    SUM(info_count),
+    SUM(network_count),
+    SUM(online_sec),
+    SUM(offline_sec),
+    SUM(drop_count),
+    SUM(drop_sec),
+    SUM(rssi_count),
+    SUM(rssi_sum),
+    MIN(rssi_min),
+    MAX(rssi_max),
+    MAX(updated_at_ts)
+FROM connectivity_rollups_hourly
+GROUP BY pivot_id, session_id, CAST(bucket_ts / 86400 AS INTEGER);
@@ -0,0 +1,526 @@
+import copy
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _interval_sequence(count, seed=13):
+    # Intervalos cloudv2 tipicos: base de 180s com jitter, alguns atrasos e
+    # rajadas curtas (reconexao), para exercitar mais de um balde.
+    rng = random.Random(seed)
+    intervals = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            intervals.append(rng.uniform(600.0, 3600.0))
+        elif roll < 0.1:
+            intervals.append(rng.uniform(5.0, 30.0))
+        else:
+            intervals.append(180.0 + rng.uniform(-12.0, 12.0))
+    return intervals
+
+
+def bench_interval_median(args):
+    from backend.cloudv2_config import DEFAULT_CONFIG
+    from backend.cloudv2_interval_stats import IntervalMedianEngine, compute_interval_stats
+    from backend.cloudv2_telemetry import CLOUDV2_MEDIAN_TOLERANCE_PCT
+
+    messages = int(args[0]) if args else 20000
+    window = int(DEFAULT_CONFIG.get("cloudv2_median_window", 20))
+    tolerance_pct = CLOUDV2_MEDIAN_TOLERANCE_PCT
+    sequence = _interval_sequence(messages)
+
+    # Cada mensagem calcula a mediana duas vezes (registro e status), como
+    # _record_cloudv2_locked seguido de _compute_status_locked.
+    windows = [sequence[max(0, index + 1 - window) : index + 1] for index in range(messages)]
+
+    started = time.perf_counter()
+    for current in windows:
+        compute_interval_stats(current, tolerance_pct)
+        compute_interval_stats(current, tolerance_pct)
+    full_sec = time.perf_counter() - started
+
+    engine = IntervalMedianEngine(tolerance_pct)
+    started = time.perf_counter()
+    for current in windows:
+        engine.stats(current)
+        engine.stats(current)
+    engine_sec = time.perf_counter() - started
+
+    # Refresh de status sem mensagem nova (tick): a janela nao mudou.
+    refreshes = min(messages, 5000)
+    current = windows[-1]
+    started = time.perf_counter()
+    for _ in range(refreshes):
+        compute_interval_stats(current, tolerance_pct)
+    full_refresh_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(refreshes):
+        engine.stats(current)
+    engine_refresh_sec = time.perf_counter() - started
+
+    mismatches = 0
+    check = IntervalMedianEngine(tolerance_pct)
+    for current in windows:
+        if check.stats(current) != compute_interval_stats(current, tolerance_pct):
+            mismatches += 1
+    return {
+        "messages": messages,
+        "window": window,
+        "full_us_per_message": round(full_sec / messages * 1e6, 3),
+        "engine_us_per_message": round(engine_sec / messages * 1e6, 3),
+        "speedup": round(full_sec / engine_sec, 2) if engine_sec > 0 else None,
+        "full_us_per_refresh": round(full_refresh_sec / refreshes * 1e6, 3),
+        "engine_us_per_refresh": round(engine_refresh_sec / refreshes * 1e6, 3),
+        "engine_rebuilds": engine.rebuild_count,
+        "engine_appends": engine.append_count,
+        "mismatches": mismatches,
+    }
+
+
+def _sample_pivot_state(index):
+    from backend.cloudv2_pivot_state import PivotState, ProbeState
+    from backend.cloudv2_telemetry import CONNECTIVITY_TOPICS, MONITOR_TOPICS
+
+    # Pivo em regime: contadores, janela de intervalos cheia por topico e
+    # status/modem preenchidos (as listas de eventos ficam vazias para medir
+    # so o custo da estrutura).
+    pivot_id = f"Pivot_{index}"
+    ts = 1_700_000_000.0 + index
+    return PivotState(
+        pivot_id=pivot_id,
+        pivot_slug=pivot_id.lower(),
+        session_id=f"session-{index}",
+        run_id="run-1",
+        latitude=-15.0 - index / 1e4,
+        longitude=-47.0 - index / 1e4,
+        discovered_at_ts=ts,
+        last_seen_ts=ts + 1.0,
+        last_ping_ts=ts + 2.0,
+        last_cloudv2_ts=ts + 3.0,
+        topic_counters={topic: index for topic in MONITOR_TOPICS},
+        cloudv2_intervals_sec=[180.0 + step for step in range(20)],
+        median_latched_ready=True,
+        median_latched_interval_sec=180.0,
+        topic_last_ts={topic: ts for topic in CONNECTIVITY_TOPICS},
+        topic_intervals_sec={topic: [180.0 + step for step in range(20)] for topic in CONNECTIVITY_TOPICS},
+        probe=ProbeState(enabled=True, interval_sec=300, last_sent_ts=ts, last_response_ts=ts + 1.5),
+        modem_reset={
+            "last_command_ts": None,
+            "last_command_topic": None,
+            "last_command_payload": None,
+            "last_ack_ts": None,
+            "last_ack_topic": None,
+            "last_ack_payload": None,
+            "last_ack_idp": None,
+            "command_count": 0,
+            "ack_count": 0,
+        },
+        status_cache={
+            "code": "green",
+            "reason": "Conectado.",
+            "quality_code": "green",
+            "quality_reason": "Qualidade estavel.",
+            "changed_at_ts": ts,
+        },
+        rollup_threshold_sec=270.0,
+    )
+
+
+def _measure_bytes(factory, count):
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        items = [factory(index) for index in range(count)]
+        used = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del items
+    return used
+
+
+def bench_pivot_memory(args):
+    counts = [int(item) for item in args] if args else [1000, 5000, 10000]
+
+    # Estado legado: o mesmo conteudo como dict de dicts (formato JSON).
+    def legacy(index):
+        return _sample_pivot_state(index).to_dict()
+
+    # Importa os modulos antes de medir.
+    _sample_pivot_state(0)
+    results = []
+    for count in counts:
+        slotted_bytes = _measure_bytes(_sample_pivot_state, count)
+        legacy_bytes = _measure_bytes(legacy, count)
+        results.append(
+            {
+                "pivots": count,
+                "dict_bytes_per_pivot": round(legacy_bytes / count, 1),
+                "slots_bytes_per_pivot": round(slotted_bytes / count, 1),
+                "dict_total_mb": round(legacy_bytes / 1048576, 2),
+                "slots_total_mb": round(slotted_bytes / 1048576, 2),
+                "saved_pct": round((legacy_bytes - slotted_bytes) / legacy_bytes * 100.0, 1) if legacy_bytes else None,
+            }
+        )
+
+    # Leitura no formato do caminho quente: chave de dict vs atributo.
+    state = _sample_pivot_state(0)
+    legacy_state = state.to_dict()
+    loops = 200000
+    started = time.perf_counter()
+    for _ in range(loops):
+        legacy_state.get("last_seen_ts")
+        legacy_state["probe"].get("pending_deadline_ts")
+    dict_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(loops):
+        state.last_seen_ts
+        state.probe.pending_deadline_ts
+    slots_sec = time.perf_counter() - started
+    return {
+        "memory": results,
+        "dict_read_ns": round(dict_sec / loops * 1e9, 1),
+        "slots_read_ns": round(slots_sec / loops * 1e9, 1),
+    }
+
+
+def _sample_timeline_events(count, seed=17):
+    from backend.cloudv2_telemetry import parse_device_payload
+
+    # Timeline em regime: cloudv2/ping/info intercalados a cada ~3 min, com o
+    # payload bruto e o parse guardados nos detalhes (como em process_message).
+    rng = random.Random(seed)
+    topics = ("cloudv2", "cloudv2-ping", "cloudv2-info", "cloudv2-network")
+    ts = 1_700_000_000.0
+    events = []
+    for index in range(count):
+        ts += 180.0 + rng.uniform(-12.0, 12.0)
+        topic = rng.choice(topics)
+        raw_payload = f"#0{index % 9 + 1}-Pivot_1-{index}-{rng.randint(-110, -50)}$"
+        parsed_payload = parse_device_payload(raw_payload)[0]
+        details = {"source_topic": topic, "raw_payload": raw_payload}
+        if parsed_payload:
+            details["parsed_payload"] = parsed_payload
+        events.append((index + 1, ts, "message", topic, f"Mensagem recebida em {topic}.", details))
+    return events
+
+
+def bench_timeline_memory(args):
+    from backend.cloudv2_event_ring import EventRing, PointRing
+    from backend.cloudv2_telemetry import _reparse_device_payload, _ts_to_str
+
+    count = int(args[0]) if args else 5000
+    events = _sample_timeline_events(count)
+
+    # Listas de dicts (formato anterior) contra os aneis em colunas, com o
+    # mesmo conteudo: timeline completa e serie RSSI do ping.
+    def legacy(_index):
+        timeline = [
+            {
+                "id": event_id,
+                "ts": ts,
+                "at": _ts_to_str(ts),
+                "type": event_type,
+                "topic": topic,
+                "summary": summary,
+                "details": copy.deepcopy(details),
+            }
+            for event_id, ts, event_type, topic, summary, details in events
+        ]
+        points = [{"ts": item[1], "at": _ts_to_str(item[1]), "rssi": -70 - item[0] % 30} for item in events]
+        return timeline, points
+
+    def columnar(_index):
+        timeline = EventRing(capacity=count, format_ts=_ts_to_str, parse_payload=_reparse_device_payload)
+        points = PointRing(capacity=count, format_ts=_ts_to_str)
+        for event_id, ts, event_type, topic, summary, details in events:
+            timeline.append(event_id, ts, event_type, topic, summary, details)
+            points.append(ts, -70 - event_id % 30)
+        return timeline, points
+
+    # Os details de entrada sao compartilhados; o legado copia (parse incluso)
+    # para medir o que a lista retinha por evento.
+    columnar(0)
+    legacy_bytes = _measure_bytes(legacy, 1)
+    ring_bytes = _measure_bytes(columnar, 1)
+
+    timeline, points = columnar(0)
+    legacy_timeline, legacy_points = legacy(0)
+    started = time.perf_counter()
+    materialized = timeline.to_list()
+    materialize_sec = time.perf_counter() - started
+    cutoff = events[count // 2][1]
+    started = time.perf_counter()
+    timeline.prune_before(cutoff)
+    prune_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    [event for event in legacy_timeline if event["ts"] >= cutoff]
+    filter_sec = time.perf_counter() - started
+    return {
+        "events": count,
+        "list_bytes_per_pivot": legacy_bytes,
+        "ring_bytes_per_pivot": ring_bytes,
+        "ratio": round(legacy_bytes / ring_bytes, 1) if ring_bytes else None,
+        "identical": materialized == legacy_timeline and points.to_list() == legacy_points,
+        "materialize_ms": round(materialize_sec * 1e3, 3),
+        "list_prune_ms": round(filter_sec * 1e3, 3),
+        "ring_prune_ms": round(prune_sec * 1e3, 3),
+    }
+
+
+def bench_runtime_restore(args):
+    import tempfile
+
+    from backend.cloudv2_checkpoint import CheckpointWriter, encode_pivot_frame, read_checkpoint
+    from backend.cloudv2_event_ring import EventRing, PointRing
+    from backend.cloudv2_telemetry import _reparse_device_payload, _ts_to_str
+
+    pivot_count = int(args[0]) if args else 50
+    event_count = int(args[1]) if len(args) > 1 else 2000
+    events = _sample_timeline_events(event_count)
+
+    def new_rings():
+        timeline = EventRing(capacity=event_count, format_ts=_ts_to_str, parse_payload=_reparse_device_payload)
+        points = PointRing(capacity=event_count, format_ts=_ts_to_str)
+        return timeline, points
+
+    pivots = {}
+    for index in range(pivot_count):
+        pivot = _sample_pivot_state(index)
+        pivot.timeline, pivot.ping_rssi_points = new_rings()
+        for event_id, ts, event_type, topic, summary, details in events:
+            pivot.timeline.append(event_id, ts, event_type, topic, summary, details)
+            pivot.ping_rssi_points.append(ts, -70 - event_id % 30)
+        pivots[pivot.pivot_id] = pivot
+    meta = {"version": 5, "active_run_id": "run-1", "pending_expected_pivots": {}}
+
+    # Restauracao como no start(): arquivo -> pivos com os aneis preenchidos.
+    def restore_json(path):
+        with open(path, "r", encoding="utf-8") as file:
+            loaded = json.load(file)
+        for raw_pivot in loaded["pivots"].values():
+            timeline, points = new_rings()
+            timeline.extend(raw_pivot["timeline"])
+            points.extend(raw_pivot["ping_rssi_points"])
+
+    def restore_checkpoint(path):
+        loaded, _info = read_checkpoint(path)
+        for raw_pivot in loaded["pivots"].values():
+            timeline, points = new_rings()
+            raw_pivot["timeline"].load_into(timeline)
+            raw_pivot["ping_rssi_points"].load_into(points)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_path = os.path.join(temp_dir, "runtime_store.json")
+        checkpoint_path = os.path.join(temp_dir, "runtime_store.ckpt")
+
+        # Escrita antiga: copia JSON de todos os pivos + arquivo indentado.
+        started = time.perf_counter()
+        payload = dict(meta)
+        payload["pivots"] = {
+            pivot_id: json.loads(json.dumps(pivot.to_dict(), ensure_ascii=False)) for pivot_id, pivot in pivots.items()
+        }
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(payload, file, indent=2, ensure_ascii=False)
+        json_write_sec = time.perf_counter() - started
+        del payload
+
+        writer = CheckpointWriter(checkpoint_path)
+        started = time.perf_counter()
+        frames = {pivot_id: ((pivot, 1), encode_pivot_frame(pivot)) for pivot_id, pivot in pivots.items()}
+        writer.write(meta, frames, frozenset(pivots), True)
+        checkpoint_write_sec = time.perf_counter() - started
+
+        # Escrita seguinte com um pivo alterado: so o quadro dele e acrescentado.
+        changed_id = next(iter(pivots))
+        started = time.perf_counter()
+        writer.write(
+            meta,
+            {changed_id: ((pivots[changed_id], 2), encode_pivot_frame(pivots[changed_id]))},
+            frozenset(pivots),
+            False,
+        )
+        append_sec = time.perf_counter() - started
+
+        started = time.perf_counter()
+        restore_json(json_path)
+        json_restore_sec = time.perf_counter() - started
+        started = time.perf_counter()
+        restore_checkpoint(checkpoint_path)
+        checkpoint_restore_sec = time.perf_counter() - started
+
+        loaded, _info = read_checkpoint(checkpoint_path)
+        sample = loaded["pivots"][changed_id]["timeline"].load_into(new_rings()[0])
+        return {
+            "pivots": pivot_count,
+            "events_per_pivot": event_count,
+            "json_bytes": os.path.getsize(json_path),
+            "checkpoint_bytes": os.path.getsize(checkpoint_path),
+            "json_write_ms": round(json_write_sec * 1e3, 1),
+            "checkpoint_write_ms": round(checkpoint_write_sec * 1e3, 1),
+            "checkpoint_append_one_ms": round(append_sec * 1e3, 2),
+            "json_restore_ms": round(json_restore_sec * 1e3, 1),
+            "checkpoint_restore_ms": round(checkpoint_restore_sec * 1e3, 1),
+            "restore_speedup": round(json_restore_sec / checkpoint_restore_sec, 1) if checkpoint_restore_sec else None,
+            "identical": sample == pivots[changed_id].timeline,
+        }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _run_http_clients(address, cookie, paths, clients, polls):
+    import http.client
+    import threading
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    # Cada cliente e um navegador com o dashboard aberto: uma conexao HTTP
+    # (reaberta quando o servidor fecha) e o par state + quality-lite por poll.
+    def client():
+        conn = http.client.HTTPConnection(*address, timeout=30)
+        local = []
+        failures = 0
+        barrier.wait()
+        for _ in range(polls):
+            for path in paths:
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers={"Cookie": cookie, "Accept-Encoding": "gzip"})
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        failures += 1
+                except (OSError, http.client.HTTPException):
+                    failures += 1
+                    conn.close()
+                local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors.append(failures)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1e3, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1e3, 2),
+        "max_ms": round(latencies[-1] * 1e3, 2),
+    }
+
+
+def bench_http_load(args):
+    import http.client
+    import tempfile
+    import threading
+    from unittest.mock import patch
+
+    import backend.cloudv2_telemetry as telemetry_mod
+    from backend.cloudv2_async_http import AsyncDashboardServer
+    from backend.cloudv2_auth import FIXED_ADMIN_EMAIL, FIXED_ADMIN_PASSWORD
+    from backend.cloudv2_dashboard import DashboardHTTPServer, _build_handler
+    from backend.cloudv2_telemetry import TelemetryStore
+
+    clients = int(args[0]) if args else 200
+    polls = int(args[1]) if len(args) > 1 else 10
+    pivot_count = int(args[2]) if len(args) > 2 else 200
+    base_ts = float(int(time.time()) - 3600)
+
+    with tempfile.TemporaryDirectory() as temp_dir, patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+        telemetry_mod, "ensure_dirs", lambda: None
+    ):
+        store = TelemetryStore(
+            config={
+                "enable_background_worker": False,
+                "require_apply_to_start": False,
+                "continuous_monitoring_mode": True,
+                "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            },
+            log_dir=temp_dir,
+        )
+        store.start()
+        pivot_ids = [f"Pivot_{index}" for index in range(pivot_count)]
+        store.queue_expected_pivots(pivot_ids, now=base_ts, source="benchmark")
+        for index, pivot_id in enumerate(pivot_ids):
+            store.process_message("cloudv2", f"#01-{pivot_id}-discovery$", ts=base_ts + index * 0.01)
+        run_id = store.get_state_snapshot()["run_id"]
+        paths = [f"/api/state?run_id={run_id}", f"/api/quality-lite?run_id={run_id}"]
+        handler = _build_handler(store)
+
+        threading_server = DashboardHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=threading_server.serve_forever, daemon=True).start()
+        async_server = AsyncDashboardServer(("127.0.0.1", 0), handler, max_connections=max(512, clients * 2))
+        async_server.start()
+        try:
+            conn = http.client.HTTPConnection(*threading_server.server_address, timeout=30)
+            body = json.dumps({"email": FIXED_ADMIN_EMAIL, "password": FIXED_ADMIN_PASSWORD})
+            conn.request("POST", "/auth/login", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            cookie = str(response.getheader("Set-Cookie") or "").split(";", 1)[0]
+
+            result = {"clients": clients, "polls_per_client": polls, "pivots": pivot_count}
+            result["threading"] = _run_http_clients(threading_server.server_address, cookie, paths, clients, polls)
+            result["asyncio"] = _run_http_clients(async_server.server_address, cookie, paths, clients, polls)
+            result["asyncio"]["keepalive_reuses"] = async_server.get_metrics()["keepalive_reuses"]
+            if result["asyncio"]["p99_ms"]:
+                result["p99_speedup"] = round(result["threading"]["p99_ms"] / result["asyncio"]["p99_ms"], 2)
+            return result
+        finally:
+            threading_server.shutdown()
+            threading_server.server_close()
+            async_server.server_close()
+            store.stop()
+
+
+BENCHMARKS = {
+    "interval-median": bench_interval_median,
+    "pivot-memory": bench_pivot_memory,
+    "timeline-memory": bench_timeline_memory,
+    "runtime-restore": bench_runtime_restore,
+    "http-load": bench_http_load,
+}
+
+
+def main():
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    # Uso: run_benchmark.py [nome] [argumentos do benchmark]; sem nome roda todos.
+    args = sys.argv[1:]
+    names = list(BENCHMARKS)
+    if args and not args[0].isdigit():
+        name = args.pop(0)
+        if name not in BENCHMARKS:
+            print(f"Benchmark desconhecido: {name} (opcoes: {', '.join(BENCHMARKS)})", file=sys.stderr)
+            sys.exit(2)
+        names = [name]
+    result = {name: BENCHMARKS[name](args) for name in names}
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
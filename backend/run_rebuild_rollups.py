@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    from backend.cloudv2_config import load_runtime_config
+    from backend.cloudv2_persistence import TelemetryPersistence
+
+    pivot_id = sys.argv[1] if len(sys.argv) > 1 else None
+    session_id = sys.argv[2] if len(sys.argv) > 2 else None
+
+    config = load_runtime_config()
+    persistence = TelemetryPersistence(db_path=config["sqlite_db_path"])
+    persistence.start()
+    try:
+        result = persistence.rebuild_rollups(
+            pivot_id=pivot_id,
+            session_id=session_id,
+            connectivity_settings={
+                "ping_expected_sec": max(1, int(config.get("ping_interval_minutes", 3)) * 60),
+                "tolerance_factor": max(1.0, float(config.get("tolerance_factor", 1.5))),
+            },
+        )
+    finally:
+        persistence.stop()
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
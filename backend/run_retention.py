@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    os.chdir(ROOT_DIR)
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    from backend.cloudv2_config import load_runtime_config
+    from backend.cloudv2_persistence import TelemetryPersistence
+    from backend.cloudv2_retention import RetentionJob, build_retention_policies
+
+    config = load_runtime_config()
+    persistence = TelemetryPersistence(db_path=config["sqlite_db_path"])
+    persistence.start()
+    try:
+        job = RetentionJob(
+            persistence,
+            build_retention_policies(config, history_retention_hours=config.get("history_retention_hours", 24)),
+            interval_sec=config["retention_interval_sec"],
+            chunk_rows=config["retention_chunk_rows"],
+        )
+        result = {"retention": job.run_once()}
+        # VACUUM completo bloqueia o banco; use apenas com o monitor parado.
+        if "--vacuum" in sys.argv[1:]:
+            result["vacuum"] = persistence.vacuum_full()
+    finally:
+        persistence.stop()
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
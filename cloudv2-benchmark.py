@@ -0,0 +1,5 @@
+from backend.run_benchmark import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+from backend.run_rebuild_rollups import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+from backend.run_retention import main
+
+
+if __name__ == "__main__":
+    main()
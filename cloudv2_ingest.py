@@ -0,0 +1 @@
+from backend.cloudv2_ingest import *  # noqa: F401,F403
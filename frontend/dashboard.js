@@ -218,6 +218,11 @@ const state = {
   panelSessionMeta: null,
   panelRunMeta: null,
   refreshInFlight: false,
+  stateStream: null,
+  stateFetchInFlight: false,
+  streamConnected: false,
+  streamNeedsFullRefresh: false,
+  lastFullStateRefreshMs: 0,
   authUserRole: "user",
   authUserEmail: "",
   pivotDeleteAllowed: false,
@@ -237,6 +242,13 @@ const state = {
 };
 
 const API_REQUEST_TIMEOUT_MS = 12000;
+const CONDITIONAL_JSON_CACHE_MAX = 24;
+// Com o /api/stream conectado o estado chega por deltas; sem ele o polling
+// pede /api/state?since=<geracao>. O /api/state completo so e relido apos um
+// "reset", troca de run ou a cada STATE_FULL_REFRESH_MS.
+const STATE_FULL_REFRESH_MS = 60000;
+// Ultima resposta (ETag + payload) de cada URL consultada com If-None-Match.
+const conditionalJsonCache = new Map();
 const CONNECTIVITY_EVENTS_MAX_PAGES = 5;
 const MODEM_RESET_ACK_MIN_FIRMWARE = [2, 8, 4];
 const DASHBOARD_TIMEZONE = "America/Sao_Paulo";
@@ -1175,8 +1187,11 @@ function setInitialLoading(loading, message = "") {
   }
 }
 
-async function getJson(url) {
+async function getJson(url, options = {}) {
+  const conditional = !!options.conditional;
   const targetUrl = buildApiUrl(url);
+  const cached = conditional ? conditionalJsonCache.get(targetUrl) : null;
+  const headers = cached ? { "If-None-Match": cached.etag } : undefined;
   const controller = typeof AbortController !== "undefined" ? new AbortController() : null;
   const timeoutId = controller
     ? window.setTimeout(() => controller.abort(), API_REQUEST_TIMEOUT_MS)
@@ -1185,6 +1200,7 @@ async function getJson(url) {
   try {
     response = await fetch(`${targetUrl}${targetUrl.includes("?") ? "&" : "?"}t=${Date.now()}`, {
       credentials: "include",
+      headers,
       signal: controller ? controller.signal : undefined,
     });
   } catch (err) {
@@ -1195,12 +1211,27 @@ async function getJson(url) {
   } finally {
     if (timeoutId !== null) window.clearTimeout(timeoutId);
   }
+  if (response.status === 304 && cached) {
+    conditionalJsonCache.delete(targetUrl);
+    conditionalJsonCache.set(targetUrl, cached);
+    return cached.payload;
+  }
   let payload = {};
   try {
     payload = await response.json();
   } catch (err) {
     payload = {};
   }
+  if (conditional) {
+    const etag = response.ok ? response.headers.get("ETag") : null;
+    conditionalJsonCache.delete(targetUrl);
+    if (etag) {
+      conditionalJsonCache.set(targetUrl, { etag, payload });
+      while (conditionalJsonCache.size > CONDITIONAL_JSON_CACHE_MAX) {
+        conditionalJsonCache.delete(conditionalJsonCache.keys().next().value);
+      }
+    }
+  }
   if (!response.ok) {
     const redirect = String(payload.redirect || "").trim();
     if (redirect) {
@@ -1212,6 +1243,12 @@ async function getJson(url) {
   return payload;
 }
 
+// GET com If-None-Match: em 304 reaproveita o payload da resposta anterior
+// (sem baixar nem decodificar o JSON de novo).
+async function getJsonConditional(url) {
+  return getJson(url, { conditional: true });
+}
+
 async function putJson(url, body) {
   const targetUrl = buildApiUrl(url);
   const response = await fetch(targetUrl, {
@@ -1232,10 +1269,13 @@ async function putJson(url, body) {
   return payload;
 }
 
-function buildStateUrl(runId = null) {
+function buildStateUrl(runId = null, since = null) {
   const normalizedRun = String(runId || "").trim();
-  if (!normalizedRun) return "/api/state";
-  return `/api/state?run_id=${encodeURIComponent(normalizedRun)}`;
+  const params = [];
+  if (normalizedRun) params.push(`run_id=${encodeURIComponent(normalizedRun)}`);
+  if (Number.isFinite(since)) params.push(`since=${since}`);
+  if (!params.length) return "/api/state";
+  return `/api/state?${params.join("&")}`;
 }
 
 function buildQualityLiteUrl(runId = null) {
@@ -3346,10 +3386,47 @@ async function loadUiConfig() {
   }
 }
 
+function resolveStateSince(requestedRunId) {
+  // Geracao da ultima resposta, valida so para o mesmo run e dentro da
+  // janela de releitura completa.
+  const current = state.rawState;
+  if (!current || !requestedRunId || normalizeRunId(current.run_id) !== requestedRunId) return null;
+  if (Date.now() - Number(state.lastFullStateRefreshMs || 0) >= STATE_FULL_REFRESH_MS) return null;
+  const generation = Number(current.generation);
+  return Number.isFinite(generation) ? generation : null;
+}
+
+function mergeStateDeltaPayload(current, delta) {
+  // Resposta de /api/state?since=: cabecalho novo e pivos mesclados aos atuais.
+  const pivots = mergeStateDeltaPivots((current || {}).pivots, delta);
+  const next = { ...delta, counts: { ...((delta || {}).counts || {}), pivots: pivots.length }, pivots };
+  delete next.since;
+  delete next.full;
+  delete next.removed;
+  return next;
+}
+
 async function refreshState(options = {}) {
-  const skipRender = !!options.skipRender;
   const requestedRunId = normalizeRunId(state.selectedRunId) || null;
-  const data = await getJson(buildStateUrl(requestedRunId));
+  const since = resolveStateSince(requestedRunId);
+  // Delta que chegar durante a requisicao pede outra leitura completa.
+  state.streamNeedsFullRefresh = false;
+  state.stateFetchInFlight = true;
+  let data;
+  try {
+    data = await getJsonConditional(buildStateUrl(requestedRunId, since));
+  } finally {
+    state.stateFetchInFlight = false;
+  }
+  if (data && data.full === false) {
+    return applyStatePayload(mergeStateDeltaPayload(state.rawState, data), requestedRunId, options);
+  }
+  state.lastFullStateRefreshMs = Date.now();
+  return applyStatePayload(data, requestedRunId, options);
+}
+
+function applyStatePayload(data, requestedRunId, options = {}) {
+  const skipRender = !!options.skipRender;
   state.rawState = data;
   state.pivots = data.pivots || [];
   syncCloud2FilterOptions(data);
@@ -3434,7 +3511,7 @@ async function refreshPivot(options = {}) {
   const selectedRunId = text(state.selectedRunId, "").trim() || null;
 
   try {
-    state.pivotData = await getJson(buildPivotPanelUrl(pivotId, selectedRunId));
+    state.pivotData = await getJsonConditional(buildPivotPanelUrl(pivotId, selectedRunId));
   } catch (err) {
     state.pivotData = null;
   }
@@ -3539,7 +3616,7 @@ async function refreshQualityOverrides(options = {}) {
   const nextConnectivityMiniSegmentsByPivotId = { ...state.connectivityMiniSegmentsByPivotId };
   let qualityPayload = null;
   try {
-    qualityPayload = await getJson(buildQualityLiteUrl(state.selectedRunId));
+    qualityPayload = await getJsonConditional(buildQualityLiteUrl(state.selectedRunId));
   } catch (err) {
     return;
   }
@@ -3595,20 +3672,114 @@ async function refreshQualityOverrides(options = {}) {
   }
 }
 
+function isStateStreamCurrent() {
+  if (!state.streamConnected || state.streamNeedsFullRefresh || !state.rawState) return false;
+  if (Date.now() - Number(state.lastFullStateRefreshMs || 0) >= STATE_FULL_REFRESH_MS) return false;
+  return normalizeRunId(state.rawState.run_id) === normalizeRunId(state.selectedRunId);
+}
+
+function mergeStateDeltaPivots(currentPivots, delta) {
+  const removedIds = new Set(((delta || {}).removed || []).map((pivotId) => text(pivotId, "").trim()));
+  const changedById = new Map();
+  for (const pivot of (delta || {}).pivots || []) {
+    const pivotId = text((pivot || {}).pivot_id, "").trim();
+    if (pivotId) changedById.set(pivotId, pivot);
+  }
+  const pivots = [];
+  for (const pivot of currentPivots || []) {
+    const pivotId = text((pivot || {}).pivot_id, "").trim();
+    if (removedIds.has(pivotId)) continue;
+    if (changedById.has(pivotId)) {
+      pivots.push(changedById.get(pivotId));
+      changedById.delete(pivotId);
+    } else {
+      pivots.push(pivot);
+    }
+  }
+  if (changedById.size) {
+    pivots.push(...changedById.values());
+    pivots.sort((a, b) => text(a.pivot_id, "").toLowerCase().localeCompare(text(b.pivot_id, "").toLowerCase()));
+  }
+  return pivots;
+}
+
+function applyStateDelta(delta) {
+  const current = state.rawState;
+  if (!current || !delta || state.stateFetchInFlight) {
+    state.streamNeedsFullRefresh = true;
+    return;
+  }
+  // Deltas sao do run ativo; com um run historico selecionado o polling segue.
+  const deltaRunId = normalizeRunId(delta.run_id);
+  if (!deltaRunId || deltaRunId !== normalizeRunId(current.run_id) || deltaRunId !== normalizeRunId(state.selectedRunId)) {
+    return;
+  }
+  const pivots = mergeStateDeltaPivots(current.pivots, delta);
+  const next = {
+    ...current,
+    updated_at: delta.updated_at ?? current.updated_at,
+    updated_at_ts: delta.updated_at_ts ?? current.updated_at_ts,
+    counts: { ...(current.counts || {}), pivots: pivots.length },
+    pivots,
+  };
+  applyStatePayload(next, normalizeRunId(state.selectedRunId) || null);
+}
+
+function startStateStream() {
+  if (typeof EventSource === "undefined" || state.stateStream) return;
+  let source;
+  try {
+    source = new EventSource(buildApiUrl("/api/stream"), { withCredentials: true });
+  } catch (err) {
+    return;
+  }
+  state.stateStream = source;
+  source.addEventListener("open", () => {
+    // Mudancas entre a ultima leitura e a (re)conexao nao vem no stream.
+    state.streamConnected = true;
+    state.streamNeedsFullRefresh = true;
+  });
+  source.addEventListener("delta", (event) => {
+    let delta = null;
+    try {
+      delta = JSON.parse(event.data);
+    } catch (err) {
+      state.streamNeedsFullRefresh = true;
+      return;
+    }
+    applyStateDelta(delta);
+  });
+  source.addEventListener("reset", () => {
+    state.streamNeedsFullRefresh = true;
+    refreshAll();
+  });
+  source.addEventListener("error", () => {
+    // O EventSource reconecta sozinho (com Last-Event-ID); fechado de vez
+    // (404/503/auth), o dashboard volta ao polling do /api/state.
+    state.streamConnected = false;
+    state.streamNeedsFullRefresh = true;
+    if (source.readyState === 2) {
+      state.stateStream = null;
+    }
+  });
+}
+
 async function refreshAll(options = {}) {
   const suppressInterimRender = !!options.suppressInterimRender;
   if (state.refreshInFlight) return;
   state.refreshInFlight = true;
   try {
-    const stateResult = await refreshState({ skipRender: suppressInterimRender });
-    if (stateResult?.selectedRunChanged) {
-      await refreshState({ skipRender: suppressInterimRender });
-    }
-    if (!state.pivots.length) {
-      const resolved = await autoResolveRunIdFromBackend({ allowOverride: true });
-      if (resolved) {
+    if (!isStateStreamCurrent()) {
+      const stateResult = await refreshState({ skipRender: suppressInterimRender });
+      if (stateResult?.selectedRunChanged) {
         await refreshState({ skipRender: suppressInterimRender });
       }
+      if (!state.pivots.length) {
+        const resolved = await autoResolveRunIdFromBackend({ allowOverride: true });
+        if (resolved) {
+          await refreshState({ skipRender: suppressInterimRender });
+        }
+      }
     }
     await refreshQualityOverrides({ skipRender: suppressInterimRender });
     await refreshPivot({ skipRender: suppressInterimRender });
@@ -4810,6 +4981,7 @@ async function boot() {
   } finally {
     setInitialLoading(false);
   }
+  startStateStream();
   setInterval(refreshAll, state.refreshMs);
 }
 
@@ -4858,6 +5030,9 @@ if (typeof module !== "undefined" && module.exports) {
       collectConfirmedModemResetAcks,
       getExpectedPivotsPending,
       shouldRenderRssiPanel,
+      mergeStateDeltaPivots,
+      mergeStateDeltaPayload,
+      buildStateUrl,
     },
   };
 }
@@ -375,3 +375,54 @@ test("ui: entrada de fila de descoberta separa pivot_ids por virgula ou quebra d
   const parsed = _test.parsePivotIdBatchInput(" PivotA_1,\nPivotB_2 ; PivotC_3  ");
   assert.deepEqual(parsed, ["PivotA_1", "PivotB_2", "PivotC_3"]);
 });
+
+test("ui: delta do stream substitui, remove e insere pivôs mantendo a ordem por id", () => {
+  const current = [
+    { pivot_id: "PivotA_1", status: "green" },
+    { pivot_id: "PivotC_3", status: "green" },
+    { pivot_id: "PivotD_4", status: "green" },
+  ];
+  const merged = _test.mergeStateDeltaPivots(current, {
+    pivots: [
+      { pivot_id: "PivotC_3", status: "red" },
+      { pivot_id: "PivotB_2", status: "gray" },
+    ],
+    removed: ["PivotD_4"],
+  });
+
+  assert.deepEqual(
+    merged.map((pivot) => [pivot.pivot_id, pivot.status]),
+    [
+      ["PivotA_1", "green"],
+      ["PivotB_2", "gray"],
+      ["PivotC_3", "red"],
+    ]
+  );
+  assert.equal(merged[0], current[0]);
+});
+
+test("ui: resposta de /api/state?since= mescla pivos e descarta campos do delta", () => {
+  const current = {
+    generation: 10,
+    counts: { pivots: 2, pending_ping_unknown: 0 },
+    pivots: [
+      { pivot_id: "PivotA_1", status: "green" },
+      { pivot_id: "PivotB_2", status: "green" },
+    ],
+  };
+  const next = _test.mergeStateDeltaPayload(current, {
+    generation: 14,
+    since: 10,
+    full: false,
+    counts: { pivots: 1, pending_ping_unknown: 3 },
+    pivots: [{ pivot_id: "PivotA_1", status: "red" }],
+    removed: ["PivotB_2"],
+  });
+
+  assert.equal(next.generation, 14);
+  assert.deepEqual(next.counts, { pivots: 1, pending_ping_unknown: 3 });
+  assert.deepEqual(next.pivots, [{ pivot_id: "PivotA_1", status: "red" }]);
+  assert.equal("since" in next || "full" in next || "removed" in next, false);
+  assert.equal(_test.buildStateUrl("run 1", 14), "/api/state?run_id=run%201&since=14");
+  assert.equal(_test.buildStateUrl(null, null), "/api/state");
+});
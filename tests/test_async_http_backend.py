@@ -0,0 +1,214 @@
+import gzip
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_async_http import AsyncDashboardServer
+from backend.cloudv2_auth import FIXED_ADMIN_EMAIL, FIXED_ADMIN_PASSWORD
+from backend.cloudv2_dashboard import DASHBOARD_DIR, _build_handler
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = float(int(time.time()) - 3600)
+
+
+class AsyncDashboardServerTests(unittest.TestCase):
+    def _config(self, temp_dir):
+        return {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 2.0,
+            "api_quality_cache_ttl_sec": 2.0,
+        }
+
+    def _run(self, test, **server_options):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=self._config(temp_dir), log_dir=temp_dir)
+                store.start()
+                server = AsyncDashboardServer(("127.0.0.1", 0), _build_handler(store), **server_options)
+                server.start()
+                try:
+                    store.queue_expected_pivots(["PivotH_1"], now=BASE_TS, source="test")
+                    store.process_message("cloudv2", "#01-PivotH_1-discovery$", ts=BASE_TS + 1.0)
+                    test(server)
+                finally:
+                    server.server_close()
+                    store.stop()
+
+    def _login(self, conn):
+        body = json.dumps({"email": FIXED_ADMIN_EMAIL, "password": FIXED_ADMIN_PASSWORD})
+        conn.request("POST", "/auth/login", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        return response.getheader("Set-Cookie").split(";", 1)[0]
+
+    def test_keep_alive_serves_api_routes_on_one_connection(self):
+        def check(server):
+            conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+            try:
+                cookie = self._login(conn)
+                sock = conn.sock
+
+                conn.request("GET", "/api/state", headers={"Cookie": cookie})
+                response = conn.getresponse()
+                state = json.loads(response.read())
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.version, 11)
+                self.assertEqual([item["pivot_id"] for item in state["pivots"]], ["PivotH_1"])
+                etag = response.getheader("ETag")
+
+                conn.request("GET", "/api/state", headers={"Cookie": cookie, "If-None-Match": etag})
+                response = conn.getresponse()
+                self.assertEqual((response.status, response.read()), (304, b""))
+
+                conn.request("GET", "/api/pivot/PivotX_9/panel", headers={"Cookie": cookie})
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 404)
+
+                conn.request("GET", "/api/metrics", headers={"Cookie": cookie})
+                metrics = json.loads(conn.getresponse().read())["http"]
+                self.assertIs(conn.sock, sock)
+                self.assertEqual(metrics["mode"], "asyncio")
+                self.assertEqual(metrics["keepalive_reuses"], 4)
+
+                conn.request("GET", "/api/state", headers={"Cookie": cookie, "Connection": "close"})
+                response = conn.getresponse()
+                response.read()
+                self.assertTrue(response.will_close)
+            finally:
+                conn.close()
+
+            # Sem sessao: mesma resposta 401 do servidor antigo.
+            conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+            try:
+                conn.request("GET", "/api/state")
+                response = conn.getresponse()
+                self.assertEqual(response.status, 401)
+                self.assertEqual(json.loads(response.read())["code"], "auth_required")
+            finally:
+                conn.close()
+
+        self._run(check)
+
+    def test_static_files_and_json_are_compressed_on_request(self):
+        def check(server):
+            with open(os.path.join(DASHBOARD_DIR, "auth.js"), "rb") as file:
+                expected = file.read()
+            conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+            try:
+                conn.request("GET", "/auth.js", headers={"Accept-Encoding": "gzip, deflate"})
+                response = conn.getresponse()
+                self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+                self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+                self.assertEqual(gzip.decompress(response.read()), expected)
+                etag = response.getheader("ETag")
+
+                conn.request("GET", "/auth.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+                response = conn.getresponse()
+                self.assertEqual((response.status, response.read()), (304, b""))
+
+                conn.request("GET", "/auth.js", headers={"Accept-Encoding": "gzip;q=0"})
+                response = conn.getresponse()
+                self.assertIsNone(response.getheader("Content-Encoding"))
+                self.assertEqual(response.read(), expected)
+
+                conn.request("HEAD", "/login", headers={"Accept-Encoding": "gzip"})
+                response = conn.getresponse()
+                response.read()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.getheader("Cache-Control"), "no-store")
+
+                cookie = self._login(conn)
+                conn.request("GET", "/api/metrics", headers={"Cookie": cookie, "Accept-Encoding": "gzip"})
+                response = conn.getresponse()
+                self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+                metrics = json.loads(gzip.decompress(response.read()))["static_files"]
+                self.assertGreaterEqual(metrics["hits"], 2)
+                self.assertGreater(metrics["bytes"], metrics["gzip_bytes"])
+            finally:
+                conn.close()
+
+        self._run(check)
+
+    def test_incomplete_request_times_out_and_connections_are_bounded(self):
+        def check(server):
+            slow = socket.create_connection(server.server_address, timeout=5)
+            try:
+                slow.sendall(b"GET /api/state HTTP/1.1\r\nHost: x\r\n")
+                extra = socket.create_connection(server.server_address, timeout=5)
+                try:
+                    self.assertIn(b" 503 ", extra.recv(1024))
+                finally:
+                    extra.close()
+                # Cabecalho nunca terminado: o servidor fecha apos o timeout.
+                self.assertEqual(slow.recv(1024), b"")
+            finally:
+                slow.close()
+            metrics = server.get_metrics()
+            self.assertEqual(metrics["timeouts"], 1)
+            self.assertEqual(metrics["rejected_connections"], 1)
+
+        self._run(check, max_connections=1, request_timeout_sec=0.3)
+
+    def test_stalled_stream_client_is_dropped_with_bounded_buffer(self):
+        written = []
+        finished = threading.Event()
+
+        class EndlessStreamHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                chunk = b"data: " + b"x" * 16384 + b"\n\n"
+                try:
+                    while len(written) < 4096:
+                        self.wfile.write(chunk)
+                        written.append(len(chunk))
+                except OSError:
+                    pass
+                finally:
+                    self.close_connection = True
+                    finished.set()
+
+            def log_message(self, format_text, *args):
+                return
+
+        server = AsyncDashboardServer(
+            ("127.0.0.1", 0),
+            EndlessStreamHandler,
+            request_timeout_sec=0.5,
+            long_request_paths=("/api/stream",),
+        )
+        server.start()
+        client = socket.create_connection(server.server_address, timeout=5)
+        try:
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            client.sendall(b"GET /api/stream HTTP/1.1\r\nHost: x\r\n\r\n")
+            # Cliente nunca le: o handler para por backpressure, sem esgotar o laco.
+            self.assertTrue(finished.wait(10))
+            self.assertLess(len(written), 4096)
+            self.assertEqual(server.get_metrics()["stalled_writes"], 1)
+        finally:
+            client.close()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_auth as auth_mod
+from backend.cloudv2_auth import FIXED_ADMIN_EMAIL, FIXED_ADMIN_PASSWORD, AuthService
+from backend.cloudv2_persistence import TelemetryPersistence
+
+
+class AuthSessionCacheTests(unittest.TestCase):
+    def _start(self, temp_dir):
+        persistence = TelemetryPersistence(db_path=os.path.join(temp_dir, "telemetry.sqlite3"))
+        persistence.start()
+        self.addCleanup(persistence.stop)
+        service = AuthService(db_path=persistence.db_path)
+        self.addCleanup(service.close)
+        self.assertTrue(service.ensure_fixed_admin_account()["ok"])
+        return service
+
+    def _last_seen(self, service, session_id):
+        conn = sqlite3.connect(service.db_path)
+        try:
+            return conn.execute("SELECT last_seen_at FROM user_sessions WHERE id = ?", (session_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_cached_session_and_batched_last_seen(self):
+        clock = [1_700_000_000.0]
+        with tempfile.TemporaryDirectory() as temp_dir, patch.object(auth_mod, "_now_ts", lambda: clock[0]), patch.object(
+            auth_mod, "LAST_SEEN_FLUSH_SEC", 60
+        ), patch.object(auth_mod, "SESSION_CACHE_TTL_SEC", 30):
+            service = self._start(temp_dir)
+            token = service.login_user(FIXED_ADMIN_EMAIL, FIXED_ADMIN_PASSWORD)["session_token"]
+
+            first = service.resolve_session(token)
+            clock[0] += 5.0
+            second = service.resolve_session(token)
+            self.assertEqual(second, first)
+            second["user"]["role"] = "alterado"
+            self.assertEqual(service.resolve_session(token)["user"]["role"], "admin")
+            metrics = service.get_metrics()
+            self.assertEqual((metrics["session_cache_hits"], metrics["session_cache_misses"]), (2, 1))
+            self.assertEqual(metrics["pending_last_seen"], 1)
+            self.assertEqual(metrics["idle_connections"], 1)
+
+            # Toques ficam em buffer ate o intervalo; a gravacao e um lote so.
+            session_id = first["session_id"]
+            self.assertEqual(self._last_seen(service, session_id), 1_700_000_000.0)
+            clock[0] += 60.0
+            service.resolve_session(token)
+            self.assertEqual(self._last_seen(service, session_id), clock[0])
+            self.assertEqual(service.get_metrics()["last_seen_flushes"], 1)
+
+            # Revogacao por fora do servico vale apos o TTL do cache.
+            conn = sqlite3.connect(service.db_path)
+            with conn:
+                conn.execute("UPDATE user_sessions SET revoked_at = ? WHERE id = ?", (clock[0], session_id))
+            conn.close()
+            self.assertIsNotNone(service.resolve_session(token))
+            clock[0] += 31.0
+            self.assertIsNone(service.resolve_session(token))
+
+    def test_logout_reset_and_deletion_invalidate_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir, patch.object(auth_mod, "SESSION_CACHE_TTL_SEC", 3600):
+            service = self._start(temp_dir)
+            admin = service.login_user(FIXED_ADMIN_EMAIL, FIXED_ADMIN_PASSWORD)
+            admin_id = admin["user"]["id"]
+            self.assertIsNotNone(service.resolve_session(admin["session_token"]))
+            service.logout_session(admin["session_token"])
+            self.assertIsNone(service.resolve_session(admin["session_token"]))
+
+            registered = service.register_user(
+                "operador1@example.com",
+                "Senha-Forte-123",
+                "Senha-Forte-123",
+                name="Operador",
+                privacy_policy_accepted=True,
+            )
+            self.assertTrue(registered["ok"], registered)
+            user_token = service.login_user("operador1@example.com", "Senha-Forte-123")["session_token"]
+            self.assertIsNotNone(service.resolve_session(user_token))
+
+            user_id = service.resolve_session(user_token)["session_user_id"]
+            with service._connect() as conn:
+                reset_token = service._insert_token(conn, user_id, "password_reset", 3600, auth_mod._now_ts())
+            self.assertTrue(service.reset_password(reset_token, "Outra-Senha-456", "Outra-Senha-456")["ok"])
+            self.assertIsNone(service.resolve_session(user_token))
+
+            user_token = service.login_user("operador1@example.com", "Outra-Senha-456")["session_token"]
+            self.assertIsNotNone(service.resolve_session(user_token))
+            admin_token = service.login_user(FIXED_ADMIN_EMAIL, FIXED_ADMIN_PASSWORD)["session_token"]
+            self.assertEqual(service.resolve_session(admin_token)["session_user_id"], admin_id)
+            self.assertTrue(service.admin_delete_user(admin_id, user_id)["ok"])
+            self.assertIsNone(service.resolve_session(user_token))
+            self.assertIsNotNone(service.resolve_session(admin_token))
+
+
+if __name__ == "__main__":
+    unittest.main()
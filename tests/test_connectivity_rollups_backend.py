@@ -0,0 +1,209 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_persistence import TelemetryPersistence
+from backend.cloudv2_rollups import (
+    ROLLUP_DAILY,
+    ROLLUP_HOURLY,
+    RollupAccumulator,
+    advance_connectivity,
+    record_connectivity_message,
+    rollup_bucket_start,
+)
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = 1_700_006_400.0  # inicio exato de uma hora UTC
+
+
+class RollupAccumulatorTests(unittest.TestCase):
+    def test_span_is_split_across_hour_buckets(self):
+        accumulator = RollupAccumulator()
+        accumulator.add_span("PivotR_1", "s1", BASE_TS + 3000.0, BASE_TS + 4200.0, True)
+        rows = [row for row in accumulator.drain() if row["granularity"] == ROLLUP_HOURLY]
+        by_bucket = {row["bucket_ts"]: row["online_sec"] for row in rows}
+        self.assertEqual(by_bucket, {BASE_TS: 600.0, BASE_TS + 3600.0: 600.0})
+        self.assertEqual(len(accumulator), 0)
+
+    def test_daily_bucket_is_the_sum_of_its_utc_hours(self):
+        accumulator = RollupAccumulator()
+        accumulator.add_span("PivotR_1", "s1", BASE_TS - 5400.0, BASE_TS + 2 * 86400.0, True)
+        rows = accumulator.drain()
+        hourly = {row["bucket_ts"]: row["online_sec"] for row in rows if row["granularity"] == ROLLUP_HOURLY}
+        daily = {row["bucket_ts"]: row["online_sec"] for row in rows if row["granularity"] == ROLLUP_DAILY}
+        for day_ts, online_sec in daily.items():
+            self.assertEqual(day_ts % 86400, 0)
+            hours = [value for bucket_ts, value in hourly.items() if day_ts <= bucket_ts < day_ts + 86400]
+            self.assertLessEqual(len(hours), 24)
+            self.assertAlmostEqual(online_sec, sum(hours))
+        self.assertAlmostEqual(sum(daily.values()), 2 * 86400.0 + 5400.0)
+
+    def test_connectivity_is_online_until_threshold_after_last_message(self):
+        accumulator = RollupAccumulator()
+        state = {"cursor_ts": None, "covered_until_ts": None}
+        record_connectivity_message(accumulator, state, "PivotR_1", "s1", BASE_TS, "cloudv2-ping", 300.0)
+        record_connectivity_message(accumulator, state, "PivotR_1", "s1", BASE_TS + 120.0, "cloudv2", 300.0)
+        advance_connectivity(accumulator, state, "PivotR_1", "s1", BASE_TS + 1200.0)
+
+        hourly = [row for row in accumulator.drain() if row["granularity"] == ROLLUP_HOURLY]
+        self.assertEqual(len(hourly), 1)
+        self.assertEqual(hourly[0]["message_count"], 2)
+        self.assertEqual(hourly[0]["ping_count"], 1)
+        self.assertEqual(hourly[0]["cloudv2_count"], 1)
+        self.assertAlmostEqual(hourly[0]["online_sec"], 420.0)
+        self.assertAlmostEqual(hourly[0]["offline_sec"], 780.0)
+
+
+class RollupPersistenceTests(unittest.TestCase):
+    def _start_session(self, persistence, pivot_id):
+        run = persistence.get_or_create_active_run(now_ts=BASE_TS, source="test")
+        session = persistence.get_or_create_active_session(
+            pivot_id,
+            pivot_slug=pivot_id.lower(),
+            now_ts=BASE_TS,
+            source="test",
+            run_id=run["run_id"],
+        )
+        return session["session_id"]
+
+    def test_rows_are_additive_and_summary_matches_hourly_sum(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence = TelemetryPersistence(db_path=os.path.join(temp_dir, "telemetry.sqlite3"), write_behind_ms=0)
+            persistence.start()
+            try:
+                session_id = self._start_session(persistence, "PivotR_2")
+                for offset in range(0, 3 * 86400, 1800):
+                    accumulator = RollupAccumulator()
+                    ts_value = BASE_TS + offset
+                    accumulator.add_message("PivotR_2", session_id, ts_value, "cloudv2-ping")
+                    accumulator.add_rssi("PivotR_2", session_id, ts_value, 10 + (offset // 1800) % 5)
+                    accumulator.add_span("PivotR_2", session_id, ts_value, ts_value + 1800.0, offset % 7200 != 0)
+                    persistence.apply_rollup_rows(accumulator.drain(), updated_at_ts=ts_value)
+
+                hourly = persistence.fetch_rollups("PivotR_2", granularity=ROLLUP_HOURLY)
+                daily = persistence.fetch_rollups("PivotR_2", granularity="daily")
+                self.assertEqual(sum(row["message_count"] for row in hourly), 144)
+                self.assertEqual(sum(row["message_count"] for row in daily), 144)
+                self.assertEqual(hourly[0]["rssi_count"], 2)
+                self.assertEqual(hourly[0]["rssi_min"], 10.0)
+                self.assertEqual(hourly[0]["rssi_max"], 11.0)
+
+                start_ts = BASE_TS + 5400.0 - 1800.0
+                end_ts = rollup_bucket_start(BASE_TS + 2 * 86400, ROLLUP_DAILY) + 7200.0
+                totals = persistence.summarize_rollups("PivotR_2", start_ts, end_ts)
+                expected = [row for row in hourly if start_ts <= row["bucket_ts"] < end_ts]
+                self.assertEqual(totals["message_count"], sum(row["message_count"] for row in expected))
+                self.assertAlmostEqual(totals["online_sec"], sum(row["online_sec"] for row in expected))
+                self.assertAlmostEqual(totals["offline_sec"], sum(row["offline_sec"] for row in expected))
+            finally:
+                persistence.stop()
+
+    def test_rebuild_recomputes_rollups_from_raw_events(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence = TelemetryPersistence(db_path=os.path.join(temp_dir, "telemetry.sqlite3"), write_behind_ms=0)
+            persistence.start()
+            try:
+                session_id = self._start_session(persistence, "PivotR_3")
+                for index in range(10):
+                    persistence.insert_connectivity_event(
+                        "PivotR_3",
+                        session_id,
+                        {"ts": BASE_TS + index * 180.0, "topic": "cloudv2-ping", "type": "ping", "summary": "ping"},
+                        source_topic="cloudv2-ping",
+                        raw_payload=f"#8-PivotR_3-{index}$",
+                    )
+                persistence.apply_rollup_rows(
+                    [
+                        {
+                            "pivot_id": "PivotR_3",
+                            "session_id": session_id,
+                            "granularity": ROLLUP_HOURLY,
+                            "bucket_ts": BASE_TS,
+                            "message_count": 999,
+                        }
+                    ]
+                )
+
+                result = persistence.rebuild_rollups(
+                    pivot_id="PivotR_3",
+                    connectivity_settings={"ping_expected_sec": 180, "tolerance_factor": 1.5},
+                )
+                self.assertEqual(result["sessions"], 1)
+
+                hourly = persistence.fetch_rollups("PivotR_3", session_id=session_id)
+                self.assertEqual(len(hourly), 1)
+                self.assertEqual(hourly[0]["message_count"], 10)
+                self.assertEqual(hourly[0]["topic_counts"]["cloudv2-ping"], 10)
+                self.assertAlmostEqual(hourly[0]["online_sec"], 9 * 180.0)
+            finally:
+                persistence.stop()
+
+
+class RollupTelemetryTests(unittest.TestCase):
+    def _build_store(self, temp_dir):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+        }
+        ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+        data_dir_patch = patch.object(telemetry_mod, "DATA_DIR", temp_dir)
+        ensure_dirs_patch = patch.object(telemetry_mod, "ensure_dirs", ensure_dirs)
+        data_dir_patch.start()
+        ensure_dirs_patch.start()
+        self.addCleanup(data_dir_patch.stop)
+        self.addCleanup(ensure_dirs_patch.stop)
+        store = TelemetryStore(config=config, log_dir=temp_dir)
+        store.start()
+        return store
+
+    def test_messages_and_tick_fill_rollups(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir)
+            try:
+                store.queue_expected_pivots(["PivotR_4"], now=BASE_TS, source="test")
+                store.process_message("cloudv2", "#01-PivotR_4-discovery$", ts=BASE_TS)
+                for index in range(1, 6):
+                    store.process_message("cloudv2-ping", f"#8-PivotR_4-{10 + index}$", ts=BASE_TS + index * 180.0)
+                store.tick(now=BASE_TS + 3000.0)
+
+                payload = store.get_connectivity_rollups("PivotR_4", start_ts=BASE_TS, end_ts=BASE_TS + 3600.0)
+                self.assertEqual(payload["granularity"], ROLLUP_HOURLY)
+                self.assertEqual(len(payload["rollups"]), 1)
+                bucket = payload["rollups"][0]
+                self.assertEqual(bucket["message_count"], 6)
+                self.assertEqual(bucket["topic_counts"]["cloudv2-ping"], 5)
+                self.assertAlmostEqual(bucket["online_sec"] + bucket["offline_sec"], 3000.0)
+                self.assertGreater(bucket["offline_sec"], 0.0)
+                self.assertEqual(payload["totals"]["message_count"], 6)
+            finally:
+                store.stop()
+
+
+    def test_drop_metrics_come_from_rollups_beyond_retention(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir)
+            try:
+                store.queue_expected_pivots(["PivotR_5"], now=BASE_TS, source="test")
+                store.process_message("cloudv2", "#01-PivotR_5-discovery$", ts=BASE_TS)
+                for day in range(3):
+                    store.process_message("cloud2", "#11-PivotR_5-20-LTE-45-fw1$", ts=BASE_TS + day * 86400.0 + 600.0)
+                store.tick(now=BASE_TS + 2 * 86400.0 + 1200.0)
+
+                # A retencao de 24h ja podou as quedas antigas da memoria.
+                self.assertEqual(len(store.pivots["PivotR_5"].drop_events), 1)
+                metrics = store.get_pivot_snapshot("PivotR_5")["metrics"]
+                self.assertEqual(metrics["drops_24h"], 1)
+                self.assertEqual(metrics["drops_7d"], 3)
+            finally:
+                store.stop()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_connectivity import OnlineIntervalTracker, scan_online_intervals
+from backend.cloudv2_telemetry import CONNECTIVITY_TOPICS, TelemetryStore
+
+
+BASE_TS = 1_700_030_000.0
+TOPICS = ("cloudv2", "cloudv2-ping", "cloudv2-info", "cloudv2-network", "cloud2", "PivotT_1")
+
+
+class OnlineIntervalTrackerTests(unittest.TestCase):
+    def _assert_matches_scan(self, tracker, timeline, start_ts, end_ts, threshold_sec):
+        expected = scan_online_intervals(timeline, CONNECTIVITY_TOPICS, start_ts, end_ts, threshold_sec)
+        self.assertEqual(tracker.online_intervals(start_ts, end_ts, threshold_sec), expected)
+        self.assertAlmostEqual(
+            tracker.connected_seconds(start_ts, end_ts, threshold_sec),
+            sum(interval_end - interval_start for interval_start, interval_end in expected),
+            places=6,
+        )
+
+    def test_matches_full_scan_under_random_appends_prunes_and_threshold_changes(self):
+        rng = random.Random(12)
+        tracker = OnlineIntervalTracker(CONNECTIVITY_TOPICS)
+        timeline = []
+        now = BASE_TS
+        threshold_sec = 270.0
+        for step in range(3000):
+            now += rng.choice((5.0, 30.0, 120.0, 180.0, 400.0, 2000.0))
+            ts = now - 50.0 if rng.random() < 0.03 else now
+            timeline.append({"ts": ts, "topic": rng.choice(TOPICS)})
+            if rng.random() < 0.05:
+                threshold_sec = rng.choice((180.0, 270.0, 450.0, 900.0))
+            if rng.random() < 0.1:
+                cutoff = now - 6 * 3600.0
+                pruned = [event for event in timeline if event["ts"] >= cutoff]
+                if len(pruned) != len(timeline):
+                    tracker.sync(timeline)
+                    timeline = pruned
+                    tracker.rebind(timeline)
+            if len(timeline) > 500:
+                tracker.sync(timeline)
+                timeline = timeline[-500:]
+                tracker.rebind(timeline)
+
+            tracker.sync(timeline)
+            if step % 7 == 0:
+                window_sec = rng.choice((3600.0, 4 * 3600.0, 24 * 3600.0))
+                self._assert_matches_scan(tracker, timeline, now - window_sec, now, threshold_sec)
+                self._assert_matches_scan(tracker, timeline, now - window_sec, now - 600.0, threshold_sec)
+
+        self.assertLess(tracker.rebuild_count, 3000 // 4)
+
+    def test_topic_presence_and_min_event_ts(self):
+        tracker = OnlineIntervalTracker(CONNECTIVITY_TOPICS)
+        timeline = [
+            {"ts": BASE_TS, "topic": "PivotT_1"},
+            {"ts": BASE_TS + 60.0, "topic": "cloudv2"},
+            {"ts": BASE_TS + 120.0, "topic": "cloudv2-ping"},
+        ]
+        tracker.sync(timeline)
+        self.assertEqual(tracker.min_event_ts(), BASE_TS)
+        self.assertTrue(tracker.has_topic_between("cloudv2", BASE_TS, BASE_TS + 60.0))
+        self.assertFalse(tracker.has_topic_between("cloudv2", BASE_TS + 61.0, BASE_TS + 500.0))
+        self.assertTrue(tracker.has_topic_between("cloudv2-ping", BASE_TS + 61.0, BASE_TS + 500.0))
+
+        timeline = timeline[2:]
+        tracker.rebind(timeline)
+        self.assertEqual(tracker.min_event_ts(), BASE_TS + 120.0)
+        self.assertFalse(tracker.has_topic_between("cloudv2", BASE_TS, BASE_TS + 500.0))
+
+
+class TelemetryConnectivityTrackerTests(unittest.TestCase):
+    def test_status_pct_matches_timeline_scan(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = {
+                "enable_background_worker": False,
+                "require_apply_to_start": False,
+                "continuous_monitoring_mode": True,
+                "history_mode": "merge",
+                "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+                "api_state_cache_ttl_sec": 0,
+                "api_quality_cache_ttl_sec": 0,
+            }
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotT_1"], now=BASE_TS, source="test")
+                    store.process_message("cloudv2", "#01-PivotT_1-discovery$", ts=BASE_TS)
+                    ts = BASE_TS
+                    for index in range(1, 120):
+                        ts += 180.0 if index % 25 else 3600.0
+                        topic = "cloudv2" if index % 3 == 0 else "cloudv2-ping"
+                        prefix = "#01" if topic == "cloudv2" else "#8"
+                        store.process_message(topic, f"{prefix}-PivotT_1-{index}$", ts=ts)
+
+                    pivot = store.pivots["PivotT_1"]
+                    now = ts + 900.0
+                    status = store._compute_status_locked(pivot, now)
+                    threshold_sec = status["disconnect_threshold_sec"]
+                    window_sec = min(store.attention_disconnected_window_sec, store.retention_sec)
+                    intervals = scan_online_intervals(
+                        pivot["timeline"], CONNECTIVITY_TOPICS, now - window_sec, now, threshold_sec
+                    )
+                    connected_sec = sum(end - start for start, end in intervals)
+                    expected_pct = (window_sec - connected_sec) / window_sec * 100.0
+                    self.assertAlmostEqual(status["attention_disconnected_pct"], expected_pct, places=6)
+                    self.assertTrue(status["has_principal_payload_in_window"])
+                finally:
+                    store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
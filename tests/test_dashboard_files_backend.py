@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = float(int(time.time()) - 3600)
+
+
+class DashboardFilesTests(unittest.TestCase):
+    def _config(self, temp_dir, **overrides):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+        }
+        config.update(overrides)
+        return config
+
+    def test_only_changed_pivot_files_are_rewritten(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=self._config(temp_dir), log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotF_1", "PivotF_2"], now=BASE_TS, source="test")
+                    store.process_message("cloudv2", "#01-PivotF_1-discovery$", ts=BASE_TS + 1.0)
+                    store.process_message("cloudv2", "#01-PivotF_2-discovery$", ts=BASE_TS + 2.0)
+                    store.write()
+                    self.assertEqual(store.get_runtime_metrics()["dashboard_files"]["last_pivot_files_written"], 2)
+
+                    store.write()
+                    self.assertEqual(store.get_runtime_metrics()["dashboard_files"]["last_pivot_files_written"], 0)
+
+                    store.process_message("cloudv2", "#01-PivotF_2-1$", ts=BASE_TS + 180.0)
+                    store.write()
+                    metrics = store.get_runtime_metrics()["dashboard_files"]
+                    self.assertEqual(metrics["last_pivot_files_written"], 1)
+                    self.assertTrue(metrics["enabled"])
+
+                    with open(os.path.join(temp_dir, "pivot_PivotF_2.json"), "r", encoding="utf-8") as file:
+                        raw = file.read()
+                    self.assertNotIn("\n", raw)
+                    self.assertEqual(json.loads(raw)["timeline"][0]["ts"], BASE_TS + 180.0)
+                    with open(os.path.join(temp_dir, "pivots.json"), "r", encoding="utf-8") as file:
+                        mapping = json.load(file)
+                    self.assertEqual([item["pivot_id"] for item in mapping], ["PivotF_1", "PivotF_2"])
+                finally:
+                    store.stop()
+
+    def test_disabled_export_writes_only_checkpoint(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                config = self._config(temp_dir, dashboard_files_enabled=False)
+                store = TelemetryStore(config=config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotF_3"], now=BASE_TS, source="test")
+                    store.process_message("cloudv2", "#01-PivotF_3-discovery$", ts=BASE_TS + 1.0)
+                    store.write()
+                    self.assertFalse(os.path.exists(os.path.join(temp_dir, "state.json")))
+                    self.assertFalse(os.path.exists(os.path.join(temp_dir, "pivots.json")))
+                    self.assertFalse(os.path.exists(os.path.join(temp_dir, "pivot_PivotF_3.json")))
+                    self.assertTrue(os.path.exists(store.checkpoint_path))
+                    self.assertEqual(store.get_runtime_metrics()["dashboard_files"]["writes"], 0)
+                finally:
+                    store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
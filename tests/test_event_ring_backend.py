@@ -0,0 +1,114 @@
+import copy
+import random
+import unittest
+
+from backend.cloudv2_connectivity import OnlineIntervalTracker, scan_online_intervals
+from backend.cloudv2_event_ring import EventRing, PointRing
+from backend.cloudv2_telemetry import CONNECTIVITY_TOPICS, _reparse_device_payload, _ts_to_str, parse_device_payload
+
+
+BASE_TS = 1_700_070_000.0
+TOPICS = ("cloudv2", "cloudv2-ping", "cloudv2-info", "cloud2", "PivotR_1")
+
+
+def _event(event_id, ts, topic):
+    raw_payload = f"#01-PivotR_1-{event_id}$"
+    details = {"source_topic": topic, "raw_payload": raw_payload}
+    parsed_payload = parse_device_payload(raw_payload)[0]
+    if parsed_payload:
+        details["parsed_payload"] = parsed_payload
+    return {
+        "id": event_id,
+        "ts": ts,
+        "at": _ts_to_str(ts),
+        "type": "message",
+        "topic": topic,
+        "summary": f"Mensagem recebida em {topic}.",
+        "details": details,
+    }
+
+
+def _ring(capacity):
+    return EventRing(capacity=capacity, format_ts=_ts_to_str, parse_payload=_reparse_device_payload)
+
+
+class EventRingTests(unittest.TestCase):
+    def test_matches_list_under_appends_capacity_and_prunes(self):
+        rng = random.Random(21)
+        ring = _ring(300)
+        reference = []
+        ts = BASE_TS
+        for event_id in range(1, 2000):
+            ts += rng.choice((5.0, 60.0, 180.0))
+            event = _event(event_id, ts, rng.choice(TOPICS))
+            ring.append(event["id"], ts, event["type"], event["topic"], event["summary"], copy.deepcopy(event["details"]))
+            reference.append(event)
+            reference = reference[-300:]
+            if rng.random() < 0.05:
+                cutoff = ts - rng.choice((600.0, 3600.0))
+                reference = [item for item in reference if item["ts"] >= cutoff]
+                ring.prune_before(cutoff)
+            self.assertEqual(len(ring), len(reference))
+            self.assertEqual(ring.end_seq - ring.start_seq, len(reference))
+
+        self.assertEqual(ring.to_list(), reference)
+        self.assertEqual(ring[-1], reference[-1])
+        self.assertEqual(ring[-5:], reference[-5:])
+        self.assertEqual(ring.first_ts(), reference[0]["ts"])
+
+    def test_unsorted_and_foreign_items_round_trip(self):
+        ring = _ring(10)
+        items = [
+            _event(1, BASE_TS + 100.0, "cloudv2"),
+            {"ts": BASE_TS, "topic": "cloudv2-ping"},
+            _event(3, BASE_TS + 50.0, "cloud2"),
+            {"topic": "cloudv2", "note": "sem ts"},
+        ]
+        ring.extend(copy.deepcopy(items))
+        self.assertEqual(ring, items)
+
+        epoch = ring.epoch
+        self.assertEqual(ring.prune_before(BASE_TS + 40.0), 2)
+        self.assertEqual(ring.to_list(), [items[0], items[2]])
+        self.assertEqual(ring.epoch, epoch + 1)
+        self.assertEqual(ring.min_ts(), BASE_TS + 50.0)
+
+    def test_point_ring_matches_list(self):
+        points = PointRing(capacity=3, format_ts=_ts_to_str)
+        points.append(BASE_TS, 20)
+        points.append_item({"ts": BASE_TS + 1.0, "rssi": "invalido"})
+        points.append(BASE_TS + 2.0, 18)
+        points.append(BASE_TS + 3.0, 17)
+        self.assertEqual(
+            points.to_list(),
+            [
+                {"ts": BASE_TS + 1.0, "rssi": "invalido"},
+                {"ts": BASE_TS + 2.0, "at": _ts_to_str(BASE_TS + 2.0), "rssi": 18},
+                {"ts": BASE_TS + 3.0, "at": _ts_to_str(BASE_TS + 3.0), "rssi": 17},
+            ],
+        )
+        self.assertEqual(points.prune_before(BASE_TS + 2.5), 2)
+        self.assertEqual(points.to_list(), [{"ts": BASE_TS + 3.0, "at": _ts_to_str(BASE_TS + 3.0), "rssi": 17}])
+
+    def test_tracker_on_ring_matches_full_scan(self):
+        rng = random.Random(8)
+        ring = _ring(400)
+        tracker = OnlineIntervalTracker(CONNECTIVITY_TOPICS)
+        ts = BASE_TS
+        threshold_sec = 270.0
+        for event_id in range(1, 2500):
+            ts += rng.choice((5.0, 30.0, 180.0, 400.0, 2000.0))
+            event_ts = ts - 40.0 if rng.random() < 0.02 else ts
+            ring.append(event_id, event_ts, "message", rng.choice(TOPICS), "Mensagem.", {})
+            if rng.random() < 0.05:
+                ring.prune_before(ts - 6 * 3600.0)
+            tracker.sync(ring)
+            if event_id % 9 == 0:
+                timeline = ring.to_list()
+                expected = scan_online_intervals(timeline, CONNECTIVITY_TOPICS, ts - 4 * 3600.0, ts, threshold_sec)
+                self.assertEqual(tracker.online_intervals(ts - 4 * 3600.0, ts, threshold_sec), expected)
+                self.assertEqual(tracker.min_event_ts(), min(item["ts"] for item in timeline))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import threading
+import unittest
+
+from backend.cloudv2_ingest import (
+    INGEST_POLICY_BLOCK,
+    INGEST_POLICY_COALESCE_PING,
+    INGEST_POLICY_DROP_OLDEST,
+    IngestQueue,
+    normalize_ingest_policy,
+)
+
+
+class IngestQueueTests(unittest.TestCase):
+    def _build_blocked_queue(self, policy, max_size=2, block_timeout_sec=0.0):
+        processed = []
+        gate = threading.Event()
+        first_started = threading.Event()
+
+        def handler(topic, payload, ts):
+            first_started.set()
+            gate.wait(5.0)
+            processed.append((topic, payload, ts))
+
+        queue = IngestQueue(handler, max_size=max_size, workers=1, policy=policy, block_timeout_sec=block_timeout_sec)
+        queue.start()
+        self.addCleanup(queue.stop)
+        self.addCleanup(gate.set)
+
+        # Segura o worker na primeira mensagem para encher a fila de forma deterministica.
+        queue.submit("cloudv2", "#01-Hold_1-x$", ts=1.0)
+        self.assertTrue(first_started.wait(2.0))
+        return queue, processed, gate
+
+    def test_normalize_ingest_policy_defaults_to_block(self):
+        self.assertEqual(normalize_ingest_policy("drop-oldest"), INGEST_POLICY_DROP_OLDEST)
+        self.assertEqual(normalize_ingest_policy("coalesce"), INGEST_POLICY_COALESCE_PING)
+        self.assertEqual(normalize_ingest_policy("qualquer"), INGEST_POLICY_BLOCK)
+
+    def test_processes_messages_in_order_and_reports_latency(self):
+        processed = []
+        done = threading.Event()
+
+        def handler(topic, payload, ts):
+            processed.append(payload)
+            if len(processed) == 3:
+                done.set()
+
+        queue = IngestQueue(handler, max_size=100, workers=2)
+        queue.start()
+        try:
+            for index in range(3):
+                self.assertTrue(queue.submit("cloudv2-ping", f"#8-PivotA_1-{index}$", ts=100.0 + index))
+            self.assertTrue(done.wait(2.0))
+        finally:
+            queue.stop()
+
+        self.assertEqual(processed, ["#8-PivotA_1-0$", "#8-PivotA_1-1$", "#8-PivotA_1-2$"])
+        metrics = queue.get_metrics()
+        self.assertEqual(metrics["processed_count"], 3)
+        self.assertEqual(metrics["dropped_count"], 0)
+        self.assertEqual(metrics["depth"], 0)
+        self.assertIsNotNone(metrics["latency_p95_ms"])
+
+    def test_drop_oldest_discards_head_of_queue(self):
+        queue, processed, gate = self._build_blocked_queue(INGEST_POLICY_DROP_OLDEST)
+        for index in range(4):
+            self.assertTrue(queue.submit("cloudv2", f"#01-PivotA_1-{index}$", ts=10.0 + index))
+
+        metrics = queue.get_metrics()
+        self.assertEqual(metrics["depth"], 2)
+        self.assertEqual(metrics["dropped_oldest_count"], 2)
+
+        gate.set()
+        queue.stop()
+        self.assertEqual([item[1] for item in processed[1:]], ["#01-PivotA_1-2$", "#01-PivotA_1-3$"])
+
+    def test_block_policy_drops_newest_after_timeout(self):
+        queue, _, _ = self._build_blocked_queue(INGEST_POLICY_BLOCK, block_timeout_sec=0.05)
+        self.assertTrue(queue.submit("cloudv2", "#01-PivotA_1-a$"))
+        self.assertTrue(queue.submit("cloudv2", "#01-PivotA_1-b$"))
+        self.assertFalse(queue.submit("cloudv2", "#01-PivotA_1-c$"))
+
+        metrics = queue.get_metrics()
+        self.assertEqual(metrics["blocked_count"], 1)
+        self.assertEqual(metrics["dropped_full_count"], 1)
+
+    def test_coalesce_ping_keeps_latest_pending_ping_per_pivot(self):
+        queue, processed, gate = self._build_blocked_queue(INGEST_POLICY_COALESCE_PING, max_size=10)
+        queue.submit("cloudv2-ping", "#8-PivotA_1-10$", ts=20.0)
+        queue.submit("cloudv2-ping", "#8-PivotB_1-11$", ts=21.0)
+        queue.submit("cloudv2-ping", "#8-PivotA_1-12$", ts=22.0)
+        queue.submit("cloudv2", "#01-PivotA_1-x$", ts=23.0)
+
+        metrics = queue.get_metrics()
+        self.assertEqual(metrics["depth"], 3)
+        self.assertEqual(metrics["coalesced_count"], 1)
+
+        gate.set()
+        queue.stop()
+        self.assertEqual(
+            [(item[1], item[2]) for item in processed[1:]],
+            [("#8-PivotA_1-12$", 22.0), ("#8-PivotB_1-11$", 21.0), ("#01-PivotA_1-x$", 23.0)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_interval_stats import IntervalMedianEngine, compute_interval_stats
+from backend.cloudv2_telemetry import CLOUDV2_MEDIAN_TOLERANCE_PCT, TelemetryStore
+
+
+BASE_TS = 1_700_040_000.0
+
+
+class IntervalMedianEngineTests(unittest.TestCase):
+    def test_matches_full_recluster_on_sliding_window(self):
+        rng = random.Random(21)
+        for tolerance_pct in (0.1, CLOUDV2_MEDIAN_TOLERANCE_PCT):
+            engine = IntervalMedianEngine(tolerance_pct)
+            intervals = []
+            for step in range(2000):
+                roll = rng.random()
+                if roll < 0.1:
+                    intervals.append(rng.uniform(5.0, 3600.0))
+                elif roll < 0.15:
+                    intervals.append(rng.choice((0, -3.0, "x", None)))
+                else:
+                    intervals.append(rng.choice((60.0, 180.0, 300.0)) * rng.uniform(0.85, 1.15))
+                window = intervals[-20:]
+                self.assertEqual(engine.stats(window), compute_interval_stats(window, tolerance_pct), msg=step)
+                if step % 5 == 0:
+                    self.assertEqual(engine.stats(window), compute_interval_stats(window, tolerance_pct))
+            self.assertGreater(engine.append_count, 0)
+
+    def test_ties_and_empty_windows(self):
+        engine = IntervalMedianEngine(0.25)
+        for window in ([], [100.0, 300.0], [100.0, 300.0, 100.0, 300.0], [300.0, 100.0, 300.0, 100.0], []):
+            self.assertEqual(engine.stats(window), compute_interval_stats(window, 0.25))
+
+
+class TelemetryIntervalMedianTests(unittest.TestCase):
+    def test_status_median_and_engine_cleanup(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = {
+                "enable_background_worker": False,
+                "require_apply_to_start": False,
+                "continuous_monitoring_mode": True,
+                "history_mode": "merge",
+                "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+                "api_state_cache_ttl_sec": 0,
+                "api_quality_cache_ttl_sec": 0,
+            }
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotM_1"], now=BASE_TS, source="test")
+                    ts = BASE_TS
+                    for index in range(40):
+                        ts += 180.0 if index % 7 else 900.0
+                        store.process_message("cloudv2", f"#01-PivotM_1-{index}$", ts=ts)
+                        store.tick(now=ts + 1.0)
+
+                    pivot = store.pivots["PivotM_1"]
+                    status = store._compute_status_locked(pivot, ts + 2.0)
+                    expected = compute_interval_stats(
+                        pivot["topic_intervals_sec"]["cloudv2"], CLOUDV2_MEDIAN_TOLERANCE_PCT
+                    )
+                    self.assertEqual(status["sample_count"], expected["sample_count"])
+                    self.assertAlmostEqual(status["median_interval_sec"], expected["median_interval_sec"])
+                    self.assertIn("PivotM_1", store._interval_engines)
+                finally:
+                    store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
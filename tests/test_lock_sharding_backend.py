@@ -0,0 +1,149 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_store_locks import StoreLock
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = 1_700_010_000.0
+
+
+class StoreLockTests(unittest.TestCase):
+    def test_shared_holders_do_not_block_each_other(self):
+        lock = StoreLock()
+        inside = threading.Barrier(2, timeout=2.0)
+        errors = []
+
+        def _reader():
+            try:
+                with lock.shared():
+                    inside.wait()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=_reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_exclusive_waits_for_shared_and_upgrade_is_rejected(self):
+        lock = StoreLock()
+        acquired = threading.Event()
+
+        def _writer():
+            with lock:
+                acquired.set()
+
+        with lock.shared():
+            with self.assertRaises(RuntimeError):
+                lock.acquire()
+            writer = threading.Thread(target=_writer)
+            writer.start()
+            self.assertFalse(acquired.wait(0.1))
+        self.assertTrue(acquired.wait(2.0))
+        writer.join()
+
+        with lock:
+            with lock.shared():
+                with lock:
+                    pass
+        self.assertEqual(lock.get_metrics()["exclusive"]["acquire_count"], 2)
+
+
+class TelemetryLockShardingTests(unittest.TestCase):
+    def _build_store(self, temp_dir):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+        }
+        ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+        data_dir_patch = patch.object(telemetry_mod, "DATA_DIR", temp_dir)
+        ensure_dirs_patch = patch.object(telemetry_mod, "ensure_dirs", ensure_dirs)
+        data_dir_patch.start()
+        ensure_dirs_patch.start()
+        self.addCleanup(data_dir_patch.stop)
+        self.addCleanup(ensure_dirs_patch.stop)
+        store = TelemetryStore(config=config, log_dir=temp_dir)
+        store.start()
+        return store
+
+    def test_concurrent_ingest_and_readers_keep_state_consistent(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir)
+            try:
+                pivot_ids = [f"PivotL_{index}" for index in range(8)]
+                store.queue_expected_pivots(pivot_ids, now=BASE_TS, source="test")
+                for pivot_id in pivot_ids:
+                    result = store.process_message("cloudv2", f"#01-{pivot_id}-discovery$", ts=BASE_TS)
+                    self.assertTrue(result["accepted"])
+
+                messages_per_pivot = 60
+                errors = []
+                rejected = []
+                ingest_done = threading.Event()
+
+                def _ingest(owned_ids):
+                    try:
+                        for index in range(1, messages_per_pivot + 1):
+                            for pivot_id in owned_ids:
+                                result = store.process_message(
+                                    "cloudv2-ping",
+                                    f"#8-{pivot_id}-{index}$",
+                                    ts=BASE_TS + index,
+                                )
+                                if not result.get("accepted"):
+                                    rejected.append(result)
+                    except Exception as exc:
+                        errors.append(exc)
+
+                def _read():
+                    try:
+                        while not ingest_done.is_set():
+                            store.get_state_snapshot(now=BASE_TS + 30.0)
+                            store.tick(now=BASE_TS + 30.0)
+                            store.write()
+                    except Exception as exc:
+                        errors.append(exc)
+
+                ingest_threads = [
+                    threading.Thread(target=_ingest, args=(pivot_ids[offset::4],)) for offset in range(4)
+                ]
+                reader_threads = [threading.Thread(target=_read) for _ in range(2)]
+                for thread in reader_threads + ingest_threads:
+                    thread.start()
+                for thread in ingest_threads:
+                    thread.join(30.0)
+                ingest_done.set()
+                for thread in reader_threads:
+                    thread.join(30.0)
+
+                self.assertEqual(errors, [])
+                self.assertEqual(rejected, [])
+
+                state = store.get_state_snapshot(now=BASE_TS + messages_per_pivot + 1.0)
+                self.assertEqual(state["counts"]["pivots"], len(pivot_ids))
+                for pivot_id in pivot_ids:
+                    snapshot = store.get_pivot_snapshot(pivot_id, now=BASE_TS + messages_per_pivot + 1.0)
+                    ping_events = [event for event in snapshot["timeline"] if event.get("topic") == "cloudv2-ping"]
+                    self.assertEqual(len(ping_events), messages_per_pivot)
+
+                locks = store.get_runtime_metrics()["locks"]
+                self.assertGreater(locks["shared"]["acquire_count"], 0)
+                self.assertEqual(locks["pivot_locks"], len(pivot_ids))
+            finally:
+                store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_pivot_state import PivotState, ProbeState
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = 1_700_060_000.0
+
+
+class PivotStateTests(unittest.TestCase):
+    def test_mapping_access_matches_attributes(self):
+        pivot = PivotState(pivot_id="PivotZ_1", pivot_slug="pivotz_1", probe=ProbeState(interval_sec=300))
+        pivot["last_seen_ts"] = BASE_TS
+        pivot.cloud2_events.append({"ts": BASE_TS, "topic": "cloud2"})
+        pivot.timeline.append_item({"ts": BASE_TS, "topic": "cloudv2"})
+
+        self.assertEqual(pivot.last_seen_ts, BASE_TS)
+        self.assertEqual(pivot.get("cloud2_events"), [{"ts": BASE_TS, "topic": "cloud2"}])
+        self.assertEqual(pivot.get("timeline"), [{"ts": BASE_TS, "topic": "cloudv2"}])
+        self.assertEqual(pivot["probe"]["interval_sec"], 300)
+        self.assertIn("rollup", pivot)
+        self.assertNotIn("unknown", pivot)
+        self.assertIsNone(pivot.get("unknown"))
+        with self.assertRaises(KeyError):
+            pivot["unknown"] = 1
+        with self.assertRaises(AttributeError):
+            pivot.unknown = 1
+
+        payload = json.loads(json.dumps(pivot.to_dict()))
+        self.assertEqual(payload["probe"]["interval_sec"], 300)
+        self.assertEqual(list(payload.keys()), pivot.keys())
+
+
+class RuntimeStoreRoundTripTests(unittest.TestCase):
+    def test_runtime_store_restores_pivot_state(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = {
+                "enable_background_worker": False,
+                "require_apply_to_start": False,
+                "continuous_monitoring_mode": True,
+                "history_mode": "merge",
+                "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+                "api_state_cache_ttl_sec": 0,
+                "api_quality_cache_ttl_sec": 0,
+            }
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotZ_1"], now=BASE_TS, source="test")
+                    ts = BASE_TS
+                    for index in range(8):
+                        ts += 180.0
+                        store.process_message("cloudv2", f"#01-PivotZ_1-{index}$", ts=ts)
+                        store.process_message("cloudv2-ping", f"#8-PivotZ_1-{index}$", ts=ts + 1.0)
+                    store.update_probe_setting("PivotZ_1", True, 600)
+                    store.write()
+                    original = store.pivots["PivotZ_1"]
+                finally:
+                    store.stop()
+
+                restored_store = TelemetryStore(config=config, log_dir=temp_dir)
+                restored_store.start()
+                try:
+                    restored = restored_store.pivots["PivotZ_1"]
+                    self.assertIsInstance(restored, PivotState)
+                    self.assertIsInstance(restored.probe, ProbeState)
+                    for name in ("last_cloudv2_ts", "last_ping_ts", "cloudv2_intervals_sec", "topic_counters"):
+                        self.assertEqual(restored[name], original[name], msg=name)
+                    self.assertEqual(restored.probe.interval_sec, 600)
+                    self.assertTrue(restored.probe.enabled)
+                finally:
+                    restored_store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from backend.cloudv2_persistence import TelemetryPersistence
+
+
+class ReadConnectionPoolTests(unittest.TestCase):
+    def _start(self, temp_dir, **kwargs):
+        persistence = TelemetryPersistence(db_path=os.path.join(temp_dir, "telemetry.sqlite3"), **kwargs)
+        persistence.start()
+        self.addCleanup(persistence.stop)
+        run = persistence.get_or_create_active_run(now_ts=1_700_000_000.0, source="test")
+        session = persistence.get_or_create_active_session(
+            "PivotRP_1",
+            pivot_slug="pivotrp-1",
+            now_ts=1_700_000_000.0,
+            source="test",
+            run_id=run["run_id"],
+        )
+        return persistence, session["session_id"]
+
+    def _insert(self, persistence, session_id, ts_value):
+        persistence.insert_connectivity_event(
+            "PivotRP_1",
+            session_id,
+            {"ts": ts_value, "topic": "cloudv2-ping", "type": "ping", "summary": "ping"},
+        )
+
+    def test_open_read_does_not_block_writer(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, session_id = self._start(temp_dir, write_behind_ms=0, read_pool_size=2)
+            written = threading.Event()
+
+            def _writer():
+                self._insert(persistence, session_id, 1_700_000_010.0)
+                written.set()
+
+            with persistence._read_connection() as conn:
+                # Leitura em andamento (conexao do pool em uso) enquanto a ingestao grava.
+                conn.execute("SELECT COUNT(*) FROM connectivity_events").fetchone()
+                writer = threading.Thread(target=_writer)
+                writer.start()
+                self.assertTrue(written.wait(2.0))
+                writer.join()
+                with self.assertRaises(Exception):
+                    conn.execute("DELETE FROM connectivity_events")
+
+            events = persistence.fetch_timeline_events_light("PivotRP_1", session_id)
+            self.assertEqual(len(events), 1)
+
+            metrics = persistence.get_write_metrics()
+            self.assertEqual(metrics["read_pool"]["size"], 2)
+            self.assertEqual(metrics["read_pool"]["in_use"], 0)
+            self.assertGreater(metrics["read_pool"]["acquire"]["acquire_count"], 0)
+            self.assertEqual(metrics["writer_lock"]["contended_count"], 0)
+
+    def test_reads_see_pending_write_behind_rows(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, session_id = self._start(temp_dir, write_behind_ms=60_000, read_pool_size=2)
+            for offset in range(3):
+                self._insert(persistence, session_id, 1_700_000_100.0 + offset)
+            self.assertEqual(len(persistence.fetch_timeline_events_light("PivotRP_1", session_id)), 3)
+            self.assertEqual(persistence.get_write_metrics()["pending_rows"], 0)
+
+    def test_pool_disabled_falls_back_to_writer_connection(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, session_id = self._start(temp_dir, write_behind_ms=0, read_pool_size=0)
+            self._insert(persistence, session_id, 1_700_000_200.0)
+            self.assertEqual(len(persistence.fetch_timeline_events("PivotRP_1", session_id)), 1)
+            self.assertIsNone(persistence.get_write_metrics()["read_pool"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_response_cache import ResponseCache, StaticFileCache, etag_matches, negotiate_encoding
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = float(int(time.time()) - 3600)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_entry_is_reused_until_ttl_and_gzip_round_trips(self):
+        cache = ResponseCache(gzip_enabled=True, gzip_min_bytes=64)
+        builds = []
+
+        def builder():
+            builds.append(1)
+            return {"pivots": [{"pivot_id": f"Pivot_{index}", "status": "verde"} for index in range(20)]}
+
+        first = cache.get_or_build(("state", "__default__"), 100.0, 2.0, 1, builder)
+        second = cache.get_or_build(("state", "__default__"), 101.5, 2.0, 5, builder)
+        self.assertIs(second, first)
+        self.assertEqual(first.generation, 1)
+        self.assertEqual(json.loads(gzip.decompress(first.gzip_body)), builder())
+        self.assertEqual(first.payload(), json.loads(first.body))
+
+        third = cache.get_or_build(("state", "__default__"), 102.0, 2.0, 5, builder)
+        self.assertIsNot(third, first)
+        self.assertEqual(third.generation, 5)
+
+        metrics = cache.get_metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"], metrics["builds"]), (1, 2, 2))
+        self.assertEqual(metrics["hit_ratio"], round(1 / 3, 4))
+
+    def test_zero_ttl_small_body_and_missing_payload_are_not_cached(self):
+        cache = ResponseCache(gzip_enabled=True, gzip_min_bytes=1024)
+        first = cache.get_or_build("quality", 100.0, 0.0, 1, lambda: {"ok": True})
+        self.assertIsNone(first.gzip_body)
+        self.assertIsNot(cache.get_or_build("quality", 100.0, 0.0, 1, lambda: {"ok": True}), first)
+        self.assertIsNone(cache.get_or_build("panel", 100.0, 2.0, 1, lambda: None))
+        self.assertEqual(cache.get_metrics()["entries"], 0)
+
+    def test_etag_follows_generation_and_matches_any_encoding(self):
+        cache = ResponseCache(gzip_enabled=True, gzip_min_bytes=0)
+        first = cache.get_or_build("state", 100.0, 2.0, 7, lambda: {"generation": 7})
+        self.assertEqual(first.etag, f'"{cache.instance_id}-7"')
+        gzip_etag = first.representation_etag(gzipped=True)
+        self.assertNotEqual(gzip_etag, first.etag)
+
+        self.assertTrue(etag_matches(first.etag, first.etag))
+        self.assertTrue(etag_matches(f'"outro", W/{gzip_etag}', first.etag))
+        self.assertTrue(etag_matches("*", first.etag))
+        self.assertFalse(etag_matches(None, first.etag))
+
+        later = cache.get_or_build("state", 103.0, 2.0, 8, lambda: {"generation": 8})
+        self.assertFalse(etag_matches(first.etag, later.etag))
+        self.assertFalse(etag_matches(gzip_etag, later.etag))
+
+    def test_accept_encoding_negotiation(self):
+        both = ("br", "gzip")
+        self.assertEqual(negotiate_encoding("gzip, deflate, br", both), "br")
+        self.assertEqual(negotiate_encoding("gzip, deflate, br", ("gzip",)), "gzip")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip", both), "gzip")
+        self.assertEqual(negotiate_encoding("*", ("gzip",)), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0", both))
+        self.assertIsNone(negotiate_encoding("identity", both))
+        self.assertIsNone(negotiate_encoding(None, both))
+        self.assertIsNone(negotiate_encoding("gzip", ()))
+
+    def test_static_file_is_compressed_once_until_it_changes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "dashboard.js")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("const valor = 1;\n" * 200)
+            cache = StaticFileCache(gzip_enabled=True, gzip_min_bytes=1024)
+            first = cache.get(path, "text/javascript; charset=utf-8")
+            self.assertIs(cache.get(path, "text/javascript; charset=utf-8"), first)
+            self.assertEqual(gzip.decompress(first.gzip_body), first.body)
+            self.assertEqual(first.encodings(), ("gzip",))
+
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("const valor = 2;\n" * 300)
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+            changed = cache.get(path, "text/javascript; charset=utf-8")
+            self.assertIsNot(changed, first)
+            self.assertNotEqual(changed.etag, first.etag)
+            self.assertIn(b"valor = 2", changed.body)
+
+            image_path = os.path.join(temp_dir, "icone.png")
+            with open(image_path, "wb") as file:
+                file.write(b"\x00" * 4096)
+            self.assertIsNone(cache.get(image_path, "image/png").gzip_body)
+            self.assertIsNone(cache.get(os.path.join(temp_dir, "nada.js"), "text/javascript"))
+            self.assertIsNone(cache.get(temp_dir, "text/html"))
+            metrics = cache.get_metrics()
+            self.assertEqual((metrics["hits"], metrics["entries"]), (1, 2))
+
+
+class StoreResponseCacheTests(unittest.TestCase):
+    def _config(self, temp_dir):
+        return {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 2.0,
+            "api_quality_cache_ttl_sec": 2.0,
+        }
+
+    def test_messages_keep_cached_state_until_ttl_and_admin_action_clears(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=self._config(temp_dir), log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotC_1", "PivotC_2"], now=BASE_TS, source="test")
+                    store.process_message("cloudv2", "#01-PivotC_1-discovery$", ts=BASE_TS + 1.0)
+                    first = store.get_state_response(now=BASE_TS + 2.0)
+                    self.assertIn("cloud2_filter_options", first.payload())
+
+                    store.process_message("cloudv2", "#01-PivotC_2-discovery$", ts=BASE_TS + 2.5)
+                    cached = store.get_state_response(now=BASE_TS + 3.0)
+                    self.assertIs(cached, first)
+                    self.assertEqual(
+                        [item["pivot_id"] for item in cached.payload()["pivots"]],
+                        ["PivotC_1"],
+                    )
+
+                    rebuilt = store.get_state_response(now=BASE_TS + 4.5)
+                    self.assertGreater(rebuilt.generation, first.generation)
+                    self.assertEqual(
+                        sorted(item["pivot_id"] for item in rebuilt.payload()["pivots"]),
+                        ["PivotC_1", "PivotC_2"],
+                    )
+
+                    store.update_probe_setting("PivotC_1", True, 600)
+                    after_admin = store.get_state_response(now=BASE_TS + 5.0)
+                    self.assertIsNot(after_admin, rebuilt)
+                    self.assertNotEqual(after_admin.etag, rebuilt.etag)
+
+                    panel = store.get_panel_response("PivotC_2")
+                    self.assertIs(store.get_panel_response("PivotC_2"), panel)
+                    self.assertIsNone(store.get_panel_response("PivotX_9"))
+
+                    metrics = store.get_runtime_metrics()["responses"]
+                    self.assertEqual(metrics["hits"], 2)
+                    self.assertGreaterEqual(metrics["builds"], 3)
+                finally:
+                    store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
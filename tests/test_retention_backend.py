@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from backend.cloudv2_persistence import TelemetryPersistence
+from backend.cloudv2_retention import DAY_SEC, RetentionJob, build_retention_policies
+
+
+NOW_TS = 1_700_000_000.0
+
+
+class RetentionTests(unittest.TestCase):
+    def _start(self, temp_dir):
+        persistence = TelemetryPersistence(db_path=os.path.join(temp_dir, "telemetry.sqlite3"), write_behind_ms=0)
+        persistence.start()
+        self.addCleanup(persistence.stop)
+        run = persistence.get_or_create_active_run(now_ts=NOW_TS - 60 * DAY_SEC, source="test")
+        session = persistence.get_or_create_active_session(
+            "PivotT_1",
+            pivot_slug="pivott-1",
+            now_ts=NOW_TS - 60 * DAY_SEC,
+            source="test",
+            run_id=run["run_id"],
+        )
+        return persistence, session["session_id"]
+
+    def _insert_events(self, persistence, session_id, count, start_ts, step_sec):
+        for index in range(count):
+            ts_value = start_ts + index * step_sec
+            persistence.insert_connectivity_event(
+                "PivotT_1",
+                session_id,
+                {
+                    "ts": ts_value,
+                    "topic": "cloudv2-ping",
+                    "type": "ping",
+                    "summary": "ping",
+                    "details": {"raw_payload": "#8-PivotT_1-20$", "rssi": 20},
+                },
+                source_topic="cloudv2-ping",
+                raw_payload="#8-PivotT_1-20$",
+                parsed_payload={"pivot_id": "PivotT_1", "parts": ["8", "PivotT_1", "20"]},
+            )
+
+    def _count(self, persistence, query, params=()):
+        with persistence._lock:
+            conn = persistence._require_conn_locked()
+            return int(conn.execute(query, params).fetchone()[0])
+
+    def test_expired_rows_are_deleted_in_chunks_and_space_is_reclaimed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, session_id = self._start(temp_dir)
+            # 40 dias de eventos, um a cada hora.
+            self._insert_events(persistence, session_id, 40 * 24, NOW_TS - 40 * DAY_SEC, 3600.0)
+
+            policies = build_retention_policies(
+                {"retention_events_days": 30, "retention_raw_payload_days": 7},
+                history_retention_hours=24,
+            )
+            job = RetentionJob(persistence, policies, chunk_rows=50)
+            report = job.run_once(now=NOW_TS)
+
+            self.assertEqual(report["deleted_by_table"]["connectivity_events"], 10 * 24)
+            self.assertEqual(
+                self._count(persistence, "SELECT COUNT(*) FROM connectivity_events WHERE ts < ?", (NOW_TS - 30 * DAY_SEC,)),
+                0,
+            )
+            self.assertEqual(self._count(persistence, "SELECT COUNT(*) FROM connectivity_events"), 30 * 24)
+            self.assertEqual(report["stripped_payload_rows"], 23 * 24)
+            self.assertEqual(
+                self._count(
+                    persistence,
+                    "SELECT COUNT(*) FROM connectivity_events WHERE raw_payload IS NOT NULL AND ts < ?",
+                    (NOW_TS - 7 * DAY_SEC,),
+                ),
+                0,
+            )
+            self.assertEqual(
+                self._count(
+                    persistence,
+                    "SELECT COUNT(*) FROM connectivity_events WHERE json_extract(event_json, '$.details.raw_payload') IS NOT NULL AND ts < ?",
+                    (NOW_TS - 7 * DAY_SEC,),
+                ),
+                0,
+            )
+            self.assertEqual(
+                self._count(persistence, "SELECT COUNT(*) FROM connectivity_events WHERE raw_payload IS NOT NULL"),
+                7 * 24,
+            )
+            self.assertTrue(report["incremental_vacuum"])
+            self.assertGreater(report["bytes_reclaimed"], 0)
+            self.assertEqual(persistence.get_storage_stats()["freelist_count"], 0)
+
+            second = job.run_once(now=NOW_TS)
+            self.assertEqual(second["deleted_rows"], 0)
+            self.assertEqual(second["stripped_payload_rows"], 0)
+            self.assertEqual(job.get_metrics()["run_count"], 2)
+
+    def test_policies_never_go_below_history_window_and_zero_keeps_forever(self):
+        policies = build_retention_policies(
+            {"retention_events_days": 1, "retention_points_days": 0, "retention_rollups_daily_days": 0},
+            history_retention_hours=72,
+        )
+        self.assertEqual(policies["tables"]["connectivity_events"], 3.0)
+        self.assertEqual(policies["tables"]["ping_rssi_points"], 0.0)
+        self.assertEqual(policies["tables"]["connectivity_rollups_daily"], 0.0)
+
+    def test_unknown_table_is_rejected(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, _ = self._start(temp_dir)
+            with self.assertRaises(ValueError):
+                persistence.delete_rows_before("users", NOW_TS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_checkpoint import read_checkpoint
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+# Dentro da retencao (history_retention_hours): o start() poda a timeline.
+BASE_TS = float(int(time.time()) - 6 * 3600)
+
+
+class RuntimeCheckpointTests(unittest.TestCase):
+    def _config(self, temp_dir, **overrides):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+        }
+        config.update(overrides)
+        return config
+
+    def _feed(self, store, pivot_id, start_ts, count):
+        ts = start_ts
+        for index in range(count):
+            ts += 180.0
+            store.process_message("cloudv2", f"#01-{pivot_id}-{index}$", ts=ts)
+            store.process_message("cloudv2-ping", f"#8-{pivot_id}-{index}-{10 + index % 20}$", ts=ts + 1.0)
+        return ts
+
+    def _restore(self, temp_dir, config):
+        store = TelemetryStore(config=config, log_dir=temp_dir)
+        store.start()
+        return store
+
+    def test_incremental_checkpoint_restores_rings_and_state(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = self._config(temp_dir)
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotK_1", "PivotK_2"], now=BASE_TS, source="test")
+                    self._feed(store, "PivotK_1", BASE_TS, 12)
+                    self._feed(store, "PivotK_2", BASE_TS, 12)
+                    store.write()
+
+                    ts = self._feed(store, "PivotK_1", BASE_TS + 12 * 180.0, 3)
+                    store.update_probe_setting("PivotK_1", True, 600)
+                    store.write()
+                    metrics = store.get_runtime_metrics()["checkpoint"]
+                    self.assertEqual(metrics["format"], "binary")
+                    self.assertFalse(metrics["last_full"])
+                    self.assertEqual(metrics["last_pivots_written"], 1)
+                    self.assertFalse(os.path.exists(store.runtime_path))
+
+                    expected = {pivot_id: pivot.to_dict() for pivot_id, pivot in store.pivots.items()}
+                finally:
+                    store.stop()
+
+                restored_store = self._restore(temp_dir, config)
+                try:
+                    for pivot_id, original in expected.items():
+                        restored = restored_store.pivots[pivot_id]
+                        # start() registra eventos novos; o checkpoint e o prefixo.
+                        timeline = restored.timeline.to_list()
+                        self.assertEqual(timeline[: len(original["timeline"])], original["timeline"])
+                        self.assertEqual(restored.ping_rssi_points.to_list(), original["ping_rssi_points"])
+                        for name in ("last_cloudv2_ts", "cloudv2_intervals_sec", "topic_counters"):
+                            self.assertEqual(restored[name], original[name], msg=name)
+                    self.assertEqual(restored_store.pivots["PivotK_1"].last_ping_ts, ts + 1.0)
+                    self.assertTrue(restored_store.pivots["PivotK_1"].probe.enabled)
+                finally:
+                    restored_store.stop()
+
+    def test_truncated_append_keeps_previous_checkpoint(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = self._config(temp_dir)
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotK_3"], now=BASE_TS, source="test")
+                    ts = self._feed(store, "PivotK_3", BASE_TS, 5)
+                    store.write()
+                    size_before = os.path.getsize(store.checkpoint_path)
+                    self._feed(store, "PivotK_3", ts, 5)
+                    store.write()
+                    size_after = os.path.getsize(store.checkpoint_path)
+                finally:
+                    store.stop()
+
+                # Quebra o ultimo quadro do segundo acrescimo (queda no meio da escrita).
+                self.assertGreater(size_after, size_before)
+                with open(store.checkpoint_path, "r+b") as file:
+                    file.truncate(size_after - 3)
+                payload, info = read_checkpoint(store.checkpoint_path)
+                self.assertTrue(info["truncated"])
+                self.assertEqual(payload["pivots"]["PivotK_3"]["last_cloudv2_ts"], ts)
+
+                restored_store = self._restore(temp_dir, config)
+                try:
+                    self.assertEqual(restored_store.pivots["PivotK_3"].last_cloudv2_ts, ts)
+                finally:
+                    restored_store.stop()
+
+    def test_legacy_json_store_is_migrated(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                json_config = self._config(temp_dir, runtime_store_format="json")
+                store = TelemetryStore(config=json_config, log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotK_4"], now=BASE_TS, source="test")
+                    ts = self._feed(store, "PivotK_4", BASE_TS, 6)
+                    store.write()
+                finally:
+                    store.stop()
+                with open(store.runtime_path, "r", encoding="utf-8") as file:
+                    legacy_timeline = json.load(file)["pivots"]["PivotK_4"]["timeline"]
+
+                restored_store = self._restore(temp_dir, self._config(temp_dir))
+                try:
+                    restored = restored_store.pivots["PivotK_4"]
+                    self.assertEqual(restored.last_cloudv2_ts, ts)
+                    self.assertEqual(restored.timeline.to_list()[: len(legacy_timeline)], legacy_timeline)
+                    self.assertTrue(os.path.exists(restored_store.checkpoint_path))
+                    self.assertFalse(os.path.exists(restored_store.runtime_path))
+                finally:
+                    restored_store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
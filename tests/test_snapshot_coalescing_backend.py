@@ -0,0 +1,125 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+class SnapshotCoalescingTests(unittest.TestCase):
+    def _build_store(self, temp_dir, interval_sec):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+            "snapshot_persist_interval_sec": interval_sec,
+        }
+        ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+        data_dir_patch = patch.object(telemetry_mod, "DATA_DIR", temp_dir)
+        ensure_dirs_patch = patch.object(telemetry_mod, "ensure_dirs", ensure_dirs)
+        data_dir_patch.start()
+        ensure_dirs_patch.start()
+        self.addCleanup(data_dir_patch.stop)
+        self.addCleanup(ensure_dirs_patch.stop)
+        store = TelemetryStore(config=config, log_dir=temp_dir)
+        store.start()
+        return store
+
+    def _persisted_updated_at(self, store, pivot_id):
+        with store.persistence._lock:
+            conn = store.persistence._require_conn_locked()
+            row = conn.execute(
+                "SELECT updated_at_ts FROM pivot_snapshots WHERE pivot_id = ?",
+                (pivot_id,),
+            ).fetchone()
+        return None if row is None else float(row["updated_at_ts"])
+
+    def test_messages_without_transition_are_coalesced_until_interval(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir, interval_sec=60)
+            try:
+                base_ts = 1_700_000_000.0
+                store.queue_expected_pivots(["PivotA_1"], now=base_ts, source="test")
+                store.process_message("cloudv2", "#01-PivotA_1-discovery$", ts=base_ts)
+                first_persisted = self._persisted_updated_at(store, "PivotA_1")
+                self.assertIsNotNone(first_persisted)
+
+                for offset in range(1, 6):
+                    store.process_message("cloudv2-ping", f"#8-PivotA_1-{10 + offset}$", ts=base_ts + offset * 5)
+
+                metrics = store.get_runtime_metrics()["snapshots"]
+                self.assertGreater(metrics["coalesced_count"], 0)
+                self.assertLess(metrics["persisted_count"], 6)
+
+                store.tick(now=base_ts + 120)
+                self.assertEqual(store.get_runtime_metrics()["snapshots"]["dirty_pivots"], 0)
+                self.assertGreater(self._persisted_updated_at(store, "PivotA_1"), first_persisted)
+            finally:
+                store.stop()
+
+    def test_panel_read_flushes_pending_snapshot(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir, interval_sec=300)
+            try:
+                base_ts = 1_700_000_000.0
+                store.queue_expected_pivots(["PivotB_1"], now=base_ts, source="test")
+                store.process_message("cloudv2", "#01-PivotB_1-discovery$", ts=base_ts)
+                store.process_message("cloudv2-ping", "#8-PivotB_1-20$", ts=base_ts + 5)
+                store.process_message("cloudv2-ping", "#8-PivotB_1-21$", ts=base_ts + 10)
+
+                panel = store.get_pivot_snapshot("PivotB_1")
+                self.assertIsNotNone(panel)
+                self.assertEqual(store.get_runtime_metrics()["snapshots"]["dirty_pivots"], 0)
+                self.assertGreaterEqual(self._persisted_updated_at(store, "PivotB_1"), base_ts + 10)
+            finally:
+                store.stop()
+
+    def test_state_and_quality_reads_keep_coalescing_until_interval(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir, interval_sec=300)
+            try:
+                base_ts = float(int(time.time()))
+                store.queue_expected_pivots(["PivotD_1"], now=base_ts, source="test")
+                store.process_message("cloudv2", "#01-PivotD_1-discovery$", ts=base_ts)
+                first_persisted = self._persisted_updated_at(store, "PivotD_1")
+                store.process_message("cloudv2-ping", "#8-PivotD_1-20$", ts=base_ts + 5)
+                run_id = store.get_state_snapshot(now=base_ts + 6)["run_id"]
+
+                # Polls do dashboard dentro do intervalo nao gravam o snapshot.
+                for offset in (10, 12, 14):
+                    store.get_state_snapshot(now=base_ts + offset, run_id=run_id)
+                store.get_quality_cards_response(run_id=run_id)
+                self.assertEqual(store.get_runtime_metrics()["snapshots"]["dirty_pivots"], 1)
+                self.assertEqual(self._persisted_updated_at(store, "PivotD_1"), first_persisted)
+
+                store.get_state_snapshot(now=base_ts + 301, run_id=run_id)
+                self.assertEqual(store.get_runtime_metrics()["snapshots"]["dirty_pivots"], 0)
+                self.assertGreater(self._persisted_updated_at(store, "PivotD_1"), first_persisted)
+            finally:
+                store.stop()
+
+    def test_zero_interval_keeps_persisting_every_message(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = self._build_store(temp_dir, interval_sec=0)
+            try:
+                base_ts = 1_700_000_000.0
+                store.queue_expected_pivots(["PivotC_1"], now=base_ts, source="test")
+                store.process_message("cloudv2", "#01-PivotC_1-discovery$", ts=base_ts)
+                store.process_message("cloudv2-ping", "#8-PivotC_1-20$", ts=base_ts + 5)
+
+                metrics = store.get_runtime_metrics()["snapshots"]
+                self.assertEqual(metrics["coalesced_count"], 0)
+                self.assertEqual(metrics["dirty_pivots"], 0)
+                self.assertEqual(self._persisted_updated_at(store, "PivotC_1"), base_ts + 5)
+            finally:
+                store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
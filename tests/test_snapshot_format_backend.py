@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from backend.cloudv2_persistence import SNAPSHOT_FORMAT_VERSION, TelemetryPersistence
+
+
+class SnapshotFormatTests(unittest.TestCase):
+    def test_snapshot_row_stores_only_summary_and_panel_rebuilds_series(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=5000, write_behind_ms=0)
+            persistence.start()
+            try:
+                pivot_id = "PivotFormat_1"
+                base_ts = 1_700_300_000.0
+
+                run = persistence.get_or_create_active_run(now_ts=base_ts, source="test")
+                session = persistence.get_or_create_active_session(
+                    pivot_id,
+                    pivot_slug="pivotformat-1",
+                    now_ts=base_ts,
+                    source="test",
+                    run_id=run["run_id"],
+                )
+                session_id = session["session_id"]
+
+                for offset in (10, 20, 30):
+                    persistence.insert_connectivity_event(
+                        pivot_id,
+                        session_id,
+                        {
+                            "ts": base_ts + offset,
+                            "topic": "cloudv2",
+                            "type": "cloudv2",
+                            "summary": "evento",
+                        },
+                    )
+
+                persistence.upsert_snapshot(
+                    pivot_id,
+                    session_id,
+                    {
+                        "pivot_id": pivot_id,
+                        "pivot_slug": "pivotformat-1",
+                        "session_id": session_id,
+                        "run_id": run["run_id"],
+                        "updated_at_ts": base_ts + 30,
+                        "summary": {
+                            "status": {"code": "green"},
+                            "quality": {"code": "green"},
+                        },
+                        "metrics": {"drops_24h": 0},
+                        "timeline": [{"ts": base_ts + 30, "summary": "stale"}] * 50,
+                        "probe_events": [{"ts": base_ts}],
+                        "rssiSeries": [{"ts": base_ts, "rssi": 20}],
+                        "hasRssi": True,
+                        "cloud2_events": [{"ts": base_ts}],
+                    },
+                    updated_at_ts=base_ts + 30,
+                )
+            finally:
+                persistence.stop()
+
+            conn = sqlite3.connect(db_path)
+            try:
+                row = conn.execute(
+                    "SELECT snapshot_format, snapshot_json FROM pivot_snapshots WHERE pivot_id = ?",
+                    (pivot_id,),
+                ).fetchone()
+            finally:
+                conn.close()
+            self.assertEqual(row[0], SNAPSHOT_FORMAT_VERSION)
+            stored = json.loads(row[1])
+            self.assertEqual(stored["summary"]["status"]["code"], "green")
+            self.assertEqual(stored["metrics"], {"drops_24h": 0})
+            for key in ("timeline", "probe_events", "rssiSeries", "hasRssi", "cloud2_events"):
+                self.assertNotIn(key, stored)
+
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=5000)
+            persistence.start()
+            try:
+                panel = persistence.get_panel_payload(pivot_id, session_id=session_id, run_id=run["run_id"])
+                self.assertIsNotNone(panel)
+                self.assertEqual(len(panel["timeline"]), 3)
+                self.assertEqual(panel["probe_events"], [])
+                self.assertEqual(panel["rssiSeries"], [])
+                self.assertFalse(panel["hasRssi"])
+                self.assertEqual(panel["summary"]["status"]["code"], "green")
+
+                state = persistence.get_run_state_payload(run_id=run["run_id"])
+                self.assertEqual(len(state["pivots"]), 1)
+                self.assertEqual(state["pivots"][0]["status"]["code"], "green")
+            finally:
+                persistence.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
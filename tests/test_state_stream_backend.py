@@ -0,0 +1,173 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_state_stream import StateChangeStream
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = float(int(time.time()) - 3600)
+
+
+def _decode(event):
+    fields = {}
+    for line in event.decode("utf-8").strip().splitlines():
+        name, _sep, value = line.partition(": ")
+        fields[name] = value
+    return fields["id"], fields["event"], json.loads(fields["data"])
+
+
+class StateStreamTests(unittest.TestCase):
+    def _config(self, temp_dir):
+        return {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+        }
+
+    def _run(self, test):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(config=self._config(temp_dir), log_dir=temp_dir)
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotE_1", "PivotE_2", "PivotE_3"], now=BASE_TS, source="test")
+                    for index in (1, 2, 3):
+                        store.process_message("cloudv2", f"#01-PivotE_{index}-discovery$", ts=BASE_TS + index)
+                    test(store)
+                finally:
+                    store.stop()
+
+    def test_pivot_changes_since_generation(self):
+        def check(store):
+            full = store.get_pivot_changes(now=BASE_TS + 10.0)
+            self.assertTrue(full["full"])
+            self.assertEqual(len(full["pivots"]), 3)
+            since = full["generation"]
+
+            self.assertEqual(store.get_pivot_changes(since=since, now=BASE_TS + 10.0)["pivots"], [])
+
+            store.process_message("cloudv2", "#01-PivotE_2-1$", ts=BASE_TS + 180.0)
+            store.delete_pivot("PivotE_3", now=BASE_TS + 181.0)
+            delta = store.get_pivot_changes(since=since, now=BASE_TS + 182.0)
+            self.assertFalse(delta["full"])
+            self.assertEqual([item["pivot_id"] for item in delta["pivots"]], ["PivotE_2"])
+            self.assertEqual(delta["removed"], ["PivotE_3"])
+            self.assertEqual(delta["counts"]["pivots"], 2)
+            self.assertGreater(delta["generation"], since)
+
+            # Mudanca global (fila de descoberta) invalida os deltas antigos.
+            store.queue_expected_pivots(["PivotE_9"], now=BASE_TS + 200.0, source="test")
+            self.assertTrue(store.get_pivot_changes(since=delta["generation"], now=BASE_TS + 201.0)["full"])
+            self.assertTrue(store.get_pivot_changes(since=10**9)["full"])
+
+        self._run(check)
+
+    def test_state_since_returns_only_changed_pivots(self):
+        def check(store):
+            live = store.get_state_snapshot(now=BASE_TS + 10.0)
+            run_id = live["run_id"]
+            full = store.get_state_snapshot(now=BASE_TS + 10.0, run_id=run_id)
+            self.assertEqual(len(full["pivots"]), 3)
+            self.assertNotIn("full", full)
+
+            unchanged = store.get_state_snapshot(now=BASE_TS + 11.0, run_id=run_id, since=full["generation"])
+            self.assertFalse(unchanged["full"])
+            self.assertEqual(unchanged["pivots"], [])
+            self.assertEqual(unchanged["counts"]["pivots"], 3)
+
+            store.process_message("cloudv2", "#01-PivotE_2-1$", ts=BASE_TS + 180.0)
+            store.delete_pivot("PivotE_3", now=BASE_TS + 181.0)
+            delta = store.get_state_snapshot(now=BASE_TS + 182.0, run_id=run_id, since=full["generation"])
+            self.assertFalse(delta["full"])
+            self.assertEqual([item["pivot_id"] for item in delta["pivots"]], ["PivotE_2"])
+            self.assertEqual(delta["removed"], ["PivotE_3"])
+            self.assertEqual(delta["counts"]["pivots"], 2)
+            self.assertGreater(delta["generation"], full["generation"])
+
+            # Sem run_id o delta vem do log em memoria do store.
+            live_delta = store.get_state_snapshot(now=BASE_TS + 182.0, since=live["generation"])
+            self.assertEqual([item["pivot_id"] for item in live_delta["pivots"]], ["PivotE_2"])
+
+            # Geracao desconhecida (outro processo) ou apos purge: estado completo.
+            self.assertTrue(store.get_state_snapshot(run_id=run_id, since=1)["full"])
+            store.queue_expected_pivots(["PivotE_9"], now=BASE_TS + 200.0, source="test")
+            stale = store.get_state_snapshot(now=BASE_TS + 201.0, run_id=run_id, since=delta["generation"])
+            self.assertTrue(stale["full"])
+            self.assertEqual(len(stale["pivots"]), 2)
+
+        self._run(check)
+
+    def test_stream_publishes_shared_events_and_resumes(self):
+        def check(store):
+            stream = StateChangeStream(store, interval_sec=60.0)
+            stream.start()
+            try:
+                after, reset = stream.resume_point(None)
+                self.assertIsNone(reset)
+                self.assertFalse(stream.publish_once(now=BASE_TS + 10.0))
+
+                store.process_message("cloudv2", "#01-PivotE_1-1$", ts=BASE_TS + 180.0)
+                self.assertTrue(stream.publish_once(now=BASE_TS + 181.0))
+                events = stream.wait_events(after, timeout=0)
+                self.assertEqual(len(events), 1)
+                event_id, event_name, payload = _decode(events[0][1])
+                self.assertEqual(event_name, "delta")
+                self.assertEqual([item["pivot_id"] for item in payload["pivots"]], ["PivotE_1"])
+
+                # Reconexao com o ultimo id: nada perdido; id de outro processo: reset.
+                resumed, reset = stream.resume_point(event_id)
+                self.assertIsNone(reset)
+                self.assertEqual(stream.wait_events(resumed, timeout=0), [])
+                _after, reset = stream.resume_point("outro-3")
+                self.assertEqual(_decode(reset)[1], "reset")
+
+                store.queue_expected_pivots(["PivotE_9"], now=BASE_TS + 200.0, source="test")
+                stream.publish_once(now=BASE_TS + 201.0)
+                self.assertEqual(_decode(stream.wait_events(resumed, timeout=0)[-1][1])[1], "reset")
+                self.assertEqual(stream.get_metrics()["resets"], 1)
+            finally:
+                stream.stop()
+            self.assertIsNone(stream.wait_events(0, timeout=0))
+            self.assertFalse(stream.open_client())
+
+        self._run(check)
+
+
+    def test_client_behind_history_gets_reset(self):
+        def check(store):
+            stream = StateChangeStream(store, interval_sec=60.0, history_size=2)
+            stream.start()
+            try:
+                after, _reset = stream.resume_point(None)
+                for offset in range(3):
+                    store.process_message("cloudv2", f"#01-PivotE_1-{offset + 1}$", ts=BASE_TS + 180.0 + offset * 60.0)
+                    self.assertTrue(stream.publish_once(now=BASE_TS + 181.0 + offset * 60.0))
+
+                # O primeiro delta saiu do historico: em vez de pular, reset.
+                events = stream.wait_events(after, timeout=0)
+                self.assertEqual(len(events), 1)
+                generation, event = events[0]
+                self.assertEqual(_decode(event)[1], "reset")
+                self.assertEqual(generation, stream.get_metrics()["generation"])
+                self.assertEqual(stream.get_metrics()["lagged_clients"], 1)
+                self.assertEqual(stream.wait_events(generation, timeout=0), [])
+            finally:
+                stream.stop()
+
+        self._run(check)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_persistence import TelemetryPersistence
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = float(int(time.time()) - 3600)
+
+
+class StateSummaryColumnsTests(unittest.TestCase):
+    def test_state_payload_is_served_from_typed_summary_columns(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=5000, write_behind_ms=0)
+            persistence.start()
+            try:
+                pivot_id = "PivotColumns_1"
+                base_ts = 1_700_400_000.0
+
+                run = persistence.get_or_create_active_run(now_ts=base_ts, source="test")
+                session = persistence.get_or_create_active_session(
+                    pivot_id,
+                    pivot_slug="pivotcolumns-1",
+                    now_ts=base_ts,
+                    source="test",
+                    run_id=run["run_id"],
+                )
+                session_id = session["session_id"]
+
+                persistence.upsert_snapshot(
+                    pivot_id,
+                    session_id,
+                    {
+                        "pivot_id": pivot_id,
+                        "pivot_slug": "pivotcolumns-1",
+                        "session_id": session_id,
+                        "run_id": run["run_id"],
+                        "updated_at_ts": base_ts + 60,
+                        "summary": {
+                            "status": {"code": "yellow", "label": "Atencao", "rank": 2, "reason": "teste"},
+                            "quality": {"code": "red", "label": "Critico", "rank": 1, "reason": "teste"},
+                            "flags": {"online": True, "offline": False},
+                            "median_ready": True,
+                            "median_sample_count": 6,
+                            "connected_pct": 87.5,
+                            "disconnected_pct": 12.5,
+                            "last_activity_ts": base_ts + 50,
+                            "last_ping_ts": base_ts + 40,
+                            "signal": "-71",
+                            "technology": "LTE",
+                            "last_cloud2": {"ts": base_ts + 30, "rssi": "-71", "technology": "LTE", "firmware": "1.2.3"},
+                            "probe": {"enabled": True, "interval_sec": 120, "sent_count": 4, "response_ratio_pct": 75.0},
+                        },
+                    },
+                    updated_at_ts=base_ts + 60,
+                )
+
+                # A listagem nao deve depender do JSON do snapshot.
+                with persistence._lock:
+                    persistence._conn.execute("UPDATE pivot_snapshots SET snapshot_json = 'invalido'")
+                    persistence._conn.commit()
+
+                payload = persistence.get_run_state_payload(run_id=run["run_id"])
+                self.assertEqual(len(payload["pivots"]), 1)
+                item = payload["pivots"][0]
+                self.assertEqual(item["pivot_slug"], "pivotcolumns-1")
+                self.assertEqual(item["status"], {"code": "yellow", "label": "Atencao", "rank": 2, "reason": "teste"})
+                self.assertEqual(item["quality"]["code"], "red")
+                self.assertEqual(item["flags"], {"online": True, "offline": False})
+                self.assertIs(item["median_ready"], True)
+                self.assertEqual(item["median_sample_count"], 6)
+                self.assertAlmostEqual(item["connected_pct"], 87.5)
+                self.assertAlmostEqual(item["last_activity_ts"], base_ts + 50)
+                self.assertNotEqual(item["last_activity_at"], "-")
+                self.assertEqual(item["last_cloudv2_at"], "-")
+                self.assertEqual(item["signal_technology"], "-71 / LTE")
+                self.assertEqual(item["last_cloud2"]["firmware"], "1.2.3")
+                self.assertIs(item["probe"]["enabled"], True)
+                self.assertEqual(item["probe"]["interval_sec"], 120)
+                self.assertAlmostEqual(item["probe"]["response_ratio_pct"], 75.0)
+
+                cards = persistence.get_quality_cards_payload(run_id=run["run_id"])
+                self.assertEqual(cards["pivots"][0]["summary"]["quality"]["code"], "red")
+            finally:
+                persistence.stop()
+
+    def test_state_row_missing_falls_back_to_initial_summary(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=5000, write_behind_ms=0)
+            persistence.start()
+            try:
+                run = persistence.get_or_create_active_run(now_ts=1_700_400_000.0, source="test")
+                persistence.get_or_create_active_session(
+                    "PivotColumns_2",
+                    pivot_slug="pivotcolumns-2",
+                    now_ts=1_700_400_000.0,
+                    source="test",
+                    run_id=run["run_id"],
+                )
+                payload = persistence.get_run_state_payload(run_id=run["run_id"])
+                item = payload["pivots"][0]
+                self.assertEqual(item["status"]["code"], "gray")
+                self.assertEqual(item["last_cloud2"], {})
+            finally:
+                persistence.stop()
+
+    def test_run_scoped_summary_has_same_keys_as_live_summary(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ensure_dirs = lambda: os.makedirs(temp_dir, exist_ok=True)
+            with patch.object(telemetry_mod, "DATA_DIR", temp_dir), patch.object(
+                telemetry_mod, "ensure_dirs", ensure_dirs
+            ):
+                store = TelemetryStore(
+                    config={
+                        "enable_background_worker": False,
+                        "require_apply_to_start": False,
+                        "continuous_monitoring_mode": True,
+                        "history_mode": "merge",
+                        "sqlite_db_path": os.path.join(temp_dir, "telemetry.sqlite3"),
+                        "api_state_cache_ttl_sec": 0,
+                        "api_quality_cache_ttl_sec": 0,
+                        "snapshot_persist_interval_sec": 0,
+                        "sqlite_write_behind_ms": 0,
+                    },
+                    log_dir=temp_dir,
+                )
+                store.start()
+                try:
+                    store.queue_expected_pivots(["PivotColumns_3"], now=BASE_TS, source="test")
+                    store.process_message("cloudv2", "#01-PivotColumns_3-discovery$", ts=BASE_TS + 1.0)
+                    store.process_message("cloudv2", "#01-PivotColumns_3-1$", ts=BASE_TS + 60.0)
+                    store.process_message("cloudv2-ping", "#11-PivotColumns_3-ping$", ts=BASE_TS + 61.0)
+
+                    live = store.get_state_snapshot(now=BASE_TS + 70.0)
+                    scoped = store.get_state_snapshot(now=BASE_TS + 70.0, run_id=live["run_id"])
+                    live_item = live["pivots"][0]
+                    scoped_item = scoped["pivots"][0]
+                    self.assertEqual(set(scoped_item), set(live_item))
+                    # Campos sem coluna tipada, lidos pelo dashboard no polling por run.
+                    for key in ("modem_reset", "expected_by_topic_sec", "topic_counters"):
+                        self.assertEqual(scoped_item[key], live_item[key])
+                    for key in ("status", "probe", "last_cloud2"):
+                        self.assertEqual(set(scoped_item[key]), set(live_item[key]))
+                finally:
+                    store.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
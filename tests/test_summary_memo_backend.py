@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = 1_700_050_000.0
+
+
+class SummaryMemoTests(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp.cleanup)
+        ensure_dirs = lambda: os.makedirs(self._temp.name, exist_ok=True)
+        for target in (
+            patch.object(telemetry_mod, "DATA_DIR", self._temp.name),
+            patch.object(telemetry_mod, "ensure_dirs", ensure_dirs),
+        ):
+            target.start()
+            self.addCleanup(target.stop)
+
+    def _build_store(self, name, **overrides):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(self._temp.name, f"{name}.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+            "summary_cache_bucket_sec": 5,
+        }
+        config.update(overrides)
+        store = TelemetryStore(config=config, log_dir=self._temp.name)
+        store.start()
+        self.addCleanup(store.stop)
+        store.queue_expected_pivots(["PivotY_1", "PivotY_2"], now=BASE_TS, source="test")
+        for pivot_id in ("PivotY_1", "PivotY_2"):
+            store.process_message("cloudv2", f"#01-{pivot_id}-discovery$", ts=BASE_TS)
+        return store
+
+    def test_readers_reuse_summary_until_mutation_or_next_bucket(self):
+        store = self._build_store("memo")
+        # Comeca num balde novo (a descoberta ja memorizou o balde de BASE_TS).
+        now = BASE_TS + 10.0
+        with patch.object(store, "_compute_pivot_summary_locked", wraps=store._compute_pivot_summary_locked) as build:
+            first = store.get_state_snapshot(now=now)
+            store.get_state_snapshot(now=now + 0.5)
+            store.get_pivot_snapshot("PivotY_1", now=now + 1.0)
+            self.assertEqual(build.call_count, 2)
+
+            store.process_message("cloudv2-ping", "#8-PivotY_1-1$", ts=now + 1.5)
+            second = store.get_state_snapshot(now=now + 2.0)
+            self.assertEqual(build.call_count, 3)
+            self.assertEqual(build.call_args_list[-1].args[0]["pivot_id"], "PivotY_1")
+
+            store.get_state_snapshot(now=now + 5.0)
+            self.assertEqual(build.call_count, 5)
+
+        by_id = {item["pivot_id"]: item for item in second["pivots"]}
+        self.assertEqual(by_id["PivotY_1"]["topic_counters"].get("cloudv2-ping"), 1)
+        self.assertEqual(first["pivots"][1], by_id["PivotY_2"])
+        metrics = store.get_runtime_metrics()["summaries"]
+        self.assertGreater(metrics["hits"], 0)
+
+    def test_memoized_summary_matches_fresh_build(self):
+        memo = self._build_store("memo")
+        fresh = self._build_store("fresh", summary_cache_bucket_sec=0)
+        ts = BASE_TS
+        for index in range(1, 30):
+            ts += 60.0
+            for store in (memo, fresh):
+                store.process_message("cloudv2", f"#01-PivotY_1-{index}$", ts=ts)
+                store.tick(now=ts)
+            memo_state = memo.get_state_snapshot(now=ts)
+            fresh_state = fresh.get_state_snapshot(now=ts)
+            ignored = ("session_id", "run_id")
+            for memo_item, fresh_item in zip(memo_state["pivots"], fresh_state["pivots"]):
+                self.assertEqual(
+                    {key: value for key, value in memo_item.items() if key not in ignored},
+                    {key: value for key, value in fresh_item.items() if key not in ignored},
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
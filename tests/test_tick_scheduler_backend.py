@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import backend.cloudv2_telemetry as telemetry_mod
+from backend.cloudv2_scheduler import DeadlineScheduler
+from backend.cloudv2_telemetry import TelemetryStore
+
+
+BASE_TS = 1_700_020_000.0
+
+
+class DeadlineSchedulerTests(unittest.TestCase):
+    def test_reschedule_keeps_only_latest_deadline(self):
+        scheduler = DeadlineScheduler()
+        scheduler.schedule("a", 10.0)
+        scheduler.schedule("b", 5.0)
+        scheduler.schedule("a", 20.0)
+        scheduler.schedule("c", 15.0)
+        scheduler.discard("c")
+
+        self.assertEqual(scheduler.next_deadline(), 5.0)
+        self.assertEqual(scheduler.pop_due(12.0), ["b"])
+        self.assertEqual(scheduler.pop_due(19.0), [])
+        self.assertEqual(scheduler.pop_due(20.0), ["a"])
+        self.assertEqual(len(scheduler), 0)
+        self.assertIsNone(scheduler.next_deadline())
+
+    def test_stale_entries_are_compacted(self):
+        scheduler = DeadlineScheduler()
+        for step in range(500):
+            scheduler.schedule("a", float(step))
+        metrics = scheduler.get_metrics()
+        self.assertEqual(metrics["scheduled"], 1)
+        self.assertLess(metrics["heap_size"], 100)
+        self.assertEqual(scheduler.pop_due(1000.0), ["a"])
+
+
+class TickSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._temp.cleanup)
+        ensure_dirs = lambda: os.makedirs(self._temp.name, exist_ok=True)
+        for target in (
+            patch.object(telemetry_mod, "DATA_DIR", self._temp.name),
+            patch.object(telemetry_mod, "ensure_dirs", ensure_dirs),
+        ):
+            target.start()
+            self.addCleanup(target.stop)
+
+    def _build_store(self, name, **overrides):
+        config = {
+            "enable_background_worker": False,
+            "require_apply_to_start": False,
+            "continuous_monitoring_mode": True,
+            "history_mode": "merge",
+            "sqlite_db_path": os.path.join(self._temp.name, f"{name}.sqlite3"),
+            "api_state_cache_ttl_sec": 0,
+            "api_quality_cache_ttl_sec": 0,
+        }
+        config.update(overrides)
+        store = TelemetryStore(config=config, log_dir=self._temp.name)
+        store.start()
+        self.addCleanup(store.stop)
+        return store
+
+    def _discover(self, store, pivot_ids):
+        store.queue_expected_pivots(list(pivot_ids), now=BASE_TS, source="test")
+        for pivot_id in pivot_ids:
+            store.process_message("cloudv2", f"#01-{pivot_id}-discovery$", ts=BASE_TS)
+        store.tick(now=BASE_TS + 1.0)
+
+    def test_tick_only_visits_due_pivots(self):
+        store = self._build_store("due")
+        pivot_ids = [f"PivotS_{index}" for index in range(20)]
+        self._discover(store, pivot_ids)
+
+        with patch.object(store, "_refresh_status_locked", wraps=store._refresh_status_locked) as refresh:
+            store.tick(now=BASE_TS + 2.0)
+        self.assertEqual(refresh.call_count, 0)
+        self.assertEqual(store.get_runtime_metrics()["scheduler"]["last_due_count"], 0)
+
+        store.process_message("cloudv2-ping", "#8-PivotS_3-20$", ts=BASE_TS + 5.0)
+        with patch.object(store, "_refresh_status_locked", wraps=store._refresh_status_locked) as refresh:
+            store.tick(now=BASE_TS + 31.5)
+        visited = {call.args[0]["pivot_id"] for call in refresh.call_args_list}
+        self.assertEqual(visited, set(pivot_ids) - {"PivotS_3"})
+
+    def test_idle_visit_does_not_touch_pivot(self):
+        store = self._build_store("idle", status_refresh_interval_sec=0)
+        pivot_ids = ["PivotS_20", "PivotS_21"]
+        self._discover(store, pivot_ids)
+        store.tick(now=BASE_TS + 2.0)
+
+        generation = store.get_change_generation()
+        versions = dict(store._pivot_versions)
+        for step in range(3, 6):
+            self.assertFalse(store.tick(now=BASE_TS + step))
+            self.assertEqual(store.get_runtime_metrics()["scheduler"]["last_due_count"], len(pivot_ids))
+        self.assertEqual(store.get_change_generation(), generation)
+        self.assertEqual(store._pivot_versions, versions)
+        self.assertFalse(store._snapshot_dirty_pivots)
+
+        # Queda por inatividade muda o status: ai sim o pivo ganha versao nova.
+        self.assertTrue(store.tick(now=BASE_TS + 3 * 3600))
+        self.assertGreater(store.get_change_generation(), generation)
+        for pivot_id in pivot_ids:
+            self.assertGreater(store._pivot_versions[pivot_id], versions[pivot_id])
+
+    def test_scheduled_status_matches_full_scan(self):
+        full = self._build_store("full", status_refresh_interval_sec=0)
+        scheduled = self._build_store("scheduled")
+        pivot_ids = ["PivotS_10", "PivotS_11"]
+        for store in (full, scheduled):
+            self._discover(store, pivot_ids)
+
+        # PivotS_10 fala sempre; PivotS_11 fica mudo por uma hora no meio.
+        transitions = {pivot_id: [] for pivot_id in pivot_ids}
+        now = BASE_TS + 1.0
+        sequence = 0
+        while now < BASE_TS + 3 * 3600:
+            now += 10.0
+            if int(now - BASE_TS) % 180 < 10:
+                for pivot_id in pivot_ids:
+                    silent = pivot_id == "PivotS_11" and BASE_TS + 3600 <= now < BASE_TS + 7200
+                    if silent:
+                        continue
+                    sequence += 1
+                    for store in (full, scheduled):
+                        store.process_message("cloudv2", f"#01-{pivot_id}-{sequence}$", ts=now)
+                        store.process_message("cloudv2-ping", f"#8-{pivot_id}-{sequence}$", ts=now)
+            for store in (full, scheduled):
+                store.tick(now=now)
+            for pivot_id in pivot_ids:
+                full_code = full.pivots[pivot_id]["status_cache"]["code"]
+                scheduled_code = scheduled.pivots[pivot_id]["status_cache"]["code"]
+                self.assertEqual(scheduled_code, full_code, msg=f"{pivot_id} em {now - BASE_TS:.0f}s")
+                if not transitions[pivot_id] or transitions[pivot_id][-1] != full_code:
+                    transitions[pivot_id].append(full_code)
+
+        self.assertIn("red", transitions["PivotS_11"])
+        self.assertNotIn("red", transitions["PivotS_10"])
+
+
+if __name__ == "__main__":
+    unittest.main()
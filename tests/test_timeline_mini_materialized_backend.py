@@ -0,0 +1,184 @@
+import os
+import tempfile
+import unittest
+
+from backend.cloudv2_persistence import (
+    TIMELINE_MINI_DEFAULT_WINDOW_SEC,
+    TelemetryPersistence,
+    _build_timeline_mini_segments,
+)
+
+
+def _insert_events(persistence, pivot_id, session_id, timestamps):
+    for ts_value in timestamps:
+        persistence.insert_connectivity_event(
+            pivot_id,
+            session_id,
+            {"ts": ts_value, "topic": "cloudv2-ping", "type": "ping", "summary": "ping"},
+        )
+
+
+def _upsert(persistence, pivot_id, session_id, run_id, ts_value, threshold_sec=300.0):
+    persistence.upsert_snapshot(
+        pivot_id,
+        session_id,
+        {
+            "pivot_id": pivot_id,
+            "session_id": session_id,
+            "run_id": run_id,
+            "summary": {
+                "status": {"code": "green"},
+                "quality": {"code": "green"},
+                "disconnect_threshold_sec": threshold_sec,
+            },
+        },
+        updated_at_ts=ts_value,
+    )
+
+
+class TimelineMiniMaterializedTests(unittest.TestCase):
+    def test_materialized_timeline_matches_full_event_history_across_restart(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+            pivot_id = "PivotMini_1"
+            base_ts = 1_700_500_000.0
+
+            # Mais eventos do que max_events_per_pivot, com quedas espalhadas.
+            first_batch = []
+            ts_value = base_ts
+            for index in range(400):
+                ts_value += 120.0 if index % 37 else 5400.0
+                first_batch.append(ts_value)
+            second_batch = []
+            for index in range(200):
+                ts_value += 120.0 if index % 23 else 9000.0
+                second_batch.append(ts_value)
+
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=100, write_behind_ms=0)
+            persistence.start()
+            try:
+                run = persistence.get_or_create_active_run(now_ts=base_ts, source="test")
+                session = persistence.get_or_create_active_session(
+                    pivot_id,
+                    pivot_slug="pivotmini-1",
+                    now_ts=base_ts,
+                    source="test",
+                    run_id=run["run_id"],
+                )
+                session_id = session["session_id"]
+                _upsert(persistence, pivot_id, session_id, run["run_id"], base_ts)
+                _insert_events(persistence, pivot_id, session_id, first_batch)
+                _upsert(persistence, pivot_id, session_id, run["run_id"], first_batch[-1] + 10)
+            finally:
+                persistence.stop()
+
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=100, write_behind_ms=0)
+            persistence.start()
+            try:
+                _insert_events(persistence, pivot_id, session_id, second_batch)
+                end_ts = second_batch[-1] + 600.0
+                _upsert(persistence, pivot_id, session_id, run["run_id"], end_ts)
+
+                payload = persistence.get_run_state_payload(run_id=run["run_id"])
+                timeline_mini = payload["pivots"][0]["timeline_mini"]
+            finally:
+                persistence.stop()
+
+            expected = _build_timeline_mini_segments(
+                [{"ts": item, "topic": "cloudv2-ping"} for item in first_batch + second_batch],
+                window_end_ts=end_ts,
+                window_sec=TIMELINE_MINI_DEFAULT_WINDOW_SEC,
+                disconnect_threshold_sec=300.0,
+            )
+            self.assertEqual(timeline_mini, expected)
+            self.assertIn("offline", {segment["state"] for segment in timeline_mini})
+
+    def test_threshold_change_falls_back_to_event_computation(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+            persistence = TelemetryPersistence(db_path=db_path, max_events_per_pivot=5000, write_behind_ms=0)
+            persistence.start()
+            try:
+                pivot_id = "PivotMini_2"
+                base_ts = 1_700_600_000.0
+                run = persistence.get_or_create_active_run(now_ts=base_ts, source="test")
+                session = persistence.get_or_create_active_session(
+                    pivot_id,
+                    pivot_slug="pivotmini-2",
+                    now_ts=base_ts,
+                    source="test",
+                    run_id=run["run_id"],
+                )
+                session_id = session["session_id"]
+                timestamps = [base_ts + (index * 200.0) for index in range(10)]
+                _insert_events(persistence, pivot_id, session_id, timestamps)
+                persistence.upsert_snapshot(
+                    pivot_id,
+                    session_id,
+                    {"summary": {"status": {"code": "green"}}},
+                    updated_at_ts=timestamps[-1] + 100,
+                )
+
+                payload = persistence.get_run_state_payload(
+                    run_id=run["run_id"],
+                    connectivity_settings={"ping_expected_sec": 60, "tolerance_factor": 1.5},
+                )
+                expected = _build_timeline_mini_segments(
+                    [{"ts": item, "topic": "cloudv2-ping"} for item in timestamps],
+                    window_end_ts=timestamps[-1] + 100,
+                    window_sec=TIMELINE_MINI_DEFAULT_WINDOW_SEC,
+                    disconnect_threshold_sec=90.0,
+                )
+                self.assertEqual(payload["pivots"][0]["timeline_mini"], expected)
+            finally:
+                persistence.stop()
+
+    def test_smaller_threshold_splits_runs_merged_with_larger_gap(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+            pivot_id = "PivotMini_3"
+            base_ts = 1_700_700_000.0
+            timestamps = [base_ts + (index * 200.0) for index in range(10)]
+
+            persistence = TelemetryPersistence(db_path=db_path, write_behind_ms=0)
+            persistence.start()
+            try:
+                run = persistence.get_or_create_active_run(now_ts=base_ts, source="test")
+                session = persistence.get_or_create_active_session(
+                    pivot_id,
+                    pivot_slug="pivotmini-3",
+                    now_ts=base_ts,
+                    source="test",
+                    run_id=run["run_id"],
+                )
+                session_id = session["session_id"]
+                _upsert(persistence, pivot_id, session_id, run["run_id"], base_ts)
+                _insert_events(persistence, pivot_id, session_id, timestamps)
+                _upsert(persistence, pivot_id, session_id, run["run_id"], timestamps[-1] + 10)
+            finally:
+                persistence.stop()
+
+            # Reinicio: os runs unidos com gap de 300s voltam do banco.
+            persistence = TelemetryPersistence(db_path=db_path, write_behind_ms=0)
+            persistence.start()
+            try:
+                end_ts = timestamps[-1] + 100
+                _upsert(persistence, pivot_id, session_id, run["run_id"], end_ts, threshold_sec=90.0)
+                payload = persistence.get_run_state_payload(run_id=run["run_id"])
+                runs = persistence._timeline_runs[(pivot_id, session_id)]["runs"]
+            finally:
+                persistence.stop()
+
+            expected = _build_timeline_mini_segments(
+                [{"ts": item, "topic": "cloudv2-ping"} for item in timestamps],
+                window_end_ts=end_ts,
+                window_sec=TIMELINE_MINI_DEFAULT_WINDOW_SEC,
+                disconnect_threshold_sec=90.0,
+            )
+            self.assertEqual(len(runs), len(timestamps))
+            self.assertEqual(payload["pivots"][0]["timeline_mini"], expected)
+            self.assertIn("offline", {segment["state"] for segment in expected})
+
+
+if __name__ == "__main__":
+    unittest.main()
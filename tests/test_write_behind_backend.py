@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from backend.cloudv2_persistence import TelemetryPersistence
+
+
+class WriteBehindPersistenceTests(unittest.TestCase):
+    def _start(self, temp_dir, write_behind_ms=60_000, write_behind_max_rows=500):
+        db_path = os.path.join(temp_dir, "telemetry.sqlite3")
+        persistence = TelemetryPersistence(
+            db_path=db_path,
+            max_events_per_pivot=5000,
+            write_behind_ms=write_behind_ms,
+            write_behind_max_rows=write_behind_max_rows,
+        )
+        persistence.start()
+        run = persistence.get_or_create_active_run(now_ts=1_700_000_000.0, source="test")
+        session = persistence.get_or_create_active_session(
+            "PivotWB_1",
+            pivot_slug="pivotwb-1",
+            now_ts=1_700_000_000.0,
+            source="test",
+            run_id=run["run_id"],
+        )
+        return persistence, db_path, session["session_id"]
+
+    def _count_on_disk(self, db_path, table):
+        conn = sqlite3.connect(db_path)
+        try:
+            return int(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+        finally:
+            conn.close()
+
+    def test_inserts_are_buffered_until_flush_and_visible_to_own_reads(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, db_path, session_id = self._start(temp_dir)
+            try:
+                for offset in range(5):
+                    persistence.insert_ping_rssi_point("PivotWB_1", session_id, ts=1_700_000_010.0 + offset, rssi=10)
+
+                self.assertEqual(self._count_on_disk(db_path, "ping_rssi_points"), 0)
+                self.assertEqual(persistence.get_write_metrics()["pending_rows"], 5)
+
+                points = persistence.fetch_ping_rssi_points("PivotWB_1", session_id)
+                self.assertEqual(len(points), 5)
+                self.assertEqual(self._count_on_disk(db_path, "ping_rssi_points"), 5)
+
+                metrics = persistence.get_write_metrics()
+                self.assertEqual(metrics["pending_rows"], 0)
+                self.assertEqual(metrics["batch_last_rows"], 5)
+                self.assertIsNotNone(metrics["flush_last_ms"])
+            finally:
+                persistence.stop()
+
+    def test_flushes_when_batch_reaches_max_rows(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, db_path, session_id = self._start(temp_dir, write_behind_max_rows=3)
+            try:
+                for offset in range(4):
+                    persistence.insert_connectivity_event(
+                        "PivotWB_1",
+                        session_id,
+                        {"ts": 1_700_000_100.0 + offset, "topic": "cloudv2-ping", "type": "ping", "summary": "ping"},
+                    )
+                self.assertEqual(self._count_on_disk(db_path, "connectivity_events"), 3)
+                self.assertEqual(persistence.get_write_metrics()["pending_rows"], 1)
+            finally:
+                persistence.stop()
+
+    def test_stop_flushes_pending_writes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, db_path, session_id = self._start(temp_dir)
+            persistence.touch_pivot_seen("PivotWB_1", 1_700_000_500.0)
+            persistence.insert_ping_rssi_point("PivotWB_1", session_id, ts=1_700_000_500.0, rssi=20)
+            persistence.stop()
+
+            self.assertEqual(self._count_on_disk(db_path, "ping_rssi_points"), 1)
+            conn = sqlite3.connect(db_path)
+            try:
+                last_seen = conn.execute(
+                    "SELECT last_seen_ts FROM pivots WHERE pivot_id = ?",
+                    ("PivotWB_1",),
+                ).fetchone()[0]
+            finally:
+                conn.close()
+            self.assertEqual(float(last_seen), 1_700_000_500.0)
+
+    def test_invalid_row_in_batch_does_not_discard_valid_rows(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            persistence, db_path, session_id = self._start(temp_dir)
+            try:
+                persistence.insert_ping_rssi_point("PivotWB_1", session_id, ts=1_700_000_600.0, rssi=5)
+                persistence.insert_ping_rssi_point("PivotWB_1", "sessao-inexistente", ts=1_700_000_601.0, rssi=6)
+                persistence.insert_ping_rssi_point("PivotWB_1", session_id, ts=1_700_000_602.0, rssi=7)
+                persistence.flush()
+
+                self.assertEqual(self._count_on_disk(db_path, "ping_rssi_points"), 2)
+                self.assertEqual(persistence.get_write_metrics()["flush_error_count"], 1)
+            finally:
+                persistence.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()